@@ -221,6 +221,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         <svg class="w-20 h-20 text-white/80 drop-shadow-lg" fill="currentColor" viewBox="0 0 24 24"><path d="M8 5v14l11-7z"/></svg>
                     </div>
                 </div>
+                ${movie.status === 'processing' ? '<span class="absolute top-2 left-2 text-xs bg-yellow-600 text-white px-2 py-1 rounded">Processando</span>' : ''}
                 <div class="mt-3 text-left"><h3 class="font-bold text-white truncate">${displayTitle}</h3></div>`;
             card.addEventListener('click', () => openPlayer(movie));
             grid.appendChild(card);
@@ -278,9 +279,11 @@ document.addEventListener('DOMContentLoaded', () => {
             DOMElements.jobs.list.prepend(jobItem);
         }
         jobItem.textContent = `Filme: ${job.status} ${job.progress ? `(${job.progress}%)` : ''}`;
+        // Publicação progressiva: o filme já aparece na biblioteca durante o processamento
+        if (job.status === 'Disponível para assistir') loadLibrary();
         if (job.status === 'Pronto' || job.status === 'Falhou') {
             setTimeout(() => jobItem.remove(), 5000);
-            if (job.status === 'Pronto') loadLibrary();
+            loadLibrary();
         }
     }
     
@@ -422,7 +425,8 @@ document.addEventListener('DOMContentLoaded', () => {
         if (appState.hls) appState.hls.destroy();
         if (Hls.isSupported()) {
             console.log('Usando HLS.js para carregar:', `/library/${movie.id}${movie.hls_playlist}`);
-            appState.hls = new Hls();
+            // Títulos ainda em processamento usam playlist EVENT: começar do início, não do "ao vivo"
+            appState.hls = new Hls(movie.status === 'processing' ? { startPosition: 0 } : {});
             appState.hls.loadSource(`/library/${movie.id}${movie.hls_playlist}`);
             appState.hls.attachMedia(video);
             
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o pipeline de legendas
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import subtitle_search
+from progressive_publisher import write_metadata_atomic, STATUS_PROCESSING
+from subtitle_manager import download_and_process_subtitles, WANTED_LANGUAGES
+from subtitle_search import DEFAULT_PROVIDERS, set_rate_limit
+# Mesmas regras de idioma, deduplicação e ordem da migração dos metadados
+from migrate_library_metadata import normalize_language_code, get_language_name, sort_subtitles
+
+# --- CONFIGURAÇÕES ---
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LIBRARY_PATH = os.path.join(ROOT_DIR, 'library')
+
+# --- BUSCA EM LOTE DAS LEGENDAS QUE FALTAM NA BIBLIOTECA ---
+#
+# Substitui o script_exemplo_que_funciona.py (um título fixo por vez, editado
+# e rodado de novo a cada filme). Para cada título cujo metadata.json não tem
+# todos os idiomas configurados (ou cujo .vtt sumiu da pasta subtitles/),
+# roda busca, download, sincronização e conversão do pipeline normal, vários
+# títulos em paralelo. O vídeo original não é necessário: a busca usa
+# título/ano, hashes do arquivo e ids guardados no metadata.json, e a
+# sincronização usa speech_reference.npz (sem ela, a legenda fica como veio).
+#
+# As sessões dos provedores são compartilhadas por todos os títulos (um login
+# por provedor) e cada provedor recebe no máximo uma chamada a cada
+# --rate-limit segundos. O metadata.json é relido e gravado de forma atômica
+# logo depois de cada título.
+
+def _load_metadata(movie_path):
+    with open(os.path.join(movie_path, 'metadata.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def missing_languages(movie_path, metadata, languages):
+    """Idiomas de `languages` sem legenda no metadata.json (ou com o arquivo .vtt ausente)."""
+    present = set()
+    for sub in metadata.get('subtitles') or []:
+        if not isinstance(sub, dict) or not sub.get('file'):
+            continue
+        if os.path.exists(os.path.join(movie_path, 'subtitles', sub['file'])):
+            present.add(normalize_language_code(sub.get('language')))
+    return [lang for lang in languages if lang not in present]
+
+def merge_subtitles(movie_id, existing, found):
+    """Lista final de legendas: idiomas normalizados, a última ocorrência vence, ordem pt-BR, en, demais."""
+    deduped = {}
+    for sub in list(existing or []) + list(found):
+        if not isinstance(sub, dict) or 'language' not in sub:
+            continue
+        sub = dict(sub)
+        lang_code = normalize_language_code(sub['language'])
+        sub['language'] = lang_code
+        sub['name'] = get_language_name(lang_code)
+        if sub.get('file'):
+            sub['url'] = f"/api/subtitles/{movie_id}/{sub['file']}"
+        deduped[lang_code] = sub
+    return sort_subtitles(list(deduped.values()))
+
+def _movie_info(movie_id, metadata):
+    return {
+        'id': movie_id,
+        'title': metadata.get('title'),
+        'original_title': metadata.get('original_title'),
+        'year': metadata.get('year'),
+        'tmdb_id': metadata.get('tmdb_id'),
+        'imdb_id': metadata.get('imdb_id'),
+        'video_hashes': metadata.get('video_hashes') or {},
+        'video_size': metadata.get('video_size'),
+    }
+
+def backfill_title(movie_path, languages, dry_run=False):
+    """Busca as legendas que faltam num título. Retorna (status, mensagem)."""
+    movie_id = os.path.basename(movie_path)
+    if not os.path.exists(os.path.join(movie_path, 'metadata.json')):
+        return 'skipped', 'sem metadata.json'
+    metadata = _load_metadata(movie_path)
+    if metadata.get('status') == STATUS_PROCESSING:
+        return 'skipped', 'título ainda em processamento'
+    missing = missing_languages(movie_path, metadata, languages)
+    if not missing:
+        return 'skipped', 'todos os idiomas presentes'
+    if dry_run:
+        return 'pending', f"faltando {', '.join(missing)}"
+
+    found = download_and_process_subtitles(movie_path, _movie_info(movie_id, metadata),
+                                           skip_languages=set(WANTED_LANGUAGES) - set(missing))
+    found = [sub for sub in found if sub]
+    if not found:
+        return 'not_found', f"nada encontrado para {', '.join(missing)}"
+
+    # Relido agora: o título pode ter mudado durante a busca
+    metadata = _load_metadata(movie_path)
+    metadata['subtitles'] = merge_subtitles(movie_id, metadata.get('subtitles'), found)
+    write_metadata_atomic(os.path.join(movie_path, 'metadata.json'), metadata)
+    still_missing = missing_languages(movie_path, metadata, languages)
+    message = f"+{', '.join(sorted(normalize_language_code(sub['language']) for sub in found))}"
+    if still_missing:
+        return 'partial', f"{message} (ainda faltando {', '.join(still_missing)})"
+    return 'updated', message
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca as legendas que faltam nos títulos da biblioteca.")
+    parser.add_argument('--library', default=LIBRARY_PATH, help="Pasta da biblioteca")
+    parser.add_argument('--languages', default=','.join(WANTED_LANGUAGES),
+                        help="Idiomas exigidos, separados por vírgula (padrão: os do worker)")
+    parser.add_argument('--workers', type=int, default=4, help="Títulos processados em paralelo")
+    parser.add_argument('--rate-limit', type=float, default=1.0,
+                        help="Intervalo mínimo entre chamadas a cada provedor (segundos, 0 desliga)")
+    parser.add_argument('--provider-timeout', type=float, default=30, help="Timeout de cada provedor por busca")
+    parser.add_argument('--budget', type=float, default=120, help="Orçamento total por título (busca + download)")
+    parser.add_argument('--dry-run', action='store_true', help="Só lista os títulos com idiomas faltando")
+    parser.add_argument('--yes', action='store_true', help="Não pede confirmação")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.library):
+        print(f"AVISO: A pasta da biblioteca '{args.library}' não foi encontrada. Nada a fazer.")
+        return
+    languages = [normalize_language_code(lang.strip()) for lang in args.languages.split(',') if lang.strip()]
+    unknown = [lang for lang in languages if lang not in WANTED_LANGUAGES]
+    if unknown:
+        parser.error(f"idiomas sem busca configurada no worker: {', '.join(unknown)}")
+
+    if not args.dry_run and not args.yes:
+        confirm = input("Este script irá baixar legendas e atualizar os `metadata.json` da biblioteca. "
+                        "Você deseja continuar? (s/n): ")
+        if confirm.lower() != 's':
+            print("Busca de legendas cancelada pelo usuário.")
+            return
+
+    # Com vários títulos disputando os mesmos provedores, os prazos são maiores que os do worker
+    subtitle_search.PROVIDER_TIMEOUT = args.provider_timeout
+    subtitle_search.SEARCH_BUDGET = args.budget
+    for provider in DEFAULT_PROVIDERS:
+        set_rate_limit(provider, args.rate_limit)
+
+    movie_paths = [os.path.join(args.library, name) for name in sorted(os.listdir(args.library))
+                   if os.path.isdir(os.path.join(args.library, name))]
+    print(f"Idiomas exigidos: {', '.join(languages)}")
+    print(f"Títulos encontrados: {len(movie_paths)} ({args.workers} em paralelo)")
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(backfill_title, path, languages, args.dry_run): path for path in movie_paths}
+        for future in as_completed(futures):
+            movie_id = os.path.basename(futures[future])
+            try:
+                status, message = future.result()
+            except Exception as e:
+                status, message = 'error', str(e)
+            counts[status] = counts.get(status, 0) + 1
+            print(f"  [{status}] {movie_id}: {message}")
+
+    print("\n--- Relatório das Legendas ---")
+    for status, count in sorted(counts.items()):
+        print(f"{status}: {count}")
+    if counts.get('error') or counts.get('not_found'):
+        print("Rode o script novamente mais tarde para tentar os títulos sem legenda.")
+
+if __name__ == "__main__":
+    main()
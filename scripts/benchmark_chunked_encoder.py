@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o codificador do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from chunked_encoder import build_encode_command, encode_hls_chunked, default_worker_count
+from hls_playlist import parse_media_playlist
+
+# --- BENCHMARK: PROCESSO ÚNICO vs. BLOCOS PARALELOS ---
+
+def summarize(hls_dir):
+    """Retorna (segmentos, duração total, tamanho em MB) da saída HLS."""
+    playlist = parse_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'))
+    total_duration = sum(seg['duration'] for seg in playlist['segments'])
+    total_size = sum(os.path.getsize(os.path.join(hls_dir, seg['uri'])) for seg in playlist['segments'])
+    return len(playlist['segments']), total_duration, total_size / (1024 * 1024)
+
+def run_single(video_file, out_dir, bit_depth):
+    cmd = build_encode_command(
+        video_file, os.path.join(out_dir, 'playlist.m3u8'),
+        os.path.join(out_dir, 'segment%03d.ts'), bit_depth
+    )
+    started = time.monotonic()
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if result.returncode != 0:
+        raise Exception("ffmpeg (processo único) falhou")
+    return time.monotonic() - started
+
+def run_chunked(video_file, out_dir, bit_depth, workers):
+    started = time.monotonic()
+    if not encode_hls_chunked(video_file, out_dir, bit_depth, workers=workers):
+        raise Exception("Codificação em blocos falhou ou não se aplica a este vídeo")
+    return time.monotonic() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a recodificação HLS em processo único com a codificação em blocos.")
+    parser.add_argument('video_file')
+    parser.add_argument('--bit-depth', type=int, default=8, help="Profundidade de cor da fonte (10 força yuv420p)")
+    parser.add_argument('--workers', type=int, default=default_worker_count())
+    parser.add_argument('--skip-single', action='store_true', help="Roda apenas o modo em blocos")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_chunked_')
+    try:
+        results = {}
+        if not args.skip_single:
+            single_dir = os.path.join(work_dir, 'single')
+            os.makedirs(single_dir)
+            print("Rodando processo único...")
+            results['single'] = (run_single(args.video_file, single_dir, args.bit_depth), summarize(single_dir))
+
+        chunked_dir = os.path.join(work_dir, 'chunked')
+        os.makedirs(chunked_dir)
+        print(f"Rodando em blocos ({args.workers} workers)...")
+        results['chunked'] = (run_chunked(args.video_file, chunked_dir, args.bit_depth, args.workers), summarize(chunked_dir))
+
+        print("\n--- Resultado ---")
+        for mode, (elapsed, (segments, duration, size_mb)) in results.items():
+            print(f"{mode:>8}: {elapsed:8.1f}s | {segments} segmentos | {duration:.1f}s de vídeo | {size_mb:.1f} MB")
+        if 'single' in results:
+            print(f"Speedup: {results['single'][0] / results['chunked'][0]:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
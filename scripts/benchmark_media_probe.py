@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar a análise do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import media_probe
+from media_probe import probe_media, sidecar_path, PACKET_WINDOW_SECONDS
+
+# --- BENCHMARK: VÁRIOS FFPROBE POR ETAPA vs. ANÁLISE ÚNICA MEMORIZADA ---
+#
+# Uso:
+#   python scripts/benchmark_media_probe.py /mnt/nas/filmes/*.mkv --runs 3
+#
+# Para medir em NFS de verdade, limpe o cache de páginas entre execuções
+# (echo 3 > /proc/sys/vm/drop_caches) ou use arquivos ainda não lidos.
+
+# Chamadas que o worker fazia antes, uma por etapa
+LEGACY_PROBES = [
+    ['-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams'],
+    ['-v', 'error', '-read_intervals', f'%+{PACKET_WINDOW_SECONDS}',
+     '-show_entries', 'packet=codec_type,pts_time,dts_time,flags', '-of', 'json'],
+    ['-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1'],
+    ['-v', 'error', '-select_streams', 'v:0', '-read_intervals', '%+21',
+     '-show_entries', 'packet=pts_time,flags:format=start_time', '-of', 'json'],
+]
+
+def run_legacy(video_file):
+    started = time.monotonic()
+    for args in LEGACY_PROBES:
+        subprocess.run(['ffprobe'] + args + [video_file], capture_output=True)
+    return time.monotonic() - started
+
+def run_single(video_file):
+    media_probe._memo.clear()
+    started = time.monotonic()
+    info = probe_media(video_file, use_cache=False)
+    elapsed = time.monotonic() - started
+    if not info:
+        raise Exception(f"ffprobe falhou em {video_file}")
+    return elapsed
+
+def run_cached(video_file):
+    """Nova execução do worker: memória vazia, análise lida do arquivo lateral."""
+    media_probe._memo.clear()
+    started = time.monotonic()
+    probe_media(video_file)
+    return time.monotonic() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os ffprobe por etapa com a análise única memorizada (media_probe).")
+    parser.add_argument('video_files', nargs='+')
+    parser.add_argument('--runs', type=int, default=3, help="Repetições por arquivo")
+    args = parser.parse_args()
+
+    rows = []
+    for video_file in args.video_files:
+        size_gb = os.path.getsize(video_file) / (1024 ** 3)
+        legacy = [run_legacy(video_file) for _ in range(args.runs)]
+        single = [run_single(video_file) for _ in range(args.runs)]
+        probe_media(video_file)  # grava o arquivo lateral
+        cached = [run_cached(video_file) for _ in range(args.runs)]
+        rows.append((os.path.basename(video_file), size_gb, legacy, single, cached))
+
+        info = probe_media(video_file)
+        print(f"{os.path.basename(video_file)} ({size_gb:.1f} GB): {len(info.streams)} fluxos, "
+              f"{info.duration or 0:.0f}s, {len(info.keyframes)} keyframes na janela, "
+              f"{(info.bit_rate or 0) / 1000:.0f} kbps")
+
+    print("\n--- Resultado (mediana) ---")
+    for name, size_gb, legacy, single, cached in rows:
+        legacy_s, single_s, cached_s = (statistics.median(v) for v in (legacy, single, cached))
+        print(f"{name[:40]:>40}: por etapa {legacy_s * 1000:7.0f} ms | única {single_s * 1000:7.0f} ms | "
+              f"cache {cached_s * 1000:6.1f} ms | {legacy_s / single_s:.1f}x")
+    print(f"Arquivos laterais: {', '.join(os.path.basename(sidecar_path(v)) for v in args.video_files[:3])}"
+          f"{'...' if len(args.video_files) > 3 else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import statistics
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o parser do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from release_name import parse_release_name, title_with_year
+
+# --- BENCHMARK: CLEAN_FILENAME_FOR_SEARCH ANTIGO vs. PARSER DE NOMES DE RELEASE ---
+#
+# Uso:
+#   python scripts/benchmark_release_name.py --synthetic 20000 --runs 5
+#   python scripts/benchmark_release_name.py --names lista_de_nomes.txt
+#   python scripts/benchmark_release_name.py --corpus rotulados.tsv
+#
+# Nenhum corpus acompanha o repositório. --corpus recebe um TSV rotulado
+# (nome, título, ano por linha; '#' comenta) e mede a precisão dos dois no
+# termo de busca (título + ano). --names lê um nome por linha (ex.: `ls` de
+# uma pasta de downloads) e --synthetic gera N nomes combinando SYNTHETIC_TITLES
+# (e os títulos do corpus, se houver) com resolução, origem, codecs, áudio e
+# grupo sorteados; esses dois só medem vazão.
+
+SYNTHETIC_TITLES = ['The Matrix 1999', 'Blade Runner 2049 2017', '1917 2019', 'Real Steel 2011',
+                    'Dune Part Two 2024', 'Toy Story 3 2010', 'Cidade de Deus 2002', 'Heat 1995']
+
+def legacy_clean_filename(filename):
+    """O clean_filename_for_search antigo do main.py."""
+    # Remove extensões e termos comuns de torrents para busca mais precisa
+    name = os.path.splitext(filename)[0]
+    
+    # Padrões para remover (em ordem de prioridade)
+    patterns = [
+        # Grupos de release e sites (incluindo variações entre colchetes)
+        r'\[.*?(yts|rarbg|1337x|kickass|torrentgalaxy|eztv|limetorrents).*?\]',
+        r'-\[?(yts|rarbg|1337x|kickass|torrentgalaxy|eztv|limetorrents)\]?',
+        r'\b(yts|ytsmx|yts\.mx|rarbg|1337x|kickass|torrentgalaxy|eztv|limetorrents)\b',
+        
+        # Qualidade e formatos de vídeo entre colchetes ou não
+        r'\[.*?(1080p|720p|2160p|4k|480p|brrip|bluray|blu-ray|dvdrip|webrip|web-dl|hdrip|hdtv).*?\]',
+        r'\b(1080p|720p|2160p|4k|480p|brrip|bluray|blu-ray|dvdrip|webrip|web-dl|hdrip|hdtv|hdcam|cam|ts|r5)\b',
+        
+        # Codecs e áudio entre colchetes ou não - MELHORADO para pegar "10bit", "AAC5", etc.
+        r'\[.*?(x264|x265|h264|h265|aac|ac3|dts|5\.1|2\.0|10bit).*?\]',
+        r'\b(x264|x265|h264|h265|hevc|avc|aac|ac3|dts|dd5\.1|dd2\.0|ddp5\.1|atmos|truehd|flac|mp3|10bit|aac5\.1)\b',
+        
+        # Outros termos técnicos e formatos
+        r'\b(extended|unrated|directors\.cut|remastered|remux|proper|real|repack|internal|limited|mp4|mkv|avi|mov)\b',
+        
+        # Grupos de release após hífens
+        r'-[A-Z0-9]+$',  # Remove grupos como -SPARKS, -DVSUX no final
+        
+        # Remove caracteres especiais e substitui por espaços
+        r'[\.\[\]\(\)_-]',
+        
+        # Remove múltiplos espaços
+        r'\s+'
+    ]
+    
+    for pattern in patterns:
+        name = re.sub(pattern, ' ', name, flags=re.IGNORECASE)
+    
+    # Limpa espaços extras
+    cleaned = name.strip()
+    
+    # MELHORIA: Tentar extrair título mais inteligentemente
+    # Para casos como "Clown.In.A.Cornfield.2025.1080p.WEBRip.x265.10bit.AAC5.1-[YTS.MX]"
+    
+    # 1. Primeiro, tentar encontrar o ano
+    year_match = re.search(r'\b(19|20)\d{2}\b', cleaned)
+    if year_match:
+        year = year_match.group()
+        # Pegar tudo antes do ano como título
+        before_year = cleaned[:year_match.start()].strip()
+        
+        # Limpar melhor o título
+        title_words = []
+        for word in before_year.split():
+            # Ignorar palavras muito técnicas que sobrou
+            if not re.match(r'^(x26[45]|h26[45]|aac\d?|ac3|dts|bit|p|fps|mb|gb|kb)$', word, re.IGNORECASE):
+                title_words.append(word)
+        
+        if title_words:
+            # Reconstruir com título limpo + ano
+            clean_title = ' '.join(title_words)
+            cleaned = f"{clean_title} {year}"
+    
+    # 2. Se não encontrou ano, tentar limpar melhor sem ano
+    if not year_match:
+        words = cleaned.split()
+        meaningful_words = []
+        for word in words:
+            # Manter palavras significativas (3+ caracteres)
+            if len(word) >= 3:
+                # Excluir códigos técnicos específicos MAIS RÍGIDO
+                if not re.match(r'^(ddp|dts|aac\d?|ac3|h26[45]|x26[45]|bit|fps|mb|gb|kb|\d+p|\d+bit)$', word, re.IGNORECASE):
+                    meaningful_words.append(word)
+        
+        cleaned = ' '.join(meaningful_words)
+    
+    # 3. Último fallback: pegar apenas as primeiras palavras sensatas
+    words = cleaned.split()
+    if len(words) > 6:  # Se ainda tem muitas palavras, pegar apenas as primeiras
+        # Tentar manter até encontrar um ano ou parar em 5 palavras
+        final_words = []
+        for word in words[:8]:  # Máximo 8 palavras
+            if re.match(r'^(19|20)\d{2}$', word):  # Se encontrar ano
+                final_words.append(word)
+                break
+            final_words.append(word)
+            if len(final_words) >= 5 and not re.match(r'^(19|20)\d{2}$', words[len(final_words)] if len(final_words) < len(words) else ""):
+                break
+        cleaned = ' '.join(final_words)
+    
+    return cleaned.strip()
+
+def load_corpus(path):
+    """[(nome, termo de busca esperado)] do corpus rotulado."""
+    corpus = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                name, title, year = line.rstrip('\n').split('\t')[:3]
+                corpus.append((name, f"{title} {year}".strip()))
+    return corpus
+
+def synthetic_names(corpus, count, seed=0):
+    rng = random.Random(seed)
+    titles = SYNTHETIC_TITLES + [expected for _, expected in corpus]
+    parts = [['2160p', '1080p', '720p', '480p'], ['BluRay', 'WEB-DL', 'WEBRip', 'HDTV', 'DVDRip', 'AMZN.WEB-DL'],
+             ['x264', 'x265.10bit', 'H.264', 'HEVC', 'XviD'], ['AAC5.1', 'DDP5.1.Atmos', 'DTS-HD.MA.7.1', 'AC3', ''],
+             ['-SPARKS', '-RARBG', '-[YTS.MX]', '-FLUX', '']]
+    names = []
+    for _ in range(count):
+        tags = [rng.choice(options) for options in parts]
+        names.append('.'.join([rng.choice(titles).replace(' ', '.')] + [tag for tag in tags[:-1] if tag]) + tags[-1])
+    return names
+
+def throughput(function, names, runs):
+    """Mediana de nomes por segundo em `runs` passadas."""
+    rates = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for name in names:
+            function(name)
+        rates.append(len(names) / (time.perf_counter() - started))
+    return statistics.median(rates)
+
+def parsed_term(name):
+    return title_with_year(parse_release_name(name))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o clean_filename_for_search antigo com o parser de nomes de release.")
+    parser.add_argument('--corpus', help="Corpus rotulado (TSV: nome, título, ano) para medir a precisão")
+    parser.add_argument('--names', help="Arquivo com um nome de release por linha (só vazão)")
+    parser.add_argument('--synthetic', type=int, default=10000, help="Nomes sintéticos gerados para a vazão")
+    parser.add_argument('--runs', type=int, default=3, help="Repetições da medição de vazão")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else []
+    if corpus:
+        print(f"--- Precisão do termo de busca ({len(corpus)} nomes rotulados) ---")
+        for label, function in (("antigo", legacy_clean_filename), ("parser", parsed_term)):
+            misses = [(name, expected, function(name)) for name, expected in corpus if function(name) != expected]
+            print(f"{label}: {len(corpus) - len(misses)}/{len(corpus)} corretos")
+            for name, expected, got in misses[:5]:
+                print(f"    {name}\n      esperado '{expected}', obtido '{got}'")
+
+    names = [name for name, _ in corpus] + synthetic_names(corpus, args.synthetic)
+    if args.names:
+        with open(args.names, encoding='utf-8') as f:
+            names += [line.strip() for line in f if line.strip()]
+    legacy = throughput(legacy_clean_filename, names, args.runs)
+    parsed = throughput(parse_release_name, names, args.runs)
+    print(f"\n--- Vazão (mediana de {args.runs}, {len(names)} nomes) ---")
+    print(f"antigo: {legacy:10.0f} nomes/s")
+    print(f"parser: {parsed:10.0f} nomes/s ({parsed / legacy:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+import pysrt
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar a sincronização do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from speech_reference import ensure_speech_reference, load_speech_reference, reference_path
+from subtitle_aligner import align, MIN_CONFIDENCE
+
+# --- BENCHMARK: ALINHADOR INTERNO vs. FFSUBSYNC ---
+#
+# Uso (pares legenda/áudio reais; PASTA é a pasta do filme na biblioteca, com
+# speech_reference.npz, ou um arquivo de vídeo, do qual a referência é extraída):
+#   python scripts/benchmark_subtitle_sync.py library/123:en.srt filme.mkv:pt.srt --runs 5
+#
+# Com --ffsubsync, cada par também roda o ffsubsync (mesma referência .npz e,
+# com --ffsubsync-video, a partir do vídeo) para comparar tempo e deslocamento.
+
+def _cues(subtitle_file):
+    return [(sub.start.ordinal / 1000, sub.end.ordinal / 1000)
+            for sub in pysrt.open(subtitle_file, encoding='utf-8', error_handling=pysrt.ERROR_PASS)]
+
+def _reference_for(source):
+    """Referência .npz do par (extraída para uma pasta temporária se `source` é um vídeo)."""
+    if os.path.isdir(source):
+        return reference_path(source), 0.0
+    folder = tempfile.mkdtemp(prefix='speech_')
+    started = time.monotonic()
+    path = ensure_speech_reference(folder, source)
+    return path, time.monotonic() - started
+
+def run_builtin(speech, cues):
+    started = time.monotonic()
+    result = align(speech, cues)
+    return time.monotonic() - started, result
+
+def run_ffsubsync(reference, subtitle_file):
+    """Tempo e deslocamento do ffsubsync (pelo primeiro cue da saída)."""
+    output = os.path.join(tempfile.mkdtemp(prefix='sync_'), 'synced.srt')
+    started = time.monotonic()
+    subprocess.run([sys.executable, '-m', 'ffsubsync.ffsubsync', reference, '-i', subtitle_file, '-o', output],
+                   capture_output=True)
+    elapsed = time.monotonic() - started
+    if not os.path.exists(output):
+        return elapsed, None
+    offset = _cues(output)[0][0] - _cues(subtitle_file)[0][0]
+    os.remove(output)
+    return elapsed, offset
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o alinhador interno de legendas com o ffsubsync.")
+    parser.add_argument('pairs', nargs='+', help="PASTA_OU_VIDEO:LEGENDA.srt")
+    parser.add_argument('--runs', type=int, default=5, help="Repetições do alinhador interno por par")
+    parser.add_argument('--ffsubsync', action='store_true', help="Roda também o ffsubsync com a referência .npz")
+    parser.add_argument('--ffsubsync-video', action='store_true', help="E o ffsubsync a partir do vídeo (decodifica o áudio)")
+    args = parser.parse_args()
+
+    rows = []
+    for pair in args.pairs:
+        source, _, subtitle_file = pair.rpartition(':')
+        reference, extract_time = _reference_for(source)
+        speech = load_speech_reference(reference)
+        cues = _cues(subtitle_file)
+        timings = []
+        for _ in range(args.runs):
+            elapsed, result = run_builtin(speech, cues)
+            timings.append(elapsed)
+        row = {'name': os.path.basename(subtitle_file), 'minutes': len(speech) / 6000, 'builtin': statistics.median(timings),
+               'result': result, 'extract': extract_time}
+        if args.ffsubsync:
+            row['ffsubsync'] = run_ffsubsync(reference, subtitle_file)
+        if args.ffsubsync_video and not os.path.isdir(source):
+            row['ffsubsync_video'] = run_ffsubsync(source, subtitle_file)
+        rows.append(row)
+
+        result = row['result'] or {'offset': 0, 'ratio': 1, 'confidence': 0}
+        print(f"{row['name']} ({row['minutes']:.0f} min, {len(cues)} falas): deslocamento {result['offset']:+.2f}s, "
+              f"razão {result['ratio']:.4f}, confiança {result['confidence']:.1f}"
+              f"{'' if result['confidence'] >= MIN_CONFIDENCE else ' (cairia para o ffsubsync)'}")
+
+    print("\n--- Resultado (mediana do alinhador interno) ---")
+    for row in rows:
+        line = f"{row['name'][:40]:>40}: interno {row['builtin'] * 1000:7.0f} ms"
+        if row['extract']:
+            line += f" | extração da referência {row['extract']:6.1f}s (uma vez por filme)"
+        for key, label in (('ffsubsync', 'ffsubsync .npz'), ('ffsubsync_video', 'ffsubsync vídeo')):
+            if key in row:
+                elapsed, offset = row[key]
+                line += f" | {label} {elapsed:6.1f}s ({'falhou' if offset is None else f'{offset:+.2f}s'})"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import io
+import os
+import random
+import sys
+import time
+import argparse
+import contextlib
+import shutil
+import statistics
+import tempfile
+
+import chardet
+import pysrt
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o conversor do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from speech_reference import load_speech_reference, reference_path, save_speech_reference
+from subtitle_aligner import align, apply_alignment, cue_vector, MIN_CONFIDENCE, SAMPLE_RATE
+from subtitle_manager import SubtitleManager
+from webvtt_converter import convert_to_webvtt, cue_seconds, read_cues
+
+# --- BENCHMARK: CHARDET NO ARQUIVO INTEIRO + PYSRT vs. CONVERSOR EM STREAMING ---
+#
+# Uso:
+#   python scripts/benchmark_webvtt_conversion.py legenda1.srt legenda2.srt --runs 5
+#   python scripts/benchmark_webvtt_conversion.py --synthetic 20000 --runs 3
+#   python scripts/benchmark_webvtt_conversion.py --synthetic 20000 --sync
+#
+# --synthetic gera SRTs grandes (N falas) em UTF-8 e em cp1252, os dois casos
+# do caminho antigo: o chardet lê o arquivo inteiro nos dois.
+#
+# --sync mede o caminho inteiro de uma legenda baixada: alinhamento com a
+# referência de fala (leitura, FFT, gravação da legenda alinhada) seguido da
+# conversão para WebVTT. O caminho novo é o do SubtitleManager; o antigo lê
+# com chardet + pysrt nas duas etapas. Sem --reference, a referência de cada
+# legenda sai das próprias falas deslocadas em SYNC_OFFSET segundos.
+
+SYNC_OFFSET = 2.5
+
+def run_legacy(source, target):
+    """O _convert_to_webvtt antigo do SubtitleManager."""
+    started = time.monotonic()
+    with open(source, 'rb') as f:
+        encoding = chardet.detect(f.read())['encoding'] or 'utf-8'
+    subs = pysrt.open(source, encoding=encoding)
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for sub in subs:
+            f.write(f"{str(sub.start).replace(',', '.')} --> {str(sub.end).replace(',', '.')}\n")
+            f.write(f"{sub.text}\n\n")
+    return time.monotonic() - started
+
+def run_streaming(source, target):
+    started = time.monotonic()
+    convert_to_webvtt(source, target)
+    return time.monotonic() - started
+
+def run_legacy_sync(source, target, speech):
+    """_align_with_reference + _convert_to_webvtt antigos (chardet e pysrt nas duas etapas)."""
+    started = time.monotonic()
+    with open(source, 'rb') as f:
+        encoding = chardet.detect(f.read())['encoding'] or 'utf-8'
+    subs = pysrt.open(source, encoding=encoding)
+    cues = [(sub.start.ordinal / 1000, sub.end.ordinal / 1000) for sub in subs]
+    result = align(speech, cues)
+    synced = source
+    if result and result['confidence'] >= MIN_CONFIDENCE:
+        for sub, (start, end) in zip(subs, apply_alignment(cues, result)):
+            sub.start = pysrt.SubRipTime.from_ordinal(int(round(start * 1000)))
+            sub.end = pysrt.SubRipTime.from_ordinal(int(round(end * 1000)))
+        synced = os.path.splitext(target)[0] + '_synced.srt'
+        subs.save(synced, encoding='utf-8')
+    elapsed = time.monotonic() - started
+    return elapsed + run_legacy(synced, target)
+
+def run_streaming_sync(source, movie_dir):
+    """
+    Alinhador interno e conversão pelo SubtitleManager (saída de progresso
+    descartada). O ffsubsync fica de fora: com confiança baixa a legenda segue
+    sem alinhar, como no caminho antigo medido aqui.
+    """
+    manager = SubtitleManager(movie_dir, {'id': 'bench'})
+    started = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        synced = manager._align_with_reference(source, reference_path(movie_dir))
+        manager._convert_to_webvtt(synced or source, 'bench')
+    elapsed = time.monotonic() - started
+    if synced:
+        os.remove(synced)
+    manager.cleanup_temp()
+    return elapsed
+
+def sync_reference(source, movie_dir, reference=None):
+    """Grava a referência de fala em `movie_dir` e a devolve (vetor do alinhador)."""
+    if reference:
+        shutil.copy(reference, reference_path(movie_dir))
+    else:
+        cues = [(cue_seconds(start) + SYNC_OFFSET, cue_seconds(end) + SYNC_OFFSET)
+                for start, end, _ in read_cues(source)[0]]
+        length = int((max((end for _, end in cues), default=0) + 60) * SAMPLE_RATE)
+        save_speech_reference(reference_path(movie_dir), cue_vector(cues, length))
+    return load_speech_reference(reference_path(movie_dir))
+
+def synthetic_srt(folder, cues, encoding):
+    path = os.path.join(folder, f'sintetica_{cues}_{encoding}.srt')
+    # Intervalos irregulares: falas a cada 3s exatos não têm alinhamento único
+    rng = random.Random(cues)
+    start = 0
+    with open(path, 'w', encoding=encoding) as f:
+        for i in range(cues):
+            start += 2600 + rng.randrange(4000)
+            f.write(f"{i + 1}\n{pysrt.SubRipTime.from_ordinal(start)} --> {pysrt.SubRipTime.from_ordinal(start + 2500)}\n"
+                    f"Fala número {i + 1}, com acentuação: ação, coração.\n<i>Segunda linha da fala.</i>\n\n")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a conversão SRT→WebVTT antiga (chardet + pysrt) com a em streaming.")
+    parser.add_argument('subtitle_files', nargs='*')
+    parser.add_argument('--synthetic', type=int, default=0, help="Gera SRTs sintéticos com N falas (UTF-8 e cp1252)")
+    parser.add_argument('--runs', type=int, default=3, help="Repetições por arquivo")
+    parser.add_argument('--sync', action='store_true', help="Mede sincronização + conversão (caminho inteiro)")
+    parser.add_argument('--reference', help="speech_reference.npz real para o --sync (padrão: sintética)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='webvtt_bench_')
+    files = list(args.subtitle_files)
+    if args.synthetic:
+        files += [synthetic_srt(work_dir, args.synthetic, encoding) for encoding in ('utf-8', 'cp1252')]
+    if not files:
+        parser.error("informe legendas ou --synthetic N")
+
+    rows = []
+    for source in files:
+        target = os.path.join(work_dir, 'saida.vtt')
+        if args.sync:
+            movie_dir = tempfile.mkdtemp(prefix='filme_', dir=work_dir)
+            speech = sync_reference(source, movie_dir, args.reference)
+            legacy = statistics.median(run_legacy_sync(source, target, speech) for _ in range(args.runs))
+            streaming = statistics.median(run_streaming_sync(source, movie_dir) for _ in range(args.runs))
+        else:
+            legacy = statistics.median(run_legacy(source, target) for _ in range(args.runs))
+            streaming = statistics.median(run_streaming(source, target) for _ in range(args.runs))
+        rows.append((os.path.basename(source), os.path.getsize(source), legacy, streaming))
+        print(f"{os.path.basename(source)}: antigo {legacy * 1000:.0f} ms, streaming {streaming * 1000:.0f} ms")
+
+    print(f"\n--- Resultado (mediana{', sincronização + conversão' if args.sync else ''}) ---")
+    for name, size, legacy, streaming in rows:
+        print(f"{name[:40]:>40} ({size / 1024 / 1024:5.1f} MB): antigo {legacy * 1000:7.0f} ms | "
+              f"streaming {streaming * 1000:7.0f} ms | {legacy / streaming:5.1f}x")
+
+if __name__ == "__main__":
+    main()
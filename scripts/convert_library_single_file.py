@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o empacotamento do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from audio_renditions import published_renditions
+from hls_playlist import parse_media_playlist
+from progressive_publisher import write_metadata_atomic, STATUS_PROCESSING
+from single_file_layout import consolidate_segments, is_single_file, remove_stale_files, LAYOUT_SINGLE_FILE
+from startup_layout import finalize_playlists
+
+# --- CONFIGURAÇÕES ---
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LIBRARY_PATH = os.path.join(ROOT_DIR, 'library')
+
+# --- CONVERSÃO DA BIBLIOTECA PARA O LAYOUT DE ARQUIVO ÚNICO ---
+#
+# Reescreve cada título no lugar: os segmentNNN.ts são concatenados em
+# hls/media.ts (sem remux nem recodificação), a playlist passa a usar
+# EXT-X-BYTERANGE, a master e a playlist de I-frames são regeneradas e o
+# metadata.json é atualizado. As renditions de áudio separadas (audio/<idioma>/)
+# passam pela mesma consolidação e continuam na master como EXT-X-MEDIA: os
+# segmentos de vídeo delas não têm áudio. Pode ser interrompido e rodado de novo: títulos
+# já convertidos são pulados e cada troca é atômica (ver single_file_layout).
+
+def convert_title(movie_path, dry_run=False):
+    """Converte um título. Retorna (status, mensagem)."""
+    hls_dir = os.path.join(movie_path, 'hls')
+    playlist_path = os.path.join(hls_dir, 'playlist.m3u8')
+    metadata_path = os.path.join(movie_path, 'metadata.json')
+    if not os.path.exists(playlist_path) or not os.path.exists(metadata_path):
+        return 'skipped', 'sem playlist ou metadata.json'
+
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata.get('status') == STATUS_PROCESSING:
+        return 'skipped', 'título ainda em processamento'
+
+    renditions = published_renditions(metadata)
+    audio_dirs = [os.path.join(hls_dir, os.path.dirname(rendition['uri'])) for rendition in renditions]
+    pending_audio = [audio_dir for audio_dir in audio_dirs
+                     if not is_single_file(parse_media_playlist(os.path.join(audio_dir, 'playlist.m3u8'))['segments'])]
+
+    segments = parse_media_playlist(playlist_path)['segments']
+    if is_single_file(segments):
+        # Resto de uma execução interrompida depois da troca da playlist
+        remove_stale_files(hls_dir, keep=[segments[0]['uri']])
+        if metadata.get('hls_layout') == LAYOUT_SINGLE_FILE and not pending_audio:
+            return 'skipped', 'já convertido'
+        count = 0
+    else:
+        if dry_run:
+            return 'pending', f'{len(segments)} segmentos'
+        count = consolidate_segments(hls_dir)
+
+    if dry_run:
+        return 'pending', f'{len(pending_audio)} renditions de áudio' if pending_audio else 'atualizar metadata.json'
+
+    for audio_dir in audio_dirs:
+        consolidate_segments(audio_dir)
+        audio_segments = parse_media_playlist(os.path.join(audio_dir, 'playlist.m3u8'))['segments']
+        remove_stale_files(audio_dir, keep=[audio_segments[0]['uri']] if audio_segments else [])
+
+    if finalize_playlists(hls_dir, audio_renditions=renditions or None):
+        metadata['hls_playlist'] = '/hls/master.m3u8'
+    metadata['hls_layout'] = LAYOUT_SINGLE_FILE
+    write_metadata_atomic(metadata_path, metadata)
+    return 'converted', f'{count} segmentos consolidados'
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte a biblioteca HLS para o layout de arquivo único (EXT-X-BYTERANGE).")
+    parser.add_argument('--library', default=LIBRARY_PATH, help="Pasta da biblioteca")
+    parser.add_argument('--workers', type=int, default=4, help="Títulos convertidos ao mesmo tempo")
+    parser.add_argument('--dry-run', action='store_true', help="Só lista o que seria convertido")
+    parser.add_argument('--yes', action='store_true', help="Não pede confirmação")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.library):
+        print(f"AVISO: A pasta da biblioteca '{args.library}' não foi encontrada. Nada a fazer.")
+        return
+
+    if not args.dry_run and not args.yes:
+        confirm = input("Este script irá reescrever os arquivos HLS da biblioteca no lugar. "
+                        "Você deseja continuar? (s/n): ")
+        if confirm.lower() != 's':
+            print("Conversão cancelada pelo usuário.")
+            return
+
+    movie_paths = [os.path.join(args.library, name) for name in sorted(os.listdir(args.library))
+                   if os.path.isdir(os.path.join(args.library, name))]
+    print(f"Títulos encontrados: {len(movie_paths)} ({args.workers} em paralelo)")
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(convert_title, path, args.dry_run): path for path in movie_paths}
+        for future in as_completed(futures):
+            movie_id = os.path.basename(futures[future])
+            try:
+                status, message = future.result()
+            except Exception as e:
+                status, message = 'error', str(e)
+            counts[status] = counts.get(status, 0) + 1
+            print(f"  [{status}] {movie_id}: {message}")
+
+    print("\n--- Relatório da Conversão ---")
+    for status, count in sorted(counts.items()):
+        print(f"{status}: {count}")
+    if counts.get('error'):
+        print("Rode o script novamente para retomar os títulos com erro.")
+
+if __name__ == "__main__":
+    main()
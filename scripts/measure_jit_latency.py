@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+import requests
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o parser de playlists do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from hls_playlist import parse_media_playlist_text
+
+# --- LATÊNCIA DOS SEGMENTOS NO MODO JIT ---
+#
+# Uso:
+#   python scripts/measure_jit_latency.py http://localhost:3000/library/<id>/jit/playlist.m3u8
+#
+# Pede segmentos em posições aleatórias (latência fria: o serviço roda o
+# ffmpeg), repete os mesmos pedidos (latência quente: cache em disco) e,
+# por fim, pede o segmento seguinte a cada um (efeito do prefetch).
+# Use um título recém-ingerido ou limpe o cache para a medição fria valer.
+
+def timed_get(url):
+    started = time.monotonic()
+    response = requests.get(url, timeout=120)
+    response.raise_for_status()
+    return len(response.content), time.monotonic() - started
+
+def summarize(label, timings):
+    if not timings:
+        return
+    print(f"  {label:>9}: mediana {statistics.median(timings) * 1000:.0f} ms | "
+          f"mín {min(timings) * 1000:.0f} ms | máx {max(timings) * 1000:.0f} ms ({len(timings)} pedidos)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a latência fria e quente dos segmentos HLS sob demanda.")
+    parser.add_argument('playlist', help="URL da playlist JIT do título")
+    parser.add_argument('--samples', type=int, default=5, help="Posições aleatórias medidas")
+    parser.add_argument('--prefetch-wait', type=float, default=5.0,
+                        help="Segundos de espera antes de pedir o segmento seguinte")
+    parser.add_argument('--seed', type=int, default=None, help="Semente das posições sorteadas")
+    args = parser.parse_args()
+
+    _, playlist_time = timed_get(args.playlist)
+    text = requests.get(args.playlist, timeout=30).text
+    segments = parse_media_playlist_text(text)['segments']
+    if len(segments) < 2:
+        print("AVISO: Playlist com menos de dois segmentos. Nada a medir.")
+        return
+
+    rng = random.Random(args.seed)
+    positions = sorted(rng.sample(range(len(segments) - 1), min(args.samples, len(segments) - 1)))
+    urls = [requests.compat.urljoin(args.playlist, segments[i]['uri']) for i in positions]
+    print(f"Playlist: {len(segments)} segmentos ({playlist_time * 1000:.0f} ms)")
+
+    cold = [timed_get(url)[1] for url in urls]
+    warm = [timed_get(url)[1] for url in urls]
+    time.sleep(args.prefetch_wait)
+    following = [timed_get(requests.compat.urljoin(args.playlist, segments[i + 1]['uri']))[1] for i in positions]
+
+    print("Latência por segmento:")
+    summarize('fria', cold)
+    summarize('quente', warm)
+    summarize('prefetch', following)
+
+    stats_url = requests.compat.urljoin(args.playlist, '/stats')
+    try:
+        stats = requests.get(stats_url, timeout=5).json()
+        print(f"Serviço: {stats}")
+    except (requests.RequestException, ValueError):
+        # Atrás do servidor Node só /library/:id/jit/* é encaminhado
+        print(f"(estatísticas do serviço disponíveis em http://127.0.0.1:<JIT_SERVICE_PORT>/stats)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+import requests
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o parser de playlists do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from hls_playlist import parse_media_playlist_text
+
+# --- MEDIÇÃO DO TEMPO ATÉ O PRIMEIRO QUADRO (TTFF) ---
+#
+# Uso:
+#   python scripts/measure_startup.py /app/library/<id>
+#   python scripts/measure_startup.py http://localhost:3000/library/<id>/hls/master.m3u8
+#
+# Rode antes e depois de reempacotar um título para comparar.
+
+def fetch(source, relative=None):
+    """Lê uma playlist/segmento local ou remoto. Retorna (bytes, segundos)."""
+    started = time.monotonic()
+    if source.startswith('http'):
+        url = requests.compat.urljoin(source, relative) if relative else source
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        data = response.content
+    else:
+        path = os.path.join(os.path.dirname(source), relative) if relative else source
+        with open(path, 'rb') as f:
+            data = f.read()
+    return data, time.monotonic() - started
+
+def resolve_entry(source):
+    """Playlist de entrada do título: master.m3u8 se existir, senão playlist.m3u8."""
+    if source.startswith('http') or source.endswith('.m3u8'):
+        return source
+    for name in ('master.m3u8', 'playlist.m3u8'):
+        candidate = os.path.join(source, 'hls', name)
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"Nenhuma playlist HLS em {source}/hls")
+
+def startup_chain(entry):
+    """
+    Baixa a cadeia que o player precisa antes do primeiro quadro
+    (master → media playlist → primeiro segmento) e mede cada etapa.
+    """
+    steps = []
+    data, elapsed = fetch(entry)
+    steps.append(('playlist', os.path.basename(entry), len(data), elapsed))
+    text = data.decode('utf-8', errors='replace')
+
+    media = entry
+    if '#EXT-X-STREAM-INF' in text:
+        uri = next(line.strip() for line in text.splitlines() if line.strip() and not line.startswith('#'))
+        data, elapsed = fetch(entry, uri)
+        steps.append(('media', uri, len(data), elapsed))
+        media = requests.compat.urljoin(entry, uri) if entry.startswith('http') else os.path.join(os.path.dirname(entry), uri)
+        text = data.decode('utf-8', errors='replace')
+
+    playlist = parse_media_playlist_text(text)
+
+    first = playlist['segments'][0]
+    data, elapsed = fetch(media, first['uri'])
+    if first.get('byterange'):
+        length, _, offset = first['byterange'].partition('@')
+        data = data[int(offset or 0):int(offset or 0) + int(length)]
+    steps.append(('segment', first['uri'], len(data), elapsed))
+    return steps, playlist
+
+def decode_first_frame(entry):
+    """Tempo de parede do ffmpeg até decodificar o primeiro quadro de vídeo."""
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-i', entry, '-map', '0:v:0',
+           '-frames:v', '1', '-f', 'null', '-']
+    started = time.monotonic()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg falhou: {result.stderr[-300:]}")
+    return time.monotonic() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o custo de início da reprodução HLS de um título.")
+    parser.add_argument('source', help="Pasta do título na biblioteca ou URL da playlist")
+    parser.add_argument('--runs', type=int, default=5, help="Repetições da decodificação do primeiro quadro")
+    parser.add_argument('--bandwidth-mbps', type=float, default=10.0,
+                        help="Banda usada para estimar o download da cadeia inicial")
+    args = parser.parse_args()
+
+    entry = resolve_entry(args.source)
+    steps, playlist = startup_chain(entry)
+    segments = playlist['segments']
+
+    print(f"Entrada: {entry}")
+    print(f"Segmentos: {len(segments)} | TARGETDURATION {playlist['target_duration']} | "
+          f"iniciais: {[round(seg['duration'], 2) for seg in segments[:4]]}")
+    for kind, name, size, elapsed in steps:
+        print(f"  {kind:>8}: {name} ({size / 1024:.0f} KB, {elapsed * 1000:.0f} ms)")
+
+    startup_bytes = sum(size for _, _, size, _ in steps)
+    estimated = startup_bytes * 8 / (args.bandwidth_mbps * 1_000_000)
+    print(f"Bytes até o primeiro quadro: {startup_bytes / 1024:.0f} KB "
+          f"(~{estimated:.2f}s a {args.bandwidth_mbps:g} Mbps)")
+
+    timings = [decode_first_frame(entry) for _ in range(args.runs)]
+    print(f"TTFF (ffmpeg, {args.runs} execuções): mediana {statistics.median(timings):.3f}s | "
+          f"mín {min(timings):.3f}s | máx {max(timings):.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Adiciona a pasta 'worker' ao sys.path para reutilizar o empacotamento do pipeline
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from audio_renditions import published_renditions
+from chunked_encoder import STARTUP_SEGMENT_DURATIONS
+from hls_playlist import parse_media_playlist, write_media_playlist
+from hls_validation import validate_hls_output
+from iframe_playlist import IFRAME_PLAYLIST
+from jit_packager import LAYOUT_JIT
+from packaging_profile import current_profile, profile_matches
+from process_supervisor import run_supervised
+from progressive_publisher import write_metadata_atomic, STATUS_PROCESSING
+from single_file_layout import consolidate_segments, LAYOUT_SINGLE_FILE, LAYOUT_SEGMENTS
+from startup_layout import finalize_playlists
+
+# --- CONFIGURAÇÕES ---
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LIBRARY_PATH = os.path.join(ROOT_DIR, 'library')
+WORK_FOLDER = '.hls.repack'
+OLD_FOLDER = '.hls.old'
+# Escrito no fim do reempacotamento: a pasta nova está completa e traz os
+# campos do metadata.json que a acompanham
+MARKER_FILE = '.repack.json'
+
+# --- REEMPACOTAMENTO DA BIBLIOTECA NO PERFIL ATUAL ---
+#
+# Quando o empacotamento muda (duração dos segmentos, layout de arquivo único,
+# áudio por idioma, I-frames), os títulos antigos continuariam no perfil
+# antigo para sempre. Este script refaz o hls/ de cada título a partir da
+# saída HLS atual (remux sem recodificar, com -copyts), numa pasta ao lado
+# (.hls.repack), valida, e troca as pastas. Cada período entre
+# EXT-X-DISCONTINUITY é remuxado separadamente, preservando a cabeça de
+# segmentos curtos e os trechos do smart render.
+#
+# Pode ser interrompido e rodado de novo: títulos já no perfil atual são
+# pulados, pastas de trabalho incompletas são descartadas e uma troca pela
+# metade é concluída (ou desfeita) antes de qualquer outra coisa.
+
+def _periods(segments):
+    periods = []
+    for seg in segments:
+        if seg.get('discontinuity') or not periods:
+            periods.append([])
+        periods[-1].append(seg)
+    return periods
+
+def remux_playlist(source_dir, playlist_name, target_dir, segment_duration):
+    """
+    Remuxa uma media playlist para `target_dir` com segmentos de
+    `segment_duration` segundos. Retorna a duração total.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    periods = _periods(parse_media_playlist(os.path.join(source_dir, playlist_name))['segments'])
+    result = []
+    for index, period in enumerate(periods):
+        period_playlist = os.path.join(target_dir, f'.period{index}.m3u8')
+        output_playlist = os.path.join(target_dir, f'.period{index}.out.m3u8')
+        write_media_playlist(period_playlist, [
+            dict(seg, uri=os.path.join(os.path.abspath(source_dir), seg['uri']), discontinuity=False)
+            for seg in period
+        ])
+        # Cabeça de segmentos curtos: corta em todo keyframe para mantê-los
+        head = index == 0 and len(periods) > 1 and period[0]['duration'] < segment_duration
+        hls_time = min(STARTUP_SEGMENT_DURATIONS) if head else segment_duration
+        cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-y', '-copyts', '-i', period_playlist,
+               '-map', '0:v?', '-map', '0:a?', '-c', 'copy',
+               '-f', 'hls', '-hls_time', str(hls_time), '-hls_playlist_type', 'vod',
+               '-hls_flags', 'independent_segments', '-start_number', str(len(result)),
+               '-hls_segment_filename', os.path.join(target_dir, 'segment%04d.ts'), output_playlist]
+        if not run_supervised(cmd, 'ffmpeg:reempacotamento')['ok']:
+            raise RuntimeError(f"ffmpeg falhou no período {index} de {playlist_name}")
+        segments = parse_media_playlist(output_playlist)['segments']
+        if segments:
+            segments[0]['discontinuity'] = index > 0
+        result += segments
+        os.remove(period_playlist)
+        os.remove(output_playlist)
+    write_media_playlist(os.path.join(target_dir, playlist_name), result)
+    return sum(seg['duration'] for seg in result)
+
+def recover_swap(movie_path):
+    """Conclui ou desfaz uma troca interrompida e aplica o metadata pendente."""
+    hls_dir = os.path.join(movie_path, 'hls')
+    work_dir = os.path.join(movie_path, WORK_FOLDER)
+    old_dir = os.path.join(movie_path, OLD_FOLDER)
+
+    if os.path.isdir(old_dir) and not os.path.isdir(hls_dir):
+        if os.path.exists(os.path.join(work_dir, MARKER_FILE)):
+            os.replace(work_dir, hls_dir)
+        else:
+            os.replace(old_dir, hls_dir)
+    if os.path.isdir(old_dir):
+        shutil.rmtree(old_dir)
+    if os.path.isdir(work_dir):
+        shutil.rmtree(work_dir)
+
+    marker = os.path.join(hls_dir, MARKER_FILE)
+    if os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as f:
+            updates = json.load(f)
+        metadata_path = os.path.join(movie_path, 'metadata.json')
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        metadata.update(updates)
+        write_metadata_atomic(metadata_path, metadata)
+        os.remove(marker)
+
+def _up_to_date(metadata, profile):
+    """
+    Perfil gravado igual ao atual. O reempacotamento não separa o áudio por
+    idioma (só a ingestão tem a fonte), então num título sem renditions
+    publicadas o campo audio_renditions não conta: reempacotar não mudaria nada.
+    """
+    recorded = metadata.get('packaging_profile')
+    if recorded and not published_renditions(metadata):
+        recorded = dict(recorded, audio_renditions=profile['audio_renditions'])
+    return profile_matches({'packaging_profile': recorded}, profile)
+
+def repackage_title(movie_path, profile, dry_run=False):
+    """Reempacota um título. Retorna (status, mensagem)."""
+    metadata_path = os.path.join(movie_path, 'metadata.json')
+    if not os.path.exists(metadata_path):
+        return 'skipped', 'sem metadata.json'
+    recover_swap(movie_path)
+
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    hls_dir = os.path.join(movie_path, 'hls')
+    if metadata.get('status') == STATUS_PROCESSING:
+        return 'skipped', 'título ainda em processamento'
+    if metadata.get('hls_layout') == LAYOUT_JIT:
+        return 'skipped', 'empacotado sob demanda (JIT)'
+    if not os.path.exists(os.path.join(hls_dir, 'playlist.m3u8')):
+        return 'skipped', 'sem playlist'
+    if _up_to_date(metadata, profile):
+        return 'skipped', 'já no perfil atual'
+    if dry_run:
+        return 'pending', f"perfil {metadata.get('packaging_profile', {}).get('version', 'antigo')}"
+
+    work_dir = os.path.join(movie_path, WORK_FOLDER)
+    os.makedirs(work_dir)
+    duration = remux_playlist(hls_dir, 'playlist.m3u8', work_dir, profile['segment_duration'])
+    renditions = published_renditions(metadata)
+    for rendition in renditions:
+        folder, playlist = os.path.split(rendition['uri'])
+        remux_playlist(os.path.join(hls_dir, folder), playlist, os.path.join(work_dir, folder),
+                       profile['segment_duration'])
+
+    report = validate_hls_output(work_dir, os.path.join(work_dir, 'playlist.m3u8'), expected_duration=duration)
+    if not report['ok']:
+        shutil.rmtree(work_dir)
+        return 'error', f"saída inválida: {'; '.join(report['errors'][:3])}"
+
+    layout = LAYOUT_SEGMENTS
+    if profile['layout'] == LAYOUT_SINGLE_FILE:
+        consolidate_segments(work_dir)
+        for rendition in renditions:
+            consolidate_segments(os.path.join(work_dir, os.path.dirname(rendition['uri'])))
+        layout = LAYOUT_SINGLE_FILE
+    hls_playlist = '/hls/master.m3u8' if finalize_playlists(
+        work_dir, iframes=profile['iframes'], audio_renditions=renditions or None) else '/hls/playlist.m3u8'
+
+    marker = os.path.join(work_dir, MARKER_FILE)
+    with open(marker + '.tmp', 'w', encoding='utf-8') as f:
+        # Perfil efetivo: sem a fonte não há como separar o áudio por idioma,
+        # e os I-frames só contam se a playlist foi mesmo gerada
+        achieved = dict(profile, layout=layout, audio_renditions=bool(renditions),
+                        iframes=os.path.exists(os.path.join(work_dir, IFRAME_PLAYLIST)))
+        json.dump({'hls_playlist': hls_playlist, 'hls_layout': layout, 'packaging_profile': achieved}, f)
+    os.replace(marker + '.tmp', marker)
+
+    # Troca: hls -> .hls.old, .hls.repack -> hls; recover_swap cobre a janela entre os dois renames
+    os.replace(hls_dir, os.path.join(movie_path, OLD_FOLDER))
+    os.replace(work_dir, hls_dir)
+    recover_swap(movie_path)
+    return 'repackaged', f"{report['segments']} segmentos ({layout})"
+
+def workers_for_budget(cpu_budget, cpu_count=None):
+    """Processos simultâneos que cabem na fração `cpu_budget` dos núcleos (mínimo 1)."""
+    return max(1, int((cpu_count or os.cpu_count() or 1) * cpu_budget))
+
+def _lower_priority():
+    # Manutenção não deve disputar CPU com os jobs de ingestão
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Reempacota os títulos da biblioteca no perfil HLS atual.")
+    parser.add_argument('--library', default=LIBRARY_PATH, help="Pasta da biblioteca")
+    parser.add_argument('--cpu-budget', type=float, default=0.5,
+                        help="Fração dos núcleos usada (cada título ocupa ~1 núcleo no remux)")
+    parser.add_argument('--workers', type=int, default=0, help="Processos em paralelo (0 = pelo --cpu-budget)")
+    parser.add_argument('--dry-run', action='store_true', help="Só lista o que seria reempacotado")
+    parser.add_argument('--yes', action='store_true', help="Não pede confirmação")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.library):
+        print(f"AVISO: A pasta da biblioteca '{args.library}' não foi encontrada. Nada a fazer.")
+        return
+
+    if not args.dry_run and not args.yes:
+        confirm = input("Este script irá substituir a pasta hls/ dos títulos desatualizados. "
+                        "Você deseja continuar? (s/n): ")
+        if confirm.lower() != 's':
+            print("Reempacotamento cancelado pelo usuário.")
+            return
+
+    profile = current_profile()
+    workers = args.workers or workers_for_budget(args.cpu_budget)
+    movie_paths = [os.path.join(args.library, name) for name in sorted(os.listdir(args.library))
+                   if os.path.isdir(os.path.join(args.library, name))]
+    print(f"Perfil alvo: {json.dumps(profile)}")
+    print(f"Títulos encontrados: {len(movie_paths)} ({workers} processos em paralelo)")
+
+    counts = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_lower_priority) as pool:
+        futures = {pool.submit(repackage_title, path, profile, args.dry_run): path for path in movie_paths}
+        for future in as_completed(futures):
+            movie_id = os.path.basename(futures[future])
+            try:
+                status, message = future.result()
+            except Exception as e:
+                status, message = 'error', str(e)
+            counts[status] = counts.get(status, 0) + 1
+            print(f"  [{status}] {movie_id}: {message}")
+
+    print("\n--- Relatório do Reempacotamento ---")
+    for status, count in sorted(counts.items()):
+        print(f"{status}: {count}")
+    if counts.get('error'):
+        print("Rode o script novamente para retomar os títulos com erro.")
+
+if __name__ == "__main__":
+    main()
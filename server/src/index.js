@@ -5,6 +5,7 @@ const { Server } = require('socket.io');
 const cors = require('cors');
 const path = require('path');
 const { randomBytes } = require('crypto');
+const { spawn } = require('child_process');
 const apiRoutes = require('./routes/api');
 
 const PORT = process.env.PORT || 3000;
@@ -57,6 +58,41 @@ app.use('/library/:movieId/posters', (req, res, next) => {
     next();
 });
 
+// Empacotamento HLS sob demanda: playlist e segmentos de /library/:id/jit/*
+// vêm do serviço local do worker (worker/jit_server.py)
+const JIT_PACKAGING = (process.env.JIT_PACKAGING || 'false').toLowerCase() === 'true';
+const JIT_SERVICE_PORT = parseInt(process.env.JIT_SERVICE_PORT || '8089', 10);
+if (JIT_PACKAGING) {
+    const jitProcess = spawn('python', [path.join(__dirname, '../../worker/jit_server.py')], {
+        cwd: path.join(__dirname, '../../worker'),
+        stdio: 'inherit'
+    });
+    jitProcess.on('exit', (code) => console.log(`⚠️ Serviço JIT encerrado (código ${code})`));
+
+    app.get('/library/:movieId/jit/:file', (req, res) => {
+        const upstream = http.request({
+            host: '127.0.0.1',
+            port: JIT_SERVICE_PORT,
+            path: `/${encodeURIComponent(req.params.movieId)}/jit/${encodeURIComponent(req.params.file)}`,
+            method: 'GET'
+        }, (jitRes) => {
+            res.status(jitRes.statusCode);
+            res.set({
+                'Content-Type': jitRes.headers['content-type'],
+                'Cache-Control': 'no-cache',
+                'Access-Control-Allow-Origin': '*'
+            });
+            if (jitRes.headers['content-length']) res.set('Content-Length', jitRes.headers['content-length']);
+            jitRes.pipe(res);
+        });
+        upstream.on('error', (err) => {
+            console.error(`Erro no serviço JIT: ${err.message}`);
+            res.status(502).end();
+        });
+        upstream.end();
+    });
+}
+
 app.use('/library', express.static(path.join(__dirname, '../../library')));
 app.use('/api', apiRoutes(io));
 
@@ -0,0 +1,115 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import audio_renditions
+from audio_renditions import (select_audio_renditions, audio_rendition_command, segment_boundaries,
+                              strip_audio, package_audio_renditions, _crc32_mpeg2)
+from hls_playlist import write_media_playlist, parse_media_playlist, write_master_playlist
+from iframe_playlist import segment_keyframes, _section
+from test_iframe_playlist import _segment, _pts_per_frame, AUDIO_PID
+
+def _audio(index, language, codec='aac', default=False):
+    return {'index': index, 'codec_type': 'audio', 'codec_name': codec,
+            'tags': {'language': language}, 'disposition': {'default': int(default)}}
+
+def _pids(data):
+    return {((data[p + 1] & 0x1F) << 8) | data[p + 2] for p in range(0, len(data), 188)}
+
+def test_select_one_rendition_per_language():
+    streams = [{'index': 0, 'codec_type': 'video'}, _audio(1, 'eng', 'ac3'), _audio(2, 'por', default=True),
+               _audio(3, 'eng', 'aac'), {'index': 4, 'codec_type': 'subtitle', 'tags': {'language': 'por'}}]
+    renditions = select_audio_renditions(streams)
+    assert [(r['stream_index'], r['language'], r['default']) for r in renditions] == [(1, 'en', False), (2, 'pt-BR', True)]
+    assert renditions[1]['uri'] == 'audio/pt-BR/playlist.m3u8'
+    # Um idioma só (ou sem tag): continua muxado
+    assert select_audio_renditions([_audio(1, 'eng'), _audio(2, 'und'), _audio(3, 'eng')]) == []
+
+def test_command_copies_aac_and_cuts_at_video_boundaries():
+    renditions = select_audio_renditions([_audio(1, 'eng', 'ac3'), _audio(2, 'por')])
+    boundaries = segment_boundaries([{'duration': 2.0}, {'duration': 4.0}, {'duration': 3.5}])
+    assert boundaries == [2.0, 6.0]
+    cmd = audio_rendition_command('/in.mkv', '/hls', renditions, boundaries)
+    assert cmd.count('-f') == 2 and cmd.count('2.000000,6.000000') == 2
+    en = cmd.index('0:1')
+    assert cmd[en:cmd.index('0:2')].count('aac') == 1  # AC-3 recodificado
+    assert cmd[cmd.index('0:2'):][cmd[cmd.index('0:2'):].index('-c:a') + 1] == 'copy'
+    assert cmd[-1] == os.path.join('/hls', 'audio', 'pt-BR', 'segment%05d.ts')
+
+def test_strip_audio_removes_packets_and_rewrites_pmt():
+    data = _segment([True, False, False])
+    stripped = strip_audio(data)
+    assert AUDIO_PID not in _pids(stripped) and len(stripped) == len(data) - 3 * 188
+    # PMT com um único fluxo e CRC válido
+    start, end = _section(stripped, 188)
+    assert (end - start - 12) == 5 and stripped[start + 12] == 0x1B
+    assert _crc32_mpeg2(stripped[start:end]) == int.from_bytes(stripped[end:end + 4], 'big')
+    # Os keyframes continuam encontráveis
+    assert len(segment_keyframes(stripped)) == 1
+
+def test_strip_audio_without_pmt_payload_returns_none():
+    data = bytearray(_segment([True, False]))
+    # PMT só com adaptation field (sem payload): estrutura inesperada, não exceção
+    data[188 + 3] = (data[188 + 3] & 0xCF) | 0x20
+    data[188 + 4] = 183
+    assert strip_audio(bytes(data)) is None
+
+def test_crc32_mpeg2_known_value():
+    assert _crc32_mpeg2(b'123456789') == 0x0376E6E7
+
+def _write_title(hls_dir, count):
+    segments = []
+    for i in range(count):
+        name = f'segment{i:03d}.ts'
+        with open(os.path.join(hls_dir, name), 'wb') as f:
+            f.write(_segment([n == 0 for n in range(24)], base_pts=126000 + i * 24 * _pts_per_frame(24)))
+        segments.append({'duration': 1.0, 'uri': name, 'discontinuity': i == 1})
+    write_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'), segments)
+
+def _fake_ffmpeg(segments_per_rendition):
+    def run(argv, stage, **kwargs):
+        for out in [a for a in argv if a.endswith('%05d.ts')]:
+            for i in range(segments_per_rendition):
+                with open(out % i, 'wb') as f:
+                    f.write(b'\x47' + b'\x00' * 187)
+        return {'ok': True}
+    return run
+
+def test_package_mirrors_video_playlist(tmp_path, monkeypatch):
+    hls_dir = str(tmp_path)
+    _write_title(hls_dir, 3)
+    monkeypatch.setattr(audio_renditions, 'run_supervised', _fake_ffmpeg(3))
+    renditions = package_audio_renditions('/in.mkv', hls_dir, select_audio_renditions([_audio(1, 'eng'), _audio(2, 'por')]))
+
+    assert [r['language'] for r in renditions] == ['en', 'pt-BR']
+    audio = parse_media_playlist(os.path.join(hls_dir, 'audio', 'en', 'playlist.m3u8'))['segments']
+    assert [(s['duration'], s['discontinuity']) for s in audio] == [(1.0, False), (1.0, True), (1.0, False)]
+    with open(os.path.join(hls_dir, 'segment002.ts'), 'rb') as f:
+        assert AUDIO_PID not in _pids(f.read())
+    assert not [name for name in os.listdir(hls_dir) if name.endswith('.video')]
+
+def test_package_keeps_muxed_audio_on_segment_mismatch(tmp_path, monkeypatch):
+    hls_dir = str(tmp_path)
+    _write_title(hls_dir, 3)
+    with open(os.path.join(hls_dir, 'segment000.ts'), 'rb') as f:
+        original = f.read()
+    monkeypatch.setattr(audio_renditions, 'run_supervised', _fake_ffmpeg(2))
+    assert package_audio_renditions('/in.mkv', hls_dir, select_audio_renditions([_audio(1, 'eng'), _audio(2, 'por')])) is None
+    assert not os.path.exists(os.path.join(hls_dir, 'audio'))
+    with open(os.path.join(hls_dir, 'segment000.ts'), 'rb') as f:
+        assert f.read() == original
+
+def test_master_declares_audio_group(tmp_path):
+    path = os.path.join(str(tmp_path), 'master.m3u8')
+    write_master_playlist(path, [{'uri': 'playlist.m3u8', 'bandwidth': 2000000, 'audio': 'audio'}], media=[
+        {'group': 'audio', 'name': 'English', 'language': 'en', 'default': False, 'uri': 'audio/en/playlist.m3u8'},
+        {'group': 'audio', 'name': 'Português', 'language': 'pt-BR', 'default': True, 'uri': 'audio/pt-BR/playlist.m3u8'},
+    ])
+    with open(path, encoding='utf-8') as f:
+        master = f.read()
+    assert '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="Português",LANGUAGE="pt-BR",DEFAULT=YES' in master
+    assert 'AUDIO="audio"' in master.split('#EXT-X-STREAM-INF:')[1]
+    assert master.index('#EXT-X-MEDIA') < master.index('#EXT-X-STREAM-INF')
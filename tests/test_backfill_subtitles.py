@@ -0,0 +1,101 @@
+import pytest
+import os
+import json
+import sys
+
+from babelfish import Language
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import subtitle_manager
+from backfill_subtitles import backfill_title, missing_languages, merge_subtitles
+
+SRT = b'1\n00:00:01,000 --> 00:00:02,000\nOi\n'
+
+class FakeSubtitle:
+    """Legenda já baixada, como a devolvida pelo subtitle_search."""
+    provider_name = 'podnapisi'
+
+    def __init__(self, language):
+        self.language = language
+        self.content = SRT
+        self.id = f'fake-{language}'
+
+    def get_path(self, video, single=False, extension=None):
+        return os.path.splitext(video.name)[0] + f'.{self.language}.srt'
+
+    def get_matches(self, video):
+        return {'title', 'year'}
+
+    def is_valid(self):
+        return True
+
+@pytest.fixture
+def searches():
+    return []
+
+@pytest.fixture
+def library(tmp_path, monkeypatch, searches):
+    def fake_search(video, languages, providers):
+        searches.append((video, languages))
+        return [FakeSubtitle(language) for language in languages]
+
+    monkeypatch.setattr(subtitle_manager, 'find_best_subtitles', fake_search)
+    monkeypatch.setattr(subtitle_manager, 'get_subtitle_cache', lambda: None)
+    monkeypatch.setattr(subtitle_manager, 'save_subtitles', _save_subtitles)
+    # Sem vídeo nem speech_reference.npz: a legenda segue sem sincronizar
+    monkeypatch.setattr(subtitle_manager.SubtitleManager, '_sync_subtitle_with_video', lambda self, path, video: path)
+
+    movie = tmp_path / '603'
+    (movie / 'subtitles').mkdir(parents=True)
+    (movie / 'subtitles' / 'subtitle_en.vtt').write_text('WEBVTT\n\n', encoding='utf-8')
+    (movie / 'metadata.json').write_text(json.dumps({
+        'id': 603, 'title': 'The Matrix', 'original_title': 'The Matrix', 'year': 1999, 'status': 'ready',
+        'imdb_id': 'tt0133093',
+        'subtitles': [{'language': 'eng', 'name': 'English', 'file': 'subtitle_en.vtt', 'url': '/old/en.vtt'},
+                      {'language': 'pb', 'name': 'Brazilian', 'file': 'apagada.vtt', 'url': '/old/pt.vtt'}],
+    }))
+    return movie
+
+def _save_subtitles(video, subtitles, directory):
+    for sub in subtitles:
+        with open(os.path.join(directory, os.path.basename(sub.get_path(video))), 'wb') as f:
+            f.write(sub.content)
+
+def _metadata(movie):
+    return json.loads((movie / 'metadata.json').read_text(encoding='utf-8'))
+
+def test_missing_languages_checks_files(library):
+    # pt-BR está no metadata.json, mas o arquivo não existe mais
+    assert missing_languages(str(library), _metadata(library), ['pt-BR', 'en']) == ['pt-BR']
+
+def test_merge_follows_migration_rules():
+    merged = merge_subtitles('7', [{'language': 'eng', 'file': 'a.vtt'}, {'language': 'por', 'file': 'old.vtt'}],
+                             [{'language': 'pt-BR', 'file': 'subtitle_pt-BR.vtt'}, 'lixo'])
+    assert merged == [
+        {'language': 'pt-BR', 'name': 'Português (Brasil)', 'file': 'subtitle_pt-BR.vtt',
+         'url': '/api/subtitles/7/subtitle_pt-BR.vtt'},
+        {'language': 'en', 'name': 'English', 'file': 'a.vtt', 'url': '/api/subtitles/7/a.vtt'},
+    ]
+
+def test_backfill_without_video(library, searches):
+    assert backfill_title(str(library), ['pt-BR', 'en'], dry_run=True) == ('pending', 'faltando pt-BR')
+    status, message = backfill_title(str(library), ['pt-BR', 'en'])
+    assert (status, message) == ('updated', '+pt-BR')
+
+    video, languages = searches[0]
+    assert languages == {Language('por')}
+    assert (video.title, video.year, video.external_ids['imdb_id']) == ('The Matrix', 1999, 'tt0133093')
+    assert [s['language'] for s in _metadata(library)['subtitles']] == ['pt-BR', 'en']
+    assert (library / 'subtitles' / 'subtitle_pt-BR.vtt').exists()
+    assert not (library / 'metadata.json.tmp').exists()
+
+    # Segunda execução: nada a fazer, nenhum provedor consultado
+    assert backfill_title(str(library), ['pt-BR', 'en'])[0] == 'skipped'
+    assert len(searches) == 1
+
+def test_skips_titles_in_processing(library):
+    metadata = dict(_metadata(library), status='processing')
+    (library / 'metadata.json').write_text(json.dumps(metadata))
+    assert backfill_title(str(library), ['pt-BR', 'en']) == ('skipped', 'título ainda em processamento')
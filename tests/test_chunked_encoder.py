@@ -0,0 +1,79 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import chunked_encoder
+from chunked_encoder import split_targets, plan_chunks, merge_chunk_playlists
+from hls_playlist import parse_media_playlist, write_media_playlist
+
+def test_split_targets_are_uniform():
+    assert split_targets(400.0, 4) == [100.0, 200.0, 300.0]
+    assert split_targets(400.0, 1) == []
+
+def test_plan_chunks_covers_whole_duration():
+    """Os intervalos devem ser contíguos e somar a duração total."""
+    chunks = plan_chunks(400.0, [101.5, 203.0, 299.0])
+    assert chunks[0][0] == 0.0
+    for (start, length), (next_start, _) in zip(chunks, chunks[1:]):
+        assert start + length == pytest.approx(next_start)
+    assert sum(length for _, length in chunks) == pytest.approx(400.0)
+
+def test_plan_chunks_drops_degenerate_boundaries():
+    """Cortes repetidos ou colados no fim do vídeo não geram blocos vazios."""
+    chunks = plan_chunks(300.0, [150.0, 150.0, 299.0])
+    assert chunks == [(0.0, 150.0), (150.0, 150.0)]
+
+def _write_chunk(chunk_dir, durations):
+    os.makedirs(chunk_dir)
+    segments = []
+    for i, duration in enumerate(durations):
+        name = f'part{i:05d}.ts'
+        with open(os.path.join(chunk_dir, name), 'wb') as f:
+            f.write(b'\x47' * 188)
+        segments.append({'duration': duration, 'uri': name})
+    playlist = os.path.join(chunk_dir, 'chunk.m3u8')
+    write_media_playlist(playlist, segments)
+    return playlist
+
+def test_merge_renumbers_segments_and_marks_discontinuities(tmp_path):
+    hls_dir = str(tmp_path)
+    chunk_a = _write_chunk(os.path.join(hls_dir, '.chunks', 'chunk000'), [4.0, 4.0, 2.5])
+    chunk_b = _write_chunk(os.path.join(hls_dir, '.chunks', 'chunk001'), [4.0, 1.0])
+
+    playlist_path = os.path.join(hls_dir, 'playlist.m3u8')
+    total = merge_chunk_playlists([chunk_a, chunk_b], hls_dir, playlist_path)
+
+    assert total == 5
+    merged = parse_media_playlist(playlist_path)
+    assert [seg['uri'] for seg in merged['segments']] == [f'segment{i:03d}.ts' for i in range(5)]
+    assert [seg['discontinuity'] for seg in merged['segments']] == [False, False, False, True, False]
+    assert merged['endlist'] is True
+    assert merged['playlist_type'] == 'VOD'
+    assert merged['target_duration'] == 4
+    for seg in merged['segments']:
+        assert os.path.exists(os.path.join(hls_dir, seg['uri']))
+
+def test_encode_chunk_returns_metrics_and_watches_cancel_file(tmp_path, monkeypatch):
+    cancel_file = str(tmp_path / '.cancel')
+    seen = {}
+
+    def fake_run_supervised(cmd, stage, total_timeout=None, should_stop=None):
+        seen['stopped_before'] = should_stop()
+        open(cancel_file, 'w').close()
+        seen['stopped_after'] = should_stop()
+        return {'stage': stage, 'ok': False, 'cancelled': True, 'returncode': -15, 'timed_out': None,
+                'tail': [], 'wall': 1.5, 'cpu_user': 2.0, 'cpu_system': 0.5, 'max_rss_mb': 300.0}
+
+    monkeypatch.setattr(chunked_encoder, 'run_supervised', fake_run_supervised)
+    result = chunked_encoder._encode_chunk({
+        'index': 2, 'video_file': 'movie.mkv', 'chunk_dir': str(tmp_path / 'chunk002'), 'bit_depth': 8,
+        'start': 200.0, 'duration': 100.0, 'threads': 2, 'encoding': None, 'startup': False,
+        'progress_file': str(tmp_path / 'chunk002.progress'), 'cancel_file': cancel_file})
+
+    assert seen == {'stopped_before': False, 'stopped_after': True}
+    assert not result['ok']
+    # Métricas do filho voltam com o resultado para o pai registrar
+    assert result['metrics'] == {'stage': 'ffmpeg:bloco 2', 'ok': False, 'wall': 1.5,
+                                 'cpu_user': 2.0, 'cpu_system': 0.5, 'max_rss_mb': 300.0}
@@ -0,0 +1,64 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from embedded_subtitles import select_embedded_subtitles, subtitle_output_args, finalize_embedded_subtitles
+
+STREAMS = [
+    {'index': 0, 'codec_type': 'video', 'codec_name': 'h264'},
+    {'index': 1, 'codec_type': 'audio', 'codec_name': 'aac', 'tags': {'language': 'eng'}},
+    {'index': 2, 'codec_type': 'subtitle', 'codec_name': 'subrip', 'tags': {'language': 'eng', 'title': 'English SDH'}},
+    {'index': 3, 'codec_type': 'subtitle', 'codec_name': 'subrip', 'tags': {'language': 'eng'}},
+    {'index': 4, 'codec_type': 'subtitle', 'codec_name': 'ass', 'tags': {'language': 'por'},
+     'disposition': {'forced': 1}},
+    {'index': 5, 'codec_type': 'subtitle', 'codec_name': 'ass', 'tags': {'language': 'por'}},
+    {'index': 6, 'codec_type': 'subtitle', 'codec_name': 'hdmv_pgs_subtitle', 'tags': {'language': 'spa'}},
+    {'index': 7, 'codec_type': 'subtitle', 'codec_name': 'subrip', 'tags': {'language': 'spa'}},
+]
+
+def test_select_one_text_track_per_wanted_language():
+    tracks = select_embedded_subtitles(STREAMS)
+    assert [(t['language'], t['stream_index'], t['file']) for t in tracks] == [
+        ('pt-BR', 5, 'subtitle_pt-BR.vtt'),  # a faixa forced é ignorada
+        ('en', 3, 'subtitle_en.vtt'),        # prefere a faixa sem SDH
+    ]
+
+def test_image_subtitles_and_unknown_languages_ignored():
+    streams = [{'index': 2, 'codec_type': 'subtitle', 'codec_name': 'hdmv_pgs_subtitle', 'tags': {'language': 'eng'}},
+               {'index': 3, 'codec_type': 'subtitle', 'codec_name': 'subrip'}]
+    assert select_embedded_subtitles(streams) == []
+
+def test_output_args_and_finalize(tmp_path):
+    subtitles_dir = str(tmp_path)
+    tracks = select_embedded_subtitles(STREAMS)
+    args = subtitle_output_args(tracks, subtitles_dir)
+    assert args[:6] == ['-map', '0:5', '-c:s', 'webvtt', '-f', 'webvtt']
+    assert args[6].endswith('subtitle_pt-BR.vtt.part')
+
+    # Só a faixa pt-BR foi gravada com cues; a en saiu vazia
+    with open(args[6], 'w') as f:
+        f.write('WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nOlá\n')
+    with open(args[13], 'w') as f:
+        f.write('WEBVTT\n\n')
+
+    done, missing = finalize_embedded_subtitles(tracks, subtitles_dir, 42)
+    assert [s['file'] for s in done] == ['subtitle_pt-BR.vtt']
+    assert done[0]['url'] == '/api/subtitles/42/subtitle_pt-BR.vtt'
+    assert done[0]['name'] == 'Português (Brasil)'
+    assert [t['language'] for t in missing] == ['en']
+    assert sorted(os.listdir(subtitles_dir)) == ['subtitle_pt-BR.vtt']
+
+def test_copy_with_startup_head_leaves_subtitles_to_extraction(tmp_path):
+    from hls_strategy import COPY, build_copy_command
+    tracks = select_embedded_subtitles(STREAMS)
+    full = build_copy_command(COPY, 'in.mkv', 'seg%d.ts', 'out.m3u8') + subtitle_output_args(tracks, str(tmp_path))
+    assert full.count('webvtt') == 4
+    # -ss antes do -i adiantaria as falas em `start` segundos: nenhuma saída WebVTT
+    cmd = build_copy_command(COPY, 'in.mkv', 'seg%d.ts', 'out.m3u8', start=12.0) + \
+        subtitle_output_args(tracks, str(tmp_path), start=12.0)
+    assert cmd[cmd.index('-ss') + 1] == '12.000' and 'webvtt' not in cmd
+    # ...e as faixas caem na extração avulsa, sem seek
+    done, missing = finalize_embedded_subtitles(tracks, str(tmp_path), 42)
+    assert done == [] and missing == tracks
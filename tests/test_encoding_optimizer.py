@@ -0,0 +1,49 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from encoding_optimizer import choose_encoding, sample_positions, DEFAULT_CRF
+
+def _samples(ssims, bitrate):
+    return [{'ssim': ssim, 'bitrate_kbps': bitrate} for ssim in ssims]
+
+def test_sample_positions_skip_intro_and_credits():
+    positions = sample_positions(6000.0, count=4, sample_duration=8)
+    assert len(positions) == 4
+    assert positions[0] == pytest.approx(300.0)
+    assert positions[-1] == pytest.approx(6000.0 * 0.95 - 8)
+    assert positions == sorted(positions)
+
+def test_low_motion_title_gets_higher_crf():
+    """Animação/baixa complexidade: CRFs altos ainda atingem a meta."""
+    measurements = {
+        20: _samples([0.995, 0.994], 2500),
+        23: _samples([0.992, 0.990], 1700),
+        26: _samples([0.986, 0.984], 1100),
+        29: _samples([0.975, 0.970], 800),
+    }
+    decision = choose_encoding(measurements, 5400.0, 0.98, 8000)
+    assert decision['crf'] == 26
+    assert decision['maxrate'] == '1650k'
+    assert decision['bufsize'] == '3300k'
+    assert decision['predicted_size_mb'] > 0
+
+def test_grainy_title_is_capped_by_max_bitrate():
+    measurements = {20: _samples([0.985, 0.983], 14000), 23: _samples([0.975, 0.97], 11000)}
+    decision = choose_encoding(measurements, 7200.0, 0.98, 8000)
+    assert decision['crf'] == 20
+    assert decision['maxrate'] == '8000k'
+    # Previsão usa o bitrate limitado pelo teto (+128k de áudio)
+    expected_mb = (8000 + 128) * 1000 / 8 * 7200.0 / (1024 * 1024)
+    assert decision['predicted_size_mb'] == pytest.approx(expected_mb, abs=0.1)
+
+def test_falls_back_to_lowest_crf_when_target_unreachable():
+    measurements = {20: _samples([0.95], 3000), 23: _samples([0.94], 2000)}
+    assert choose_encoding(measurements, 3600.0, 0.98, 8000)['crf'] == 20
+
+def test_no_measurements_returns_default():
+    decision = choose_encoding({20: []}, 3600.0, 0.98, 8000)
+    assert decision['crf'] == DEFAULT_CRF
+    assert decision['maxrate'] is None
@@ -0,0 +1,65 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from ffmpeg_progress import FfmpegProgress, format_eta, read_progress_file, with_progress_flags
+
+BLOCK = """frame=2400
+fps=96.00
+bitrate=2100.5kbits/s
+total_size=26254336
+out_time_us=100000000
+out_time_ms=100000000
+out_time=00:01:40.000000
+dup_frames=0
+drop_frames=0
+speed=4.00x
+progress=continue
+"""
+
+def test_snapshot_maps_out_time_against_duration():
+    reports = []
+    tracker = FfmpegProgress(400.0, reports.append, min_interval=0)
+    for line in BLOCK.splitlines():
+        assert tracker.feed(line)
+    assert len(reports) == 1
+    snapshot = reports[0]
+    assert snapshot['out_time'] == pytest.approx(100.0)
+    assert snapshot['percent'] == pytest.approx(25.0)
+    assert snapshot['speed'] == pytest.approx(4.0)
+    assert snapshot['fps'] == pytest.approx(96.0)
+    # Faltam 300s de vídeo a 4x
+    assert snapshot['eta'] == pytest.approx(75.0)
+
+def test_callback_is_throttled_but_end_always_reported():
+    reports = []
+    tracker = FfmpegProgress(400.0, reports.append, min_interval=3600)
+    for _ in range(3):
+        for line in BLOCK.splitlines():
+            tracker.feed(line)
+    assert len(reports) == 1
+    tracker.feed('progress=end')
+    assert len(reports) == 2
+
+def test_log_lines_are_not_progress():
+    tracker = FfmpegProgress(None)
+    assert not tracker.feed('[hls @ 0x55] Opening segment001.ts for writing')
+    assert not tracker.feed('Input #0, matroska,webm, from "movie.mkv":')
+    assert tracker.feed('speed=N/A')
+    assert tracker.snapshot()['percent'] is None
+
+def test_progress_file_and_flags(tmp_path):
+    path = tmp_path / 'chunk.progress'
+    path.write_text(BLOCK + BLOCK.replace('100000000', '160000000'))
+    assert read_progress_file(str(path)) == pytest.approx(160.0)
+    assert read_progress_file(str(tmp_path / 'missing')) is None
+
+    assert with_progress_flags(['ffmpeg', '-i', 'a.mkv']) == ['ffmpeg', '-progress', 'pipe:1', '-nostats', '-i', 'a.mkv']
+    assert with_progress_flags('ffmpeg -i "a.mkv" -y').startswith('ffmpeg -progress pipe:1 -nostats -i')
+
+def test_format_eta():
+    assert format_eta(None) == '--'
+    assert format_eta(75) == '1m15s'
+    assert format_eta(3 * 3600 + 5 * 60) == '3h05m'
@@ -0,0 +1,67 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from hls_strategy import (analyze_packets, rank_strategies, stream_signature, StrategyHistory,
+                          COPY, COPY_CONSERVATIVE, COPY_VIDEO_AAC, SMART_RENDER, TRANSCODE)
+
+CLEAN_SIGNALS = {'video_ts_errors': 0, 'audio_ts_errors': 0, 'keyframes': 5, 'max_keyframe_interval': 2.0}
+
+def test_analyze_packets_detects_dts_regression_and_gop():
+    packets = [
+        {'codec_type': 'video', 'pts_time': '0.000', 'dts_time': '0.000', 'flags': 'K_'},
+        {'codec_type': 'video', 'pts_time': '0.080', 'dts_time': '0.040', 'flags': '__'},
+        # B-frame: PTS volta, DTS não — não é erro
+        {'codec_type': 'video', 'pts_time': '0.040', 'dts_time': '0.080', 'flags': '__'},
+        {'codec_type': 'video', 'pts_time': '5.000', 'dts_time': '5.000', 'flags': 'K_'},
+        {'codec_type': 'audio', 'pts_time': '1.000', 'dts_time': '1.000', 'flags': 'K_'},
+        {'codec_type': 'audio', 'pts_time': '0.500', 'dts_time': '0.500', 'flags': 'K_'},
+        {'codec_type': 'audio', 'pts_time': 'N/A', 'dts_time': 'N/A', 'flags': 'K_'},
+    ]
+    signals = analyze_packets(packets)
+    assert signals['video_ts_errors'] == 0
+    assert signals['audio_ts_errors'] == 2
+    assert signals['keyframes'] == 2
+    assert signals['max_keyframe_interval'] == pytest.approx(5.0)
+
+def test_rank_full_cascade_for_clean_source():
+    assert rank_strategies(True, True, CLEAN_SIGNALS, {}) == [COPY, COPY_CONSERVATIVE, COPY_VIDEO_AAC, TRANSCODE]
+
+def test_rank_incompatible_audio_goes_straight_to_audio_reencode():
+    assert rank_strategies(True, False, CLEAN_SIGNALS, {}) == [COPY_VIDEO_AAC, TRANSCODE]
+
+def test_rank_broken_video_timestamps_or_extradata_transcode():
+    assert rank_strategies(True, True, dict(CLEAN_SIGNALS, video_ts_errors=3), {}) == [TRANSCODE]
+    assert rank_strategies(True, True, CLEAN_SIGNALS, {}, has_video_extradata=False) == [TRANSCODE]
+
+def test_rank_uses_history_to_skip_failed_passes():
+    outcomes = {
+        COPY: {'success': 0, 'failure': 3},
+        COPY_CONSERVATIVE: {'success': 0, 'failure': 2},
+        COPY_VIDEO_AAC: {'success': 4, 'failure': 0},
+    }
+    assert rank_strategies(True, True, CLEAN_SIGNALS, outcomes) == [COPY_VIDEO_AAC, TRANSCODE]
+
+def test_history_round_trip(tmp_path):
+    history = StrategyHistory(str(tmp_path / 'cache' / 'history.json'))
+    signature = stream_signature({
+        'format': {'format_name': 'matroska,webm'},
+        'streams': [
+            {'codec_type': 'video', 'codec_name': 'h264', 'profile': 'High', 'pix_fmt': 'yuv420p'},
+            {'codec_type': 'audio', 'codec_name': 'ac3'},
+        ]
+    })
+    assert signature == 'matroska|h264|high|yuv420p|ac3'
+    history.record(signature, COPY_VIDEO_AAC, True)
+    history.record(signature, COPY_VIDEO_AAC, True)
+    history.record(signature, COPY, False)
+    assert history.outcomes(signature) == {
+        COPY_VIDEO_AAC: {'success': 2, 'failure': 0},
+        COPY: {'success': 0, 'failure': 1},
+    }
+
+def test_rank_long_gop_goes_to_smart_render():
+    signals = dict(CLEAN_SIGNALS, max_keyframe_interval=12.0)
+    assert rank_strategies(True, True, signals, {}) == [SMART_RENDER, TRANSCODE]
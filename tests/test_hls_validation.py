@@ -0,0 +1,77 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import hls_validation
+from hls_validation import validate_hls_output, sample_indexes
+from hls_playlist import write_media_playlist
+from test_iframe_playlist import _segment, _pts_per_frame
+
+FRAMES_PER_SEGMENT = 48  # 2s a 24fps
+
+def _write_title(hls_dir, count, shift=None, endlist=True):
+    """`shift`: {índice: segundos} desloca o PTS de um segmento (timestamps quebrados)."""
+    segments = []
+    for i in range(count):
+        name = f'segment{i:03d}.ts'
+        base = 126000 + i * FRAMES_PER_SEGMENT * _pts_per_frame(24)
+        base += int((shift or {}).get(i, 0) * 90000)
+        with open(os.path.join(hls_dir, name), 'wb') as f:
+            f.write(_segment([n == 0 for n in range(FRAMES_PER_SEGMENT)], base_pts=base))
+        segments.append({'duration': 2.0, 'uri': name})
+    write_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'), segments, endlist=endlist)
+    return os.path.join(hls_dir, 'playlist.m3u8')
+
+@pytest.fixture
+def decoded(monkeypatch):
+    calls = []
+
+    def fake_decode(data):
+        calls.append(len(data))
+        return None
+
+    monkeypatch.setattr(hls_validation, 'decode_segment', fake_decode)
+    return calls
+
+def test_sample_indexes_include_first_and_last():
+    indexes = sample_indexes(1000, samples=6, seed=1)
+    assert indexes[0] == 0 and indexes[-1] == 999 and len(indexes) == 6
+    assert sample_indexes(2) == [0, 1]
+    assert sample_indexes(0) == []
+
+def test_valid_output(tmp_path, decoded):
+    playlist = _write_title(str(tmp_path), 10)
+    report = validate_hls_output(str(tmp_path), playlist, expected_duration=20.0, samples=4)
+    assert report['ok'], report['errors']
+    assert len(decoded) == 4
+
+def test_duration_mismatch_and_truncated_playlist(tmp_path, decoded):
+    playlist = _write_title(str(tmp_path), 10, endlist=False)
+    report = validate_hls_output(str(tmp_path), playlist, expected_duration=60.0)
+    assert not report['ok']
+    assert any('ENDLIST' in e for e in report['errors'])
+    assert any('duração' in e for e in report['errors'])
+    assert not decoded
+
+def test_truncated_segment_file(tmp_path, decoded):
+    playlist = _write_title(str(tmp_path), 5)
+    with open(os.path.join(str(tmp_path), 'segment004.ts'), 'r+b') as f:
+        f.truncate(1000)
+    report = validate_hls_output(str(tmp_path), playlist, expected_duration=10.0)
+    assert report['errors'] == ['segmento 4 truncado (1000 bytes): segment004.ts']
+
+def test_broken_timestamps(tmp_path, decoded):
+    playlist = _write_title(str(tmp_path), 3, shift={2: 7.0})
+    report = validate_hls_output(str(tmp_path), playlist, expected_duration=6.0)
+    assert not report['ok']
+    assert report['errors'] == ['segmento 2 começa em 11.00s, playlist indica 4.00s']
+
+def test_decode_failure_reported(tmp_path, monkeypatch):
+    playlist = _write_title(str(tmp_path), 3)
+    monkeypatch.setattr(hls_validation, 'decode_segment', lambda data: 'Invalid data found')
+    report = validate_hls_output(str(tmp_path), playlist, expected_duration=6.0)
+    assert not report['ok']
+    assert len(report['errors']) == 3
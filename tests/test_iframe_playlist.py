@@ -0,0 +1,121 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import iframe_playlist
+from iframe_playlist import segment_keyframes, build_iframe_index, read_keyframe_head, write_iframes_for
+from hls_playlist import write_media_playlist, write_master_playlist
+
+PMT_PID = 0x1000
+VIDEO_PID = 0x100
+AUDIO_PID = 0x101
+
+def _packet(pid, payload, start=False, random_access=False):
+    header = bytes([0x47, (0x40 if start else 0) | (pid >> 8), pid & 0xFF])
+    if random_access:
+        adaptation = bytes([1, 0x40])
+        body = adaptation + payload
+        header += bytes([0x30])
+    else:
+        body = payload
+        header += bytes([0x10])
+    return (header + body).ljust(188, b'\xff')
+
+def _psi(table):
+    return bytes([0]) + table  # pointer_field
+
+def _pat():
+    section = bytes([0x00, 0xB0, 13, 0, 1, 0xC1, 0, 0, 0, 1, 0xE0 | (PMT_PID >> 8), PMT_PID & 0xFF])
+    return _packet(0, _psi(section + b'\x00' * 4), start=True)
+
+def _pmt():
+    streams = bytes([0x1B, 0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0,
+                     0x0F, 0xE0 | (AUDIO_PID >> 8), AUDIO_PID & 0xFF, 0xF0, 0])
+    body = bytes([0, 1, 0xC1, 0, 0, 0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0]) + streams
+    section = bytes([0x02, 0xB0, len(body) + 4]) + body
+    return _packet(PMT_PID, _psi(section + b'\x00' * 4), start=True)
+
+def _pes(pts):
+    encoded = bytes([
+        0x21 | ((pts >> 29) & 0x0E), (pts >> 22) & 0xFF, 0x01 | ((pts >> 14) & 0xFE),
+        (pts >> 7) & 0xFF, 0x01 | ((pts << 1) & 0xFE)
+    ])
+    return b'\x00\x00\x01\xe0\x00\x00\x80\x80\x05' + encoded
+
+def _segment(frames, fps=24, base_pts=126000):
+    """frames: lista de bool (keyframe?) — cada quadro ocupa 3 pacotes de vídeo + 1 de áudio."""
+    data = _pat() + _pmt()
+    for i, key in enumerate(frames):
+        pts = base_pts + i * _pts_per_frame(fps)
+        data += _packet(VIDEO_PID, _pes(pts), start=True, random_access=key)
+        data += _packet(VIDEO_PID, b'\x00' * 100)
+        data += _packet(AUDIO_PID, b'\x00' * 100, start=True)
+        data += _packet(VIDEO_PID, b'\x00' * 100)
+    return data
+
+def _pts_per_frame(fps):
+    return 90000 // fps
+
+def test_segment_keyframes_offsets_and_lengths():
+    data = _segment([True, False, False, True, False])
+    keyframes = segment_keyframes(data)
+
+    assert [k['offset'] for k in keyframes] == [2 * 188, (2 + 3 * 4) * 188]
+    # Até o próximo PES de vídeo (3 pacotes de vídeo + 1 de áudio intercalado)
+    assert keyframes[0]['length'] == 4 * 188
+    assert keyframes[0]['tables_end'] == 2 * 188
+    assert keyframes[1]['pts'] - keyframes[0]['pts'] == 3 * _pts_per_frame(24)
+
+def test_unmarked_segment_uses_first_pes():
+    keyframes = segment_keyframes(_segment([False, False]))
+    assert len(keyframes) == 1 and keyframes[0]['offset'] == 2 * 188
+
+def test_iframe_playlist_from_segments(tmp_path):
+    hls_dir = str(tmp_path)
+    segments = []
+    # 48 quadros (2s a 24fps) por segmento, keyframes a cada 24 quadros
+    for i in range(3):
+        name = f'segment{i:03d}.ts'
+        frames = [n % 24 == 0 for n in range(48)]
+        with open(os.path.join(hls_dir, name), 'wb') as f:
+            f.write(_segment(frames, base_pts=126000 + i * 48 * _pts_per_frame(24)))
+        segments.append({'duration': 2.0, 'uri': name, 'discontinuity': i == 2})
+    write_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'), segments)
+
+    # Um I-frame por segmento (o keyframe inicial), no tempo da media playlist
+    frames = build_iframe_index(hls_dir)
+    assert len(frames) == 3
+    assert [round(f['time'], 2) for f in frames] == [0.0, 2.0, 4.0]
+    assert all(f['duration'] == pytest.approx(2.0) for f in frames)
+    assert frames[2]['discontinuity'] and not frames[1]['discontinuity']
+    assert frames[0]['byterange'] == f'{4 * 188}@{2 * 188}'
+
+    variant = write_iframes_for(hls_dir)
+    with open(os.path.join(hls_dir, 'iframes.m3u8')) as f:
+        content = f.read()
+    assert '#EXT-X-I-FRAMES-ONLY' in content
+    assert '#EXT-X-VERSION:5' in content
+    assert content.count('#EXT-X-MAP:URI="segment000.ts",BYTERANGE="376@0"') == 1
+    assert content.count('#EXT-X-BYTERANGE:') == 3
+
+    write_master_playlist(os.path.join(hls_dir, 'master.m3u8'),
+                          [{'uri': 'playlist.m3u8', 'bandwidth': 1000}],
+                          [dict(variant, codecs='avc1.4d401f', resolution='1280x720')])
+    with open(os.path.join(hls_dir, 'master.m3u8')) as f:
+        master = f.read()
+    assert '#EXT-X-I-FRAME-STREAM-INF:BANDWIDTH=' in master
+    assert 'URI="iframes.m3u8"' in master
+
+def test_keyframe_head_reads_only_the_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(iframe_playlist, 'HEAD_READ_SIZE', 4 * 188)
+    data = _segment([n % 48 == 0 for n in range(96)])
+    single = tmp_path / 'movie.ts'
+    single.write_bytes(b'\x47' + b'\x00' * 187 + data)
+
+    head, base = read_keyframe_head(str(tmp_path), {'uri': 'movie.ts', 'byterange': f'{len(data)}@188'})
+    assert base == 188 and head == data[:len(head)]
+    # PAT + PMT + o keyframe e o próximo PES: o resto do segmento não é lido
+    assert len(head) < len(data) // 10
+    assert segment_keyframes(head)[0]['length'] == 4 * 188
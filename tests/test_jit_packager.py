@@ -0,0 +1,138 @@
+import pytest
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from hls_playlist import parse_media_playlist_text
+from jit_packager import plan_segments, playlist_for, segment_command
+import jit_server
+import process_supervisor
+from jit_server import SegmentCache, JitService
+
+def test_plan_segments_copy_cuts_on_keyframes():
+    keyframes = [0.0, 2.0, 4.2, 6.0, 9.0, 13.5, 19.8]
+    segments = plan_segments(keyframes, 20.0, copy_video=True)
+    # 19.8 fica a menos de 0.5s do fim e não abre um segmento
+    assert segments == [[0.0, 4.2], [4.2, 9.0], [9.0, 13.5], [13.5, 20.0]]
+
+def test_plan_segments_uniform_for_reencode():
+    segments = plan_segments([], 10.0, copy_video=False)
+    assert segments == [[0.0, 4.0], [4.0, 8.0], [8.0, 10.0]]
+
+def test_playlist_and_segment_command():
+    index = {'source': 'source/movie.mp4', 'duration': 9.0, 'copy_video': True, 'copy_audio': False,
+             'bit_depth': 8, 'segments': [[0.0, 4.5], [4.5, 9.0]]}
+    playlist = parse_media_playlist_text(playlist_for(index))
+    assert [s['uri'] for s in playlist['segments']] == ['segment00000.ts', 'segment00001.ts']
+    assert playlist['target_duration'] == 5
+
+    cmd = segment_command(index, '/lib/42', 1, '/cache/out.ts')
+    assert cmd[cmd.index('-ss') + 1] == '4.500'
+    assert cmd[cmd.index('-t') + 1] == '4.500'
+    assert cmd[cmd.index('-c:v') + 1] == 'copy'
+    assert cmd[cmd.index('-c:a') + 1] == 'aac'
+    assert cmd[cmd.index('-output_ts_offset') + 1] == '4.500'
+    assert '/lib/42/source/movie.mp4' in cmd
+
+def _put(cache, key, size):
+    temp = cache.path_for(key) + '.tmp'
+    os.makedirs(os.path.dirname(temp), exist_ok=True)
+    with open(temp, 'wb') as f:
+        f.write(b'\0' * size)
+    return cache.put(key, temp)
+
+def test_segment_cache_evicts_least_recently_used(tmp_path):
+    cache = SegmentCache(str(tmp_path), max_bytes=300)
+    _put(cache, 'a/segment00000.ts', 100)
+    _put(cache, 'a/segment00001.ts', 100)
+    _put(cache, 'a/segment00002.ts', 100)
+    assert cache.get('a/segment00000.ts')  # passa a ser o mais recente
+
+    _put(cache, 'a/segment00003.ts', 100)
+    assert cache.get('a/segment00001.ts') is None
+    assert not os.path.exists(cache.path_for('a/segment00001.ts'))
+    assert cache.total_bytes == 300
+
+    # Reabrir o cache reconstrói as entradas a partir do disco
+    reopened = SegmentCache(str(tmp_path), max_bytes=300)
+    assert sorted(reopened.entries) == ['a/segment00000.ts', 'a/segment00002.ts', 'a/segment00003.ts']
+
+def test_service_dedups_and_prefetches(tmp_path, monkeypatch):
+    index = {'source': 'source/movie.mp4', 'duration': 16.0, 'copy_video': True, 'copy_audio': True,
+             'bit_depth': 8, 'segments': [[0.0, 4.0], [4.0, 8.0], [8.0, 12.0], [12.0, 16.0]]}
+    monkeypatch.setattr(jit_server, 'load_index', lambda folder: index)
+    calls = []
+
+    class Result:
+        returncode = 0
+        stderr = ''
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd[-1])
+        time.sleep(0.05)
+        with open(cmd[-1], 'wb') as f:
+            f.write(b'\0' * 188)
+        return Result()
+
+    monkeypatch.setattr(process_supervisor.subprocess, 'run', fake_run)
+    service = JitService(str(tmp_path / 'library'), SegmentCache(str(tmp_path / 'cache'), 10 ** 6), prefetch=2)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.segment('42', 0))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    service.pool.shutdown(wait=True)
+
+    assert len(set(results)) == 1 and results[0].endswith('segment00000.ts')
+    # Um ffmpeg para o segmento pedido + os dois seguintes via prefetch
+    assert sorted(os.path.basename(c) for c in calls) == \
+        ['segment00000.ts.tmp', 'segment00001.ts.tmp', 'segment00002.ts.tmp']
+    stats = service.snapshot()
+    assert stats['prefetched'] == 2
+    assert stats['misses'] + stats['hits'] == 3
+    assert service.segment('42', 9) is None
+
+def test_open_segment_reproduces_segment_evicted_before_open(tmp_path, monkeypatch):
+    index = {'source': 'source/movie.mp4', 'duration': 8.0, 'copy_video': True, 'copy_audio': True,
+             'bit_depth': 8, 'segments': [[0.0, 4.0], [4.0, 8.0]]}
+    monkeypatch.setattr(jit_server, 'load_index', lambda folder: index)
+    calls = []
+
+    class Result:
+        returncode = 0
+        stderr = ''
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd[-1])
+        with open(cmd[-1], 'wb') as f:
+            f.write(b'\0' * 188)
+        return Result()
+
+    monkeypatch.setattr(process_supervisor.subprocess, 'run', fake_run)
+    cache = SegmentCache(str(tmp_path / 'cache'), 10 ** 6)
+    service = JitService(str(tmp_path / 'library'), cache, prefetch=0)
+    assert service.segment('42', 0) is not None
+
+    # Simula a evicção concorrente: o arquivo some logo depois do get()
+    original_get = cache.get
+    evicted = []
+
+    def racing_get(key):
+        path = original_get(key)
+        if path is not None and not evicted:
+            evicted.append(key)
+            with cache.lock:
+                cache.total_bytes -= cache.entries.pop(key)
+            os.remove(path)
+        return path
+
+    monkeypatch.setattr(cache, 'get', racing_get)
+    with service.open_segment('42', 0) as f:
+        assert f.read() == b'\0' * 188
+    assert len(calls) == 2
+    assert service.open_segment('42', 5) is None
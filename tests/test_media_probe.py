@@ -0,0 +1,93 @@
+import pytest
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import media_probe
+import process_supervisor
+from media_probe import probe_media, sidecar_path, bit_depth_for
+
+PROBE_OUTPUT = {
+    'format': {'format_name': 'matroska,webm', 'duration': '5400.5', 'bit_rate': '8000000', 'start_time': '0.000'},
+    'streams': [
+        {'index': 0, 'codec_type': 'video', 'codec_name': 'h264', 'pix_fmt': 'yuv420p10le'},
+        {'index': 1, 'codec_type': 'audio', 'codec_name': 'aac'},
+        {'index': 2, 'codec_type': 'subtitle', 'codec_name': 'subrip'},
+    ],
+    'packets': [
+        {'codec_type': 'video', 'pts_time': '0.000', 'flags': 'K__'},
+        {'codec_type': 'audio', 'pts_time': '0.010', 'flags': 'K__'},
+        {'codec_type': 'video', 'pts_time': '0.042', 'flags': '___'},
+        {'codec_type': 'video', 'pts_time': '5.005', 'flags': 'K__'},
+    ]
+}
+
+class Result:
+    def __init__(self, stdout, returncode=0):
+        self.stdout = stdout
+        self.stderr = ''
+        self.returncode = returncode
+
+@pytest.fixture
+def fake_ffprobe(monkeypatch):
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        return Result(json.dumps(PROBE_OUTPUT))
+
+    media_probe._memo.clear()
+    monkeypatch.setattr(process_supervisor.subprocess, 'run', run)
+    return calls
+
+def test_probe_media_structured_fields(tmp_path, fake_ffprobe):
+    video = tmp_path / 'movie.mkv'
+    video.write_bytes(b'\0' * 1024)
+
+    info = probe_media(str(video))
+    assert info.duration == pytest.approx(5400.5)
+    assert info.bit_rate == 8000000
+    assert info.video['codec_name'] == 'h264' and info.audio['codec_name'] == 'aac'
+    assert [s['codec_name'] for s in info.streams_of('subtitle')] == ['subrip']
+    assert info.bit_depth == 10
+    assert info.keyframes == [0.0, 5.005]
+    assert info.raw == {'format': PROBE_OUTPUT['format'], 'streams': PROBE_OUTPUT['streams']}
+
+    cmd = fake_ffprobe[0]
+    assert cmd[cmd.index('-probesize') + 1] == str(media_probe.PROBE_SIZE)
+    assert '-analyzeduration' in cmd and '-read_intervals' in cmd
+
+def test_probe_media_memoized_and_sidecar(tmp_path, fake_ffprobe):
+    video = tmp_path / 'movie.mkv'
+    video.write_bytes(b'\0' * 1024)
+
+    first = probe_media(str(video))
+    assert probe_media(str(video)) is first
+    assert len(fake_ffprobe) == 1
+    assert os.path.exists(sidecar_path(str(video)))
+
+    # Novo processo: memória vazia, análise lida do arquivo lateral
+    media_probe._memo.clear()
+    assert probe_media(str(video)).duration == pytest.approx(5400.5)
+    assert len(fake_ffprobe) == 1
+
+    # Arquivo alterado (tamanho/mtime): o arquivo lateral é ignorado
+    media_probe._memo.clear()
+    video.write_bytes(b'\0' * 2048)
+    probe_media(str(video))
+    assert len(fake_ffprobe) == 2
+
+def test_probe_media_failure(tmp_path, monkeypatch):
+    media_probe._memo.clear()
+    monkeypatch.setattr(process_supervisor.subprocess, 'run', lambda cmd, **kwargs: Result('', returncode=1))
+    video = tmp_path / 'broken.mkv'
+    video.write_bytes(b'\0')
+    assert probe_media(str(video)) is None
+    assert probe_media(str(tmp_path / 'missing.mkv')) is None
+
+def test_bit_depth_for():
+    assert bit_depth_for('yuv420p') == 8
+    assert bit_depth_for('yuv420p12le') == 12
+    assert bit_depth_for('') == 8
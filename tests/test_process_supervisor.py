@@ -0,0 +1,77 @@
+import pytest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import process_supervisor
+from process_supervisor import (run_supervised, run_captured, encode_timeout, stage_metrics, format_stage_metrics,
+                                TIMEOUT_IDLE, TIMEOUT_TOTAL, SHORT_JOB_TIMEOUT)
+
+def _python(code):
+    return [sys.executable, '-c', code]
+
+def test_success_records_metrics_and_filters_lines(capsys):
+    seen = []
+
+    def on_line(line):
+        seen.append(line)
+        return line.startswith('progress=')
+
+    result = run_supervised(_python("import sys\nfor i in range(200): print(f'linha {i}')\nprint('progress=end')\n"
+                                    "sys.stdout.write('sem quebra')"),
+                            'teste', on_line=on_line, tail_lines=5)
+    assert result['ok'] and result['returncode'] == 0 and result['timed_out'] is None
+    assert result['tail'] == ['linha 196', 'linha 197', 'linha 198', 'linha 199', 'sem quebra']
+    assert 'progress=end' in seen
+    assert result['wall'] >= 0
+    if hasattr(os, 'wait4'):
+        assert result['max_rss_mb'] > 0 and result['cpu_user'] is not None
+    # Sucesso: nada da saída do processo é impresso
+    assert 'linha' not in capsys.readouterr().out
+    assert stage_metrics()[-1]['stage'] == 'teste'
+    assert format_stage_metrics()[-1].startswith('teste')
+
+def test_failure_dumps_tail(capsys):
+    result = run_supervised(_python("import sys\nprint('erro fatal')\nsys.exit(3)"), 'falha')
+    assert not result['ok'] and result['returncode'] == 3
+    assert 'erro fatal' in capsys.readouterr().out
+
+def test_idle_timeout_kills_silent_process(monkeypatch):
+    monkeypatch.setattr(process_supervisor, 'WATCHDOG_INTERVAL', 0.1)
+    result = run_supervised(_python("import time\nprint('início', flush=True)\ntime.sleep(30)"),
+                            'travado', idle_timeout=0.5)
+    assert result['timed_out'] == TIMEOUT_IDLE and not result['ok']
+    assert result['wall'] < 10
+
+def test_total_timeout_with_continuous_output(monkeypatch):
+    monkeypatch.setattr(process_supervisor, 'WATCHDOG_INTERVAL', 0.1)
+    result = run_supervised(_python("import time\nwhile True:\n    print('x', flush=True)\n    time.sleep(0.05)"),
+                            'longo', idle_timeout=5, total_timeout=0.5)
+    assert result['timed_out'] == TIMEOUT_TOTAL
+    assert result['wall'] < 10
+
+def test_should_stop_cancels_running_process(monkeypatch, capsys):
+    monkeypatch.setattr(process_supervisor, 'WATCHDOG_INTERVAL', 0.1)
+    started = time.monotonic()
+    result = run_supervised(_python("import time\ntime.sleep(30)"), 'cancelado',
+                            should_stop=lambda: time.monotonic() - started > 0.3)
+    assert result['cancelled'] and not result['ok'] and result['timed_out'] is None
+    assert result['wall'] < 10
+    assert 'cancelado cancelado' in capsys.readouterr().out
+
+def test_run_captured_kills_on_timeout(capsys):
+    started = time.monotonic()
+    result = run_captured(_python("import time\ntime.sleep(30)"), 'lento', timeout=0.5)
+    assert result.returncode == -1 and result.stdout == ''
+    assert time.monotonic() - started < 10
+    assert 'lento excedeu o tempo máximo' in capsys.readouterr().out
+    # Entrada binária (segmento pelo stdin) e saída separada do stderr
+    echo = run_captured(_python("import sys\nsys.stdout.buffer.write(sys.stdin.buffer.read())\nsys.stderr.write('x')"),
+                        'eco', timeout=10, input=b'\x47\x00', text=False)
+    assert echo.returncode == 0 and echo.stdout == b'\x47\x00' and echo.stderr == b'x'
+
+def test_encode_timeout_scales_with_media():
+    assert encode_timeout(None) == encode_timeout(1) == SHORT_JOB_TIMEOUT
+    assert encode_timeout(3600) == 3600 * process_supervisor.ENCODE_TIMEOUT_FACTOR
@@ -0,0 +1,113 @@
+import pytest
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from progressive_publisher import ProgressivePublisher, STATUS_PROCESSING
+from hls_playlist import parse_media_playlist
+from hls_strategy import build_copy_command, COPY, COPY_CONSERVATIVE, COPY_VIDEO_AAC
+from chunked_encoder import build_encode_command
+
+def _write_work_playlist(hls_dir, count, ended=False):
+    """Simula o ffmpeg: playlist de trabalho + arquivos de segmento já fechados."""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4', '#EXT-X-MEDIA-SEQUENCE:0']
+    for i in range(count):
+        name = f'segment{i:03d}.ts'
+        with open(os.path.join(hls_dir, name), 'wb') as f:
+            f.write(b'\x47' * 188)
+        lines += ['#EXTINF:4.000000,', name]
+    if ended:
+        lines.append('#EXT-X-ENDLIST')
+    with open(os.path.join(hls_dir, '.packaging.m3u8'), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+@pytest.fixture
+def setup(tmp_path):
+    movie_dir = tmp_path / '101'
+    hls_dir = movie_dir / 'hls'
+    hls_dir.mkdir(parents=True)
+    published = []
+    publisher = ProgressivePublisher(
+        str(hls_dir / '.packaging.m3u8'), str(hls_dir / 'playlist.m3u8'), str(movie_dir / 'metadata.json'),
+        {'id': 101, 'title': 'Movie', 'hls_playlist': '/hls/playlist.m3u8'},
+        on_published=lambda: published.append(True), min_segments=3
+    )
+    return publisher, str(hls_dir), str(movie_dir), published
+
+def test_publishes_event_playlist_after_first_segments(setup):
+    publisher, hls_dir, movie_dir, published = setup
+
+    _write_work_playlist(hls_dir, 2)
+    publisher.poll()
+    assert not publisher.published
+    assert not os.path.exists(os.path.join(movie_dir, 'metadata.json'))
+
+    _write_work_playlist(hls_dir, 3)
+    publisher.poll()
+    assert published == [True]
+    with open(os.path.join(movie_dir, 'metadata.json'), encoding='utf-8') as f:
+        assert json.load(f)['status'] == STATUS_PROCESSING
+    public = parse_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'))
+    assert public['playlist_type'] == 'EVENT'
+    assert public['endlist'] is False
+    assert len(public['segments']) == 3
+
+    _write_work_playlist(hls_dir, 5)
+    publisher.poll()
+    assert len(parse_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'))['segments']) == 5
+    assert published == [True]  # Notificado uma única vez
+
+def test_finalize_switches_to_vod(setup):
+    publisher, hls_dir, _, _ = setup
+    _write_work_playlist(hls_dir, 4)
+    publisher.poll()
+    _write_work_playlist(hls_dir, 6, ended=True)
+    publisher.finalize()
+
+    public = parse_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'))
+    assert public['playlist_type'] == 'VOD'
+    assert public['endlist'] is True
+    assert len(public['segments']) == 6
+    assert not os.path.exists(os.path.join(hls_dir, '.packaging.m3u8'))
+
+def test_startup_head_is_published_from_the_start(setup):
+    publisher, hls_dir, _, _ = setup
+    publisher.prefix_segments = [{'duration': d, 'uri': f'startup{i:02d}.ts'} for i, d in enumerate((1.0, 1.0, 2.0))]
+    _write_work_playlist(hls_dir, 3)
+    publisher.poll()
+    first = [seg['uri'] for seg in parse_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'))['segments']]
+    assert first[:3] == ['startup00.ts', 'startup01.ts', 'startup02.ts'] and len(first) == 6
+
+    # EVENT só cresce no fim: o que os clientes já viram continua sendo o prefixo
+    _write_work_playlist(hls_dir, 5)
+    publisher.poll()
+    _write_work_playlist(hls_dir, 7, ended=True)
+    publisher.finalize()
+    final = parse_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'))['segments']
+    assert [seg['uri'] for seg in final[:len(first)]] == first
+    assert len(final) == 10 and final[3].get('discontinuity')
+
+def test_reset_unpublishes(setup):
+    publisher, hls_dir, movie_dir, _ = setup
+    _write_work_playlist(hls_dir, 3)
+    publisher.poll()
+    publisher.reset()
+    assert not publisher.published
+    assert not os.path.exists(os.path.join(movie_dir, 'metadata.json'))
+    assert not os.path.exists(os.path.join(hls_dir, 'playlist.m3u8'))
+
+def _playlist_type(cmd):
+    return cmd[cmd.index('-hls_playlist_type') + 1]
+
+def test_progressive_commands_write_event_playlist():
+    # Com 'vod' o muxer HLS do ffmpeg só escreve a playlist no final: o
+    # publicador não veria nenhum segmento até o empacotamento terminar
+    for strategy in (COPY, COPY_CONSERVATIVE, COPY_VIDEO_AAC):
+        assert _playlist_type(build_copy_command(strategy, 'in.mkv', 'seg%03d.ts', '.packaging.m3u8',
+                                                 playlist_type='event')) == 'event'
+        assert _playlist_type(build_copy_command(strategy, 'in.mkv', 'seg%03d.ts', 'playlist.m3u8')) == 'vod'
+    assert _playlist_type(build_encode_command('in.mkv', '.packaging.m3u8', 'seg%03d.ts', 8,
+                                               playlist_type='event')) == 'event'
+    assert _playlist_type(build_encode_command('in.mkv', 'playlist.m3u8', 'seg%03d.ts', 8)) == 'vod'
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from hls_strategy import COPY, TRANSCODE
+from release_name import parse_release_name, title_with_year, title_variations, packaging_hint
+
+FIELDS = ('title', 'year', 'resolution', 'source', 'video_codec', 'release_group')
+# Casos que o clean_filename_for_search antigo errava ou que exercitam cada
+# tipo de token: títulos com cara de ano ou de tag, grupos entre colchetes,
+# prefixo de site, nomes sem ano ou só com o título
+CASES = [
+    ('The.Matrix.1999.1080p.BluRay.x264-SPARKS.mkv', ('The Matrix', 1999, '1080p', 'BluRay', 'h264', 'SPARKS')),
+    ('The Matrix (1999) [1080p] [YTS.AG]', ('The Matrix', 1999, '1080p', None, None, 'YTS.AG')),
+    ('Blade.Runner.2049.2017.1080p.BluRay.x264.DTS-HD.MA.7.1-FGT',
+     ('Blade Runner 2049', 2017, '1080p', 'BluRay', 'h264', 'FGT')),
+    ('2001.A.Space.Odyssey.1968.REMASTERED.1080p.BluRay.x264-AMIABLE',
+     ('2001 A Space Odyssey', 1968, '1080p', 'BluRay', 'h264', 'AMIABLE')),
+    ('1917.2019.1080p.WEB-DL.DD5.1.H264-FGT', ('1917', 2019, '1080p', 'WEB-DL', 'h264', 'FGT')),
+    ('1917.1080p.BluRay.x264-SPARKS', ('1917', None, '1080p', 'BluRay', 'h264', 'SPARKS')),
+    ('Se7en.1995.REMASTERED.1080p.BluRay.6CH.x265.HEVC-PSA', ('Se7en', 1995, '1080p', 'BluRay', 'hevc', 'PSA')),
+    ('Cam.2018.1080p.NF.WEB-DL.DD5.1.x264-NTG', ('Cam', 2018, '1080p', 'WEB-DL', 'h264', 'NTG')),
+    ('Real.Steel.2011.1080p.BluRay.x264-SPARKS', ('Real Steel', 2011, '1080p', 'BluRay', 'h264', 'SPARKS')),
+    ('Web.of.Lies.2009.DVDRip.XviD-VoMiT', ('Web of Lies', 2009, None, 'DVDRip', 'mpeg4', 'VoMiT')),
+    ('Dune.Part.Two.2024.1080p.AMZN.WEB-DL.DDP5.1.Atmos.H.264-FLUX.mkv',
+     ('Dune Part Two', 2024, '1080p', 'WEB-DL', 'h264', 'FLUX')),
+    ('Toy Story 4 (2019) [720p] [BluRay] [YTS.MX]', ('Toy Story 4', 2019, '720p', 'BluRay', None, 'YTS.MX')),
+    ('Mr.&.Mrs.Smith.2005.720p.BluRay.x264-SiNNERS', ('Mr & Mrs Smith', 2005, '720p', 'BluRay', 'h264', 'SiNNERS')),
+    ('Amélie.Poulain.2001.720p.BluRay.x264', ('Amélie Poulain', 2001, '720p', 'BluRay', 'h264', None)),
+    ('Frozen II (2019) (1080p BluRay x265 10bit Tigole)', ('Frozen II', 2019, '1080p', 'BluRay', 'hevc', None)),
+    ('www.TamilBlasters.com - Vikram (2022) 1080p WEB-DL x264 DD5.1',
+     ('Vikram', 2022, '1080p', 'WEB-DL', 'h264', None)),
+    ('[ www.Torrenting.com ] - Jungle.Cruise.2021.1080p.WEBRip.x264-RARBG',
+     ('Jungle Cruise', 2021, '1080p', 'WEBRip', 'h264', 'RARBG')),
+    ('Cidade de Deus.avi', ('Cidade de Deus', None, None, None, None, None)),
+    ('Some.Movie.2020.1080i.HDTV.MPEG2.DD5.1-HDCHiNA', ('Some Movie', 2020, '1080i', 'HDTV', 'mpeg2video', 'HDCHiNA')),
+    ('Some.Movie.2021.2160p.WEB.VP9.Opus.5.1-GRP', ('Some Movie', 2021, '2160p', 'WEB', 'vp9', 'GRP')),
+    ('Some.Movie.2018.4K.UHD.BluRay.HEVC.TrueHD.Atmos-GRP', ('Some Movie', 2018, '2160p', 'BluRay', 'hevc', 'GRP')),
+    ('Some.Movie.CAM.x264-GRP', ('Some Movie', None, None, 'CAM', 'h264', 'GRP')),
+    ('Some.Movie.2018.1080p.BluRay.REMUX.AVC.DTS-HD.MA.5.1-GRP', ('Some Movie', 2018, '1080p', 'Remux', 'h264', 'GRP')),
+    ('Some_Movie_2018_720p_HDTV_x264-GRP', ('Some Movie', 2018, '720p', 'HDTV', 'h264', 'GRP')),
+]
+
+@pytest.mark.parametrize('name,expected', CASES, ids=[name for name, _ in CASES])
+def test_labelled_names(name, expected):
+    release = parse_release_name(name)
+    assert tuple(release[field] for field in FIELDS) == expected
+
+def test_all_fields():
+    release = parse_release_name('Clown.In.A.Cornfield.2025.1080p.WEBRip.x265.10bit.AAC5.1-[YTS.MX].mp4')
+    assert release == {'title': 'Clown In A Cornfield', 'year': 2025, 'resolution': '1080p', 'source': 'WEBRip',
+                       'video_codec': 'hevc', 'bit_depth': 10, 'audio': 'aac', 'audio_channels': '5.1', 'hdr': None,
+                       'flags': [], 'release_group': 'YTS.MX'}
+    release = parse_release_name('John.Wick.Chapter.4.2023.2160p.WEB-DL.DDP5.1.Atmos.DV.HDR10.H.265-FLUX')
+    assert (release['audio'], release['audio_channels'], release['hdr']) == ('eac3', '5.1', 'DV')
+    assert parse_release_name('Gladiator.2000.EXTENDED.REMASTERED.1080p.BluRay.x264')['flags'] == ['extended',
+                                                                                                   'remastered']
+
+def test_search_variations():
+    release = parse_release_name('Clown.In.A.Cornfield.2025.1080p.WEBRip.x265-[YTS.MX]')
+    assert title_with_year(release) == 'Clown In A Cornfield 2025'
+    assert title_variations(release) == ['Clown In A Cornfield', 'Clown In A Cornfield 2025', 'Clown In A']
+    assert title_variations(parse_release_name('Toy.Story.3.2010.1080p.BluRay.x264')) == [
+        'Toy Story 3', 'Toy Story 3 2010', 'Toy Story']
+    assert title_variations(parse_release_name('Heat.mkv')) == ['Heat']
+
+def test_packaging_hint():
+    assert packaging_hint(parse_release_name('Movie.2019.1080p.BluRay.x264-GRP')) == COPY
+    assert packaging_hint(parse_release_name('Movie.2019.1080p.BluRay.x265-GRP')) == TRANSCODE
+    assert packaging_hint(parse_release_name('Movie.2019.1080p.WEB.H264.10bit-GRP')) == TRANSCODE
+    assert packaging_hint(parse_release_name('Movie.2019.DVDRip.XviD-GRP')) == TRANSCODE
+    assert packaging_hint(parse_release_name('Movie (2019) [1080p] [YTS.MX]')) is None
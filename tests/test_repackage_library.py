@@ -0,0 +1,119 @@
+import pytest
+import os
+import json
+import shutil
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import repackage_library
+import startup_layout
+import hls_validation
+from repackage_library import repackage_title, recover_swap, workers_for_budget, WORK_FOLDER, OLD_FOLDER, MARKER_FILE
+from hls_playlist import write_media_playlist, parse_media_playlist
+from packaging_profile import current_profile
+from test_iframe_playlist import _segment, _pts_per_frame
+
+def _fake_remux(argv, stage, **kwargs):
+    """Remux 1:1: cada segmento de entrada vira um segmento de saída."""
+    source = parse_media_playlist(argv[argv.index('-i') + 1])['segments']
+    start = int(argv[argv.index('-start_number') + 1])
+    pattern = argv[argv.index('-hls_segment_filename') + 1]
+    segments = []
+    for i, seg in enumerate(source):
+        name = pattern % (start + i)
+        shutil.copyfile(seg['uri'], name)
+        segments.append({'duration': seg['duration'], 'uri': os.path.basename(name)})
+    write_media_playlist(argv[-1], segments)
+    return {'ok': True}
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(repackage_library, 'run_supervised', _fake_remux)
+    monkeypatch.setattr(hls_validation, 'decode_segment', lambda data: None)
+    monkeypatch.setattr(startup_layout, '_probe_json', lambda args: {})
+
+    movie = tmp_path / '101'
+    hls_dir = movie / 'hls'
+    hls_dir.mkdir(parents=True)
+    segments = []
+    for i in range(4):
+        name = f'segment{i:03d}.ts'
+        # Cabeça de 1s recodificada + corpo copiado
+        frames = 24 if i == 0 else 48
+        base = 126000 + (0 if i == 0 else (24 + (i - 1) * 48) * _pts_per_frame(24))
+        (hls_dir / name).write_bytes(_segment([n == 0 for n in range(frames)], base_pts=base))
+        segments.append({'duration': frames / 24, 'uri': name, 'discontinuity': i == 1})
+    write_media_playlist(str(hls_dir / 'playlist.m3u8'), segments)
+    (movie / 'metadata.json').write_text(json.dumps({'id': '101', 'status': 'ready',
+                                                     'hls_playlist': '/hls/playlist.m3u8'}))
+    return movie
+
+def _metadata(movie):
+    return json.loads((movie / 'metadata.json').read_text())
+
+def test_repackage_swaps_in_new_output(library):
+    profile = current_profile()
+    status, _ = repackage_title(str(library), profile)
+    assert status == 'repackaged'
+
+    metadata = _metadata(library)
+    assert metadata['packaging_profile']['version'] == profile['version']
+    assert metadata['hls_playlist'] == '/hls/master.m3u8'
+    segments = parse_media_playlist(str(library / 'hls' / 'playlist.m3u8'))['segments']
+    # A descontinuidade entre a cabeça e o corpo é preservada
+    assert [s['discontinuity'] for s in segments] == [False, True, False, False]
+    assert [s['uri'] for s in segments] == ['segment0000.ts', 'segment0001.ts', 'segment0002.ts', 'segment0003.ts']
+    assert not (library / WORK_FOLDER).exists() and not (library / OLD_FOLDER).exists()
+    assert not (library / 'hls' / MARKER_FILE).exists()
+    assert not [n for n in os.listdir(str(library / 'hls')) if n.startswith('.period')]
+
+    # Segunda execução: já no perfil atual
+    assert repackage_title(str(library), profile) == ('skipped', 'já no perfil atual')
+
+def test_invalid_output_keeps_current_title(library, monkeypatch):
+    monkeypatch.setattr(hls_validation, 'decode_segment', lambda data: 'Invalid data found')
+    before = sorted(os.listdir(str(library / 'hls')))
+    status, message = repackage_title(str(library), current_profile())
+    assert status == 'error' and 'inválida' in message
+    assert sorted(os.listdir(str(library / 'hls'))) == before
+    assert not (library / WORK_FOLDER).exists()
+    assert 'packaging_profile' not in _metadata(library)
+
+def test_recover_interrupted_swap(library):
+    # Interrompido entre os dois renames, com a pasta nova completa
+    hls_dir, work_dir, old_dir = library / 'hls', library / WORK_FOLDER, library / OLD_FOLDER
+    shutil.copytree(str(hls_dir), str(work_dir))
+    (work_dir / MARKER_FILE).write_text(json.dumps({'hls_layout': 'segments'}))
+    os.replace(str(hls_dir), str(old_dir))
+    recover_swap(str(library))
+    assert hls_dir.exists() and not old_dir.exists() and not work_dir.exists()
+    assert _metadata(library)['hls_layout'] == 'segments'
+
+    # Pasta de trabalho incompleta: o título antigo volta
+    shutil.copytree(str(hls_dir), str(work_dir))
+    os.replace(str(hls_dir), str(old_dir))
+    recover_swap(str(library))
+    assert hls_dir.exists() and not work_dir.exists()
+
+def test_skips_titles_in_processing_and_dry_run(library):
+    metadata = _metadata(library)
+    assert repackage_title(str(library), current_profile(), dry_run=True)[0] == 'pending'
+    (library / 'metadata.json').write_text(json.dumps(dict(metadata, status='processing')))
+    assert repackage_title(str(library), current_profile())[0] == 'skipped'
+
+def test_workers_for_budget():
+    assert workers_for_budget(0.5, cpu_count=8) == 4
+    assert workers_for_budget(0.1, cpu_count=4) == 1
+
+def test_marker_records_achieved_profile(library):
+    # Sem a fonte não há renditions de áudio: o perfil gravado não pode dizer que há
+    profile = dict(current_profile(), audio_renditions=True, iframes=True)
+    assert repackage_title(str(library), profile)[0] == 'repackaged'
+    recorded = _metadata(library)['packaging_profile']
+    assert recorded['audio_renditions'] is False
+    assert recorded['iframes'] is True and (library / 'hls' / 'iframes.m3u8').exists()
+    # ...mas o título não é reempacotado de novo a cada execução por isso
+    assert repackage_title(str(library), profile) == ('skipped', 'já no perfil atual')
@@ -0,0 +1,84 @@
+import pytest
+import os
+import json
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+from hls_playlist import parse_media_playlist, write_media_playlist
+from single_file_layout import consolidate_segments, is_single_file
+import convert_library_single_file
+
+def _write_segments(hls_dir, sizes):
+    segments = []
+    for i, size in enumerate(sizes):
+        name = f'segment{i:03d}.ts'
+        with open(os.path.join(hls_dir, name), 'wb') as f:
+            f.write(bytes([i]) * size)
+        segments.append({'duration': 4.0, 'uri': name, 'discontinuity': i == 2})
+    write_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'), segments)
+
+def test_consolidate_segments_into_byteranges(tmp_path):
+    hls_dir = str(tmp_path)
+    _write_segments(hls_dir, [188 * 3, 188 * 5, 188 * 2])
+
+    assert consolidate_segments(hls_dir) == 3
+
+    playlist = parse_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'))
+    assert is_single_file(playlist['segments'])
+    assert [s['byterange'] for s in playlist['segments']] == ['564@0', '940@564', '376@1504']
+    assert [s['discontinuity'] for s in playlist['segments']] == [False, False, True]
+    assert sorted(os.listdir(hls_dir)) == ['media.ts', 'playlist.m3u8']
+
+    with open(os.path.join(hls_dir, 'media.ts'), 'rb') as f:
+        data = f.read()
+    assert data[564:564 + 940] == bytes([1]) * 940
+    with open(os.path.join(hls_dir, 'playlist.m3u8')) as f:
+        assert '#EXT-X-VERSION:4' in f.read()
+
+    # Segunda execução não muda nada
+    assert consolidate_segments(hls_dir) == 0
+
+def test_converter_is_resumable(tmp_path, monkeypatch):
+    movie_dir = tmp_path / '101'
+    hls_dir = movie_dir / 'hls'
+    hls_dir.mkdir(parents=True)
+    _write_segments(str(hls_dir), [188, 188])
+    with open(movie_dir / 'metadata.json', 'w') as f:
+        json.dump({'id': 101, 'hls_playlist': '/hls/playlist.m3u8'}, f)
+    monkeypatch.setattr(convert_library_single_file, 'finalize_playlists', lambda hls_dir, **kwargs: True)
+
+    assert convert_library_single_file.convert_title(str(movie_dir), dry_run=True)[0] == 'pending'
+    assert convert_library_single_file.convert_title(str(movie_dir))[0] == 'converted'
+    with open(movie_dir / 'metadata.json') as f:
+        metadata = json.load(f)
+    assert metadata['hls_layout'] == 'single_file'
+    assert metadata['hls_playlist'] == '/hls/master.m3u8'
+
+    # Órfão de uma execução interrompida após a troca da playlist
+    (hls_dir / 'segment000.ts').write_bytes(b'\x47' * 188)
+    assert convert_library_single_file.convert_title(str(movie_dir)) == ('skipped', 'já convertido')
+    assert not (hls_dir / 'segment000.ts').exists()
+
+def test_converter_keeps_audio_renditions(tmp_path, monkeypatch):
+    movie_dir = tmp_path / '102'
+    hls_dir = movie_dir / 'hls'
+    audio_dir = hls_dir / 'audio' / 'eng'
+    audio_dir.mkdir(parents=True)
+    _write_segments(str(hls_dir), [188, 188])
+    _write_segments(str(audio_dir), [188, 376])
+    with open(movie_dir / 'metadata.json', 'w') as f:
+        json.dump({'id': 102, 'hls_playlist': '/hls/master.m3u8',
+                   'audio_tracks': [{'language': 'eng', 'name': 'English', 'default': True}]}, f)
+    finalized = []
+    monkeypatch.setattr(convert_library_single_file, 'finalize_playlists',
+                        lambda hls_dir, **kwargs: finalized.append(kwargs) or True)
+
+    assert convert_library_single_file.convert_title(str(movie_dir))[0] == 'converted'
+    # Vídeo sem áudio: a master continua apontando para a rendition de áudio
+    assert finalized == [{'audio_renditions': [{'language': 'eng', 'name': 'English', 'default': True,
+                                                'uri': 'audio/eng/playlist.m3u8', 'group': 'audio'}]}]
+    audio = parse_media_playlist(str(audio_dir / 'playlist.m3u8'))
+    assert is_single_file(audio['segments'])
+    assert sorted(os.listdir(audio_dir)) == ['media.ts', 'playlist.m3u8']
@@ -0,0 +1,57 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from smart_render import (plan_regions, encode_fraction, build_region_command,
+                          COPY_REGION, ENCODE_REGION)
+
+def _modes(regions):
+    return [(round(r['start'], 1), round(r['end'], 1), r['mode']) for r in regions]
+
+def test_regular_gops_are_copied_entirely():
+    keyframes = [i * 2.0 for i in range(300)]
+    regions = plan_regions(keyframes, 600.0)
+    assert _modes(regions) == [(0.0, 600.0, COPY_REGION)]
+    assert encode_fraction(regions) == 0.0
+
+def test_only_long_gop_is_reencoded():
+    # GOPs de 2s, com um GOP de 30s entre 100 e 130s
+    keyframes = [i * 2.0 for i in range(51)] + [130.0 + i * 2.0 for i in range(100)]
+    regions = plan_regions(keyframes, 330.0)
+    assert _modes(regions) == [
+        (0.0, 100.0, COPY_REGION),
+        (100.0, 130.0, ENCODE_REGION),
+        (130.0, 330.0, COPY_REGION),
+    ]
+    assert encode_fraction(regions) == pytest.approx(30 / 330)
+
+def test_short_copy_between_encoded_regions_is_absorbed():
+    keyframes = [0.0, 20.0, 22.0, 24.0, 40.0] + [40.0 + i * 2.0 for i in range(1, 100)]
+    regions = plan_regions(keyframes, 240.0)
+    # 20-24s (copy curto) fica entre dois GOPs longos: tudo até 40s é recodificado
+    assert _modes(regions)[0] == (0.0, 40.0, ENCODE_REGION)
+    assert regions[1]['mode'] == COPY_REGION
+
+def test_missing_start_keyframe_and_startup_head():
+    keyframes = [1.5] + [1.5 + i * 2.0 for i in range(1, 100)]
+    regions = plan_regions(keyframes, 200.0)
+    assert _modes(regions)[0] == (0.0, 1.5, ENCODE_REGION)
+
+    regions = plan_regions([i * 2.0 for i in range(100)], 200.0, startup=True)
+    assert _modes(regions)[0] == (0.0, 4.0, ENCODE_REGION)
+    assert regions[0]['startup'] and not regions[1]['startup']
+
+def test_region_commands():
+    copy_cmd = build_region_command('in.mkv', {'start': 130.0, 'end': 330.0, 'mode': COPY_REGION},
+                                    'r.m3u8', 'p%05d.ts', 8, audio_copy=True)
+    assert copy_cmd[copy_cmd.index('-ss') + 1] == '130.000'
+    assert copy_cmd[copy_cmd.index('-t') + 1] == '200.000'
+    assert copy_cmd[copy_cmd.index('-c:v') + 1] == 'copy'
+    assert copy_cmd[copy_cmd.index('-output_ts_offset') + 1] == '130.000'
+
+    encode_cmd = build_region_command('in.mkv', {'start': 100.0, 'end': 130.0, 'mode': ENCODE_REGION},
+                                      'r.m3u8', 'p%05d.ts', 8, audio_copy=True)
+    assert encode_cmd[encode_cmd.index('-c:v') + 1] == 'h264'
+    assert encode_cmd[encode_cmd.index('-c:a') + 1] == 'copy'
@@ -0,0 +1,71 @@
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import speech_reference
+from speech_reference import (ensure_speech_reference, save_speech_reference, load_speech_reference,
+                              reference_path)
+from subtitle_manager import SubtitleManager
+
+def _speech(seconds=60):
+    # Fala em blocos de 2s alternados, 100 amostras por segundo
+    return np.array([1.0 if (i // 200) % 2 else 0.0 for i in range(seconds * 100)])
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = reference_path(str(tmp_path))
+    save_speech_reference(path, _speech())
+    assert np.array_equal(load_speech_reference(path), _speech())
+    with np.load(path) as data:
+        assert data['speech'].dtype == np.uint8
+    assert not [name for name in os.listdir(str(tmp_path)) if 'tmp' in name]
+
+def test_reference_computed_once(tmp_path, monkeypatch):
+    video = tmp_path / 'movie.mkv'
+    video.write_bytes(b'\x00')
+    calls = []
+    monkeypatch.setattr(speech_reference, 'compute_speech_reference', lambda f: calls.append(f) or _speech())
+
+    first = ensure_speech_reference(str(tmp_path), str(video))
+    video.unlink()
+    # Depois da ingestão o vídeo não existe mais, mas a referência continua servindo
+    assert ensure_speech_reference(str(tmp_path), str(video)) == first
+    assert len(calls) == 1
+    assert ensure_speech_reference(str(tmp_path / 'outro')) is None
+
+def test_ffsubsync_reads_the_sidecar(tmp_path):
+    from ffsubsync.speech_transformers import DeserializeSpeechTransformer
+
+    path = reference_path(str(tmp_path))
+    save_speech_reference(path, _speech())
+    speech = DeserializeSpeechTransformer(0.0).fit(path).transform()
+    assert len(speech) == 6000 and speech.sum() == 3000
+
+def test_every_language_syncs_against_the_reference(tmp_path, monkeypatch):
+    import subtitle_manager
+
+    save_speech_reference(reference_path(str(tmp_path)), _speech())
+    monkeypatch.setattr(speech_reference, 'compute_speech_reference',
+                        lambda f: pytest.fail("a referência não deveria ser recalculada"))
+    references = []
+
+    def fake_ffsubsync(argv, stage, **kwargs):
+        references.append(argv[argv.index('-i') - 1])
+        with open(argv[argv.index('-o') + 1], 'w') as f:
+            f.write('1\n00:00:01,000 --> 00:00:02,000\nOi\n')
+        return {'ok': True, 'timed_out': None, 'returncode': 0}
+
+    monkeypatch.setattr(subtitle_manager, 'run_supervised', fake_ffsubsync)
+    manager = SubtitleManager(str(tmp_path), {'id': '1'})
+    # Força o caminho do ffsubsync (alinhador interno sem confiança)
+    monkeypatch.setattr(manager, '_align_with_reference', lambda path, reference: None)
+    for lang in ('en', 'pt-BR'):
+        srt = tmp_path / f'{lang}.srt'
+        srt.write_text('1\n00:00:00,000 --> 00:00:01,000\nOi\n')
+        synced = manager._sync_subtitle_with_video(str(srt), None)
+        assert synced.endswith('_synced.srt')
+    manager.cleanup_temp()
+    assert references == [reference_path(str(tmp_path))] * 2
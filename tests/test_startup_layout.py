@@ -0,0 +1,116 @@
+import pytest
+import sys
+import os
+import re
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import startup_layout
+from chunked_encoder import force_keyframes_expr, build_encode_command
+from hls_playlist import (parse_media_playlist, write_media_playlist, video_codec_string,
+                          audio_codec_string)
+
+def _forced_keyframes(expr, duration, fps=24):
+    """Avalia a expressão de -force_key_frames como o ffmpeg faz, quadro a quadro."""
+    body = expr[len('expr:'):]
+    body = re.sub(r'\bif\(', '_if(', body)
+    body = re.sub(r'\beq\(', '_eq(', body)
+    body = re.sub(r'\bgte\(', '_gte(', body)
+    helpers = {
+        '_if': lambda c, a, b: a if c else b,
+        '_eq': lambda a, b: a == b,
+        '_gte': lambda a, b: a >= b,
+    }
+    forced = []
+    for frame in range(int(duration * fps)):
+        t = frame / fps
+        if eval(body, helpers, {'t': t, 'n_forced': len(forced)}):
+            forced.append(round(t, 3))
+    return forced
+
+def test_startup_keyframes_are_short_then_regular():
+    assert _forced_keyframes(force_keyframes_expr(startup=True), 17) == [0, 1, 2, 4, 8, 12, 16]
+
+def test_regular_keyframes_every_four_seconds():
+    assert _forced_keyframes(force_keyframes_expr(), 13) == [0, 4, 8, 12]
+
+def test_startup_command_cuts_at_every_forced_keyframe():
+    cmd = build_encode_command('in.mkv', 'out.m3u8', 'seg%03d.ts', 8, startup=True)
+    assert cmd[cmd.index('-hls_time') + 1] == '1'
+    assert cmd[cmd.index('-sc_threshold') + 1] == '0'
+
+    regular = build_encode_command('in.mkv', 'out.m3u8', 'seg%03d.ts', 8)
+    assert regular[regular.index('-hls_time') + 1] == '4'
+
+def test_media_playlist_tags(tmp_path):
+    path = str(tmp_path / 'playlist.m3u8')
+    segments = [{'duration': d, 'uri': f's{i}.ts'} for i, d in enumerate([1.0, 1.0, 2.0, 4.4, 3.96])]
+    write_media_playlist(path, segments)
+
+    with open(path) as f:
+        content = f.read()
+    assert '#EXT-X-INDEPENDENT-SEGMENTS' in content
+    assert '#EXT-X-VERSION:3' in content
+    # 4.4 arredonda para 4 (RFC 8216), não para 5
+    assert parse_media_playlist(path)['target_duration'] == 4
+
+def test_codec_strings():
+    assert video_codec_string({'codec_name': 'h264', 'profile': 'Main', 'level': 31}) == 'avc1.4d401f'
+    assert video_codec_string({'codec_name': 'h264', 'profile': 'High', 'level': 41}) == 'avc1.640029'
+    assert video_codec_string({'codec_name': 'hevc', 'profile': 'Main', 'level': 120}) is None
+    assert audio_codec_string({'codec_name': 'aac', 'profile': 'LC'}) == 'mp4a.40.2'
+    assert audio_codec_string({'codec_name': 'aac', 'profile': 'HE-AAC'}) == 'mp4a.40.5'
+    assert audio_codec_string({'codec_name': 'mp3'}) == 'mp4a.40.34'
+
+def test_startup_head_is_prepended_with_discontinuity():
+    head = [{'duration': 1.0, 'uri': 'startup00.ts', 'discontinuity': False},
+            {'duration': 1.0, 'uri': 'startup01.ts', 'discontinuity': False}]
+    tail = [{'duration': 8.0, 'uri': 'segment000.ts', 'discontinuity': False},
+            {'duration': 8.0, 'uri': 'segment001.ts', 'discontinuity': False}]
+
+    merged = startup_layout.with_startup_head(head, tail)
+    assert [s['uri'] for s in merged] == ['startup00.ts', 'startup01.ts', 'segment000.ts', 'segment001.ts']
+    assert [s['discontinuity'] for s in merged] == [False, False, True, False]
+    assert startup_layout.with_startup_head(None, tail) == tail
+    assert startup_layout.with_startup_head(head, []) == []
+
+def test_finalize_writes_master_playlist(tmp_path, monkeypatch):
+    hls_dir = str(tmp_path)
+    segments = []
+    for i, (duration, size) in enumerate([(1.0, 100_000), (1.0, 100_000), (2.0, 500_000), (4.0, 800_000)]):
+        name = f'segment{i:03d}.ts'
+        with open(os.path.join(hls_dir, name), 'wb') as f:
+            f.write(b'\x47' * size)
+        segments.append({'duration': duration, 'uri': name})
+    write_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'), segments)
+
+    monkeypatch.setattr(startup_layout, '_probe_json', lambda args: {'streams': [
+        {'codec_type': 'video', 'codec_name': 'h264', 'profile': 'High', 'level': 40,
+         'width': 1920, 'height': 1080, 'avg_frame_rate': '24000/1001'},
+        {'codec_type': 'audio', 'codec_name': 'aac', 'profile': 'LC'},
+    ]})
+
+    assert startup_layout.finalize_playlists(hls_dir)
+    with open(os.path.join(hls_dir, 'master.m3u8')) as f:
+        master = f.read()
+    assert 'CODECS="avc1.640028,mp4a.40.2"' in master
+    assert 'RESOLUTION=1920x1080' in master
+    assert 'FRAME-RATE=23.976' in master
+    # Pico: 500 KB em 2s = 2 Mbit/s
+    assert 'BANDWIDTH=2000000' in master
+    assert master.strip().endswith('playlist.m3u8')
+
+def test_master_omits_codecs_when_a_stream_is_unknown(tmp_path, monkeypatch):
+    hls_dir = str(tmp_path)
+    with open(os.path.join(hls_dir, 'segment000.ts'), 'wb') as f:
+        f.write(b'\x47' * 1000)
+    write_media_playlist(os.path.join(hls_dir, 'playlist.m3u8'), [{'duration': 4.0, 'uri': 'segment000.ts'}])
+
+    monkeypatch.setattr(startup_layout, '_probe_json', lambda args: {'streams': [
+        {'codec_type': 'video', 'codec_name': 'h264', 'profile': 'Main', 'level': 31, 'width': 1280, 'height': 720},
+        {'codec_type': 'audio', 'codec_name': 'opus'},
+    ]})
+
+    variant = startup_layout.describe_variant(hls_dir)
+    assert 'codecs' not in variant
+    assert variant['resolution'] == '1280x720'
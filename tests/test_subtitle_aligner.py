@@ -0,0 +1,124 @@
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import subtitle_manager
+from subtitle_aligner import align, apply_alignment, cue_vector, MIN_CONFIDENCE
+from speech_reference import save_speech_reference, reference_path
+from subtitle_manager import SubtitleManager
+from webvtt_converter import cue_seconds, read_cues
+
+def _dialogue(duration, seed):
+    rng = np.random.default_rng(seed)
+    cues, t = [], 5.0
+    while t < duration - 10:
+        length = rng.uniform(1, 5)
+        cues.append((t, t + length))
+        t += length + rng.exponential(4)
+    return cues
+
+def _reference(cues, duration, noise=0.2, seed=1):
+    """Referência de fala com `noise` das amostras trocadas (VAD imperfeito)."""
+    speech = cue_vector(cues, duration * 100)
+    flips = np.random.default_rng(seed).random(len(speech)) < noise
+    return np.where(flips, 1 - speech, speech)
+
+def _shift(cues, ratio, offset):
+    """Legenda fora de sincronia: o tempo correto é tempo * ratio + offset."""
+    return [((start - offset) / ratio, (end - offset) / ratio) for start, end in cues]
+
+def test_cue_vector_marks_cue_intervals():
+    vector = cue_vector([(0.5, 1.0), (2.0, 2.05)], 300)
+    assert vector[50:100].all() and not vector[100:200].any()
+    assert vector[200:205].all() and vector.sum() == 55
+
+@pytest.mark.parametrize('ratio,offset', [(1.0, 3.27), (1.0, -41.5), (25.0 / 23.976, -1.5), (24.0 / 25.0, 12.0)])
+def test_recovers_offset_and_framerate_drift(ratio, offset):
+    cues = _dialogue(1800, seed=0)
+    result = align(_reference(cues, 1800), _shift(cues, ratio, offset))
+    assert result['ratio'] == pytest.approx(ratio)
+    assert result['offset'] == pytest.approx(offset, abs=0.02)
+    assert result['confidence'] >= MIN_CONFIDENCE
+
+def test_unrelated_subtitle_has_low_confidence():
+    result = align(_reference(_dialogue(1800, seed=0), 1800), _dialogue(1800, seed=5))
+    assert result['confidence'] < MIN_CONFIDENCE
+
+def test_offset_outside_window_is_not_trusted():
+    cues = _dialogue(1800, seed=0)
+    result = align(_reference(cues, 1800), _shift(cues, 1.0, 90.0), max_offset=30)
+    assert result['confidence'] < MIN_CONFIDENCE
+
+def test_apply_alignment():
+    assert apply_alignment([(10.0, 12.0)], {'ratio': 1.5, 'offset': -2.0}) == [(13.0, 16.0)]
+    assert apply_alignment([(1.0, 2.0)], {'ratio': 1.0, 'offset': -5.0}) == [(0.0, 0.0)]
+
+def _write_srt(path, cues):
+    def stamp(t):
+        ms = int(round(t * 1000))
+        return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, (start, end) in enumerate(cues, 1):
+            f.write(f"{i}\n{stamp(start)} --> {stamp(end)}\nFala {i}\n\n")
+
+def test_manager_uses_builtin_aligner(tmp_path, monkeypatch):
+    cues = _dialogue(900, seed=2)
+    save_speech_reference(reference_path(str(tmp_path)), _reference(cues, 900))
+    monkeypatch.setattr(subtitle_manager, 'run_supervised',
+                        lambda *a, **k: pytest.fail("ffsubsync não deveria rodar"))
+    srt = str(tmp_path / 'en.srt')
+    _write_srt(srt, _shift(cues, 1.0, 2.5))
+
+    manager = SubtitleManager(str(tmp_path), {'id': '1'})
+    synced = manager._sync_subtitle_with_video(srt, None)
+    manager.cleanup_temp()
+
+    first = read_cues(synced)[0][0]
+    assert cue_seconds(first[0]) == pytest.approx(cues[0][0], abs=0.015)
+
+def test_manager_aligns_ass_subtitles(tmp_path, monkeypatch):
+    # ASS/SSA passa pelo mesmo leitor da conversão (o pysrt não via nenhuma fala)
+    cues = _dialogue(900, seed=2)
+    save_speech_reference(reference_path(str(tmp_path)), _reference(cues, 900))
+    monkeypatch.setattr(subtitle_manager, 'run_supervised',
+                        lambda *a, **k: pytest.fail("ffsubsync não deveria rodar"))
+
+    def stamp(t):
+        cs = int(round(t * 100))
+        return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+    ass = tmp_path / 'pt.ass'
+    ass.write_text('[Script Info]\nTitle: teste\n\n[Events]\n'
+                   'Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n' +
+                   ''.join(f"Dialogue: 0,{stamp(start)},{stamp(end)},Default,,0,0,0,,{{\\i1}}Fala {i}\n"
+                           for i, (start, end) in enumerate(_shift(cues, 1.0, 2.5), 1)),
+                   encoding='cp1252')
+
+    manager = SubtitleManager(str(tmp_path), {'id': '1'})
+    synced = manager._sync_subtitle_with_video(str(ass), None)
+    manager.cleanup_temp()
+
+    aligned, encoding = read_cues(synced)
+    assert synced.endswith('_synced.srt') and encoding == 'utf-8'
+    assert len(aligned) == len(cues) and aligned[0][2] == 'Fala 1'
+    assert cue_seconds(aligned[0][0]) == pytest.approx(cues[0][0], abs=0.02)
+
+def test_manager_falls_back_to_ffsubsync_on_low_confidence(tmp_path, monkeypatch):
+    save_speech_reference(reference_path(str(tmp_path)), _reference(_dialogue(900, seed=2), 900))
+    calls = []
+
+    def fake_ffsubsync(argv, stage, **kwargs):
+        calls.append(argv)
+        return {'ok': False, 'timed_out': 'total', 'returncode': -9}
+
+    monkeypatch.setattr(subtitle_manager, 'run_supervised', fake_ffsubsync)
+    srt = str(tmp_path / 'en.srt')
+    _write_srt(srt, _dialogue(900, seed=7))
+    manager = SubtitleManager(str(tmp_path), {'id': '1'})
+    # ffsubsync estourou o tempo: a legenda segue sem sincronizar, sem travar o job
+    assert manager._sync_subtitle_with_video(srt, None) == srt
+    manager.cleanup_temp()
+    assert len(calls) == 1 and calls[0][calls[0].index('-i') - 1] == reference_path(str(tmp_path))
@@ -0,0 +1,78 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import subtitle_manager
+from subtitle_cache import SubtitleCache, identity_keys
+from subtitle_manager import SubtitleManager
+
+SRT = '1\n00:00:01,000 --> 00:00:02,000\nOlá\n'
+VTT = 'WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nOlá\n\n'
+
+@pytest.fixture
+def files(tmp_path):
+    raw = tmp_path / 'legenda.srt'
+    raw.write_text(SRT, encoding='utf-8')
+    vtt = tmp_path / 'subtitle_pt-BR.vtt'
+    vtt.write_text(VTT, encoding='utf-8')
+    return str(raw), str(vtt)
+
+def test_exact_and_title_hits(tmp_path, files):
+    cache = SubtitleCache(str(tmp_path / 'cache'), 1024 * 1024)
+    cache.put(identity_keys('abc123', 603, 'tt0133093'), 'pt-BR', *files, provider='podnapisi')
+
+    exact = cache.lookup(identity_keys('abc123', 603), 'pt-BR')
+    assert exact['exact'] and open(exact['vtt'], encoding='utf-8').read() == VTT
+    # Outra release do mesmo filme: a legenda bruta serve, mas precisa sincronizar
+    other_release = cache.lookup(identity_keys('fff999', None, 'tt0133093'), 'pt-BR')
+    assert not other_release['exact'] and open(other_release['raw'], encoding='utf-8').read() == SRT
+    assert cache.lookup(identity_keys('abc123', 603), 'en') is None
+
+    stats = cache.stats()
+    assert (stats['hits_exact'], stats['hits_title'], stats['misses']) == (1, 1, 1)
+    assert stats['entries'] == 1
+
+def test_index_survives_restart(tmp_path, files):
+    SubtitleCache(str(tmp_path / 'cache'), 1024 * 1024).put(identity_keys(None, 603), 'en', *files)
+    (tmp_path / 'cache' / 'en-interrompida.tmp').mkdir()
+    cache = SubtitleCache(str(tmp_path / 'cache'), 1024 * 1024)
+    assert cache.lookup(['tmdb:603'], 'en')['provider'] is None
+    assert os.listdir(str(tmp_path / 'cache')) == [next(iter(cache.entries))]
+
+def test_lru_eviction(tmp_path, files):
+    cache = SubtitleCache(str(tmp_path / 'cache'), 1024 * 1024)
+    cache.put(identity_keys(None, 1), 'en', *files)
+    # Cabem exatamente duas entradas
+    cache.max_bytes = 2 * cache.total_bytes
+    cache.put(identity_keys(None, 2), 'en', *files)
+    assert cache.lookup(['tmdb:1'], 'en')  # 1 passa a ser o mais recente
+    cache.put(identity_keys(None, 3), 'en', *files)
+    assert cache.lookup(['tmdb:2'], 'en') is None
+    assert cache.lookup(['tmdb:1'], 'en') and cache.lookup(['tmdb:3'], 'en')
+    assert cache.stats()['evictions'] == 1
+    assert cache.total_bytes <= cache.max_bytes
+
+def test_manager_checks_cache_before_providers(tmp_path, files, monkeypatch):
+    cache = SubtitleCache(str(tmp_path / 'cache'), 1024 * 1024)
+    video = tmp_path / 'filme.mkv'
+    video.write_bytes(b'\x00' * 300000)
+    video_hash = subtitle_manager.compute_video_hashes(str(video))['opensubtitles']
+    cache.put(identity_keys(video_hash), 'pt-BR', *files)
+    cache.put(identity_keys(None, 603), 'en', *files)
+
+    monkeypatch.setattr(subtitle_manager, 'get_subtitle_cache', lambda: cache)
+    monkeypatch.setattr(subtitle_manager, 'find_best_subtitles',
+                        lambda *args, **kwargs: pytest.fail("nenhum provedor deveria ser consultado"))
+    synced = []
+    movie = tmp_path / 'library' / '603'
+    manager = SubtitleManager(str(movie), {'id': '603', 'tmdb_id': 603, 'video_file': str(video)})
+    monkeypatch.setattr(manager, '_sync_subtitle_with_video', lambda path, video: synced.append(path) or path)
+
+    subtitles = manager.download_subtitles()
+    manager.cleanup_temp()
+    assert [s['language'] for s in subtitles] == ['pt-BR', 'en']
+    # Só a legenda do acerto por TMDB passa pela sincronização
+    assert len(synced) == 1
+    assert sorted(os.listdir(str(movie / 'subtitles'))) == ['subtitle_en.vtt', 'subtitle_pt-BR.vtt']
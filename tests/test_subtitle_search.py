@@ -0,0 +1,164 @@
+import pytest
+import os
+import sys
+import time
+
+from babelfish import Language
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import subtitle_search
+from subtitle_search import find_best_subtitles, list_subtitles, terminate_sessions
+
+class FakeSubtitle:
+    def __init__(self, provider_name, language, score):
+        self.provider_name = provider_name
+        self.language = language
+        self.score = score
+        self.content = None
+
+    def is_valid(self):
+        return self.content is not None
+
+class FakeProvider:
+    initialized = []
+    delay = {}
+    results = {}
+
+    def __init__(self, name):
+        self.name = name
+
+    def initialize(self):
+        FakeProvider.initialized.append(self.name)
+
+    def terminate(self):
+        pass
+
+    def list_subtitles(self, video, languages):
+        time.sleep(FakeProvider.delay.get(self.name, 0))
+        return [s for s in FakeProvider.results.get(self.name, []) if s.language in languages]
+
+    def download_subtitle(self, subtitle):
+        if subtitle.score < 0:
+            raise ValueError("arquivo corrompido")
+        subtitle.content = b'1\n00:00:01,000 --> 00:00:02,000\nOi\n'
+
+def _plugin(name):
+    class Plugin(FakeProvider):
+        def __init__(self):
+            super().__init__(name)
+
+        @staticmethod
+        def check(video):
+            return True
+
+        @staticmethod
+        def check_languages(languages):
+            return set(languages)
+    return Plugin
+
+def _score(subtitle, video):
+    return subtitle.score
+
+@pytest.fixture(autouse=True)
+def fake_providers(monkeypatch):
+    plugins = {}
+    monkeypatch.setattr(subtitle_search, '_provider_class', lambda name: plugins.setdefault(name, _plugin(name)))
+    FakeProvider.initialized, FakeProvider.delay, FakeProvider.results = [], {}, {}
+    terminate_sessions()
+    yield
+    terminate_sessions()
+
+POR, ENG = Language('por'), Language('eng')
+
+def test_providers_are_queried_in_parallel():
+    FakeProvider.delay = {'a': 0.3, 'b': 0.3, 'c': 0.3}
+    FakeProvider.results = {name: [FakeSubtitle(name, POR, 1)] for name in 'abc'}
+    started = time.monotonic()
+    found = list_subtitles(None, {POR}, providers=['a', 'b', 'c'], provider_timeout=5)
+    assert len(found) == 3
+    assert time.monotonic() - started < 0.8
+
+def test_slow_provider_does_not_stall_the_search():
+    FakeProvider.delay = {'slow': 2}
+    FakeProvider.results = {'slow': [FakeSubtitle('slow', POR, 100)], 'fast': [FakeSubtitle('fast', POR, 10)]}
+    started = time.monotonic()
+    found = find_best_subtitles(None, {POR}, providers=['slow', 'fast'], provider_timeout=0.3, budget=1,
+                                score=_score)
+    assert time.monotonic() - started < 1
+    # Vale a melhor legenda disponível no prazo
+    assert [s.provider_name for s in found] == ['fast']
+
+def test_best_score_per_language_with_fallback_on_failed_download():
+    FakeProvider.results = {
+        'a': [FakeSubtitle('a', POR, -1), FakeSubtitle('a', ENG, 5)],
+        'b': [FakeSubtitle('b', POR, 7), FakeSubtitle('b', ENG, 9), FakeSubtitle('b', Language('por', 'BR'), 3)],
+    }
+    found = find_best_subtitles(None, {POR, ENG}, providers=['a', 'b'], budget=5, score=_score)
+    assert sorted((str(s.language), s.provider_name, s.score) for s in found) == [('en', 'b', 9), ('pt', 'b', 7)]
+
+def test_sessions_are_reused_across_searches():
+    FakeProvider.results = {'a': [FakeSubtitle('a', POR, 1)], 'b': [FakeSubtitle('b', ENG, 1)]}
+    for languages in ({POR}, {ENG}, {POR, ENG}):
+        find_best_subtitles(None, languages, providers=['a', 'b'], budget=5, score=_score)
+    assert sorted(FakeProvider.initialized) == ['a', 'b']
+
+def test_failing_provider_logs_in_again(monkeypatch):
+    calls = []
+
+    def broken(self, video, languages):
+        calls.append(self.name)
+        raise ConnectionError("sessão expirada")
+
+    monkeypatch.setattr(FakeProvider, 'list_subtitles', broken)
+    for _ in range(2):
+        assert list_subtitles(None, {POR}, providers=['a'], provider_timeout=5) == []
+    assert FakeProvider.initialized == ['a', 'a']
+
+def test_video_hashes_match_provider_algorithms(tmp_path):
+    from subliminal.refiners.hash import hash_opensubtitles
+    from subliminal.providers.napiprojekt import NapiProjektProvider
+
+    video = tmp_path / 'filme.mkv'
+    video.write_bytes(os.urandom(300000))
+    hashes = subtitle_search.compute_video_hashes(str(video))
+    assert hashes == {'opensubtitles': hash_opensubtitles(str(video)),
+                      'napiprojekt': NapiProjektProvider.hash_video(str(video))}
+
+def test_hash_match_skips_sync(tmp_path, monkeypatch):
+    import subtitle_manager
+    from subliminal.providers.napiprojekt import NapiProjektSubtitle
+    from subtitle_manager import SubtitleManager
+
+    video_file = tmp_path / 'Filme.2020.1080p.mkv'
+    video_file.write_bytes(os.urandom(300000))
+    hashes = subtitle_search.compute_video_hashes(str(video_file))
+    exact = NapiProjektSubtitle(Language('por', 'BR'), hashes['napiprojekt'])
+    exact.content = b'1\n00:00:01,000 --> 00:00:02,000\nOi\n'
+    searched = []
+
+    def fake_search(video, languages, providers):
+        searched.append(video)
+        return [exact]
+
+    monkeypatch.setattr(subtitle_manager, 'get_subtitle_cache', lambda: None)
+    monkeypatch.setattr(subtitle_manager, 'find_best_subtitles', fake_search)
+    manager = SubtitleManager(str(tmp_path / '42'), {'id': '42', 'title': 'Filme', 'imdb_id': 'tt0000042',
+                                                     'video_file': str(video_file)})
+    monkeypatch.setattr(manager, '_sync_subtitle_with_video',
+                        lambda *args: pytest.fail("acerto por hash não deveria ser sincronizado"))
+    subtitles = manager.download_subtitles(skip_languages={'en'})
+    manager.cleanup_temp()
+
+    assert [s['language'] for s in subtitles] == ['pt-BR']
+    video = searched[0]
+    assert video.hashes == hashes and video.size == 300000
+    assert video.external_ids['imdb_id'] == 'tt0000042'
+
+def test_rate_limit_spaces_calls_to_a_provider(monkeypatch):
+    monkeypatch.setattr(subtitle_search, '_min_intervals', {'a': 0.2})
+    monkeypatch.setattr(subtitle_search, '_next_call', {})
+    started = time.monotonic()
+    for _ in range(3):
+        list_subtitles(None, {POR}, providers=['a', 'b'], provider_timeout=5)
+    assert time.monotonic() - started >= 0.4
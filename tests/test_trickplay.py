@@ -0,0 +1,43 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+from PIL import Image
+from trickplay import build_sprites, thumbnail_output_args, list_thumbnails, SPRITE_COLUMNS, SPRITE_ROWS
+
+def _make_thumbnails(folder, count, size=(160, 90)):
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        Image.new('RGB', size, (i % 255, 0, 0)).save(os.path.join(folder, f'thumb{i + 1:05d}.jpg'))
+    return list_thumbnails(folder)
+
+def test_thumbnail_output_is_a_second_ffmpeg_output(tmp_path):
+    args = thumbnail_output_args(str(tmp_path), interval=5, width=120)
+    assert args[:2] == ['-map', '0:v:0']
+    assert 'fps=1/5,scale=120:-2' in args
+    assert args[-1].endswith('thumb%05d.jpg')
+
+def test_sprites_and_vtt(tmp_path):
+    thumbnails = _make_thumbnails(str(tmp_path / 'thumbs'), 105)
+    output_dir = str(tmp_path / 'trickplay')
+
+    info = build_sprites(thumbnails, output_dir, interval=10, duration=1045.0)
+
+    assert info == {'vtt': '/trickplay/thumbnails.vtt', 'interval': 10, 'width': 160, 'height': 90, 'sprites': 2}
+    with Image.open(os.path.join(output_dir, 'sprite_000.jpg')) as sprite:
+        assert sprite.size == (160 * SPRITE_COLUMNS, 90 * SPRITE_ROWS)
+    with Image.open(os.path.join(output_dir, 'sprite_001.jpg')) as sprite:
+        assert sprite.size == (160 * 5, 90)
+
+    with open(os.path.join(output_dir, 'thumbnails.vtt')) as f:
+        vtt = f.read()
+    assert vtt.startswith('WEBVTT')
+    assert '00:00:00.000 --> 00:00:10.000\nsprite_000.jpg#xywh=0,0,160,90' in vtt
+    assert '00:01:50.000 --> 00:02:00.000\nsprite_000.jpg#xywh=160,90,160,90' in vtt
+    # Último cue termina na duração do filme
+    assert '00:17:20.000 --> 00:17:25.000\nsprite_001.jpg#xywh=640,0,160,90' in vtt
+
+def test_no_thumbnails(tmp_path):
+    assert build_sprites([], str(tmp_path / 'trickplay')) is None
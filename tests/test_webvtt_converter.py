@@ -0,0 +1,105 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../worker')))
+
+import webvtt_converter
+from webvtt_converter import convert_to_webvtt, cue_seconds, read_cues, vtt_time, write_srt
+
+def _cues(path):
+    blocks = open(path, encoding='utf-8').read().split('\n\n')
+    assert blocks[0] == 'WEBVTT'
+    return [block for block in blocks[1:] if block]
+
+def test_srt_with_normalized_timestamps(tmp_path):
+    source = tmp_path / 'filme.srt'
+    source.write_bytes('1\r\n00:00:01,5 --> 0:00:02.250\r\nOlá, <i>mundo</i>\r\n\r\n'
+                       '2\r\n00:01:00,000 --> 00:01:02,000\r\nA --> B\r\nsegunda linha\r\n'
+                       '3\r\n01:00:00,000 --> 01:00:01,000\r\nÚltima\r\n'.encode('utf-8'))
+    target = tmp_path / 'subtitle_pt-BR.vtt'
+    assert convert_to_webvtt(str(source), str(target)) == (3, 'utf-8')
+    assert _cues(str(target)) == [
+        '00:00:01.005 --> 00:00:02.250\nOlá, <i>mundo</i>',
+        # Número da fala seguinte sem linha vazia antes não vira texto
+        '00:01:00.000 --> 00:01:02.000\nA -> B\nsegunda linha',
+        '01:00:00.000 --> 01:00:01.000\nÚltima',
+    ]
+
+def test_legacy_encoding_uses_bounded_sample(tmp_path, monkeypatch):
+    source = tmp_path / 'filme.srt'
+    source.write_bytes(('1\n00:00:01,000 --> 00:00:02,000\nAção e coração\n\n' * 2000).encode('cp1252'))
+    samples = []
+    real_detect = webvtt_converter.chardet.detect
+    monkeypatch.setattr(webvtt_converter.chardet, 'detect', lambda data: samples.append(len(data)) or real_detect(data))
+
+    cues, encoding = convert_to_webvtt(str(source), str(tmp_path / 'out.vtt'))
+    assert cues == 2000 and encoding.lower() in ('windows-1252', 'iso-8859-1')
+    assert samples == [webvtt_converter.ENCODING_SAMPLE_BYTES]
+    assert 'Ação e coração' in _cues(str(tmp_path / 'out.vtt'))[0]
+
+def test_utf8_file_never_runs_chardet(tmp_path, monkeypatch):
+    source = tmp_path / 'filme.srt'
+    source.write_bytes(b'\xef\xbb\xbf1\n00:00:01,000 --> 00:00:02,000\nPor qu\xc3\xaa?\n')
+    monkeypatch.setattr(webvtt_converter.chardet, 'detect', lambda data: pytest.fail("chardet não deveria rodar"))
+    assert convert_to_webvtt(str(source), str(tmp_path / 'out.vtt'))[0] == 1
+    assert _cues(str(tmp_path / 'out.vtt')) == ['00:00:01.000 --> 00:00:02.000\nPor quê?']
+
+def test_ass_events(tmp_path):
+    source = tmp_path / 'filme.ass'
+    source.write_text('[Script Info]\nTitle: Teste\n\n[V4+ Styles]\nFormat: Name, Fontname\nStyle: Default,Arial\n\n'
+                      '[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n'
+                      'Dialogue: 0,0:00:01.50,0:00:03.00,Default,,0,0,0,,{\\i1}Olá{\\i0}, tudo bem?\\NSim.\n'
+                      'Comment: 0,0:00:04.00,0:00:05.00,Default,,0,0,0,,nota\n'
+                      'Dialogue: 0,1:02:03.04,1:02:04.00,Default,,0,0,0,,Vírgula, no texto\n', encoding='utf-8')
+    target = tmp_path / 'out.vtt'
+    assert convert_to_webvtt(str(source), str(target))[0] == 2
+    assert _cues(str(target)) == ['00:00:01.500 --> 00:00:03.000\nOlá, tudo bem?\nSim.',
+                                  '01:02:03.040 --> 01:02:04.000\nVírgula, no texto']
+
+def test_failed_conversion_keeps_previous_file(tmp_path, monkeypatch):
+    target = tmp_path / 'out.vtt'
+    target.write_text('WEBVTT\n\nanterior\n', encoding='utf-8')
+    monkeypatch.setattr(webvtt_converter, '_stamp', lambda *parts: 1 / 0)
+    source = tmp_path / 'filme.srt'
+    source.write_text('1\n00:00:01,000 --> 00:00:02,000\nOi\n', encoding='utf-8')
+    with pytest.raises(ZeroDivisionError):
+        convert_to_webvtt(str(source), str(target))
+    assert 'anterior' in target.read_text(encoding='utf-8')
+    assert not (tmp_path / 'out.vtt.tmp').exists()
+
+def test_vtt_time():
+    assert vtt_time(3723004) == '01:02:03.004'
+    assert vtt_time(-5) == '00:00:00.000'
+
+def test_read_cues_and_write_srt_roundtrip(tmp_path):
+    source = tmp_path / 'filme.srt'
+    source.write_bytes('1\n00:00:01,500 --> 00:00:02,250\nCoração\n\n2\n00:01:00,000 --> 00:01:02,000\nAção\n'
+                       .encode('cp1252'))
+    cues, encoding = read_cues(str(source))
+    assert encoding != 'utf-8'
+    assert cues == [('00:00:01.500', '00:00:02.250', 'Coração'), ('00:01:00.000', '00:01:02.000', 'Ação')]
+    assert cue_seconds(cues[1][1]) == 62.0
+
+    target = tmp_path / 'filme_synced.srt'
+    assert write_srt(cues, str(target)) == 2
+    assert target.read_text(encoding='utf-8').startswith('1\n00:00:01,500 --> 00:00:02,250\nCoração\n\n2\n')
+    assert read_cues(str(target)) == (cues, 'utf-8')
+
+def test_ascii_head_does_not_hide_legacy_accents(tmp_path):
+    # 2000 falas só ASCII antes da primeira acentuada: a amostra do início diria 'ascii'
+    source = tmp_path / 'filme.srt'
+    head = ''.join(f"{i}\n{vtt_time(i * 3000).replace('.', ',')} --> {vtt_time(i * 3000 + 2000).replace('.', ',')}\n"
+                   f"Line {i}\n\n" for i in range(1, 2001))
+    source.write_bytes((head + '2001\n02:00:00,000 --> 02:00:02,000\nCafé à noite, ação\n').encode('cp1252'))
+    cues, encoding = convert_to_webvtt(str(source), str(tmp_path / 'out.vtt'))
+    assert cues == 2001 and encoding.lower() != 'ascii'
+    assert _cues(str(tmp_path / 'out.vtt'))[-1].endswith('Café à noite, ação')
+
+def test_guess_encoding_falls_back_for_ascii(tmp_path, monkeypatch):
+    source = tmp_path / 'filme.srt'
+    source.write_bytes(b'1\n00:00:01,000 --> 00:00:02,000\n' + 'Café, ação\n'.encode('cp1252') * 20)
+    monkeypatch.setattr(webvtt_converter.chardet, 'detect', lambda data: {'encoding': 'ascii'})
+    assert webvtt_converter.guess_encoding(str(source)) == webvtt_converter.FALLBACK_ENCODING
+    monkeypatch.setattr(webvtt_converter.chardet, 'detect', lambda data: {'encoding': None})
+    assert webvtt_converter.guess_encoding(str(source)) == webvtt_converter.FALLBACK_ENCODING
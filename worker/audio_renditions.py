@@ -0,0 +1,283 @@
+"""
+Renditions de áudio separadas por idioma (EXT-X-MEDIA).
+
+Releases com áudio duplo (original + dublagem) eram empacotados com o áudio
+dentro dos segmentos TS — e a seleção padrão do ffmpeg mantinha só uma das
+faixas. Aqui, para fontes com dois ou mais idiomas de áudio:
+
+- cada idioma vira uma rendition só de áudio (audio/{idioma}/), cortada nos
+  mesmos instantes e com as mesmas descontinuidades da playlist de vídeo,
+  numa única execução do ffmpeg (uma saída por idioma);
+- os segmentos de vídeo já empacotados perdem o áudio por filtragem dos
+  pacotes TS (PIDs de áudio descartados e PMT reescrita), sem remux, em
+  processos separados (o laço byte a byte em Python não escala com threads);
+- a master playlist declara o grupo com EXT-X-MEDIA e cada cliente baixa
+  só o idioma que está tocando. O vídeo é guardado uma vez só.
+"""
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from embedded_subtitles import EMBEDDED_LANGUAGE_CODES
+from hls_playlist import parse_media_playlist, write_media_playlist
+from iframe_playlist import TS_PACKET_SIZE, TS_SYNC_BYTE, VIDEO_STREAM_TYPES, _payload_start, _section
+from process_supervisor import run_supervised
+from subtitle_manager import language_name
+
+AUDIO_FOLDER = 'audio'
+AUDIO_GROUP = 'audio'
+COPY_AUDIO_CODECS = ('aac',)
+STRIP_WORKERS = 8
+
+
+def _crc32_mpeg2(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) & 0xFFFFFFFF if crc & 0x80000000 else (crc << 1) & 0xFFFFFFFF
+    return crc
+
+
+def _language_code(stream: Dict) -> Optional[str]:
+    tag = ((stream.get('tags') or {}).get('language') or '').lower()
+    if not tag or tag == 'und':
+        return None
+    return EMBEDDED_LANGUAGE_CODES.get(tag, tag)
+
+
+def select_audio_renditions(streams: List[Dict]) -> List[Dict]:
+    """
+    Uma faixa por idioma (a primeira de cada, preferindo a marcada como
+    padrão). Vazio se a fonte não tem pelo menos dois idiomas identificados.
+    """
+    chosen = {}
+    for stream in streams:
+        if stream.get('codec_type') != 'audio':
+            continue
+        language = _language_code(stream)
+        if not language:
+            continue
+        default = bool((stream.get('disposition') or {}).get('default'))
+        if language not in chosen or (default and not chosen[language]['default']):
+            chosen[language] = {
+                'stream_index': stream['index'],
+                'language': language,
+                'name': language_name(language),
+                'default': default,
+                'codec': stream.get('codec_name'),
+                'profile': stream.get('profile'),
+                'channels': stream.get('channels'),
+            }
+    if len(chosen) < 2:
+        return []
+
+    renditions = sorted(chosen.values(), key=lambda r: r['stream_index'])
+    if not any(r['default'] for r in renditions):
+        renditions[0]['default'] = True
+    elif sum(r['default'] for r in renditions) > 1:
+        first = next(r for r in renditions if r['default'])
+        for rendition in renditions:
+            rendition['default'] = rendition is first
+    for rendition in renditions:
+        rendition['uri'] = f"{AUDIO_FOLDER}/{rendition['language']}/playlist.m3u8"
+        rendition['group'] = AUDIO_GROUP
+    return renditions
+
+
+def published_renditions(metadata: Dict) -> List[Dict]:
+    """Renditions de um título já publicado, a partir do 'audio_tracks' do metadata.json."""
+    return [dict(track, uri=f"{AUDIO_FOLDER}/{track['language']}/playlist.m3u8", group=AUDIO_GROUP)
+            for track in metadata.get('audio_tracks') or []]
+
+
+def segment_boundaries(segments: List[Dict]) -> List[float]:
+    """Instantes de corte (fim de cada segmento, exceto o último)."""
+    boundaries = []
+    position = 0.0
+    for seg in segments[:-1]:
+        position += seg['duration']
+        boundaries.append(position)
+    return boundaries
+
+
+def audio_rendition_command(video_file: str, hls_dir: str, renditions: List[Dict],
+                            boundaries: List[float]) -> List[str]:
+    """Um ffmpeg, uma saída segmentada (MPEG-TS) por idioma, cortada nos limites do vídeo."""
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-y', '-i', video_file]
+    times = ','.join(f'{t:.6f}' for t in boundaries)
+    for rendition in renditions:
+        folder = os.path.join(hls_dir, AUDIO_FOLDER, rendition['language'])
+        cmd += ['-map', f"0:{rendition['stream_index']}", '-vn', '-sn']
+        if rendition['codec'] in COPY_AUDIO_CODECS:
+            cmd += ['-c:a', 'copy']
+        else:
+            cmd += ['-c:a', 'aac', '-ar', '48000', '-ac', '2', '-b:a', '128k']
+        cmd += ['-f', 'segment', '-segment_format', 'mpegts', '-reset_timestamps', '0']
+        if times:
+            cmd += ['-segment_times', times]
+        cmd.append(os.path.join(folder, 'segment%05d.ts'))
+    return cmd
+
+
+def _rewrite_pmt(packet: bytes, keep_pids: set) -> Optional[bytes]:
+    """PMT só com os fluxos em `keep_pids`, com section_length e CRC recalculados."""
+    start, _ = _payload_start(packet, 0)
+    if start is None:
+        return None
+    section_start = start + 1 + packet[start]
+    section = packet[section_start:]
+    length = ((section[1] & 0x0F) << 8) | section[2]
+    if 3 + length > len(section):
+        return None  # PMT em mais de um pacote (não acontece com o mpegts do ffmpeg)
+
+    program_info_length = ((section[10] & 0x0F) << 8) | section[11]
+    entries_start = 12 + program_info_length
+    entries_end = 3 + length - 4
+    kept = b''
+    p = entries_start
+    while p + 5 <= entries_end:
+        es_pid = ((section[p + 1] & 0x1F) << 8) | section[p + 2]
+        es_info_length = ((section[p + 3] & 0x0F) << 8) | section[p + 4]
+        if es_pid in keep_pids:
+            kept += section[p:p + 5 + es_info_length]
+        p += 5 + es_info_length
+
+    body = section[3:entries_start] + kept
+    new_length = len(body) + 4
+    header = bytes([section[0], (section[1] & 0xF0) | (new_length >> 8), new_length & 0xFF])
+    crc = _crc32_mpeg2(header + body)
+    new_section = header + body + crc.to_bytes(4, 'big')
+    return (packet[:section_start] + new_section).ljust(TS_PACKET_SIZE, b'\xff')
+
+
+def strip_audio(data: bytes) -> Optional[bytes]:
+    """
+    Remove de um trecho MPEG-TS todos os fluxos que não são vídeo.
+
+    Returns:
+        Os bytes filtrados, ou None se a estrutura não for a esperada (PCR
+        fora do fluxo de vídeo, PMT ausente ou em vários pacotes)
+    """
+    pmt_pid = None
+    video_pid = None
+    drop = set()
+    for pos in range(0, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        if data[pos] != TS_SYNC_BYTE or not data[pos + 1] & 0x40:
+            continue
+        pid = ((data[pos + 1] & 0x1F) << 8) | data[pos + 2]
+        if pid == 0 and pmt_pid is None:
+            section = _section(data, pos)
+            if section:
+                for p in range(section[0] + 8, section[1] - 3, 4):
+                    if (data[p] << 8 | data[p + 1]) != 0:
+                        pmt_pid = ((data[p + 2] & 0x1F) << 8) | data[p + 3]
+                        break
+        elif pid == pmt_pid:
+            section = _section(data, pos)
+            if not section:
+                return None
+            start, end = section
+            pcr_pid = ((data[start + 8] & 0x1F) << 8) | data[start + 9]
+            p = start + 12 + (((data[start + 10] & 0x0F) << 8) | data[start + 11])
+            while p + 5 <= end:
+                es_pid = ((data[p + 1] & 0x1F) << 8) | data[p + 2]
+                if data[p] in VIDEO_STREAM_TYPES and video_pid is None:
+                    video_pid = es_pid
+                else:
+                    drop.add(es_pid)
+                p += 5 + (((data[p + 3] & 0x0F) << 8) | data[p + 4])
+            if video_pid is None or pcr_pid != video_pid:
+                return None
+            break
+    if video_pid is None:
+        return None
+
+    out = bytearray()
+    pmt_cache = {}
+    for pos in range(0, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        packet = data[pos:pos + TS_PACKET_SIZE]
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        if pid in drop:
+            continue
+        if pid == pmt_pid and packet[1] & 0x40:
+            if packet not in pmt_cache:
+                pmt_cache[packet] = _rewrite_pmt(packet, {video_pid})
+            if pmt_cache[packet] is None:
+                return None
+            packet = pmt_cache[packet]
+        out += packet
+    return bytes(out)
+
+
+def _strip_segment(path: str) -> bool:
+    with open(path, 'rb') as f:
+        stripped = strip_audio(f.read())
+    if stripped is None:
+        return False
+    with open(path + '.video', 'wb') as f:
+        f.write(stripped)
+    return True
+
+
+def discard_audio_renditions(hls_dir: str):
+    """Remove as renditions e os segmentos filtrados pela metade (o áudio muxado continua)."""
+    for name in os.listdir(hls_dir):
+        if name.endswith('.video'):
+            os.remove(os.path.join(hls_dir, name))
+    shutil.rmtree(os.path.join(hls_dir, AUDIO_FOLDER), ignore_errors=True)
+
+
+def package_audio_renditions(video_file: str, hls_dir: str, renditions: List[Dict],
+                             media_playlist: str = 'playlist.m3u8') -> Optional[List[Dict]]:
+    """
+    Gera as renditions de áudio e deixa os segmentos de vídeo sem áudio.
+    Em qualquer falha nada é alterado (o título continua com áudio muxado).
+
+    Returns:
+        As renditions escritas ou None
+    """
+    playlist_path = os.path.join(hls_dir, media_playlist)
+    segments = parse_media_playlist(playlist_path)['segments']
+    audio_dir = os.path.join(hls_dir, AUDIO_FOLDER)
+    if not segments or any(seg.get('byterange') for seg in segments):
+        return None
+
+    shutil.rmtree(audio_dir, ignore_errors=True)
+    for rendition in renditions:
+        os.makedirs(os.path.join(audio_dir, rendition['language']))
+
+    result = run_supervised(audio_rendition_command(video_file, hls_dir, renditions, segment_boundaries(segments)),
+                            'ffmpeg:renditions de áudio')
+    if not result['ok']:
+        shutil.rmtree(audio_dir, ignore_errors=True)
+        return None
+
+    for rendition in renditions:
+        folder = os.path.join(audio_dir, rendition['language'])
+        names = sorted(name for name in os.listdir(folder) if name.endswith('.ts'))
+        if len(names) != len(segments):
+            print(f"AVISO: Rendition {rendition['language']} com {len(names)} segmentos "
+                  f"(vídeo tem {len(segments)}); mantendo o áudio muxado")
+            shutil.rmtree(audio_dir, ignore_errors=True)
+            return None
+        # Mesmas durações e descontinuidades do vídeo: as linhas do tempo se alinham
+        write_media_playlist(os.path.join(folder, 'playlist.m3u8'), [
+            {'duration': seg['duration'], 'uri': name, 'discontinuity': seg.get('discontinuity', False)}
+            for seg, name in zip(segments, names)
+        ])
+
+    paths = [os.path.join(hls_dir, seg['uri']) for seg in segments]
+    workers = max(1, min(STRIP_WORKERS, os.cpu_count() or 1, len(paths)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        stripped = list(pool.map(_strip_segment, paths, chunksize=max(1, len(paths) // (workers * 4))))
+    if not all(stripped):
+        discard_audio_renditions(hls_dir)
+        print("AVISO: Estrutura TS inesperada; mantendo o áudio muxado")
+        return None
+    for path in paths:
+        os.replace(path + '.video', path)
+
+    print(f"Áudio separado por idioma: {', '.join(r['language'] for r in renditions)}")
+    return renditions
@@ -0,0 +1,351 @@
+"""
+Codificação paralela em blocos para o caminho de recodificação completa.
+
+Um único processo ffmpeg não aproveita bem servidores com muitos núcleos em
+fontes 4K/10-bit, principalmente porque partes como a conversão 10→8 bits
+são single-thread. Aqui o vídeo é dividido em N intervalos que começam em
+keyframes da fonte, cada intervalo é codificado num processo separado (com
+keyframes forçados a cada SEGMENT_DURATION segundos) e os segmentos
+resultantes são unidos numa única playlist VOD contínua.
+"""
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ffmpeg_progress import format_eta, read_progress_file
+from hls_playlist import parse_media_playlist, write_media_playlist
+from media_probe import probe_media
+from process_supervisor import PROBE_TIMEOUT, encode_timeout, record_metrics, run_captured, run_supervised
+
+SEGMENT_DURATION = 4
+# Blocos muito curtos não compensam o custo de iniciar um ffmpeg por bloco
+MIN_CHUNK_DURATION = 120
+# Janela (em segundos) lida após cada ponto de corte para achar um keyframe
+KEYFRAME_SEARCH_WINDOW = 15
+# Intervalo de leitura dos arquivos de -progress dos blocos
+PROGRESS_POLL_INTERVAL = 3
+# Criado na pasta de trabalho quando um bloco falha: os demais param
+CANCEL_FILE = '.cancel'
+# Segmentos curtos no início do filme: o player começa após baixar só ~1s
+STARTUP_SEGMENT_DURATIONS = (1, 1, 2)
+
+
+def default_worker_count() -> int:
+    """Número de blocos simultâneos: ~4 threads do x264 por processo."""
+    return max(2, (os.cpu_count() or 2) // 4)
+
+
+def probe_duration(video_file: str) -> Optional[float]:
+    """Retorna a duração do vídeo em segundos (ou None se não for possível)."""
+    info = probe_media(video_file)
+    return info.duration if info else None
+
+
+def split_targets(duration: float, chunk_count: int) -> List[float]:
+    """Pontos de corte ideais (uniformes), sem o início 0."""
+    return [duration * i / chunk_count for i in range(1, chunk_count)]
+
+
+def find_keyframe_boundaries(video_file: str, targets: List[float]) -> List[float]:
+    """
+    Para cada ponto de corte ideal, encontra o primeiro keyframe de vídeo
+    a partir dele. Usa -read_intervals para ler só uma pequena janela após
+    cada ponto, em vez de demultiplexar o arquivo inteiro.
+    """
+    if not targets:
+        return []
+
+    intervals = ','.join(f'{t:.3f}%+{KEYFRAME_SEARCH_WINDOW}' for t in targets)
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+           '-read_intervals', intervals,
+           '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_file]
+    result = run_captured(cmd, 'ffprobe:keyframes', PROBE_TIMEOUT)
+
+    keyframes = []
+    if result.returncode == 0:
+        for line in result.stdout.splitlines():
+            parts = line.strip().split(',')
+            if len(parts) < 2 or 'K' not in parts[1]:
+                continue
+            try:
+                keyframes.append(float(parts[0]))
+            except ValueError:
+                continue
+    keyframes.sort()
+
+    boundaries = []
+    for target in targets:
+        candidates = [k for k in keyframes if target <= k < target + KEYFRAME_SEARCH_WINDOW]
+        # Sem keyframe na janela, o corte fica no ponto ideal: a busca com -ss
+        # antes do -i continua precisa na recodificação, só decodifica mais
+        boundaries.append(candidates[0] if candidates else target)
+    return boundaries
+
+
+def plan_chunks(duration: float, boundaries: List[float]) -> List[Tuple[float, float]]:
+    """
+    Converte pontos de corte em intervalos (início, duração), descartando
+    cortes duplicados ou fora de ordem.
+    """
+    points = [0.0]
+    for boundary in sorted(boundaries):
+        if points[-1] + SEGMENT_DURATION <= boundary <= duration - SEGMENT_DURATION:
+            points.append(boundary)
+    points.append(duration)
+    return [(start, end - start) for start, end in zip(points, points[1:])]
+
+
+def video_encode_args(bit_depth: int, encoding: Optional[Dict] = None,
+                      threads: Optional[int] = None) -> List[str]:
+    """
+    Argumentos do encoder H.264 (Main). `encoding` vem do otimizador
+    por título: {'crf': int, 'maxrate': '6000k', 'bufsize': '12000k'}.
+    """
+    encoding = encoding or {}
+    args = ['-c:v', 'h264', '-profile:v', 'main']
+    if bit_depth >= 10:
+        # Para vídeos de 10+ bits, converter para 8 bits para compatibilidade web
+        args += ['-pix_fmt', 'yuv420p']
+    args += ['-crf', str(encoding.get('crf', 23)), '-preset', 'veryfast']
+    if encoding.get('maxrate'):
+        args += ['-maxrate', encoding['maxrate'], '-bufsize', encoding['bufsize']]
+    if threads:
+        args += ['-threads', str(threads)]
+    return args
+
+
+def force_keyframes_expr(startup: bool = False) -> str:
+    """
+    Expressão de -force_key_frames. Com `startup`, os primeiros keyframes
+    seguem STARTUP_SEGMENT_DURATIONS (0, 1, 2, 4...) e depois a cada
+    SEGMENT_DURATION segundos.
+    """
+    if not startup:
+        return f'expr:gte(t,n_forced*{SEGMENT_DURATION})'
+
+    starts = [0.0]
+    for length in STARTUP_SEGMENT_DURATIONS[:-1]:
+        starts.append(starts[-1] + length)
+    head_end = sum(STARTUP_SEGMENT_DURATIONS)
+    count = len(STARTUP_SEGMENT_DURATIONS)
+    expr = f'gte(t,{head_end}+(n_forced-{count})*{SEGMENT_DURATION})'
+    for index in reversed(range(count)):
+        expr = f'if(eq(n_forced,{index}),gte(t,{starts[index]:g}),{expr})'
+    return f'expr:{expr}'
+
+
+def build_encode_command(video_file: str, playlist_path: str, segment_pattern: str, bit_depth: int,
+                         start: Optional[float] = None, duration: Optional[float] = None,
+                         threads: Optional[int] = None, encoding: Optional[Dict] = None,
+                         startup: bool = False, audio_copy: bool = False,
+                         playlist_type: str = 'vod') -> List[str]:
+    """
+    Comando ffmpeg de recodificação H.264/AAC para HLS. Sem start/duration
+    é o caminho de processo único usado pelo worker.
+
+    Os keyframes ficam só nos pontos forçados (-sc_threshold 0), então cada
+    keyframe é um corte de segmento. Com `startup` o -hls_time cai para o
+    menor segmento inicial e os cortes seguem force_keyframes_expr().
+    `audio_copy` mantém o áudio original (trechos do smart render).
+    `playlist_type` 'event' faz o ffmpeg reescrever a playlist a cada
+    segmento (publicação progressiva).
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-y']
+    if start:
+        cmd += ['-ss', f'{start:.3f}']
+    if duration:
+        cmd += ['-t', f'{duration:.3f}']
+    cmd += ['-i', video_file]
+    cmd += ['-c:a', 'copy'] if audio_copy else ['-c:a', 'aac', '-ar', '48000', '-b:a', '128k']
+    cmd += video_encode_args(bit_depth, encoding, threads)
+    cmd += ['-force_key_frames', force_keyframes_expr(startup), '-sc_threshold', '0']
+    if start:
+        # Mantém os timestamps contínuos entre blocos
+        cmd += ['-output_ts_offset', f'{start:.3f}']
+    hls_time = min(STARTUP_SEGMENT_DURATIONS) if startup else SEGMENT_DURATION
+    cmd += ['-f', 'hls',
+            '-hls_time', str(hls_time), '-hls_playlist_type', playlist_type,
+            '-hls_flags', 'independent_segments',
+            '-hls_segment_filename', segment_pattern, playlist_path]
+    return cmd
+
+
+def _encode_chunk(task: Dict) -> Dict:
+    """Codifica um bloco. Executado dentro do ProcessPoolExecutor."""
+    os.makedirs(task['chunk_dir'], exist_ok=True)
+    playlist_path = os.path.join(task['chunk_dir'], 'chunk.m3u8')
+    cmd = build_encode_command(
+        task['video_file'], playlist_path,
+        os.path.join(task['chunk_dir'], 'part%05d.ts'),
+        task['bit_depth'], start=task['start'], duration=task['duration'],
+        threads=task['threads'], encoding=task['encoding'], startup=task['startup']
+    )
+    # Progresso estruturado num arquivo lido pelo processo pai
+    cmd[1:1] = ['-progress', task['progress_file'], '-nostats', '-v', 'error']
+
+    started = time.monotonic()
+    # Com -v error o ffmpeg fica em silêncio até o fim: só o limite total vale
+    # O arquivo de cancelamento (criado pelo pai quando um bloco falha) encerra o ffmpeg
+    result = run_supervised(cmd, f"ffmpeg:bloco {task['index']}", total_timeout=encode_timeout(task['duration']),
+                            should_stop=lambda: os.path.exists(task['cancel_file']))
+    return {
+        'index': task['index'],
+        'ok': result['ok'] and os.path.exists(playlist_path),
+        'playlist': playlist_path,
+        'chunk_dir': task['chunk_dir'],
+        'elapsed': time.monotonic() - started,
+        'error': '\n'.join(result['tail'])[-2000:] if not result['ok'] else None,
+        # As métricas registradas aqui ficam no processo filho: o pai as regrava
+        'metrics': {key: result[key] for key in ('stage', 'ok', 'wall', 'cpu_user', 'cpu_system', 'max_rss_mb')}
+    }
+
+
+def _chunk_encoded_seconds(task: Dict, finished: bool) -> float:
+    if finished:
+        return task['duration']
+    out_time = read_progress_file(task['progress_file'])
+    if out_time is None:
+        return 0.0
+    # O out_time do -progress já inclui o -output_ts_offset do bloco
+    return min(task['duration'], max(0.0, out_time - task['start']))
+
+
+def merge_chunk_playlists(chunk_playlists: List[str], hls_dir: str, playlist_path: str,
+                          segment_prefix: str = 'segment') -> int:
+    """
+    Une as playlists dos blocos numa playlist VOD única, renomeando os
+    segmentos para a numeração contínua segmentNNN.ts. Cada bloco após o
+    primeiro começa com EXT-X-DISCONTINUITY, já que o encoder reinicia (e o
+    AAC insere priming) na emenda.
+
+    Returns:
+        Número total de segmentos
+    """
+    merged = []
+    for chunk_index, chunk_playlist in enumerate(chunk_playlists):
+        chunk_dir = os.path.dirname(chunk_playlist)
+        parsed = parse_media_playlist(chunk_playlist)
+        for seg_index, seg in enumerate(parsed['segments']):
+            final_name = f'{segment_prefix}{len(merged):03d}.ts'
+            os.replace(os.path.join(chunk_dir, seg['uri']), os.path.join(hls_dir, final_name))
+            merged.append({
+                'duration': seg['duration'],
+                'uri': final_name,
+                'discontinuity': chunk_index > 0 and seg_index == 0
+            })
+
+    write_media_playlist(playlist_path, merged, playlist_type='VOD', endlist=True)
+    return len(merged)
+
+
+def encode_hls_chunked(video_file: str, hls_dir: str, bit_depth: int,
+                       workers: Optional[int] = None,
+                       progress_callback: Optional[Callable] = None,
+                       encoding: Optional[Dict] = None, startup: bool = False) -> bool:
+    """
+    Recodifica o vídeo para HLS em blocos paralelos.
+
+    Args:
+        video_file: Arquivo de origem
+        hls_dir: Pasta final do HLS (playlist.m3u8 + segmentNNN.ts)
+        bit_depth: Profundidade de cor detectada na fonte
+        workers: Blocos simultâneos (padrão: default_worker_count())
+        progress_callback: Função (message, progress 0-100)
+        encoding: Parâmetros do otimizador por título (CRF, maxrate, bufsize)
+        startup: Segmentos iniciais curtos no primeiro bloco
+
+    Returns:
+        True se a playlist final foi gerada. False indica que o chamador
+        deve usar o caminho de processo único.
+    """
+    def report(message, progress=None):
+        if progress_callback:
+            progress_callback(message, progress)
+        print(f"Chunked: {message}")
+
+    duration = probe_duration(video_file)
+    workers = workers or default_worker_count()
+    if not duration or workers < 2:
+        report("Duração desconhecida ou CPU insuficiente, usando processo único")
+        return False
+
+    chunk_count = min(workers, int(duration // MIN_CHUNK_DURATION))
+    if chunk_count < 2:
+        report(f"Vídeo curto ({duration:.0f}s), usando processo único")
+        return False
+
+    boundaries = find_keyframe_boundaries(video_file, split_targets(duration, chunk_count))
+    chunks = plan_chunks(duration, boundaries)
+    threads = max(1, (os.cpu_count() or 2) // len(chunks))
+
+    work_dir = os.path.join(hls_dir, '.chunks')
+    shutil.rmtree(work_dir, ignore_errors=True)
+    tasks = [{
+        'index': i,
+        'video_file': video_file,
+        'chunk_dir': os.path.join(work_dir, f'chunk{i:03d}'),
+        'bit_depth': bit_depth,
+        'start': start,
+        'duration': length,
+        'threads': threads,
+        'encoding': encoding,
+        'startup': startup and i == 0,
+        'progress_file': os.path.join(work_dir, f'chunk{i:03d}.progress'),
+        'cancel_file': os.path.join(work_dir, CANCEL_FILE)
+    } for i, (start, length) in enumerate(chunks)]
+
+    report(f"Codificando {len(tasks)} blocos em paralelo ({threads} threads cada)", 0)
+    started = time.monotonic()
+    results = {}
+    os.makedirs(work_dir, exist_ok=True)
+
+    failed = False
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = {pool.submit(_encode_chunk, task): task for task in tasks}
+            pending = set(futures)
+            while pending and not failed:
+                done, pending = wait(pending, timeout=PROGRESS_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = futures[future]
+                    result = future.result()
+                    if not result['ok']:
+                        report(f"Bloco {task['index']} falhou: {result['error']}")
+                        # Sair do with espera os blocos em andamento: o arquivo de
+                        # cancelamento faz o supervisor de cada um encerrar o ffmpeg
+                        open(task['cancel_file'], 'w').close()
+                        for other in pending:
+                            other.cancel()
+                        failed = True
+                        break
+                    results[task['index']] = result
+                if failed:
+                    break
+
+                # Soma o tempo já codificado de cada bloco (concluído ou em andamento)
+                encoded = sum(_chunk_encoded_seconds(task, task['index'] in results) for task in tasks)
+                elapsed = time.monotonic() - started
+                speed = encoded / elapsed if elapsed > 0 else 0
+                eta = (duration - encoded) / speed if speed > 0 else None
+                report(f"{len(results)}/{len(tasks)} blocos · {speed:.1f}x · ETA {format_eta(eta)}",
+                       encoded / duration * 100)
+
+        # Também os blocos encerrados pelo cancelamento entram no relatório de etapas
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                record_metrics(future.result()['metrics'])
+        if failed:
+            return False
+        segment_count = merge_chunk_playlists(
+            [results[i]['playlist'] for i in range(len(tasks))],
+            hls_dir, os.path.join(hls_dir, 'playlist.m3u8')
+        )
+        report(f"{segment_count} segmentos unidos em {time.monotonic() - started:.0f}s", 100)
+        return True
+    except Exception as e:
+        report(f"Erro na codificação em blocos: {e}")
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
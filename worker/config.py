@@ -11,4 +11,84 @@ TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 
 # Os caminhos agora são relativos ao WORKDIR do Docker (/app)
 LIBRARY_ROOT = "/app/library"
-TEMP_ROOT = "/app/tmp"
\ No newline at end of file
+TEMP_ROOT = "/app/tmp"
+
+# Codificação paralela em blocos no caminho de recodificação completa.
+# CHUNKED_ENCODING_WORKERS=0 escolhe automaticamente pelo número de núcleos.
+CHUNKED_ENCODING = os.getenv("CHUNKED_ENCODING", "true").lower() == "true"
+CHUNKED_ENCODING_WORKERS = int(os.getenv("CHUNKED_ENCODING_WORKERS", "0"))
+
+# Otimizador por título: escolhe CRF e -maxrate/-bufsize a partir de amostras.
+# A meta de qualidade é o SSIM médio das amostras em relação à fonte.
+ENCODING_OPTIMIZER = os.getenv("ENCODING_OPTIMIZER", "true").lower() == "true"
+ENCODING_QUALITY_TARGET = float(os.getenv("ENCODING_QUALITY_TARGET", "0.98"))
+MAX_STREAM_BITRATE_KBPS = int(os.getenv("MAX_STREAM_BITRATE_KBPS", "8000"))
+
+# Histórico local de sucesso/falha das estratégias HLS por tipo de fonte
+STRATEGY_HISTORY_PATH = "/app/cache/hls_strategy_history.json"
+
+# Publicação progressiva: o título aparece na biblioteca (playlist EVENT) assim
+# que os primeiros segmentos ficam prontos. Usa o ffmpeg em processo único,
+# já que a codificação em blocos só gera a playlist no final.
+PROGRESSIVE_PUBLISH = os.getenv("PROGRESSIVE_PUBLISH", "false").lower() == "true"
+
+# Segmentos iniciais curtos (1s, 1s, 2s) para o primeiro quadro aparecer
+# mais cedo. No copy, só o trecho até o primeiro keyframe após 4s é recodificado.
+STARTUP_SEGMENTS = os.getenv("STARTUP_SEGMENTS", "true").lower() == "true"
+
+# Playlist só de I-frames (byte ranges nos segmentos existentes) para busca/scrubbing
+IFRAME_PLAYLIST = os.getenv("IFRAME_PLAYLIST", "true").lower() == "true"
+
+# Miniaturas de pré-visualização da barra de busca (sprites + WebVTT)
+TRICKPLAY = os.getenv("TRICKPLAY", "true").lower() == "true"
+
+# Layout HLS de arquivo único: um media.ts por rendição com EXT-X-BYTERANGE,
+# em vez de centenas de segmentNNN.ts (menos inodes e leituras pequenas no NAS)
+HLS_SINGLE_FILE = os.getenv("HLS_SINGLE_FILE", "false").lower() == "true"
+
+# Empacotamento HLS sob demanda: a ingestão só guarda a fonte e um índice de
+# keyframes; o serviço jit_server.py produz cada segmento no primeiro pedido
+# e o guarda num cache LRU em disco, pré-produzindo os próximos segmentos.
+JIT_PACKAGING = os.getenv("JIT_PACKAGING", "false").lower() == "true"
+JIT_SERVICE_PORT = int(os.getenv("JIT_SERVICE_PORT", "8089"))
+JIT_CACHE_DIR = "/app/cache/jit_segments"
+JIT_CACHE_MAX_MB = int(os.getenv("JIT_CACHE_MAX_MB", "4096"))
+JIT_PREFETCH_SEGMENTS = int(os.getenv("JIT_PREFETCH_SEGMENTS", "3"))
+
+# Validação da saída HLS antes de publicar: playlist completa, durações,
+# timestamps e decodificação de uma amostra de segmentos (em paralelo).
+# Uma estratégia reprovada passa direto para a próxima.
+HLS_VALIDATION = os.getenv("HLS_VALIDATION", "true").lower() == "true"
+HLS_VALIDATION_SAMPLES = int(os.getenv("HLS_VALIDATION_SAMPLES", "6"))
+
+# Timeouts dos processos externos (segundos; 0 desliga). "Inatividade" é o
+# tempo sem nenhuma saída: o ffmpeg reporta progresso a cada ~0,5s e o
+# webtorrent redesenha o status continuamente, então só um processo
+# travado (ou um torrent sem pares) fica em silêncio.
+DOWNLOAD_IDLE_TIMEOUT = int(os.getenv("DOWNLOAD_IDLE_TIMEOUT", "900"))
+DOWNLOAD_TOTAL_TIMEOUT = int(os.getenv("DOWNLOAD_TOTAL_TIMEOUT", "21600"))
+FFMPEG_IDLE_TIMEOUT = int(os.getenv("FFMPEG_IDLE_TIMEOUT", "300"))
+FFMPEG_TOTAL_TIMEOUT = int(os.getenv("FFMPEG_TOTAL_TIMEOUT", "43200"))
+
+# Legendas de texto embutidas na fonte (SRT/ASS) extraídas como WebVTT junto
+# com o HLS; a busca online fica só para os idiomas que faltarem
+EMBEDDED_SUBTITLES = os.getenv("EMBEDDED_SUBTITLES", "true").lower() == "true"
+
+# Fontes com áudio em dois ou mais idiomas: segmentos só de vídeo e uma
+# rendition de áudio por idioma (EXT-X-MEDIA); o cliente baixa só a que toca
+AUDIO_RENDITIONS = os.getenv("AUDIO_RENDITIONS", "true").lower() == "true"
+
+# Referência de fala (VAD) extraída uma vez por filme e guardada como
+# speech_reference.npz; todas as sincronizações de legenda a reutilizam
+SPEECH_REFERENCE = os.getenv("SPEECH_REFERENCE", "true").lower() == "true"
+
+# Busca de legendas online: provedores consultados em paralelo, cada um com
+# seu timeout, e orçamento total (listagem + download) por busca (segundos)
+SUBTITLE_PROVIDER_TIMEOUT = int(os.getenv("SUBTITLE_PROVIDER_TIMEOUT", "15"))
+SUBTITLE_SEARCH_BUDGET = int(os.getenv("SUBTITLE_SEARCH_BUDGET", "45"))
+
+# Cache em disco das legendas baixadas (bruta + WebVTT), por hash do vídeo,
+# id do TMDB/IMDb e idioma; consultado antes de qualquer provedor
+SUBTITLE_CACHE = os.getenv("SUBTITLE_CACHE", "true").lower() == "true"
+SUBTITLE_CACHE_DIR = "/app/cache/subtitles"
+SUBTITLE_CACHE_MAX_MB = int(os.getenv("SUBTITLE_CACHE_MAX_MB", "256"))
@@ -0,0 +1,124 @@
+"""
+Legendas de texto embutidas na fonte (SRT/ASS em MKV, mov_text em MP4).
+
+Muitos releases já trazem faixas em inglês e português, mas o worker
+sempre buscava nos provedores online e depois sincronizava com o
+ffsubsync. Aqui as faixas embutidas são listadas a partir da análise única
+da fonte (media_probe) e extraídas como WebVTT (subtitle_XX.vtt):
+
+- na mesma execução do ffmpeg que empacota o HLS (copy ou recodificação em
+  processo único), como saídas extras — sem reler o arquivo;
+- nos demais caminhos, numa execução só de demux, sem decodificar vídeo.
+
+A busca online roda apenas para os idiomas que continuam faltando, e as
+faixas embutidas não passam pelo ffsubsync (já estão sincronizadas).
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+from process_supervisor import run_supervised
+from subtitle_manager import language_name
+
+TEXT_SUBTITLE_CODECS = {'subrip', 'srt', 'ass', 'ssa', 'webvtt', 'mov_text', 'text'}
+# Tags de idioma das faixas -> códigos usados na biblioteca
+EMBEDDED_LANGUAGE_CODES = {
+    'eng': 'en', 'en': 'en',
+    'por': 'pt-BR', 'pt': 'pt-BR', 'pob': 'pt-BR', 'pt-br': 'pt-BR', 'pb': 'pt-BR',
+}
+PARTIAL_SUFFIX = '.part'
+
+
+def subtitle_filename(language: str) -> str:
+    return f"subtitle_{language}.vtt"
+
+
+def select_embedded_subtitles(streams: List[Dict], languages: Tuple[str, ...] = ('pt-BR', 'en')) -> List[Dict]:
+    """
+    Uma faixa de texto por idioma desejado. Faixas "forced" (só os diálogos
+    em língua estrangeira) são ignoradas; entre as demais, prefere a que não
+    é para deficientes auditivos e, depois, a primeira do arquivo.
+    """
+    candidates = {}
+    for stream in streams:
+        if stream.get('codec_type') != 'subtitle' or stream.get('codec_name') not in TEXT_SUBTITLE_CODECS:
+            continue
+        tag = ((stream.get('tags') or {}).get('language') or '').lower()
+        language = EMBEDDED_LANGUAGE_CODES.get(tag)
+        disposition = stream.get('disposition') or {}
+        if language not in languages or disposition.get('forced'):
+            continue
+        title = ((stream.get('tags') or {}).get('title') or '').lower()
+        hearing_impaired = bool(disposition.get('hearing_impaired')) or 'sdh' in title
+        key = (hearing_impaired, stream.get('index', 0))
+        if language not in candidates or key < candidates[language][0]:
+            candidates[language] = (key, stream)
+
+    return [{
+        'stream_index': stream['index'],
+        'language': language,
+        'codec': stream.get('codec_name'),
+        'file': subtitle_filename(language)
+    } for language, (_, stream) in sorted(candidates.items(), key=lambda item: languages.index(item[0]))]
+
+
+def subtitle_output_args(tracks: List[Dict], subtitles_dir: str, start: Optional[float] = None) -> List[str]:
+    """
+    Saídas extras do ffmpeg: uma WebVTT parcial por faixa (renomeada em finalize).
+
+    Com `start` (o copy que pula a cabeça recodificada, -ss antes do -i) não
+    há saídas: as falas sairiam adiantadas em `start` segundos e as anteriores
+    a ele se perderiam. As faixas ficam sem WebVTT parcial e caem na extração
+    avulsa (extract_embedded_subtitles) depois do empacotamento.
+    """
+    if start:
+        return []
+    args = []
+    for track in tracks:
+        partial = os.path.join(subtitles_dir, track['file'] + PARTIAL_SUFFIX)
+        args += ['-map', f"0:{track['stream_index']}", '-c:s', 'webvtt', '-f', 'webvtt', partial]
+    return args
+
+
+def _has_cues(path: str) -> bool:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return '-->' in f.read()
+    except OSError:
+        return False
+
+
+def finalize_embedded_subtitles(tracks: List[Dict], subtitles_dir: str,
+                                movie_id) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Publica as WebVTT extraídas com sucesso.
+
+    Returns:
+        (informações das legendas no formato do SubtitleManager, faixas que faltaram)
+    """
+    done, missing = [], []
+    for track in tracks:
+        partial = os.path.join(subtitles_dir, track['file'] + PARTIAL_SUFFIX)
+        if _has_cues(partial):
+            os.replace(partial, os.path.join(subtitles_dir, track['file']))
+            done.append({
+                'language': track['language'],
+                'name': language_name(track['language']),
+                'file': track['file'],
+                'url': f"/api/subtitles/{movie_id}/{track['file']}",
+                'source': 'embedded'
+            })
+        else:
+            if os.path.exists(partial):
+                os.remove(partial)
+            missing.append(track)
+    return done, missing
+
+
+def extract_embedded_subtitles(video_file: str, tracks: List[Dict], subtitles_dir: str) -> bool:
+    """Extração avulsa (só demux + conversão das faixas de texto)."""
+    if not tracks:
+        return True
+    os.makedirs(subtitles_dir, exist_ok=True)
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-y', '-i', video_file] + \
+        subtitle_output_args(tracks, subtitles_dir)
+    return run_supervised(cmd, 'ffmpeg:legendas embutidas')['ok']
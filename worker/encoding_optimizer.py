@@ -0,0 +1,176 @@
+"""
+Otimizador de codificação por título.
+
+Antes da recodificação completa, alguns trechos curtos espalhados pelo filme
+são codificados numa escada de CRFs e comparados com a fonte (SSIM). O maior
+CRF que ainda atinge a meta de qualidade é escolhido para o título, e o pico
+de bitrate medido define -maxrate/-bufsize para que filmes granulados não
+estourem a banda dos espectadores remotos.
+"""
+import os
+import re
+import shutil
+import tempfile
+from typing import Callable, Dict, List, Optional
+
+from chunked_encoder import probe_duration, video_encode_args
+from process_supervisor import encode_timeout, run_captured
+
+CRF_LADDER = (20, 23, 26, 29)
+DEFAULT_CRF = 23
+SAMPLE_COUNT = 4
+SAMPLE_DURATION = 8
+# Folga aplicada ao pico de bitrate medido antes de virar -maxrate
+MAXRATE_HEADROOM = 1.5
+MIN_MAXRATE_KBPS = 1500
+
+_SSIM_PATTERN = re.compile(r'All:([0-9.]+)')
+
+
+def sample_positions(duration: float, count: int = SAMPLE_COUNT,
+                     sample_duration: float = SAMPLE_DURATION) -> List[float]:
+    """
+    Posições de início das amostras, distribuídas uniformemente e evitando
+    os primeiros/últimos 5% (logos e créditos não representam o filme).
+    """
+    usable_start = duration * 0.05
+    usable_end = duration * 0.95 - sample_duration
+    if usable_end <= usable_start:
+        return [0.0]
+    if count == 1:
+        return [usable_start + (usable_end - usable_start) / 2]
+    step = (usable_end - usable_start) / (count - 1)
+    return [usable_start + step * i for i in range(count)]
+
+
+def _encode_sample(video_file: str, start: float, crf: int, bit_depth: int, output_path: str) -> Optional[float]:
+    """Codifica uma amostra sem áudio e retorna o bitrate em kbps."""
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-y',
+           '-ss', f'{start:.3f}', '-t', str(SAMPLE_DURATION), '-i', video_file,
+           '-an', '-sn'] + video_encode_args(bit_depth, {'crf': crf}) + ['-f', 'mp4', output_path]
+    result = run_captured(cmd, 'ffmpeg:amostra', encode_timeout(SAMPLE_DURATION))
+    if result.returncode != 0 or not os.path.exists(output_path):
+        return None
+    return os.path.getsize(output_path) * 8 / 1000 / SAMPLE_DURATION
+
+
+def _measure_ssim(video_file: str, start: float, encoded_path: str) -> Optional[float]:
+    """SSIM médio entre a amostra codificada e o mesmo trecho da fonte."""
+    cmd = ['ffmpeg', '-hide_banner', '-nostats', '-y',
+           '-i', encoded_path,
+           '-ss', f'{start:.3f}', '-t', str(SAMPLE_DURATION), '-i', video_file,
+           '-lavfi', '[0:v]format=yuv420p[dist];[1:v]format=yuv420p[ref];[dist][ref]ssim',
+           '-f', 'null', '-']
+    result = run_captured(cmd, 'ffmpeg:ssim', encode_timeout(SAMPLE_DURATION))
+    match = _SSIM_PATTERN.search(result.stderr or '')
+    return float(match.group(1)) if match else None
+
+
+def choose_encoding(measurements: Dict[int, List[Dict]], duration: float,
+                    quality_target: float, max_bitrate_kbps: int) -> Dict:
+    """
+    Escolhe CRF e limites de bitrate a partir das medições.
+
+    Args:
+        measurements: {crf: [{'bitrate_kbps': float, 'ssim': float}, ...]}
+        duration: Duração do filme em segundos
+        quality_target: SSIM médio mínimo aceito
+        max_bitrate_kbps: Teto absoluto de -maxrate para streaming remoto
+
+    Returns:
+        Dict com crf, maxrate, bufsize, predicted_size_mb e ssim
+    """
+    chosen_crf = None
+    for crf in sorted(measurements):
+        samples = measurements[crf]
+        if not samples:
+            continue
+        mean_ssim = sum(s['ssim'] for s in samples) / len(samples)
+        worst_ssim = min(s['ssim'] for s in samples)
+        # A pior amostra pode ficar um pouco abaixo da meta, mas não muito
+        if mean_ssim >= quality_target and worst_ssim >= quality_target - 0.02:
+            chosen_crf = crf
+        else:
+            break
+
+    if chosen_crf is None:
+        valid = [crf for crf in sorted(measurements) if measurements[crf]]
+        if not valid:
+            return {'crf': DEFAULT_CRF, 'maxrate': None, 'bufsize': None,
+                    'predicted_size_mb': None, 'ssim': None}
+        chosen_crf = valid[0]
+
+    samples = measurements[chosen_crf]
+    mean_bitrate = sum(s['bitrate_kbps'] for s in samples) / len(samples)
+    peak_bitrate = max(s['bitrate_kbps'] for s in samples)
+
+    maxrate = int(min(max(peak_bitrate * MAXRATE_HEADROOM, MIN_MAXRATE_KBPS), max_bitrate_kbps))
+    # Com o teto ativo, a média também fica limitada por ele
+    effective_bitrate = min(mean_bitrate, maxrate)
+    # Áudio AAC 128k incluído na previsão
+    predicted_size_mb = (effective_bitrate + 128) * 1000 / 8 * duration / (1024 * 1024)
+
+    return {
+        'crf': chosen_crf,
+        'maxrate': f'{maxrate}k',
+        'bufsize': f'{maxrate * 2}k',
+        'predicted_size_mb': round(predicted_size_mb, 1),
+        'ssim': round(sum(s['ssim'] for s in samples) / len(samples), 4)
+    }
+
+
+def analyze_title(video_file: str, bit_depth: int, quality_target: float, max_bitrate_kbps: int,
+                  progress_callback: Optional[Callable] = None) -> Optional[Dict]:
+    """
+    Amostra o filme e decide os parâmetros de codificação do título.
+
+    Returns:
+        Decisão de choose_encoding() acrescida de 'samples', ou None se a
+        análise não foi possível (o chamador usa os padrões).
+    """
+    def report(message, progress=None):
+        if progress_callback:
+            progress_callback(message, progress)
+        print(f"Otimizador: {message}")
+
+    duration = probe_duration(video_file)
+    if not duration or duration < SAMPLE_DURATION * 2:
+        report("Duração desconhecida ou muito curta, usando parâmetros padrão")
+        return None
+
+    positions = sample_positions(duration)
+    temp_dir = tempfile.mkdtemp(prefix='encoding_optimizer_')
+    measurements = {}
+    total_steps = len(CRF_LADDER) * len(positions)
+    step = 0
+
+    try:
+        for crf in CRF_LADDER:
+            measurements[crf] = []
+            for i, start in enumerate(positions):
+                step += 1
+                report(f"Amostra {i + 1}/{len(positions)} em CRF {crf}", step / total_steps * 100)
+                sample_path = os.path.join(temp_dir, f'crf{crf}_{i}.mp4')
+                bitrate = _encode_sample(video_file, start, crf, bit_depth, sample_path)
+                if bitrate is None:
+                    continue
+                ssim = _measure_ssim(video_file, start, sample_path)
+                if ssim is not None:
+                    measurements[crf].append({'bitrate_kbps': bitrate, 'ssim': ssim})
+
+            samples = measurements[crf]
+            if samples and sum(s['ssim'] for s in samples) / len(samples) < quality_target:
+                # CRFs maiores só pioram a qualidade: não vale a pena medir
+                break
+
+        if not any(measurements.values()):
+            report("Nenhuma amostra pôde ser medida, usando parâmetros padrão")
+            return None
+
+        decision = choose_encoding(measurements, duration, quality_target, max_bitrate_kbps)
+        decision['samples'] = len(positions)
+        report(f"CRF {decision['crf']}, maxrate {decision['maxrate']}, "
+               f"tamanho previsto {decision['predicted_size_mb']} MB", 100)
+        return decision
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,161 @@
+"""
+Progresso real do ffmpeg a partir do fluxo legível por máquina (-progress).
+
+Com -progress o ffmpeg escreve blocos key=value (out_time_us, fps, speed,
+progress=continue|end). Eles são convertidos em porcentagem usando a duração
+obtida no probe e repassados a um callback com frequência limitada. A saída
+bruta do ffmpeg fica só no buffer circular do supervisor (process_supervisor),
+impresso apenas em caso de falha.
+"""
+import shlex
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+from process_supervisor import run_supervised
+
+PROGRESS_FLAGS = ['-progress', 'pipe:1', '-nostats']
+MIN_REPORT_INTERVAL = 2.0
+TAIL_LINES = 50
+
+_PROGRESS_KEYS = {
+    'frame', 'fps', 'bitrate', 'total_size', 'out_time_us', 'out_time_ms', 'out_time',
+    'dup_frames', 'drop_frames', 'speed', 'progress'
+}
+
+
+def _parse_out_time(value: str) -> Optional[float]:
+    """Converte 'HH:MM:SS.micro' em segundos."""
+    try:
+        hours, minutes, seconds = value.split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (ValueError, AttributeError):
+        return None
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '--'
+    seconds = int(max(0, seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f'{hours}h{minutes:02d}m'
+    return f'{minutes}m{secs:02d}s'
+
+
+def read_progress_file(path: str) -> Optional[float]:
+    """Último out_time (segundos) escrito por `-progress <arquivo>`."""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        key, _, value = line.strip().partition('=')
+        if key == 'out_time_us':
+            try:
+                return max(0, int(value)) / 1_000_000
+            except ValueError:
+                continue
+    return None
+
+
+class FfmpegProgress:
+    """Interpreta as linhas de -progress e chama o callback com limite de frequência."""
+
+    def __init__(self, duration: Optional[float], callback: Optional[Callable] = None,
+                 min_interval: float = MIN_REPORT_INTERVAL):
+        self.duration = duration if duration and duration > 0 else None
+        self.callback = callback
+        self.min_interval = min_interval
+        self.current = {}
+        self.last_report = None
+
+    @staticmethod
+    def is_progress_line(line: str) -> bool:
+        key, sep, _ = line.partition('=')
+        return bool(sep) and key.strip() in _PROGRESS_KEYS
+
+    def snapshot(self) -> Dict:
+        """Estado atual: out_time, percent, fps, speed e eta (segundos)."""
+        out_time = None
+        if 'out_time_us' in self.current:
+            try:
+                out_time = max(0, int(self.current['out_time_us'])) / 1_000_000
+            except ValueError:
+                out_time = None
+        if out_time is None and 'out_time' in self.current:
+            out_time = _parse_out_time(self.current['out_time'])
+
+        try:
+            fps = float(self.current.get('fps', ''))
+        except ValueError:
+            fps = None
+        try:
+            speed = float(self.current.get('speed', '').rstrip('x'))
+        except ValueError:
+            speed = None
+
+        percent = None
+        eta = None
+        if self.duration and out_time is not None:
+            percent = min(100.0, out_time / self.duration * 100)
+            if speed:
+                eta = max(0.0, (self.duration - out_time) / speed)
+
+        return {'out_time': out_time, 'percent': percent, 'fps': fps, 'speed': speed, 'eta': eta}
+
+    def feed(self, line: str) -> bool:
+        """
+        Processa uma linha. Retorna True se era uma linha de progresso.
+        O callback é chamado ao fim de cada bloco (progress=...), no máximo
+        uma vez a cada `min_interval` segundos, e sempre no bloco final.
+        """
+        if not self.is_progress_line(line):
+            return False
+        key, _, value = line.strip().partition('=')
+        self.current[key.strip()] = value.strip()
+
+        if key.strip() == 'progress':
+            finished = value.strip() == 'end'
+            now = time.monotonic()
+            if self.callback and (finished or self.last_report is None
+                                  or now - self.last_report >= self.min_interval):
+                self.last_report = now
+                self.callback(self.snapshot())
+        return True
+
+
+def with_progress_flags(command: Union[str, List[str]]) -> Union[str, List[str]]:
+    """Insere -progress pipe:1 -nostats logo após o executável ffmpeg."""
+    if isinstance(command, list):
+        return command[:1] + PROGRESS_FLAGS + command[1:]
+    executable, _, rest = command.partition(' ')
+    return f"{executable} {' '.join(PROGRESS_FLAGS)} {rest}"
+
+
+def run_ffmpeg_with_progress(command: Union[str, List[str]], duration: Optional[float],
+                             callback: Optional[Callable] = None,
+                             min_interval: float = MIN_REPORT_INTERVAL, stage: str = 'ffmpeg',
+                             idle_timeout: Optional[float] = None,
+                             total_timeout: Optional[float] = None) -> bool:
+    """
+    Executa o ffmpeg reportando progresso estruturado.
+
+    Args:
+        command: Comando ffmpeg (lista argv; uma string é dividida com shlex, sem shell)
+        duration: Duração da fonte em segundos (do probe)
+        callback: Recebe o dict de FfmpegProgress.snapshot()
+        min_interval: Intervalo mínimo entre chamadas do callback
+        stage: Nome da etapa nas métricas do supervisor
+        idle_timeout: Segundos sem progresso até encerrar o ffmpeg
+        total_timeout: Tempo máximo de parede
+
+    Returns:
+        True se o ffmpeg terminou com sucesso
+    """
+    tracker = FfmpegProgress(duration, callback, min_interval)
+    argv = shlex.split(command) if isinstance(command, str) else command
+    result = run_supervised(with_progress_flags(argv), stage, idle_timeout=idle_timeout,
+                            total_timeout=total_timeout, on_line=tracker.feed, tail_lines=TAIL_LINES)
+    return result['ok']
@@ -0,0 +1,259 @@
+import os
+from typing import Dict, List, Optional
+
+
+def parse_media_playlist(playlist_path: str) -> Dict:
+    """Lê uma media playlist HLS (.m3u8) do disco; ver parse_media_playlist_text()."""
+    with open(playlist_path, 'r', encoding='utf-8') as f:
+        return parse_media_playlist_text(f.read())
+
+
+def parse_media_playlist_text(text: str) -> Dict:
+    """
+    Interpreta o conteúdo de uma media playlist HLS e retorna seus segmentos.
+
+    Returns:
+        Dict com 'target_duration', 'media_sequence', 'playlist_type',
+        'endlist' e 'segments' (lista de dicts com 'duration', 'uri',
+        'discontinuity' e, em playlists single_file, 'byterange')
+    """
+    playlist = {
+        'target_duration': None,
+        'media_sequence': 0,
+        'playlist_type': None,
+        'endlist': False,
+        'segments': []
+    }
+
+    pending_duration = None
+    pending_discontinuity = False
+    pending_byterange = None
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            playlist['target_duration'] = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            playlist['media_sequence'] = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-PLAYLIST-TYPE:'):
+            playlist['playlist_type'] = line.split(':', 1)[1]
+        elif line.startswith('#EXT-X-ENDLIST'):
+            playlist['endlist'] = True
+        elif line.startswith('#EXT-X-DISCONTINUITY'):
+            pending_discontinuity = True
+        elif line.startswith('#EXTINF:'):
+            pending_duration = float(line.split(':', 1)[1].split(',', 1)[0])
+        elif line.startswith('#EXT-X-BYTERANGE:'):
+            pending_byterange = line.split(':', 1)[1]
+        elif not line.startswith('#'):
+            segment = {
+                'duration': pending_duration or 0.0,
+                'uri': line,
+                'discontinuity': pending_discontinuity
+            }
+            if pending_byterange:
+                segment['byterange'] = pending_byterange
+            playlist['segments'].append(segment)
+            pending_duration = None
+            pending_discontinuity = False
+            pending_byterange = None
+
+    return playlist
+
+
+def target_duration_for(segments: List[Dict]) -> int:
+    """
+    EXT-X-TARGETDURATION: a maior duração arredondada para o inteiro mais
+    próximo (RFC 8216, 4.3.3.1). Arredondar para cima anunciaria um alvo
+    maior que o real e atrasaria o início no hls.js.
+    """
+    longest = max((seg['duration'] for seg in segments), default=0)
+    return max(1, int(longest + 0.5))
+
+
+def render_media_playlist(segments: List[Dict], playlist_type: str = 'VOD',
+                          endlist: bool = True, target_duration: Optional[int] = None,
+                          start_time_offset: Optional[float] = None, independent_segments: bool = True) -> str:
+    """
+    Texto de uma media playlist HLS a partir de uma lista de segmentos.
+
+    Todos os caminhos do worker cortam segmentos em keyframes, por isso
+    EXT-X-INDEPENDENT-SEGMENTS é escrito por padrão.
+    """
+    if target_duration is None:
+        target_duration = target_duration_for(segments)
+
+    # EXT-X-BYTERANGE exige versão 4
+    version = 4 if any(seg.get('byterange') for seg in segments) else 3
+    lines = [
+        '#EXTM3U',
+        f'#EXT-X-VERSION:{version}',
+        f'#EXT-X-TARGETDURATION:{target_duration}',
+        '#EXT-X-MEDIA-SEQUENCE:0',
+    ]
+    if independent_segments:
+        lines.append('#EXT-X-INDEPENDENT-SEGMENTS')
+    if playlist_type:
+        lines.append(f'#EXT-X-PLAYLIST-TYPE:{playlist_type}')
+    if start_time_offset is not None:
+        # Playlists EVENT seriam abertas no "ao vivo"; força o início do filme
+        lines.append(f'#EXT-X-START:TIME-OFFSET={start_time_offset:.1f},PRECISE=YES')
+
+    for seg in segments:
+        if seg.get('discontinuity'):
+            lines.append('#EXT-X-DISCONTINUITY')
+        lines.append(f"#EXTINF:{seg['duration']:.6f},")
+        if seg.get('byterange'):
+            lines.append(f"#EXT-X-BYTERANGE:{seg['byterange']}")
+        lines.append(seg['uri'])
+
+    if endlist:
+        lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def write_media_playlist(playlist_path: str, segments: List[Dict], playlist_type: str = 'VOD',
+                         endlist: bool = True, target_duration: Optional[int] = None,
+                         start_time_offset: Optional[float] = None, independent_segments: bool = True):
+    """
+    Escreve uma media playlist HLS a partir de uma lista de segmentos.
+
+    A escrita é feita num arquivo temporário e renomeada no final, para que
+    o player nunca leia uma playlist pela metade.
+    """
+    text = render_media_playlist(segments, playlist_type, endlist, target_duration,
+                                 start_time_offset, independent_segments)
+    temp_path = playlist_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, playlist_path)
+
+
+_H264_PROFILES = {
+    # perfil do ffprobe: (profile_idc, constraint flags)
+    'constrained baseline': (0x42, 0xE0),
+    'baseline': (0x42, 0x00),
+    'main': (0x4D, 0x40),
+    'extended': (0x58, 0x00),
+    'high': (0x64, 0x00),
+    'high 10': (0x6E, 0x00),
+}
+
+_AUDIO_CODECS = {
+    'mp3': 'mp4a.40.34',
+    'ac3': 'ac-3',
+    'eac3': 'ec-3',
+}
+
+_AAC_PROFILES = {
+    'lc': 'mp4a.40.2',
+    'he-aac': 'mp4a.40.5',
+    'he-aacv2': 'mp4a.40.29',
+}
+
+
+def video_codec_string(stream: Dict) -> Optional[str]:
+    """Atributo CODECS de um fluxo H.264 do ffprobe (ex.: avc1.4d401f)."""
+    if (stream.get('codec_name') or '').lower() != 'h264':
+        return None
+    profile = _H264_PROFILES.get((stream.get('profile') or '').lower())
+    level = stream.get('level')
+    if not profile or not isinstance(level, int) or level <= 0:
+        return None
+    return f'avc1.{profile[0]:02x}{profile[1]:02x}{level:02x}'
+
+
+def audio_codec_string(stream: Dict) -> Optional[str]:
+    """Atributo CODECS de um fluxo de áudio do ffprobe (ex.: mp4a.40.2)."""
+    codec = (stream.get('codec_name') or '').lower()
+    if codec == 'aac':
+        return _AAC_PROFILES.get((stream.get('profile') or 'lc').lower(), 'mp4a.40.2')
+    return _AUDIO_CODECS.get(codec)
+
+
+def write_iframe_playlist(playlist_path: str, iframes: List[Dict]):
+    """
+    Escreve uma playlist EXT-X-I-FRAMES-ONLY.
+
+    Args:
+        iframes: Dicts com 'duration' (até o próximo keyframe), 'uri',
+            'byterange' ('tamanho@offset'), 'discontinuity' e 'map'
+            (BYTERANGE do PAT/PMT do arquivo, escrito quando o arquivo muda)
+    """
+    lines = [
+        '#EXTM3U',
+        # EXT-X-MAP em playlist só de I-frames exige versão 5
+        '#EXT-X-VERSION:5',
+        f'#EXT-X-TARGETDURATION:{target_duration_for(iframes)}',
+        '#EXT-X-MEDIA-SEQUENCE:0',
+        '#EXT-X-PLAYLIST-TYPE:VOD',
+        '#EXT-X-I-FRAMES-ONLY',
+    ]
+    current_map = None
+    for frame in iframes:
+        if frame.get('discontinuity'):
+            lines.append('#EXT-X-DISCONTINUITY')
+        if frame.get('map') and (frame['uri'], frame['map']) != current_map:
+            current_map = (frame['uri'], frame['map'])
+            lines.append(f'#EXT-X-MAP:URI="{frame["uri"]}",BYTERANGE="{frame["map"]}"')
+        lines.append(f"#EXTINF:{frame['duration']:.6f},")
+        lines.append(f"#EXT-X-BYTERANGE:{frame['byterange']}")
+        lines.append(frame['uri'])
+    lines.append('#EXT-X-ENDLIST')
+
+    temp_path = playlist_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp_path, playlist_path)
+
+
+def write_master_playlist(playlist_path: str, variants: List[Dict], iframe_variants: Optional[List[Dict]] = None,
+                          media: Optional[List[Dict]] = None):
+    """
+    Escreve uma master playlist.
+
+    Args:
+        variants: Dicts com 'uri', 'bandwidth' e, opcionalmente,
+            'average_bandwidth', 'codecs', 'resolution', 'frame_rate' e
+            'audio' (GROUP-ID das renditions de áudio)
+        iframe_variants: Playlists só de I-frames (mesmos campos, sem
+            frame_rate), listadas como EXT-X-I-FRAME-STREAM-INF
+        media: Renditions EXT-X-MEDIA de áudio: 'group', 'name', 'language',
+            'default' e 'uri'
+    """
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-INDEPENDENT-SEGMENTS']
+    for rendition in media or []:
+        default = 'YES' if rendition.get('default') else 'NO'
+        lines.append(f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="{rendition["group"]}",NAME="{rendition["name"]}",'
+                     f'LANGUAGE="{rendition["language"]}",DEFAULT={default},AUTOSELECT=YES,'
+                     f'URI="{rendition["uri"]}"')
+    for variant in variants:
+        attributes = [f"BANDWIDTH={int(variant['bandwidth'])}"]
+        if variant.get('average_bandwidth'):
+            attributes.append(f"AVERAGE-BANDWIDTH={int(variant['average_bandwidth'])}")
+        if variant.get('codecs'):
+            attributes.append(f'CODECS="{variant["codecs"]}"')
+        if variant.get('resolution'):
+            attributes.append(f"RESOLUTION={variant['resolution']}")
+        if variant.get('frame_rate'):
+            attributes.append(f"FRAME-RATE={variant['frame_rate']:.3f}")
+        if variant.get('audio'):
+            attributes.append(f'AUDIO="{variant["audio"]}"')
+        lines.append(f"#EXT-X-STREAM-INF:{','.join(attributes)}")
+        lines.append(variant['uri'])
+    for variant in iframe_variants or []:
+        attributes = [f"BANDWIDTH={int(variant['bandwidth'])}"]
+        if variant.get('codecs'):
+            attributes.append(f'CODECS="{variant["codecs"]}"')
+        if variant.get('resolution'):
+            attributes.append(f"RESOLUTION={variant['resolution']}")
+        attributes.append(f'URI="{variant["uri"]}"')
+        lines.append(f"#EXT-X-I-FRAME-STREAM-INF:{','.join(attributes)}")
+
+    temp_path = playlist_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp_path, playlist_path)
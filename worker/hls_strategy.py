@@ -0,0 +1,252 @@
+"""
+Seletor de estratégia de empacotamento HLS.
+
+Antes, quando o copy falhava, o worker tentava em sequência até quatro
+execuções completas do ffmpeg (copy, copy conservador, copy de vídeo com
+áudio recodificado e recodificação completa), e cada tentativa falha podia
+processar o arquivo inteiro. Aqui uma janela curta da fonte é inspecionada
+(timestamps dos pacotes, espaçamento de keyframes, extradata dos codecs) e o
+histórico local de resultados por assinatura (container, codecs, profile,
+pix_fmt) é consultado para começar direto pela estratégia que funciona.
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+from process_supervisor import PROBE_TIMEOUT, run_captured
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local)
+    fcntl = None
+
+COPY = 'copy'
+COPY_CONSERVATIVE = 'copy_conservative'
+COPY_VIDEO_AAC = 'copy_video_aac'
+SMART_RENDER = 'smart_render'
+TRANSCODE = 'transcode'
+STRATEGIES = (COPY, COPY_CONSERVATIVE, COPY_VIDEO_AAC, SMART_RENDER, TRANSCODE)
+
+PROBE_WINDOW_SECONDS = 30
+# GOPs maiores que isso geram segmentos enormes no copy: vai para o smart render
+LONG_GOP_SECONDS = 6
+# Falhas sem nenhum sucesso a partir das quais a estratégia é pulada
+SKIP_AFTER_FAILURES = 2
+
+
+def build_copy_command(strategy: str, video_file: str, segment_path: str, hls_playlist: str,
+                       start: Optional[float] = None, playlist_type: str = 'vod') -> List[str]:
+    """
+    Comando ffmpeg (argv) das estratégias de segmentação sem recodificar o
+    vídeo. `start` (um keyframe da fonte) pula a cabeça já recodificada em
+    segmentos curtos, mantendo os timestamps originais.
+
+    Na publicação progressiva `playlist_type` é 'event': com 'vod' o muxer
+    HLS do ffmpeg só escreve a playlist no final e nada seria publicado antes.
+    """
+    seek = ['-ss', f'{start:.3f}'] if start else []
+    offset = ['-output_ts_offset', f'{start:.3f}'] if start else []
+    if strategy == COPY:
+        return (['ffmpeg'] + seek + ['-i', video_file, '-y',
+                '-c', 'copy'] + offset +  # Copy streams sem recodificar
+                ['-f', 'hls',  # Especificar formato HLS explicitamente
+                 '-hls_time', '4', '-hls_playlist_type', playlist_type,
+                 '-hls_flags', 'independent_segments',  # Segmentos independentes para melhor compatibilidade
+                 '-hls_segment_filename', segment_path, hls_playlist])
+    if strategy == COPY_CONSERVATIVE:
+        return ['ffmpeg', '-i', video_file, '-y',
+                '-c', 'copy',
+                '-f', 'hls', '-hls_time', '4', '-hls_playlist_type', playlist_type,
+                '-hls_flags', 'single_file',  # Flags mais simples
+                '-hls_segment_filename', segment_path, hls_playlist]
+    if strategy == COPY_VIDEO_AAC:
+        return (['ffmpeg'] + seek + ['-i', video_file, '-y',
+                '-c:v', 'copy', '-c:a', 'aac', '-ar', '48000', '-b:a', '128k'] + offset +
+                ['-f', 'hls', '-hls_time', '4', '-hls_playlist_type', playlist_type,
+                 '-hls_flags', 'independent_segments',
+                 '-hls_segment_filename', segment_path, hls_playlist])
+    raise ValueError(f"Estratégia sem comando de copy: {strategy}")
+
+
+def stream_signature(probe_data: Dict) -> str:
+    """Assinatura estável da fonte: container|vcodec|profile|pix_fmt|acodec."""
+    container = (probe_data.get('format', {}).get('format_name') or 'unknown').split(',')[0]
+    video = next((s for s in probe_data.get('streams', []) if s.get('codec_type') == 'video'), {})
+    audio = next((s for s in probe_data.get('streams', []) if s.get('codec_type') == 'audio'), {})
+    parts = [
+        container,
+        video.get('codec_name') or 'none',
+        (video.get('profile') or 'none').lower().replace(' ', ''),
+        video.get('pix_fmt') or 'none',
+        audio.get('codec_name') or 'none',
+    ]
+    return '|'.join(parts)
+
+
+def probe_window(video_file: str, seconds: int = PROBE_WINDOW_SECONDS) -> List[Dict]:
+    """Lê os pacotes dos primeiros `seconds` segundos (sem decodificar)."""
+    cmd = ['ffprobe', '-v', 'error', '-read_intervals', f'%+{seconds}',
+           '-show_entries', 'packet=codec_type,pts_time,dts_time,flags',
+           '-of', 'json', video_file]
+    result = run_captured(cmd, 'ffprobe:janela inicial', PROBE_TIMEOUT)
+    if result.returncode != 0:
+        return []
+    try:
+        return json.loads(result.stdout).get('packets', [])
+    except json.JSONDecodeError:
+        return []
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def analyze_packets(packets: List[Dict]) -> Dict:
+    """
+    Extrai sinais de risco para o copy a partir dos pacotes da janela.
+
+    Returns:
+        Dict com video_ts_errors, audio_ts_errors, keyframes e
+        max_keyframe_interval (None se houve menos de 2 keyframes)
+    """
+    signals = {'video_ts_errors': 0, 'audio_ts_errors': 0, 'keyframes': 0, 'max_keyframe_interval': None}
+    last_dts = {'video': None, 'audio': None}
+    keyframe_times = []
+
+    for packet in packets:
+        kind = packet.get('codec_type')
+        if kind not in last_dts:
+            continue
+        pts = _as_float(packet.get('pts_time'))
+        dts = _as_float(packet.get('dts_time'))
+        error_key = f'{kind}_ts_errors'
+
+        if dts is None and pts is None:
+            signals[error_key] += 1
+            continue
+        # Só o DTS precisa ser monotônico (o PTS oscila com B-frames)
+        if dts is not None:
+            if last_dts[kind] is not None and dts < last_dts[kind]:
+                signals[error_key] += 1
+            last_dts[kind] = dts
+
+        if kind == 'video' and 'K' in (packet.get('flags') or '') and pts is not None:
+            keyframe_times.append(pts)
+
+    keyframe_times.sort()
+    signals['keyframes'] = len(keyframe_times)
+    if len(keyframe_times) >= 2:
+        signals['max_keyframe_interval'] = max(b - a for a, b in zip(keyframe_times, keyframe_times[1:]))
+    return signals
+
+
+class StrategyHistory:
+    """Histórico local de sucesso/falha por assinatura, em JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def outcomes(self, signature: str) -> Dict:
+        return self._read().get(signature, {})
+
+    def record(self, signature: str, strategy: str, success: bool):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_path = self.path + '.lock'
+        with open(lock_path, 'w') as lock:
+            # Vários jobs podem terminar ao mesmo tempo
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            entry = data.setdefault(signature, {}).setdefault(strategy, {'success': 0, 'failure': 0})
+            entry['success' if success else 'failure'] += 1
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_path, self.path)
+
+
+def rank_strategies(video_copyable: bool, audio_copyable: bool, signals: Dict,
+                    outcomes: Dict, has_video_extradata: bool = True) -> List[str]:
+    """
+    Ordena as estratégias candidatas, da mais barata viável à recodificação.
+
+    Args:
+        video_copyable: Codec/profile/bit depth de vídeo aceitos pelo HLS
+        audio_copyable: Codec de áudio aceito pelo HLS (aac/mp3)
+        signals: Resultado de analyze_packets()
+        outcomes: Histórico da assinatura {strategy: {'success', 'failure'}}
+        has_video_extradata: False quando o H.264 fora de TS não tem extradata
+
+    Returns:
+        Lista ordenada; sempre termina em TRANSCODE
+    """
+    if not video_copyable or not has_video_extradata or signals.get('video_ts_errors'):
+        return [TRANSCODE]
+
+    long_gop = (signals.get('max_keyframe_interval') or 0) > LONG_GOP_SECONDS
+    if long_gop:
+        # O copy puro geraria segmentos irregulares e busca lenta
+        candidates = [SMART_RENDER, TRANSCODE]
+    elif not audio_copyable or signals.get('audio_ts_errors'):
+        candidates = [COPY_VIDEO_AAC, TRANSCODE]
+    else:
+        candidates = [COPY, COPY_CONSERVATIVE, COPY_VIDEO_AAC, TRANSCODE]
+
+    def known_bad(strategy):
+        stats = outcomes.get(strategy, {})
+        return stats.get('success', 0) == 0 and stats.get('failure', 0) >= SKIP_AFTER_FAILURES
+
+    candidates = [s for s in candidates if s == TRANSCODE or not known_bad(s)]
+
+    # Uma estratégia que já funcionou para esta assinatura vai para a frente
+    proven = [s for s in candidates if outcomes.get(s, {}).get('success', 0) > outcomes.get(s, {}).get('failure', 0)]
+    if proven:
+        first = proven[0]
+        candidates = [first] + [s for s in candidates if s != first and STRATEGIES.index(s) > STRATEGIES.index(first)]
+
+    return candidates
+
+
+class HlsStrategySelector:
+    """Combina a inspeção da janela da fonte com o histórico de resultados."""
+
+    def __init__(self, video_file: str, probe_data: Dict, history_path: str,
+                 packets: Optional[List[Dict]] = None):
+        self.video_file = video_file
+        self.probe_data = probe_data
+        self.signature = stream_signature(probe_data)
+        self.history = StrategyHistory(history_path)
+        # Pacotes da janela inicial já coletados pela análise única (media_probe)
+        self.signals = analyze_packets(packets if packets is not None else probe_window(video_file))
+
+    def _has_video_extradata(self) -> bool:
+        container = self.probe_data.get('format', {}).get('format_name') or ''
+        if 'mpegts' in container:
+            return True  # Annex B: SPS/PPS vêm no próprio fluxo
+        video = next((s for s in self.probe_data.get('streams', []) if s.get('codec_type') == 'video'), {})
+        size = video.get('extradata_size')
+        return size is None or int(size) > 0
+
+    def candidates(self, video_copyable: bool, audio_copyable: bool) -> List[str]:
+        outcomes = self.history.outcomes(self.signature)
+        ranked = rank_strategies(video_copyable, audio_copyable, self.signals, outcomes,
+                                 self._has_video_extradata())
+        print(f"Estratégia HLS: assinatura={self.signature} sinais={self.signals} histórico={outcomes}")
+        print(f"Estratégias candidatas: {ranked}")
+        return ranked
+
+    def record(self, strategy: str, success: bool):
+        try:
+            self.history.record(self.signature, strategy, success)
+        except OSError as e:
+            print(f"AVISO: Não foi possível salvar o histórico de estratégias: {e}")
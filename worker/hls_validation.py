@@ -0,0 +1,172 @@
+"""
+Validação rápida da saída HLS antes de publicar o título.
+
+Uma estratégia de copy pode "funcionar" (ffmpeg com código 0) e mesmo
+assim gerar timestamps quebrados ou uma playlist truncada, e o título só
+falhava quando alguém apertava play. Aqui, logo depois do empacotamento:
+
+- a playlist é lida e precisa ter segmentos e EXT-X-ENDLIST;
+- a soma das durações precisa bater com a duração da fonte;
+- todos os segmentos precisam existir, não estar vazios e ter tamanho
+  múltiplo de 188 (só stat, sem leitura);
+- uma amostra (primeiro, último e alguns sorteados) é decodificada em
+  paralelo pelo ffmpeg, e o PTS inicial de cada segmento amostrado é
+  comparado com a posição dele na playlist (só os cabeçalhos TS são lidos).
+
+Mesmo em filmes longos a validação leva poucos segundos; se falhar, o
+worker passa direto para a próxima estratégia.
+"""
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from hls_playlist import parse_media_playlist
+from iframe_playlist import TS_PACKET_SIZE, scan_video_pes, read_segment
+from process_supervisor import SHORT_JOB_TIMEOUT, run_captured
+
+SAMPLE_SEGMENTS = 6
+# Desvio aceito entre o PTS do segmento e o início dele na playlist
+TIMESTAMP_TOLERANCE = 1.0
+# Desvio aceito na soma das durações: um segmento ou 0,5% do filme
+DURATION_TOLERANCE_FRACTION = 0.005
+PTS_WRAP = 1 << 33
+
+
+def sample_indexes(count: int, samples: int = SAMPLE_SEGMENTS, seed: Optional[int] = None) -> List[int]:
+    """Primeiro, último e segmentos sorteados (sem repetição, em ordem)."""
+    if count <= 0:
+        return []
+    chosen = {0, count - 1}
+    middle = list(range(1, count - 1))
+    rng = random.Random(seed)
+    chosen.update(rng.sample(middle, min(len(middle), max(0, samples - len(chosen)))))
+    return sorted(chosen)
+
+
+def check_files(hls_dir: str, segments: List[Dict]) -> List[str]:
+    """Existência e tamanho de todos os segmentos (e dos byteranges)."""
+    errors = []
+    sizes = {}
+    for index, seg in enumerate(segments):
+        path = os.path.join(hls_dir, seg['uri'])
+        if seg['uri'] not in sizes:
+            sizes[seg['uri']] = os.path.getsize(path) if os.path.exists(path) else None
+        size = sizes[seg['uri']]
+        if size is None:
+            errors.append(f"segmento {index} ausente: {seg['uri']}")
+        elif seg.get('byterange'):
+            length, _, offset = seg['byterange'].partition('@')
+            if int(offset or 0) + int(length) > size:
+                errors.append(f"segmento {index} além do fim de {seg['uri']}")
+        elif size == 0 or size % TS_PACKET_SIZE:
+            errors.append(f"segmento {index} truncado ({size} bytes): {seg['uri']}")
+    return errors
+
+
+def decode_segment(data: bytes) -> Optional[str]:
+    """Decodifica o segmento (vídeo e áudio) sem gravar saída. Retorna o erro ou None."""
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-nostats', '-f', 'mpegts', '-i', 'pipe:0',
+           '-map', '0:v:0', '-map', '0:a:0?', '-f', 'null', '-progress', 'pipe:1', '-']
+    result = run_captured(cmd, 'ffmpeg:validação', SHORT_JOB_TIMEOUT, input=data, text=False)
+    if result.returncode != 0:
+        return result.stderr.decode('utf-8', errors='replace').strip()[-300:] or 'ffmpeg falhou'
+    frames = 0
+    for line in result.stdout.decode('utf-8', errors='replace').splitlines():
+        if line.startswith('frame='):
+            try:
+                frames = int(line.split('=', 1)[1])
+            except ValueError:
+                continue
+    return None if frames > 0 else 'nenhum quadro de vídeo decodificado'
+
+
+def _first_pts(data: bytes) -> Optional[int]:
+    for _, _, pts in scan_video_pes(data)['pes']:
+        if pts is not None:
+            return pts
+    return None
+
+
+def check_timestamps(hls_dir: str, segments: List[Dict], indexes: List[int]) -> List[str]:
+    """
+    Compara o PTS inicial dos segmentos amostrados com o início deles na
+    playlist, relativo ao primeiro segmento da mesma sequência de
+    descontinuidade (cada trecho tem sua própria linha do tempo).
+    """
+    starts = []
+    anchors = []
+    position = 0.0
+    anchor = 0
+    for index, seg in enumerate(segments):
+        if seg.get('discontinuity'):
+            anchor = index
+        starts.append(position)
+        anchors.append(anchor)
+        position += seg['duration']
+
+    errors = []
+    anchor_pts = {}
+    for index in indexes:
+        anchor = anchors[index]
+        if anchor not in anchor_pts:
+            anchor_pts[anchor] = _first_pts(read_segment(hls_dir, segments[anchor])[0])
+        pts = _first_pts(read_segment(hls_dir, segments[index])[0])
+        if pts is None or anchor_pts[anchor] is None:
+            errors.append(f"segmento {index} sem PTS de vídeo")
+            continue
+        actual = ((pts - anchor_pts[anchor]) % PTS_WRAP) / 90000
+        expected = starts[index] - starts[anchor]
+        if abs(actual - expected) > TIMESTAMP_TOLERANCE:
+            errors.append(f"segmento {index} começa em {actual:.2f}s, playlist indica {expected:.2f}s")
+    return errors
+
+
+def validate_hls_output(hls_dir: str, playlist_path: str, expected_duration: Optional[float] = None,
+                        samples: int = SAMPLE_SEGMENTS, workers: int = 4, decode: bool = True) -> Dict:
+    """
+    Valida a saída HLS de uma estratégia.
+
+    Returns:
+        Dict com 'ok', 'errors' (lista de mensagens), 'segments' e 'sampled'
+    """
+    report = {'ok': False, 'errors': [], 'segments': 0, 'sampled': []}
+    try:
+        playlist = parse_media_playlist(playlist_path)
+    except (OSError, ValueError) as e:
+        report['errors'].append(f"playlist ilegível: {e}")
+        return report
+
+    segments = playlist['segments']
+    report['segments'] = len(segments)
+    if not segments:
+        report['errors'].append("playlist sem segmentos")
+        return report
+    if not playlist['endlist']:
+        report['errors'].append("playlist sem EXT-X-ENDLIST (truncada)")
+
+    total = sum(seg['duration'] for seg in segments)
+    if expected_duration:
+        tolerance = max(playlist['target_duration'] or 0, expected_duration * DURATION_TOLERANCE_FRACTION)
+        if abs(total - expected_duration) > tolerance:
+            report['errors'].append(f"duração {total:.1f}s diferente da fonte ({expected_duration:.1f}s)")
+
+    report['errors'] += check_files(hls_dir, segments)
+    if report['errors']:
+        return report
+
+    indexes = sample_indexes(len(segments), samples, seed=len(segments))
+    report['sampled'] = indexes
+    report['errors'] += check_timestamps(hls_dir, segments, indexes)
+
+    if decode:
+        def decode_index(index):
+            return index, decode_segment(read_segment(hls_dir, segments[index])[0])
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(indexes)))) as pool:
+            for index, error in pool.map(decode_index, indexes):
+                if error:
+                    report['errors'].append(f"segmento {index} não decodifica: {error}")
+
+    report['ok'] = not report['errors']
+    return report
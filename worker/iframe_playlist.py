@@ -0,0 +1,214 @@
+"""
+Playlist só de I-frames (EXT-X-I-FRAMES-ONLY) para busca e scrubbing.
+
+Sem ela, uma busca no player (ou o SEEK que o mestre da sala envia a todos)
+baixa o segmento inteiro antes de mostrar algo. Todo segmento do worker
+começa num keyframe (o segmentador só corta em keyframes), então a media
+playlist já dá a posição e a duração de cada I-frame; dos segmentos só se lê
+o começo, até o PES de vídeo seguinte ao keyframe inicial, para o tamanho do
+EXT-X-BYTERANGE (o mpegts do ffmpeg marca o primeiro pacote de cada keyframe
+com random_access_indicator). Keyframes no meio de um segmento (GOPs curtos
+da fonte no copy) ficam de fora: um I-frame por segmento basta para a busca.
+Nenhuma codificação extra; o PAT/PMT do arquivo entra como EXT-X-MAP.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+from hls_playlist import parse_media_playlist, write_iframe_playlist
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+IFRAME_PLAYLIST = 'iframes.m3u8'
+# stream_type da PMT: H.264 e HEVC
+VIDEO_STREAM_TYPES = (0x1B, 0x24)
+# Primeira leitura do início de um segmento (dobra até cobrir o keyframe)
+HEAD_READ_SIZE = 512 * TS_PACKET_SIZE
+
+
+def _payload_start(data, pos: int) -> Tuple[Optional[int], bool]:
+    """Início do payload de um pacote TS e o random_access_indicator."""
+    control = (data[pos + 3] >> 4) & 0x3
+    start = pos + 4
+    random_access = False
+    if control & 0x2:
+        length = data[start]
+        if length:
+            random_access = bool(data[start + 1] & 0x40)
+        start += 1 + length
+    if not control & 0x1 or start >= pos + TS_PACKET_SIZE:
+        return None, random_access
+    return start, random_access
+
+
+def _section(data, pos: int) -> Optional[Tuple[int, int]]:
+    """(início, fim sem CRC) da seção PSI que começa neste pacote."""
+    start, _ = _payload_start(data, pos)
+    if start is None:
+        return None
+    start += 1 + data[start]  # pointer_field
+    length = ((data[start + 1] & 0x0F) << 8) | data[start + 2]
+    return start, min(start + 3 + length - 4, pos + TS_PACKET_SIZE)
+
+
+def _pes_pts(data, start: int) -> Optional[int]:
+    if data[start:start + 3] != b'\x00\x00\x01' or not data[start + 7] & 0x80:
+        return None
+    p = start + 9
+    return (((data[p] >> 1) & 0x07) << 30 | data[p + 1] << 22 | (data[p + 2] >> 1) << 15
+            | data[p + 3] << 7 | data[p + 4] >> 1)
+
+
+def scan_video_pes(data: bytes) -> Dict:
+    """
+    Varre um trecho MPEG-TS (um segmento ou um byterange de single_file).
+
+    Returns:
+        Dict com 'tables_end' (fim do PMT, para o EXT-X-MAP) e 'pes': lista
+        de (offset, random_access, pts) para cada PES de vídeo, em ordem
+    """
+    pmt_pid = None
+    video_pid = None
+    tables_end = None
+    pes = []
+
+    for pos in range(0, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        if data[pos] != TS_SYNC_BYTE:
+            continue
+        header = data[pos + 1]
+        pid = ((header & 0x1F) << 8) | data[pos + 2]
+        # Caminho quente primeiro: pacotes de vídeo sem início de PES
+        if pid == video_pid:
+            if header & 0x40:
+                start, random_access = _payload_start(data, pos)
+                if start is not None:
+                    pes.append((pos, random_access, _pes_pts(data, start)))
+        elif pid == 0 and header & 0x40 and pmt_pid is None:
+            section = _section(data, pos)
+            if section:
+                for p in range(section[0] + 8, section[1] - 3, 4):
+                    if (data[p] << 8 | data[p + 1]) != 0:  # program 0 é a NIT
+                        pmt_pid = ((data[p + 2] & 0x1F) << 8) | data[p + 3]
+                        break
+        elif pid == pmt_pid and header & 0x40 and video_pid is None:
+            section = _section(data, pos)
+            if section:
+                start, end = section
+                p = start + 12 + (((data[start + 10] & 0x0F) << 8) | data[start + 11])
+                while p + 5 <= end:
+                    es_pid = ((data[p + 1] & 0x1F) << 8) | data[p + 2]
+                    if data[p] in VIDEO_STREAM_TYPES:
+                        video_pid = es_pid
+                        tables_end = pos + TS_PACKET_SIZE
+                        break
+                    p += 5 + (((data[p + 3] & 0x0F) << 8) | data[p + 4])
+
+    return {'tables_end': tables_end, 'pes': pes}
+
+
+def segment_keyframes(data: bytes) -> List[Dict]:
+    """
+    Keyframes de um segmento: offset, tamanho (até o próximo PES de vídeo)
+    e PTS. Se o muxer não marcou random_access, o primeiro PES é usado
+    (segmentos HLS do worker sempre começam num keyframe).
+    """
+    scan = scan_video_pes(data)
+    pes = scan['pes']
+    marked = [i for i, (_, random_access, _) in enumerate(pes) if random_access]
+    if not marked and pes:
+        marked = [0]
+
+    keyframes = []
+    for i in marked:
+        offset, _, pts = pes[i]
+        end = pes[i + 1][0] if i + 1 < len(pes) else len(data)
+        keyframes.append({'offset': offset, 'length': end - offset, 'pts': pts,
+                          'tables_end': scan['tables_end']})
+    return keyframes
+
+
+def read_segment(hls_dir: str, segment: Dict) -> Tuple[bytes, int]:
+    """Bytes do segmento e o offset deles no arquivo (single_file usa byterange)."""
+    path = os.path.join(hls_dir, segment['uri'])
+    with open(path, 'rb') as f:
+        if not segment.get('byterange'):
+            return f.read(), 0
+        length, _, offset = segment['byterange'].partition('@')
+        f.seek(int(offset or 0))
+        return f.read(int(length)), int(offset or 0)
+
+
+def read_keyframe_head(hls_dir: str, segment: Dict) -> Tuple[bytes, int]:
+    """
+    Início do segmento até o fim do keyframe inicial (o próximo PES de vídeo
+    ou o fim do segmento), em leituras que dobram de tamanho. Retorna os
+    bytes e o offset deles no arquivo, como read_segment.
+    """
+    path = os.path.join(hls_dir, segment['uri'])
+    if segment.get('byterange'):
+        length, _, offset = segment['byterange'].partition('@')
+        base, limit = int(offset or 0), int(length)
+    else:
+        base, limit = 0, os.path.getsize(path)
+
+    data = b''
+    size = HEAD_READ_SIZE
+    with open(path, 'rb') as f:
+        f.seek(base)
+        while len(data) < limit:
+            chunk = f.read(min(size, limit - len(data)))
+            if not chunk:
+                break
+            data += chunk
+            keyframes = segment_keyframes(data)
+            if keyframes and keyframes[0]['offset'] + keyframes[0]['length'] < len(data):
+                break
+            size *= 2
+    return data, base
+
+
+def build_iframe_index(hls_dir: str, media_playlist: str = 'playlist.m3u8') -> List[Dict]:
+    """
+    Índice de I-frames da media playlist: o keyframe inicial de cada
+    segmento, no tempo de início do segmento (robusto a descontinuidades
+    entre trechos).
+    """
+    segments = parse_media_playlist(os.path.join(hls_dir, media_playlist))['segments']
+    frames = []
+    segment_start = 0.0
+    for segment in segments:
+        data, base = read_keyframe_head(hls_dir, segment)
+        keyframes = segment_keyframes(data)
+        if keyframes:
+            keyframe = keyframes[0]
+            frame = {
+                'time': segment_start,
+                'uri': segment['uri'],
+                'byterange': f"{keyframe['length']}@{base + keyframe['offset']}",
+                'discontinuity': segment.get('discontinuity', False),
+            }
+            if keyframe['tables_end']:
+                frame['map'] = f"{keyframe['tables_end']}@{base}"
+            frames.append(frame)
+        segment_start += segment['duration']
+
+    for frame, following in zip(frames, frames[1:] + [None]):
+        end = following['time'] if following else segment_start
+        frame['duration'] = max(0.0, end - frame['time'])
+    return [f for f in frames if f['duration'] > 0]
+
+
+def write_iframes_for(hls_dir: str, media_playlist: str = 'playlist.m3u8') -> Optional[Dict]:
+    """
+    Gera iframes.m3u8 ao lado da media playlist.
+
+    Returns:
+        Variante para a master (uri e bandwidth de pico) ou None se nenhum
+        keyframe foi encontrado
+    """
+    frames = build_iframe_index(hls_dir, media_playlist)
+    if not frames:
+        return None
+    write_iframe_playlist(os.path.join(hls_dir, IFRAME_PLAYLIST), frames)
+    bandwidth = max(int(f['byterange'].split('@')[0]) * 8 / f['duration'] for f in frames)
+    print(f"Playlist de I-frames: {len(frames)} keyframes")
+    return {'uri': IFRAME_PLAYLIST, 'bandwidth': bandwidth}
@@ -0,0 +1,115 @@
+"""
+Empacotamento HLS sob demanda (just-in-time).
+
+Para títulos pouco assistidos, empacotar o filme inteiro na ingestão gasta
+CPU e dobra o armazenamento. Neste modo a ingestão só guarda a fonte em
+library/{id}/source/ e um índice (library/{id}/jit/index.json) com a
+duração, os cortes de segmento e o que pode ser copiado. O serviço local
+(jit_server.py) gera a playlist direto do índice e cada segmento quando ele
+é pedido.
+
+Com vídeo copiável os cortes caem em keyframes da fonte (o segmento é um
+copy exato do intervalo); caso contrário os cortes são uniformes e o
+segmento é recodificado com keyframe no início.
+"""
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+from chunked_encoder import SEGMENT_DURATION, video_encode_args
+from hls_playlist import render_media_playlist
+from smart_render import probe_keyframe_index
+
+JIT_FOLDER = 'jit'
+SOURCE_FOLDER = 'source'
+INDEX_FILE = 'index.json'
+LAYOUT_JIT = 'jit'
+SEGMENT_NAME = 'segment{:05d}.ts'
+
+
+def plan_segments(keyframes: List[float], duration: float, copy_video: bool,
+                  target: float = SEGMENT_DURATION) -> List[List[float]]:
+    """
+    Cortes [início, fim] dos segmentos. No copy, corta no primeiro keyframe
+    a pelo menos `target` segundos do corte anterior (como o muxer HLS).
+    """
+    if not copy_video or not keyframes:
+        count = max(1, int(-(-duration // target)))
+        return [[i * target, min((i + 1) * target, duration)] for i in range(count)]
+
+    cuts = [0.0]
+    for keyframe in sorted(keyframes):
+        if keyframe - cuts[-1] >= target and duration - keyframe > 0.5:
+            cuts.append(keyframe)
+    return [[start, end] for start, end in zip(cuts, cuts[1:] + [duration])]
+
+
+def prepare_jit_title(video_file: str, movie_folder: str, duration: float, copy_video: bool,
+                      copy_audio: bool, bit_depth: int) -> Dict:
+    """
+    Ingestão do modo JIT: move a fonte para a biblioteca e grava o índice.
+
+    Returns:
+        O índice gravado
+    """
+    source_dir = os.path.join(movie_folder, SOURCE_FOLDER)
+    os.makedirs(source_dir, exist_ok=True)
+    source_path = os.path.join(source_dir, os.path.basename(video_file))
+    shutil.move(video_file, source_path)
+
+    keyframes = probe_keyframe_index(source_path)[1] if copy_video else []
+    segments = plan_segments(keyframes, duration, copy_video and bool(keyframes))
+    index = {
+        'source': os.path.relpath(source_path, movie_folder),
+        'duration': duration,
+        'copy_video': copy_video and bool(keyframes),
+        'copy_audio': copy_audio,
+        'bit_depth': bit_depth,
+        'segments': segments
+    }
+
+    jit_dir = os.path.join(movie_folder, JIT_FOLDER)
+    os.makedirs(jit_dir, exist_ok=True)
+    temp_path = os.path.join(jit_dir, INDEX_FILE + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(temp_path, os.path.join(jit_dir, INDEX_FILE))
+    print(f"JIT: {len(segments)} segmentos indexados "
+          f"({'copy' if index['copy_video'] else 'recodificação'} sob demanda)")
+    return index
+
+
+def load_index(movie_folder: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(movie_folder, JIT_FOLDER, INDEX_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def playlist_for(index: Dict) -> str:
+    """Media playlist VOD gerada direto do índice."""
+    segments = [{'duration': end - start, 'uri': SEGMENT_NAME.format(i)}
+                for i, (start, end) in enumerate(index['segments'])]
+    return render_media_playlist(segments, playlist_type='VOD', endlist=True)
+
+
+def segment_command(index: Dict, movie_folder: str, number: int, output_path: str) -> List[str]:
+    """Comando ffmpeg que produz o segmento `number` como MPEG-TS."""
+    start, end = index['segments'][number]
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-y']
+    if start:
+        cmd += ['-ss', f'{start:.3f}']
+    cmd += ['-t', f'{end - start:.3f}', '-i', os.path.join(movie_folder, index['source']),
+            '-map', '0:v:0', '-map', '0:a:0?']
+    if index['copy_video']:
+        cmd += ['-c:v', 'copy']
+    else:
+        cmd += video_encode_args(index['bit_depth'])
+    cmd += ['-c:a', 'copy'] if index['copy_audio'] else ['-c:a', 'aac', '-ar', '48000', '-b:a', '128k']
+    if start:
+        # Timestamps originais: os segmentos se encaixam sem descontinuidade
+        cmd += ['-output_ts_offset', f'{start:.3f}']
+    cmd += ['-f', 'mpegts', '-muxdelay', '0', output_path]
+    return cmd
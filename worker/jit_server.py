@@ -0,0 +1,279 @@
+"""
+Serviço local do empacotamento HLS sob demanda (ver jit_packager.py).
+
+O servidor Node encaminha /library/{id}/jit/* para cá. A playlist é gerada
+direto do índice; cada segmento é produzido pelo ffmpeg no primeiro pedido
+e guardado num cache em disco limitado por tamanho (LRU). Ao servir o
+segmento N, os próximos JIT_PREFETCH_SEGMENTS são produzidos em segundo
+plano, de modo que a reprodução contínua só paga a latência fria no início
+e depois de uma busca.
+
+GET /stats devolve acertos/faltas do cache e as latências médias fria e
+quente, para acompanhar o custo do modo JIT.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import BinaryIO, Dict, Optional
+
+import config
+from jit_packager import JIT_FOLDER, load_index, playlist_for, segment_command
+from process_supervisor import SHORT_JOB_TIMEOUT, run_captured
+
+PATH_PATTERN = re.compile(r'^/([^/]+)/' + JIT_FOLDER + r'/(playlist\.m3u8|segment(\d{5})\.ts)$')
+PREFETCH_WORKERS = 2
+# Tentativas de abrir um segmento que o cache removeu entre get() e open()
+SEGMENT_OPEN_ATTEMPTS = 3
+
+
+class SegmentCache:
+    """Cache LRU de segmentos em disco, limitado a `max_bytes`."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # chave -> tamanho em bytes
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        # Reconstrói a ordem LRU pelo mtime (atualizado a cada acerto)
+        found = []
+        for movie_id in os.listdir(self.cache_dir):
+            movie_dir = os.path.join(self.cache_dir, movie_id)
+            if not os.path.isdir(movie_dir):
+                continue
+            for name in os.listdir(movie_dir):
+                path = os.path.join(movie_dir, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                elif name.endswith('.ts'):
+                    stat = os.stat(path)
+                    found.append((stat.st_mtime, f'{movie_id}/{name}', stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+        with self.lock:
+            self._evict()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+        return path
+
+    def put(self, key: str, temp_path: str) -> str:
+        path = self.path_for(key)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: Optional[str] = None):
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = next(iter(self.entries.items()))
+            if key == keep:
+                break
+            del self.entries[key]
+            self.total_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+
+class JitService:
+    """Produz segmentos sob demanda, com deduplicação de pedidos simultâneos e prefetch."""
+
+    def __init__(self, library_root: str, cache: SegmentCache, prefetch: int = 3):
+        self.library_root = library_root
+        self.cache = cache
+        self.prefetch = prefetch
+        self.indexes = {}
+        self.inflight = {}  # chave -> threading.Event
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+        self.stats = {'hits': 0, 'misses': 0, 'prefetched': 0, 'errors': 0,
+                      'cold_ms_total': 0.0, 'warm_ms_total': 0.0}
+
+    def index_for(self, movie_id: str) -> Optional[Dict]:
+        with self.lock:
+            if movie_id in self.indexes:
+                return self.indexes[movie_id]
+        index = load_index(os.path.join(self.library_root, movie_id))
+        if index is not None:
+            with self.lock:
+                self.indexes[movie_id] = index
+        return index
+
+    def playlist(self, movie_id: str) -> Optional[str]:
+        index = self.index_for(movie_id)
+        return playlist_for(index) if index else None
+
+    def segment(self, movie_id: str, number: int) -> Optional[str]:
+        """Caminho do segmento no cache, produzindo-o se necessário."""
+        index = self.index_for(movie_id)
+        if not index or not 0 <= number < len(index['segments']):
+            return None
+
+        started = time.monotonic()
+        path = self.cache.get(self._key(movie_id, number))
+        hit = path is not None
+        if not hit:
+            path = self._produce(movie_id, index, number)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self.lock:
+            if hit:
+                self.stats['hits'] += 1
+                self.stats['warm_ms_total'] += elapsed_ms
+            else:
+                self.stats['misses'] += 1
+                self.stats['cold_ms_total'] += elapsed_ms
+
+        for ahead in range(number + 1, min(number + 1 + self.prefetch, len(index['segments']))):
+            self.pool.submit(self._prefetch, movie_id, index, ahead)
+        return path
+
+    def open_segment(self, movie_id: str, number: int) -> Optional[BinaryIO]:
+        """Abre o segmento para leitura. O cache pode removê-lo entre get() e
+        open(); nesse caso ele é produzido de novo. Depois de aberto, a remoção
+        não afeta a leitura."""
+        for _ in range(SEGMENT_OPEN_ATTEMPTS):
+            path = self.segment(movie_id, number)
+            if path is None:
+                return None
+            try:
+                return open(path, 'rb')
+            except FileNotFoundError:
+                print(f"AVISO JIT: segmento {self._key(movie_id, number)} removido do cache antes da leitura")
+        return None
+
+    def _key(self, movie_id: str, number: int) -> str:
+        return f'{movie_id}/segment{number:05d}.ts'
+
+    def _prefetch(self, movie_id: str, index: Dict, number: int):
+        if self.cache.get(self._key(movie_id, number)) is None:
+            self._produce(movie_id, index, number, prefetch=True)
+
+    def _produce(self, movie_id: str, index: Dict, number: int, prefetch: bool = False) -> Optional[str]:
+        key = self._key(movie_id, number)
+        with self.lock:
+            if prefetch and key in self.cache.entries:
+                return None
+            event = self.inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self.inflight[key] = threading.Event()
+        if not owner:
+            # Outro pedido (ou o prefetch) já está produzindo este segmento
+            if prefetch:
+                return None
+            event.wait()
+            return self.cache.get(key)
+
+        try:
+            temp_path = self.cache.path_for(key) + '.tmp'
+            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+            cmd = segment_command(index, os.path.join(self.library_root, movie_id), number, temp_path)
+            result = run_captured(cmd, f'ffmpeg:jit {key}', SHORT_JOB_TIMEOUT)
+            if result.returncode != 0 or not os.path.exists(temp_path):
+                print(f"ERRO JIT: segmento {key}: {result.stderr[-500:]}")
+                with self.lock:
+                    self.stats['errors'] += 1
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return None
+            if prefetch:
+                with self.lock:
+                    self.stats['prefetched'] += 1
+            return self.cache.put(key, temp_path)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            event.set()
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats)
+        cold_ms = stats.pop('cold_ms_total')
+        warm_ms = stats.pop('warm_ms_total')
+        stats['avg_cold_ms'] = round(cold_ms / stats['misses'], 1) if stats['misses'] else None
+        stats['avg_warm_ms'] = round(warm_ms / stats['hits'], 1) if stats['hits'] else None
+        stats['cache_bytes'] = self.cache.total_bytes
+        stats['cache_segments'] = len(self.cache.entries)
+        return stats
+
+
+def make_handler(service: JitService):
+    class JitHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/stats':
+                return self._send(200, 'application/json', json.dumps(service.snapshot()).encode('utf-8'))
+
+            match = PATH_PATTERN.match(self.path.split('?', 1)[0])
+            if not match or match.group(1) in ('.', '..'):
+                return self._send(404, 'text/plain', b'not found')
+            movie_id = match.group(1)
+
+            if match.group(3) is None:
+                playlist = service.playlist(movie_id)
+                if playlist is None:
+                    return self._send(404, 'text/plain', b'not found')
+                return self._send(200, 'application/vnd.apple.mpegurl', playlist.encode('utf-8'))
+
+            f = service.open_segment(movie_id, int(match.group(3)))
+            if f is None:
+                return self._send(404, 'text/plain', b'not found')
+            with f:
+                self.send_response(200)
+                self.send_header('Content-Type', 'video/mp2t')
+                self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile)
+
+        def _send(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return JitHandler
+
+
+def main():
+    cache = SegmentCache(config.JIT_CACHE_DIR, config.JIT_CACHE_MAX_MB * 1024 * 1024)
+    service = JitService(config.LIBRARY_ROOT, cache, config.JIT_PREFETCH_SEGMENTS)
+    server = ThreadingHTTPServer(('127.0.0.1', config.JIT_SERVICE_PORT), make_handler(service))
+    print(f"Serviço JIT ouvindo em 127.0.0.1:{config.JIT_SERVICE_PORT} "
+          f"(cache {config.JIT_CACHE_MAX_MB} MB em {config.JIT_CACHE_DIR})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
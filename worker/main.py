@@ -1,16 +1,36 @@
 import os
 import sys
 import shutil
-import subprocess
 import argparse
 import requests
 import magic
 import patoolib
-import re
 from tmdbv3api import TMDb, Movie, Search
 import config
-from subtitle_manager import download_and_process_subtitles
+from subtitle_manager import download_and_process_subtitles, sort_subtitles, WANTED_LANGUAGES
+from subtitle_search import compute_video_hashes
+from audio_renditions import select_audio_renditions, package_audio_renditions, discard_audio_renditions
+from embedded_subtitles import (select_embedded_subtitles, subtitle_output_args,
+                                finalize_embedded_subtitles, extract_embedded_subtitles)
 from poster_manager import download_and_process_posters
+from chunked_encoder import encode_hls_chunked, build_encode_command, probe_duration
+from encoding_optimizer import analyze_title
+from ffmpeg_progress import run_ffmpeg_with_progress, format_eta
+from progressive_publisher import ProgressivePublisher, write_metadata_atomic, STATUS_READY
+from hls_strategy import HlsStrategySelector, build_copy_command, COPY, COPY_CONSERVATIVE, COPY_VIDEO_AAC, SMART_RENDER, TRANSCODE
+from smart_render import smart_render_hls
+from trickplay import thumbnail_output_args, finalize_trickplay
+from single_file_layout import consolidate_segments, is_single_file, LAYOUT_SEGMENTS, LAYOUT_SINGLE_FILE
+from startup_layout import (find_copy_head_end, encode_startup_head, with_startup_head,
+                            discard_startup_head, finalize_playlists)
+from hls_playlist import parse_media_playlist, write_media_playlist
+from process_supervisor import run_supervised, format_stage_metrics, TIMEOUT_IDLE
+from hls_validation import validate_hls_output
+from media_probe import probe_media, bit_depth_for
+from release_name import parse_release_name, title_with_year, title_variations, packaging_hint
+from jit_packager import prepare_jit_title, JIT_FOLDER, LAYOUT_JIT
+from packaging_profile import current_profile
+from speech_reference import ensure_speech_reference, reference_path as speech_reference_path
 
 # --- CONFIGURAÇÃO INICIAL ---
 if not config.TMDB_API_KEY:
@@ -44,101 +64,128 @@ def update_status(api_url, job_id, status, progress=None, message=None):
     except requests.RequestException as e:
         print(f"AVISO: Não foi possível atualizar o status: {e}")
 
-def run_command(command):
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True, text=True, encoding='utf-8')
-    for line in iter(process.stdout.readline, ''):
-        print(line.strip())
-    process.wait()
-    return process.returncode == 0
+def run_ffmpeg(api_url, job_id, command, status_label, duration, stage_start=70, stage_end=95, stage='ffmpeg'):
+    """
+    Executa um comando ffmpeg de conversão reportando o progresso real
+    (out_time / duração do probe) mapeado para a faixa do estágio.
+    """
+    def progress_callback(snapshot):
+        percent = snapshot['percent']
+        adjusted_progress = None
+        details = []
+        if percent is not None:
+            adjusted_progress = round(stage_start + percent / 100 * (stage_end - stage_start), 1)
+            details.append(f"{percent:.0f}%")
+        if snapshot['speed']:
+            details.append(f"{snapshot['speed']:.1f}x")
+        if snapshot['fps']:
+            details.append(f"{snapshot['fps']:.0f} fps")
+        if snapshot['eta'] is not None:
+            details.append(f"ETA {format_eta(snapshot['eta'])}")
+        message = f"{status_label} ({' · '.join(details)})" if details else status_label
+        update_status(api_url, job_id, status_label, adjusted_progress, message)
 
-def clean_filename_for_search(filename):
-    # Remove extensões e termos comuns de torrents para busca mais precisa
-    name = os.path.splitext(filename)[0]
-    
-    # Padrões para remover (em ordem de prioridade)
-    patterns = [
-        # Grupos de release e sites (incluindo variações entre colchetes)
-        r'\[.*?(yts|rarbg|1337x|kickass|torrentgalaxy|eztv|limetorrents).*?\]',
-        r'-\[?(yts|rarbg|1337x|kickass|torrentgalaxy|eztv|limetorrents)\]?',
-        r'\b(yts|ytsmx|yts\.mx|rarbg|1337x|kickass|torrentgalaxy|eztv|limetorrents)\b',
-        
-        # Qualidade e formatos de vídeo entre colchetes ou não
-        r'\[.*?(1080p|720p|2160p|4k|480p|brrip|bluray|blu-ray|dvdrip|webrip|web-dl|hdrip|hdtv).*?\]',
-        r'\b(1080p|720p|2160p|4k|480p|brrip|bluray|blu-ray|dvdrip|webrip|web-dl|hdrip|hdtv|hdcam|cam|ts|r5)\b',
-        
-        # Codecs e áudio entre colchetes ou não - MELHORADO para pegar "10bit", "AAC5", etc.
-        r'\[.*?(x264|x265|h264|h265|aac|ac3|dts|5\.1|2\.0|10bit).*?\]',
-        r'\b(x264|x265|h264|h265|hevc|avc|aac|ac3|dts|dd5\.1|dd2\.0|ddp5\.1|atmos|truehd|flac|mp3|10bit|aac5\.1)\b',
-        
-        # Outros termos técnicos e formatos
-        r'\b(extended|unrated|directors\.cut|remastered|remux|proper|real|repack|internal|limited|mp4|mkv|avi|mov)\b',
-        
-        # Grupos de release após hífens
-        r'-[A-Z0-9]+$',  # Remove grupos como -SPARKS, -DVSUX no final
-        
-        # Remove caracteres especiais e substitui por espaços
-        r'[\.\[\]\(\)_-]',
-        
-        # Remove múltiplos espaços
-        r'\s+'
-    ]
-    
-    for pattern in patterns:
-        name = re.sub(pattern, ' ', name, flags=re.IGNORECASE)
-    
-    # Limpa espaços extras
-    cleaned = name.strip()
-    
-    # MELHORIA: Tentar extrair título mais inteligentemente
-    # Para casos como "Clown.In.A.Cornfield.2025.1080p.WEBRip.x265.10bit.AAC5.1-[YTS.MX]"
-    
-    # 1. Primeiro, tentar encontrar o ano
-    year_match = re.search(r'\b(19|20)\d{2}\b', cleaned)
-    if year_match:
-        year = year_match.group()
-        # Pegar tudo antes do ano como título
-        before_year = cleaned[:year_match.start()].strip()
-        
-        # Limpar melhor o título
-        title_words = []
-        for word in before_year.split():
-            # Ignorar palavras muito técnicas que sobrou
-            if not re.match(r'^(x26[45]|h26[45]|aac\d?|ac3|dts|bit|p|fps|mb|gb|kb)$', word, re.IGNORECASE):
-                title_words.append(word)
-        
-        if title_words:
-            # Reconstruir com título limpo + ano
-            clean_title = ' '.join(title_words)
-            cleaned = f"{clean_title} {year}"
-    
-    # 2. Se não encontrou ano, tentar limpar melhor sem ano
-    if not year_match:
-        words = cleaned.split()
-        meaningful_words = []
-        for word in words:
-            # Manter palavras significativas (3+ caracteres)
-            if len(word) >= 3:
-                # Excluir códigos técnicos específicos MAIS RÍGIDO
-                if not re.match(r'^(ddp|dts|aac\d?|ac3|h26[45]|x26[45]|bit|fps|mb|gb|kb|\d+p|\d+bit)$', word, re.IGNORECASE):
-                    meaningful_words.append(word)
-        
-        cleaned = ' '.join(meaningful_words)
-    
-    # 3. Último fallback: pegar apenas as primeiras palavras sensatas
-    words = cleaned.split()
-    if len(words) > 6:  # Se ainda tem muitas palavras, pegar apenas as primeiras
-        # Tentar manter até encontrar um ano ou parar em 5 palavras
-        final_words = []
-        for word in words[:8]:  # Máximo 8 palavras
-            if re.match(r'^(19|20)\d{2}$', word):  # Se encontrar ano
-                final_words.append(word)
-                break
-            final_words.append(word)
-            if len(final_words) >= 5 and not re.match(r'^(19|20)\d{2}$', words[len(final_words)] if len(final_words) < len(words) else ""):
-                break
-        cleaned = ' '.join(final_words)
-    
-    return cleaned.strip()
+    return run_ffmpeg_with_progress(command, duration, progress_callback, stage=stage,
+                                    idle_timeout=config.FFMPEG_IDLE_TIMEOUT or None,
+                                    total_timeout=config.FFMPEG_TOTAL_TIMEOUT or None)
+
+def validate_output(api_url, job_id, hls_dir, playlist_path, expected_duration, strategy):
+    """Validação rápida da saída de uma estratégia (ver hls_validation)."""
+    if not config.HLS_VALIDATION:
+        return True
+    update_status(api_url, job_id, "Validando segmentos HLS")
+    report = validate_hls_output(hls_dir, playlist_path, expected_duration,
+                                 samples=config.HLS_VALIDATION_SAMPLES)
+    if report['ok']:
+        print(f"✓ Saída HLS validada ({len(report['sampled'])} de {report['segments']} segmentos decodificados)")
+    else:
+        print(f"AVISO: Saída da estratégia '{strategy}' inválida:")
+        for error in report['errors'][:10]:
+            print(f"  - {error}")
+    return report['ok']
+
+def transcode_full(api_url, job_id, video_file, hls_dir, bit_depth, status_label, duration=None,
+                   output_playlist=None, allow_chunked=True, thumbs_dir=None, extra_outputs=None,
+                   playlist_type='vod'):
+    """
+    Recodificação completa para HLS (H.264 Main + AAC). Tenta primeiro a
+    codificação paralela em blocos e cai para o processo único se ela não
+    se aplicar ou falhar.
+
+    Na publicação progressiva o ffmpeg escreve em `output_playlist` e os
+    blocos paralelos ficam desligados (eles só geram a playlist no final).
+    Com `thumbs_dir`, o processo único também grava as miniaturas de
+    trickplay a partir dos mesmos quadros decodificados; `extra_outputs`
+    (ex.: legendas embutidas) também só vão no processo único.
+
+    Returns:
+        Decisão do otimizador por título (ou None se ele não rodou)
+    """
+    hls_playlist = output_playlist or os.path.join(hls_dir, "playlist.m3u8")
+    segment_path = os.path.join(hls_dir, "segment%03d.ts")
+
+    encoding = None
+    if config.ENCODING_OPTIMIZER:
+        def optimizer_progress_callback(message, progress=None):
+            update_status(api_url, job_id, f"Analisando complexidade: {message}", 70)
+
+        update_status(api_url, job_id, "Analisando complexidade do vídeo", 70)
+        encoding = analyze_title(video_file, bit_depth, config.ENCODING_QUALITY_TARGET,
+                                 config.MAX_STREAM_BITRATE_KBPS, optimizer_progress_callback)
+
+    if config.CHUNKED_ENCODING and allow_chunked:
+        def chunked_progress_callback(message, progress=None):
+            # Ajusta o progresso para a faixa 70-95
+            adjusted_progress = 70 + (progress * 0.25) if progress is not None else None
+            update_status(api_url, job_id, f"{status_label} (paralelo): {message}", adjusted_progress)
+
+        if encode_hls_chunked(video_file, hls_dir, bit_depth,
+                              workers=config.CHUNKED_ENCODING_WORKERS or None,
+                              progress_callback=chunked_progress_callback,
+                              encoding=encoding, startup=config.STARTUP_SEGMENTS):
+            print("✓ Recodificação paralela em blocos concluída")
+            return encoding
+        print("Recodificação em blocos não aplicada, usando processo único")
+
+    update_status(api_url, job_id, status_label)
+
+    # Perfil H.264 Main; fontes de 10+ bits são convertidas para 8 bits (yuv420p)
+    if bit_depth >= 10:
+        print(f"Detectado vídeo {bit_depth}-bit, convertendo para 8-bit (yuv420p) para compatibilidade web")
+    else:
+        print(f"Detectado vídeo {bit_depth}-bit, usando profile H.264 Main")
+
+    ffmpeg_cmd = build_encode_command(video_file, hls_playlist, segment_path, bit_depth,
+                                      encoding=encoding, startup=config.STARTUP_SEGMENTS,
+                                      playlist_type=playlist_type)
+    if thumbs_dir:
+        # Segunda saída do mesmo ffmpeg: sem decodificação extra
+        os.makedirs(thumbs_dir, exist_ok=True)
+        ffmpeg_cmd += thumbnail_output_args(thumbs_dir)
+    if extra_outputs:
+        ffmpeg_cmd += extra_outputs
+    if not run_ffmpeg(api_url, job_id, ffmpeg_cmd, status_label, duration, stage='ffmpeg:transcode'):
+        raise Exception("Falha na conversão do vídeo para HLS.")
+    return encoding
+
+def build_metadata(movie_id, final_title, overview, release_date, year, movie_info, subtitles,
+                   hls_playlist="/hls/playlist.m3u8"):
+    return {
+        "id": movie_id,
+        "title": final_title,
+        "original_title": final_title,
+        "overview": overview,
+        "release_date": release_date,
+        "year": year,
+        "poster_path": movie_info.get('poster_path', "/poster.png"),
+        "posters": movie_info.get('posters', {}),
+        "hls_playlist": hls_playlist,
+        "subtitles": subtitles,
+        "tmdb_id": movie_info.get('tmdb_id'),
+        "imdb_id": movie_info.get('imdb_id'),
+        "video_hashes": movie_info.get('video_hashes', {}),
+        "video_size": movie_info.get('video_size')
+    }
 
 # --- PIPELINE ---
 def main():
@@ -156,12 +203,17 @@ def main():
     
     # Variável para controlar sucesso do processamento
     processing_successful = False
+    publisher = None  # Publicação progressiva (quando habilitada)
 
     try:
         # 1. Download
         update_status(args.api_url, args.job_id, "Baixando")
-        if not run_command(f'webtorrent download "{args.magnet}" --out "{download_dir}"'):
-            raise Exception("Falha no download do torrent.")
+        download = run_supervised(['webtorrent', 'download', args.magnet, '--out', download_dir], 'webtorrent',
+                                  idle_timeout=config.DOWNLOAD_IDLE_TIMEOUT or None,
+                                  total_timeout=config.DOWNLOAD_TOTAL_TIMEOUT or None)
+        if not download['ok']:
+            reason = " (sem progresso)" if download['timed_out'] == TIMEOUT_IDLE else ""
+            raise Exception(f"Falha no download do torrent{reason}.")
 
         # 2. Descompressão
         update_status(args.api_url, args.job_id, "Descompactando")
@@ -204,7 +256,10 @@ def main():
 
         # 4. Metadados
         update_status(args.api_url, args.job_id, "Buscando metadados")
-        search_term = clean_filename_for_search(os.path.basename(video_file))
+        # Nome do release lido uma vez: título/ano para a busca e dicas (codec,
+        # resolução, grupo) para as etapas seguintes
+        release = parse_release_name(os.path.basename(video_file))
+        search_term = title_with_year(release)
         print(f"Buscando metadados para: '{search_term}'")
         
         try:
@@ -212,25 +267,7 @@ def main():
             movie = Movie()
             
             # Tentar múltiplas variações de busca para melhor resultado
-            search_variations = [search_term]
-            
-            # Se o termo tem mais de 3 palavras, tentar versão mais curta
-            words = search_term.split()
-            if len(words) > 3:
-                # Tentar apenas as primeiras 3-4 palavras
-                short_version = ' '.join(words[:3])
-                search_variations.append(short_version)
-                
-                # Se tem ano, tentar sem o ano primeiro
-                if re.search(r'\b(19|20)\d{2}\b', search_term):
-                    no_year = re.sub(r'\b(19|20)\d{2}\b', '', search_term).strip()
-                    if no_year and len(no_year.split()) >= 2:
-                        search_variations.insert(0, no_year)  # Tentar sem ano primeiro
-            
-            # Tentar também versão ainda mais limpa removendo números restantes
-            clean_version = re.sub(r'\b\d+\b', '', search_term).strip()
-            if clean_version and clean_version != search_term:
-                search_variations.append(clean_version)
+            search_variations = title_variations(release)
             
             print(f"Tentando variações de busca: {search_variations}")
             
@@ -301,6 +338,8 @@ def main():
                 release_date = getattr(movie_details, 'release_date', '')
                 poster_path = getattr(movie_details, 'poster_path', None)
                 year = int(release_date[:4]) if release_date else None
+                tmdb_id = movie_id
+                imdb_id = getattr(movie_details, 'imdb_id', None) or None
                 
                 print(f"Metadados extraídos - Título Final: {final_title}, Data: {release_date}, Ano: {year}")
                 
@@ -315,6 +354,7 @@ def main():
             release_date = ''
             year = None
             poster_path = None
+            tmdb_id = imdb_id = None
             movie_id = abs(hash(final_title)) % 1000000  # ID único baseado no hash do nome
             print(f"Usando fallback - ID: {movie_id}, Título: {final_title}")
         
@@ -333,7 +373,12 @@ def main():
             'release_date': release_date,
             'year': year,
             'poster_path': poster_path,
-            'video_file': video_file
+            'video_file': video_file,
+            'tmdb_id': tmdb_id,
+            'imdb_id': imdb_id,
+            # Hashes do arquivo para a busca exata de legendas (OpenSubtitles/napiprojekt)
+            'video_hashes': compute_video_hashes(video_file),
+            'video_size': os.path.getsize(video_file)
         }
         
         # --- Download e Processamento de Posters (Sistema Avançado) ---
@@ -359,6 +404,18 @@ def main():
         movie_info['posters'] = poster_info
         movie_info['poster_path'] = poster_info.get('large') or poster_info.get('medium') or "/poster.png"
             
+        # Faixas de legenda de texto embutidas: extraídas junto com o HLS e
+        # dispensam a busca online (e o ffsubsync) para os seus idiomas
+        subtitles_dir = os.path.join(movie_library_path, 'subtitles')
+        embedded_tracks = []
+        if config.EMBEDDED_SUBTITLES:
+            source_info = probe_media(video_file)
+            if source_info:
+                embedded_tracks = select_embedded_subtitles(source_info.streams)
+            if embedded_tracks:
+                os.makedirs(subtitles_dir, exist_ok=True)
+                print(f"Legendas embutidas: {', '.join(t['language'] + ' (' + t['codec'] + ')' for t in embedded_tracks)}")
+
         # 5. Download e Processamento de Legendas (ANTES da conversão HLS)
         update_status(args.api_url, args.job_id, "Baixando legendas", 60)
         subtitle_info = []
@@ -384,7 +441,8 @@ def main():
             subtitle_info = download_and_process_subtitles(
                 movie_library_path, 
                 movie_info, 
-                subtitle_progress_callback
+                subtitle_progress_callback,
+                skip_languages={track['language'] for track in embedded_tracks}
             )
             
             print(f"Resultado do processamento de legendas: {len(subtitle_info)} encontradas")
@@ -399,24 +457,57 @@ def main():
             subtitle_info = []  # Continua sem legendas se houver erro
         
         print(f"=== DOWNLOAD DE LEGENDAS CONCLUÍDO ===\n")
+
+        # Referência de fala do filme: se nenhuma sincronização a criou, extrai agora
+        # (o vídeo não fica guardado) para as buscas de legenda posteriores
+        if config.SPEECH_REFERENCE and not os.path.exists(speech_reference_path(movie_library_path)):
+            update_status(args.api_url, args.job_id, "Extraindo referência de fala", 68)
+            try:
+                ensure_speech_reference(movie_library_path, video_file)
+            except Exception as speech_error:
+                print(f"AVISO: Não foi possível extrair a referência de fala: {speech_error}")
             
         # 6. Conversão inteligente para HLS (copy quando possível, recodifica só quando necessário)
         update_status(args.api_url, args.job_id, "Analisando formato do vídeo", 70)
         hls_playlist = os.path.join(hls_dir, "playlist.m3u8")
         segment_path = os.path.join(hls_dir, "segment%03d.ts")
+        metadata_path = os.path.join(movie_library_path, "metadata.json")
+        
+        # Publicação progressiva: o ffmpeg escreve numa playlist de trabalho e o
+        # título é publicado (EVENT + metadata provisório) nos primeiros segmentos
+        output_playlist = hls_playlist
+        playlist_type = 'vod'
+        if config.PROGRESSIVE_PUBLISH and not config.JIT_PACKAGING:
+            output_playlist = os.path.join(hls_dir, ".packaging.m3u8")
+            # EVENT: o ffmpeg reescreve a playlist de trabalho a cada segmento
+            playlist_type = 'event'
+            publisher = ProgressivePublisher(
+                output_playlist, hls_playlist, metadata_path,
+                build_metadata(movie_id, final_title, overview, release_date, year, movie_info, subtitle_info),
+                on_published=lambda: update_status(args.api_url, args.job_id, "Disponível para assistir",
+                                                   message="O filme já pode ser assistido enquanto o processamento termina")
+            )
+            publisher.start()
         
-        # Primeiro, analisar os codecs do arquivo de vídeo
-        probe_cmd = f'ffprobe -v quiet -print_format json -show_streams "{video_file}"'
-        probe_process = subprocess.run(probe_cmd, shell=True, capture_output=True, text=True)
+        # Primeiro, analisar os codecs do arquivo de vídeo (análise única,
+        # memorizada e reaproveitada pelas demais etapas)
+        media_info = probe_media(video_file)
         
-        can_copy = False
+        can_copy_video = False
+        can_copy_audio = False
+        probe_data = None
+        media_duration = None
         bit_depth = 8  # Padrão
+        encoding_decision = None  # Preenchido pelo otimizador quando há recodificação
+        thumbs_dir = os.path.join(movie_library_path, ".thumbs") if config.TRICKPLAY and not config.JIT_PACKAGING else None
+        trickplay_info = None
+        audio_renditions = None
         pixel_format = None
         
-        if probe_process.returncode == 0:
+        if media_info:
             try:
-                import json
-                probe_data = json.loads(probe_process.stdout)
+                probe_data = media_info.raw
+                media_duration = media_info.duration
                 
                 video_codec = None
                 audio_codec = None
@@ -427,18 +518,7 @@ def main():
                         video_codec = stream.get('codec_name', '').lower()
                         video_profile = stream.get('profile', '').lower()
                         pixel_format = stream.get('pix_fmt', '')
-                        
-                        # Detecção mais precisa de bit depth
-                        if any(fmt in pixel_format for fmt in ['p10', '10bit', '10le', '10be', 'yuv420p10']):
-                            bit_depth = 10
-                        elif any(fmt in pixel_format for fmt in ['p12', '12bit', '12le', '12be', 'yuv420p12']):
-                            bit_depth = 12
-                        elif any(fmt in pixel_format for fmt in ['16le', '16be', '16bit']):
-                            bit_depth = 16
-                        else:
-                            # Para formatos 8-bit ou desconhecidos, assumir 8-bit
-                            bit_depth = 8
-                            
+                        bit_depth = bit_depth_for(pixel_format)
                         print(f"Detecção de bit depth: {pixel_format} → {bit_depth} bits")
                             
                     elif stream.get('codec_type') == 'audio':
@@ -457,117 +537,215 @@ def main():
                     if not compatible_profile:
                         print(f"AVISO: Profile H.264 {video_profile} pode ser incompatível com copy")
                 
-                can_copy = compatible_video and compatible_audio and compatible_profile
+                can_copy_video = compatible_video and compatible_profile
+                can_copy_audio = compatible_audio
                 
                 print(f"Codecs detectados: Vídeo={video_codec} ({video_profile}), Áudio={audio_codec}")
                 print(f"Pixel Format: {pixel_format}, Bit Depth: {bit_depth}")
-                print(f"Compatível para segmentação rápida: {can_copy}")
+                print(f"Compatível para segmentação rápida: vídeo={can_copy_video}, áudio={can_copy_audio}")
                 
             except Exception as probe_error:
                 print(f"AVISO: Erro ao analisar codecs: {probe_error}")
-                can_copy = False
+                can_copy_video = False
         
-        if can_copy:
-            # Segmentação rápida sem recodificação (copy)
-            update_status(args.api_url, args.job_id, "Segmentando vídeo (modo rápido)")
-            print("Usando modo de segmentação rápida (copy) - isso será muito mais rápido!")
-            ffmpeg_cmd = (
-                f'ffmpeg -i "{video_file}" -y '
-                f'-c copy '  # Copy streams sem recodificar
-                f'-f hls '  # Especificar formato HLS explicitamente
-                f'-hls_time 4 -hls_playlist_type vod '
-                f'-hls_flags independent_segments '  # Segmentos independentes para melhor compatibilidade
-                f'-hls_segment_filename "{segment_path}" "{hls_playlist}"'
-            )
-            
-            # Tentar copy primeiro
-            if not run_command(ffmpeg_cmd):
-                print("AVISO: Segmentação rápida falhou, tentando estratégias intermediárias...")
-                
-                # Estratégia 1: Copy com flags mais conservadoras
-                update_status(args.api_url, args.job_id, "Tentando segmentação conservadora")
-                conservative_cmd = (
-                    f'ffmpeg -i "{video_file}" -y '
-                    f'-c copy '
-                    f'-f hls -hls_time 4 -hls_playlist_type vod '
-                    f'-hls_flags single_file '  # Flags mais simples
-                    f'-hls_segment_filename "{segment_path}" "{hls_playlist}"'
-                )
-                
-                if run_command(conservative_cmd):
-                    print("✓ Segmentação conservadora funcionou!")
+        # Escolher a ordem das estratégias pela janela da fonte + histórico,
+        # em vez de tentar todas em sequência sobre o arquivo inteiro
+        if probe_data and can_copy_video:
+            selector = HlsStrategySelector(video_file, probe_data, config.STRATEGY_HISTORY_PATH,
+                                           packets=media_info.packets)
+            strategies = selector.candidates(can_copy_video, can_copy_audio)
+        elif not media_info and packaging_hint(release) == COPY:
+            # ffprobe falhou, mas o nome do release indica H.264 8 bits: o copy
+            # passa pela validação e a recodificação completa fica de fallback
+            selector = None
+            copy_strategy = COPY if release['audio'] in ('aac', 'mp3') else COPY_VIDEO_AAC
+            strategies = [copy_strategy, TRANSCODE]
+            print(f"AVISO: Codecs não analisados; pelo nome do release tentando '{copy_strategy}' antes de recodificar")
+        else:
+            selector = None
+            strategies = [TRANSCODE]
+
+        # Empacotamento sob demanda: nenhuma estratégia roda na ingestão, só o
+        # índice de keyframes; os segmentos saem do serviço JIT quando pedidos
+        jit_index = None
+        if config.JIT_PACKAGING:
+            update_status(args.api_url, args.job_id, "Indexando para empacotamento sob demanda", 90)
+            jit_index = prepare_jit_title(video_file, movie_library_path,
+                                          media_duration or probe_duration(video_file) or 0.0,
+                                          can_copy_video, can_copy_audio, bit_depth)
+            strategies = []
+            video_file = os.path.join(movie_library_path, jit_index['source'])
+
+        strategy_labels = {
+            COPY: "Segmentando vídeo (modo rápido)",
+            COPY_CONSERVATIVE: "Tentando segmentação conservadora",
+            COPY_VIDEO_AAC: "Recodificando apenas áudio",
+            SMART_RENDER: "Segmentação inteligente (recodificando só GOPs longos)",
+        }
+        startup_head = None  # Segmentos iniciais curtos recodificados para o copy
+        head_end = None
+        for strategy in strategies:
+            if strategy == TRANSCODE:
+                discard_startup_head(hls_dir, startup_head)
+                startup_head = None
+                # Recodificação completa para garantir compatibilidade
+                print("Usando modo de recodificação completa")
+                label = "Recodificando vídeo (necessário)" if len(strategies) == 1 else "Recodificando vídeo (fallback)"
+                try:
+                    encoding_decision = transcode_full(args.api_url, args.job_id, video_file, hls_dir, bit_depth,
+                                                       label, media_duration, output_playlist=output_playlist,
+                                                       allow_chunked=publisher is None, thumbs_dir=thumbs_dir,
+                                                       extra_outputs=subtitle_output_args(embedded_tracks, subtitles_dir),
+                                                       playlist_type=playlist_type)
+                except Exception:
+                    if selector:
+                        selector.record(TRANSCODE, False)
+                    raise
+                valid = validate_output(args.api_url, args.job_id, hls_dir, output_playlist, media_duration, TRANSCODE)
+                if selector:
+                    selector.record(TRANSCODE, valid)
+                if not valid:
+                    raise Exception("Saída HLS da recodificação não passou na validação")
+                break
+
+            if strategy == SMART_RENDER:
+                discard_startup_head(hls_dir, startup_head)
+                startup_head = None
+
+                def smart_progress_callback(message, progress=None):
+                    # Ajusta o progresso para a faixa 70-95
+                    adjusted_progress = 70 + (progress * 0.25) if progress is not None else None
+                    update_status(args.api_url, args.job_id, f"{strategy_labels[SMART_RENDER]}: {message}",
+                                  adjusted_progress)
+
+                update_status(args.api_url, args.job_id, strategy_labels[SMART_RENDER])
+                success = smart_render_hls(video_file, hls_dir, bit_depth, output_playlist,
+                                           audio_copy=can_copy_audio and not selector.signals.get('audio_ts_errors'),
+                                           startup=config.STARTUP_SEGMENTS,
+                                           progress_callback=smart_progress_callback)
+                success = success and validate_output(args.api_url, args.job_id, hls_dir, output_playlist,
+                                                      media_duration, SMART_RENDER)
+                selector.record(SMART_RENDER, success)
+                if success:
+                    print("✓ Smart render funcionou!")
+                    break
+                print("AVISO: Smart render não aplicado, tentando a próxima estratégia...")
+                if publisher:
+                    publisher.reset()
+                continue
+
+            # No copy os cortes seguem o GOP da fonte: só o início é recodificado
+            # em segmentos curtos (o single_file do modo conservador fica de fora)
+            use_head = config.STARTUP_SEGMENTS and strategy in (COPY, COPY_VIDEO_AAC)
+            if use_head and startup_head is None:
+                head_end = find_copy_head_end(video_file)
+                if head_end:
+                    update_status(args.api_url, args.job_id, "Preparando início rápido da reprodução")
+                    startup_head = encode_startup_head(video_file, hls_dir, bit_depth, head_end) or []
                 else:
-                    print("Segmentação conservadora falhou, tentando copy apenas do vídeo...")
-                    
-                    # Estratégia 2: Copy vídeo + recodificar apenas áudio
-                    update_status(args.api_url, args.job_id, "Recodificando apenas áudio")
-                    audio_only_cmd = (
-                        f'ffmpeg -i "{video_file}" -y '
-                        f'-c:v copy -c:a aac -ar 48000 -b:a 128k '
-                        f'-f hls -hls_time 4 -hls_playlist_type vod '
-                        f'-hls_flags independent_segments '
-                        f'-hls_segment_filename "{segment_path}" "{hls_playlist}"'
+                    startup_head = []
+            head = startup_head if use_head else None
+            if publisher:
+                publisher.prefix_segments = head
+
+            update_status(args.api_url, args.job_id, strategy_labels[strategy])
+            print(f"Tentando estratégia '{strategy}' (sem recodificar o vídeo)")
+            copy_start = head_end if head else None
+            success = run_ffmpeg(args.api_url, args.job_id,
+                                 build_copy_command(strategy, video_file, segment_path, output_playlist,
+                                                    start=copy_start, playlist_type=playlist_type)
+                                 + subtitle_output_args(embedded_tracks, subtitles_dir, start=copy_start),
+                                 strategy_labels[strategy], media_duration, stage=f'ffmpeg:{strategy}')
+            if success:
+                if head and not publisher:
+                    copied = parse_media_playlist(output_playlist)['segments']
+                    write_media_playlist(hls_playlist, with_startup_head(head, copied))
+                # Na publicação progressiva a cabeça fica fora da playlist de trabalho
+                expected_duration = media_duration - head_end if head and publisher and media_duration else media_duration
+                success = validate_output(args.api_url, args.job_id, hls_dir,
+                                          output_playlist if publisher else hls_playlist,
+                                          expected_duration, strategy)
+            if selector:
+                selector.record(strategy, success)
+            if success:
+                print(f"✓ Estratégia '{strategy}' funcionou!")
+                if not head:
+                    discard_startup_head(hls_dir, startup_head)
+                break
+            print(f"AVISO: Estratégia '{strategy}' falhou, tentando a próxima...")
+            if publisher:
+                publisher.reset()
+
+        if publisher:
+            publisher.finalize()
+
+        # Legendas embutidas: as que não saíram junto com o HLS (blocos, smart
+        # render, JIT) são extraídas agora; faixas ilegíveis voltam para a busca online
+        if embedded_tracks:
+            embedded_info, missing = finalize_embedded_subtitles(embedded_tracks, subtitles_dir, movie_id)
+            if missing:
+                update_status(args.api_url, args.job_id, "Extraindo legendas embutidas")
+                extract_embedded_subtitles(video_file, missing, subtitles_dir)
+                extracted, missing = finalize_embedded_subtitles(missing, subtitles_dir, movie_id)
+                embedded_info += extracted
+            if missing:
+                missing_languages = {track['language'] for track in missing}
+                print(f"AVISO: Legendas embutidas ilegíveis ({', '.join(sorted(missing_languages))}), buscando online")
+                try:
+                    subtitle_info += download_and_process_subtitles(
+                        movie_library_path, movie_info,
+                        skip_languages=set(WANTED_LANGUAGES) - missing_languages
                     )
-                    
-                    if run_command(audio_only_cmd):
-                        print("✓ Copy vídeo + recodificação áudio funcionou!")
-                    else:
-                        print("Todas as estratégias rápidas falharam, partindo para recodificação completa...")
-                        # Fallback para recodificação se copy falhar
-                        update_status(args.api_url, args.job_id, "Recodificando vídeo (fallback)")
-                        
-                        # Escolher perfil H.264 baseado no bit depth do vídeo original
-                        if bit_depth >= 10:
-                            # Para vídeos de 10+ bits, converter para 8 bits para compatibilidade web
-                            h264_profile = "main"
-                            pixel_format_cmd = "-pix_fmt yuv420p"  # Forçar 8 bits
-                            print(f"Fallback: Detectado vídeo {bit_depth}-bit, convertendo para 8-bit (yuv420p) para compatibilidade web")
-                        else:
-                            # Para vídeos de 8 bits, usar Main profile
-                            h264_profile = "main"
-                            pixel_format_cmd = ""  # Manter formato original
-                            print(f"Fallback: Detectado vídeo {bit_depth}-bit, usando profile H.264 Main")
-                        
-                        ffmpeg_cmd = (
-                            f'ffmpeg -i "{video_file}" -y '
-                            f'-c:a aac -ar 48000 -b:a 128k '
-                            f'-c:v h264 -profile:v {h264_profile} {pixel_format_cmd} -crf 23 -preset veryfast '
-                            f'-f hls '  # Especificar formato HLS explicitamente
-                            f'-hls_time 4 -hls_playlist_type vod '
-                            f'-hls_flags independent_segments '  # Segmentos independentes
-                            f'-hls_segment_filename "{segment_path}" "{hls_playlist}"'
-                        )
-                        if not run_command(ffmpeg_cmd): 
-                            raise Exception("Falha na conversão do vídeo para HLS.")
+                except Exception as subtitle_error:
+                    print(f"ERRO no processamento de legendas: {subtitle_error}")
+            subtitle_info = sort_subtitles(subtitle_info + embedded_info)
+
+        if jit_index:
+            public_playlist = f"/{JIT_FOLDER}/playlist.m3u8"
+            hls_layout = LAYOUT_JIT
         else:
-            # Recodificação completa para garantir compatibilidade
-            update_status(args.api_url, args.job_id, "Recodificando vídeo (necessário)")
-            print("Usando modo de recodificação completa")
-            
-            # Escolher perfil H.264 baseado no bit depth do vídeo original
-            if bit_depth >= 10:
-                # Para vídeos de 10+ bits, converter para 8 bits para compatibilidade web
-                h264_profile = "main"
-                pixel_format_cmd = "-pix_fmt yuv420p"  # Forçar 8 bits
-                print(f"Detectado vídeo {bit_depth}-bit, convertendo para 8-bit (yuv420p) para compatibilidade web")
-            else:
-                # Para vídeos de 8 bits, usar Main profile
-                h264_profile = "main"
-                pixel_format_cmd = ""  # Manter formato original
-                print(f"Detectado vídeo {bit_depth}-bit, usando profile H.264 Main")
-            
-            ffmpeg_cmd = (
-                f'ffmpeg -i "{video_file}" -y '
-                f'-c:a aac -ar 48000 -b:a 128k '
-                f'-c:v h264 -profile:v {h264_profile} {pixel_format_cmd} -crf 23 -preset veryfast '
-                f'-force_key_frames "expr:gte(t,n_forced*4)" '  # Forçar keyframes a cada 4 segundos
-                f'-f hls '  # Especificar formato HLS explicitamente
-                f'-hls_time 4 -hls_playlist_type vod '
-                f'-hls_flags independent_segments '  # Segmentos independentes
-                f'-hls_segment_filename "{segment_path}" "{hls_playlist}"'
-            )
-            if not run_command(ffmpeg_cmd): 
-                raise Exception("Falha na conversão do vídeo para HLS.")
+            # Áudio duplo: uma rendition por idioma e segmentos só de vídeo. Na
+            # publicação progressiva os segmentos já estão sendo servidos com áudio.
+            if config.AUDIO_RENDITIONS and not publisher:
+                source_info = probe_media(video_file)
+                candidates = select_audio_renditions(source_info.streams) if source_info else []
+                if candidates:
+                    update_status(args.api_url, args.job_id, "Separando áudio por idioma")
+                    try:
+                        audio_renditions = package_audio_renditions(video_file, hls_dir, candidates)
+                    except Exception as rendition_error:
+                        # Opcional: o título segue com o áudio muxado
+                        print(f"AVISO: Separação do áudio falhou, mantendo o áudio muxado: {rendition_error}")
+                        discard_audio_renditions(hls_dir)
+                        audio_renditions = None
+
+            # Layout de arquivo único: os segmentos viram faixas de bytes de media.ts.
+            # Na publicação progressiva os clientes já podem estar lendo os
+            # segmentos avulsos; nesse caso a conversão fica para o script da biblioteca.
+            if config.HLS_SINGLE_FILE:
+                if publisher:
+                    print("Layout de arquivo único adiado: título publicado progressivamente")
+                else:
+                    consolidate_segments(hls_dir)
+                    for rendition in audio_renditions or []:
+                        consolidate_segments(os.path.join(hls_dir, os.path.dirname(rendition['uri'])))
+            hls_layout = LAYOUT_SINGLE_FILE if is_single_file(parse_media_playlist(hls_playlist)['segments']) else LAYOUT_SEGMENTS
+
+            # Tags corretas na media playlist + master playlist com CODECS/RESOLUTION
+            public_playlist = "/hls/playlist.m3u8"
+            try:
+                if finalize_playlists(hls_dir, iframes=config.IFRAME_PLAYLIST, audio_renditions=audio_renditions):
+                    public_playlist = "/hls/master.m3u8"
+            except (OSError, ValueError) as playlist_error:
+                print(f"AVISO: Não foi possível anotar as playlists HLS: {playlist_error}")
+
+        # Miniaturas da barra de busca (da passada de recodificação ou só dos keyframes)
+        if thumbs_dir:
+            update_status(args.api_url, args.job_id, "Gerando miniaturas de navegação", 95)
+            try:
+                trickplay_info = finalize_trickplay(movie_library_path, thumbs_dir, video_file, media_duration)
+            except Exception as trickplay_error:
+                print(f"AVISO: Não foi possível gerar as miniaturas de navegação: {trickplay_error}")
         
         # 7. Verificação de Integridade das Legendas
         update_status(args.api_url, args.job_id, "Verificando legendas", 95)
@@ -586,23 +764,25 @@ def main():
         print(f"Legendas finais verificadas: {len(verified_subtitles)}")
         
         # 8. Salvar Metadados Finais
-        metadata = {
-            "id": movie_id,
-            "title": final_title,
-            "original_title": final_title,
-            "overview": overview,
-            "release_date": release_date,
-            "year": year,
-            "poster_path": movie_info.get('poster_path', "/poster.png"),
-            "posters": movie_info.get('posters', {}),
-            "hls_playlist": "/hls/playlist.m3u8",
-            "subtitles": verified_subtitles
-        }
+        metadata = build_metadata(movie_id, final_title, overview, release_date, year, movie_info, verified_subtitles,
+                                  hls_playlist=public_playlist)
+        metadata["status"] = STATUS_READY
+        if encoding_decision:
+            metadata["encoding"] = encoding_decision
+        metadata["hls_layout"] = hls_layout
+        if not jit_index:
+            # Perfil efetivo (a publicação progressiva adia arquivo único e áudio por idioma),
+            # para o reempacotamento da biblioteca saber o que está desatualizado
+            metadata["packaging_profile"] = dict(current_profile(), layout=hls_layout,
+                                                 audio_renditions=config.AUDIO_RENDITIONS and not publisher)
+        if trickplay_info:
+            metadata["trickplay"] = trickplay_info
+        if audio_renditions:
+            metadata["audio_tracks"] = [
+                {'language': r['language'], 'name': r['name'], 'default': r['default']} for r in audio_renditions
+            ]
         
-        metadata_path = os.path.join(movie_library_path, "metadata.json")
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            import json
-            json.dump(metadata, f, ensure_ascii=False, indent=4)
+        write_metadata_atomic(metadata_path, metadata)
         
         print(f"Metadados salvos em: {metadata_path}")
         print(f"Filme processado com sucesso: {len(verified_subtitles)} legendas disponíveis")
@@ -614,8 +794,18 @@ def main():
     except Exception as e:
         print(f"ERRO no Job {args.job_id}: {e}")
         processing_successful = False
+        if publisher:
+            # Não deixa um título provisório quebrado na biblioteca
+            publisher.stop()
+            publisher.reset()
         update_status(args.api_url, args.job_id, "Falhou", message=str(e))
     finally:
+        metrics = format_stage_metrics()
+        if metrics:
+            print("--- Processos externos (parede / CPU / RSS máx) ---")
+            for line in metrics:
+                print(line)
+
         # Limpeza condicional - só remove se processamento foi bem-sucedido
         if 'processing_successful' in locals() and processing_successful:
             print(f"Processamento concluído com sucesso. Limpando diretório temporário: {job_temp_dir}")
@@ -0,0 +1,170 @@
+"""
+Análise única da fonte com ffprobe, compartilhada por todas as etapas.
+
+Cada etapa (detecção de codecs, seletor de estratégia, otimizador,
+codificação em blocos, smart render, JIT) rodava o seu próprio ffprobe
+sobre o mesmo arquivo de vários GB. Aqui um único ffprobe com probesize e
+analyzeduration limitados coleta formato, fluxos e os pacotes da janela
+inicial (timestamps e keyframes), e o resultado é memorizado por
+(caminho, tamanho, mtime): em memória no processo e num arquivo lateral
+(.{nome}.probe.json) ao lado da fonte, reaproveitado entre execuções.
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+from process_supervisor import PROBE_TIMEOUT, run_captured
+
+# Limites da análise do cabeçalho: suficientes para MKV/MP4 com muitas
+# trilhas, sem ler centenas de MB em NFS
+PROBE_SIZE = 50 * 1024 * 1024
+ANALYZE_DURATION_US = 20 * 1000 * 1000
+# Janela inicial de pacotes (sem decodificar) usada pelo seletor de estratégia
+PACKET_WINDOW_SECONDS = 30
+PROBE_CACHE_VERSION = 1
+
+_memo = {}
+
+
+class MediaInfo:
+    """Resultado estruturado do ffprobe de uma fonte."""
+
+    def __init__(self, path: str, data: Dict):
+        self.path = path
+        self.format = data.get('format', {})
+        self.streams = data.get('streams', [])
+        self.packets = data.get('packets', [])
+
+    @property
+    def raw(self) -> Dict:
+        """Formato e fluxos no formato do `ffprobe -show_format -show_streams`."""
+        return {'format': self.format, 'streams': self.streams}
+
+    def streams_of(self, codec_type: str) -> List[Dict]:
+        return [s for s in self.streams if s.get('codec_type') == codec_type]
+
+    @property
+    def video(self) -> Optional[Dict]:
+        return next(iter(self.streams_of('video')), None)
+
+    @property
+    def audio(self) -> Optional[Dict]:
+        return next(iter(self.streams_of('audio')), None)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return _as_float(self.format.get('duration'))
+
+    @property
+    def bit_rate(self) -> Optional[int]:
+        value = _as_float(self.format.get('bit_rate'))
+        return int(value) if value else None
+
+    @property
+    def bit_depth(self) -> int:
+        return bit_depth_for((self.video or {}).get('pix_fmt') or '')
+
+    @property
+    def keyframes(self) -> List[float]:
+        """Keyframes de vídeo da janela inicial (dica para cortes e início rápido)."""
+        times = [_as_float(p.get('pts_time')) for p in self.packets
+                 if p.get('codec_type') == 'video' and 'K' in (p.get('flags') or '')]
+        return sorted(t for t in times if t is not None)
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bit_depth_for(pixel_format: str) -> int:
+    """Bit depth a partir do pix_fmt do ffprobe (8 para formatos desconhecidos)."""
+    if any(fmt in pixel_format for fmt in ['p10', '10bit', '10le', '10be', 'yuv420p10']):
+        return 10
+    if any(fmt in pixel_format for fmt in ['p12', '12bit', '12le', '12be', 'yuv420p12']):
+        return 12
+    if any(fmt in pixel_format for fmt in ['16le', '16be', '16bit']):
+        return 16
+    return 8
+
+
+def probe_command(video_file: str, window: int = PACKET_WINDOW_SECONDS) -> List[str]:
+    return ['ffprobe', '-v', 'error',
+            '-probesize', str(PROBE_SIZE), '-analyzeduration', str(ANALYZE_DURATION_US),
+            '-read_intervals', f'%+{window}',
+            '-show_format', '-show_streams',
+            '-show_entries', 'packet=codec_type,pts_time,dts_time,flags',
+            '-of', 'json', video_file]
+
+
+def sidecar_path(video_file: str) -> str:
+    folder, name = os.path.split(os.path.abspath(video_file))
+    return os.path.join(folder, f'.{name}.probe.json')
+
+
+def _file_key(video_file: str):
+    stat = os.stat(video_file)
+    return [os.path.abspath(video_file), stat.st_size, stat.st_mtime_ns]
+
+
+def _read_sidecar(video_file: str, key) -> Optional[Dict]:
+    try:
+        with open(sidecar_path(video_file), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if cached.get('version') != PROBE_CACHE_VERSION or cached.get('key') != key:
+        return None
+    return cached.get('data')
+
+
+def _write_sidecar(video_file: str, key, data: Dict):
+    path = sidecar_path(video_file)
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PROBE_CACHE_VERSION, 'key': key, 'data': data}, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        # Pasta só de leitura (ex.: NFS montado sem escrita): fica só a memória
+        print(f"AVISO: Não foi possível gravar o cache do ffprobe: {e}")
+
+
+def probe_media(video_file: str, use_cache: bool = True) -> Optional[MediaInfo]:
+    """
+    Analisa a fonte (ou devolve a análise memorizada).
+
+    Returns:
+        MediaInfo, ou None se o ffprobe falhar
+    """
+    try:
+        key = _file_key(video_file)
+    except OSError:
+        return None
+    memo_key = tuple(key)
+
+    if use_cache:
+        if memo_key in _memo:
+            return _memo[memo_key]
+        data = _read_sidecar(video_file, key)
+        if data is not None:
+            info = _memo[memo_key] = MediaInfo(video_file, data)
+            return info
+
+    result = run_captured(probe_command(video_file), 'ffprobe', PROBE_TIMEOUT)
+    if result.returncode != 0:
+        print(f"AVISO: ffprobe falhou em {os.path.basename(video_file)}: {result.stderr[-300:]}")
+        return None
+    try:
+        data = json.loads(result.stdout)
+    except json.JSONDecodeError:
+        return None
+
+    data = {'format': data.get('format', {}), 'streams': data.get('streams', []),
+            'packets': data.get('packets', [])}
+    info = _memo[memo_key] = MediaInfo(video_file, data)
+    if use_cache:
+        _write_sidecar(video_file, key, data)
+    return info
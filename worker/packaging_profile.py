@@ -0,0 +1,32 @@
+"""
+Perfil de empacotamento HLS de um título.
+
+O metadata.json de cada título guarda o perfil com que ele foi empacotado
+('packaging_profile'). Quando o empacotamento muda (duração de segmento,
+layout, áudio por idioma, I-frames), scripts/repackage_library.py compara o
+perfil gravado com o atual e reempacota só os títulos desatualizados.
+
+PROFILE_VERSION sobe quando a saída muda de um jeito que não aparece nos
+demais campos.
+"""
+from typing import Dict, Optional
+
+import config
+from chunked_encoder import SEGMENT_DURATION
+from single_file_layout import LAYOUT_SEGMENTS, LAYOUT_SINGLE_FILE
+
+PROFILE_VERSION = 1
+
+
+def current_profile() -> Dict:
+    return {
+        'version': PROFILE_VERSION,
+        'segment_duration': SEGMENT_DURATION,
+        'layout': LAYOUT_SINGLE_FILE if config.HLS_SINGLE_FILE else LAYOUT_SEGMENTS,
+        'audio_renditions': config.AUDIO_RENDITIONS,
+        'iframes': config.IFRAME_PLAYLIST,
+    }
+
+
+def profile_matches(metadata: Dict, profile: Optional[Dict] = None) -> bool:
+    return metadata.get('packaging_profile') == (profile or current_profile())
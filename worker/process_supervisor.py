@@ -0,0 +1,222 @@
+"""
+Supervisor dos processos externos do worker (webtorrent, ffmpeg).
+
+Antes tudo rodava com shell=True, sem timeout (um webtorrent ou ffmpeg
+travado prendia o job para sempre) e cada linha de saída era impressa e ia
+parar no console do Node. Aqui:
+
+- os argumentos vão como lista argv, sem shell;
+- há timeout de inatividade (nenhuma saída por N segundos) e total;
+- a saída fica num buffer circular com as últimas linhas, impresso só em
+  caso de falha (quem precisa das linhas, como o progresso do ffmpeg,
+  recebe-as por callback);
+- tempo de parede, CPU (usuário + sistema) e pico de RSS de cada filho vêm
+  do rusage (os.wait4) e ficam registrados como métricas da etapa.
+
+As métricas ficam numa lista do módulo: chamadas feitas em processos filhos
+(ProcessPoolExecutor) registram no filho. Quem usa um pool de processos
+devolve as métricas junto com o resultado e chama record_metrics no pai.
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+TAIL_LINES = 50
+# Espera entre o SIGTERM e o SIGKILL de um processo que estourou o timeout
+KILL_GRACE_SECONDS = 10
+WATCHDOG_INTERVAL = 1.0
+READ_CHUNK = 64 * 1024
+
+TIMEOUT_IDLE = 'idle'
+TIMEOUT_TOTAL = 'total'
+
+# Limites dos processos auxiliares do pipeline (segundos). As sondagens
+# leem o arquivo inteiro (índice de keyframes), os trabalhos curtos cobrem
+# poucos segundos de mídia (amostras, segmentos avulsos) e a recodificação de
+# um trecho tem um limite proporcional à sua duração.
+PROBE_TIMEOUT = 600
+SHORT_JOB_TIMEOUT = 300
+ENCODE_TIMEOUT_FACTOR = 10
+# Inatividade de um ffmpeg com -progress: ele reporta a cada ~0,5s
+PROGRESS_IDLE_TIMEOUT = 300
+
+_stage_metrics = []
+_metrics_lock = threading.Lock()
+
+
+def _reader(stream, on_line: Optional[Callable[[str], bool]], tail: deque, activity: List[float]):
+    """Lê a saída em blocos (qualquer byte conta como atividade) e separa as linhas."""
+    pending = b''
+    while True:
+        chunk = stream.read1(READ_CHUNK) if hasattr(stream, 'read1') else stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        activity[0] = time.monotonic()
+        pending += chunk.replace(b'\r', b'\n')
+        *lines, pending = pending.split(b'\n')
+        for raw in lines:
+            _handle_line(raw, on_line, tail)
+    if pending:
+        _handle_line(pending, on_line, tail)
+
+
+def _handle_line(raw: bytes, on_line, tail: deque):
+    line = raw.decode('utf-8', errors='replace').rstrip()
+    if not line:
+        return
+    if on_line and on_line(line):
+        return
+    tail.append(line)
+
+
+def _wait_with_rusage(process: subprocess.Popen):
+    """Espera o filho e devolve o rusage dele (None onde os.wait4 não existe)."""
+    if not hasattr(os, 'wait4'):
+        process.wait()
+        return None
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def _stop(process: subprocess.Popen):
+    try:
+        process.send_signal(signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    deadline = time.monotonic() + KILL_GRACE_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return
+        time.sleep(0.2)
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+
+def run_supervised(argv: List[str], stage: str, idle_timeout: Optional[float] = None,
+                   total_timeout: Optional[float] = None,
+                   on_line: Optional[Callable[[str], bool]] = None,
+                   tail_lines: int = TAIL_LINES, cwd: Optional[str] = None,
+                   should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+    """
+    Executa `argv` sob supervisão.
+
+    Args:
+        argv: Comando como lista (sem shell)
+        stage: Nome da etapa nas métricas e mensagens
+        idle_timeout: Segundos sem nenhuma saída até encerrar o processo
+        total_timeout: Tempo máximo de parede
+        on_line: Recebe cada linha; se devolver True a linha não vai para o buffer
+        should_stop: Consultado a cada WATCHDOG_INTERVAL; True encerra o
+            processo (ex.: outro bloco do mesmo trabalho já falhou)
+
+    Returns:
+        Dict com 'ok', 'returncode', 'timed_out' (None, 'idle' ou 'total'),
+        'cancelled', 'tail' (últimas linhas) e as métricas (wall, cpu_user,
+        cpu_system, max_rss_mb)
+    """
+    tail = deque(maxlen=tail_lines)
+    started = time.monotonic()
+    activity = [started]
+    process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               stdin=subprocess.DEVNULL, cwd=cwd)
+    reader = threading.Thread(target=_reader, args=(process.stdout, on_line, tail, activity), daemon=True)
+    reader.start()
+
+    timed_out = None
+    cancelled = False
+    while reader.is_alive():
+        reader.join(WATCHDOG_INTERVAL)
+        if should_stop and reader.is_alive() and should_stop():
+            cancelled = True
+            _stop(process)
+            reader.join(KILL_GRACE_SECONDS)
+            break
+        now = time.monotonic()
+        if total_timeout and now - started > total_timeout:
+            timed_out = TIMEOUT_TOTAL
+        elif idle_timeout and now - activity[0] > idle_timeout:
+            timed_out = TIMEOUT_IDLE
+        if timed_out:
+            print(f"AVISO: {stage} sem saída há {now - activity[0]:.0f}s" if timed_out == TIMEOUT_IDLE
+                  else f"AVISO: {stage} excedeu o tempo máximo ({total_timeout:.0f}s)")
+            _stop(process)
+            reader.join(KILL_GRACE_SECONDS)
+            break
+
+    rusage = _wait_with_rusage(process) if process.returncode is None else None
+    process.stdout.close()
+
+    result = {
+        'stage': stage,
+        'ok': process.returncode == 0 and timed_out is None and not cancelled,
+        'returncode': process.returncode,
+        'timed_out': timed_out,
+        'cancelled': cancelled,
+        'tail': list(tail),
+        'wall': round(time.monotonic() - started, 2),
+        'cpu_user': round(rusage.ru_utime, 2) if rusage else None,
+        'cpu_system': round(rusage.ru_stime, 2) if rusage else None,
+        # ru_maxrss vem em KB no Linux
+        'max_rss_mb': round(rusage.ru_maxrss / 1024, 1) if rusage else None,
+    }
+    record_metrics(result)
+
+    if cancelled:
+        print(f"{stage} cancelado")
+    elif not result['ok']:
+        reason = f"timeout ({timed_out})" if timed_out else f"código {process.returncode}"
+        print(f"{stage} falhou ({reason}). Últimas linhas:")
+        for line in result['tail']:
+            print(f"  {line}")
+    return result
+
+
+def encode_timeout(media_seconds: Optional[float]) -> float:
+    """Tempo máximo para processar `media_seconds` de mídia (nunca menos que SHORT_JOB_TIMEOUT)."""
+    return max(SHORT_JOB_TIMEOUT, (media_seconds or 0) * ENCODE_TIMEOUT_FACTOR)
+
+
+def run_captured(argv: List[str], stage: str, timeout: float, input: Optional[bytes] = None,
+                 text: bool = True) -> subprocess.CompletedProcess:
+    """
+    subprocess.run com a saída capturada e `timeout`, para quem precisa do
+    stdout/stderr separados (JSON do ffprobe, estatísticas do ffmpeg) ou de
+    stdin. Ao estourar o tempo o filho já foi morto pelo run; devolve
+    returncode -1 e a saída vazia, como uma falha comum.
+    """
+    options = {'text': True, 'encoding': 'utf-8', 'errors': 'replace'} if text else {}
+    try:
+        return subprocess.run(argv, input=input, capture_output=True, timeout=timeout, **options)
+    except subprocess.TimeoutExpired:
+        print(f"AVISO: {stage} excedeu o tempo máximo ({timeout:.0f}s)")
+        empty = '' if text else b''
+        return subprocess.CompletedProcess(argv, -1, empty, f'timeout ({timeout:.0f}s)' if text else b'timeout')
+
+
+def record_metrics(result: Dict):
+    with _metrics_lock:
+        _stage_metrics.append({key: result[key] for key in
+                               ('stage', 'ok', 'wall', 'cpu_user', 'cpu_system', 'max_rss_mb')})
+
+
+def stage_metrics() -> List[Dict]:
+    with _metrics_lock:
+        return list(_stage_metrics)
+
+
+def format_stage_metrics(metrics: Optional[List[Dict]] = None) -> List[str]:
+    """Linhas de resumo das etapas (para o log do job)."""
+    lines = []
+    for m in (metrics if metrics is not None else stage_metrics()):
+        cpu = (m['cpu_user'] or 0) + (m['cpu_system'] or 0) if m['cpu_user'] is not None else None
+        lines.append(f"{m['stage']:<28} {'ok' if m['ok'] else 'FALHOU':<7} parede {m['wall']:8.1f}s"
+                     + (f" | CPU {cpu:8.1f}s" if cpu is not None else '')
+                     + (f" | RSS máx {m['max_rss_mb']:.0f} MB" if m['max_rss_mb'] is not None else ''))
+    return lines
@@ -0,0 +1,166 @@
+"""
+Publicação progressiva: o título fica assistível enquanto ainda é empacotado.
+
+O ffmpeg escreve numa playlist de trabalho (que só lista segmentos já
+fechados). Uma thread acompanha essa playlist e, assim que os primeiros
+segmentos existem, publica uma playlist EVENT em playlist.m3u8 e um
+metadata.json provisório com "status": "processing". Novos segmentos são
+acrescentados conforme ficam prontos e, ao final, a playlist vira VOD com
+EXT-X-ENDLIST.
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from hls_playlist import parse_media_playlist, write_media_playlist
+from startup_layout import with_startup_head
+
+MIN_SEGMENTS_TO_PUBLISH = 3
+POLL_INTERVAL = 1.0
+
+STATUS_PROCESSING = 'processing'
+STATUS_READY = 'ready'
+
+
+def write_metadata_atomic(metadata_path: str, metadata: Dict):
+    """Grava o metadata.json via arquivo temporário + rename (o Node pode ler a qualquer momento)."""
+    temp_path = metadata_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=4)
+    os.replace(temp_path, metadata_path)
+
+
+class ProgressivePublisher:
+    """Acompanha a playlist de trabalho do ffmpeg e publica o título aos poucos."""
+
+    def __init__(self, work_playlist: str, public_playlist: str, metadata_path: str,
+                 provisional_metadata: Dict, on_published: Optional[Callable] = None,
+                 min_segments: int = MIN_SEGMENTS_TO_PUBLISH, poll_interval: float = POLL_INTERVAL):
+        """
+        Args:
+            work_playlist: Playlist escrita pelo ffmpeg (nunca servida)
+            public_playlist: hls/playlist.m3u8 servida aos clientes
+            metadata_path: metadata.json do título
+            provisional_metadata: Metadados já conhecidos (sem o campo status)
+            on_published: Chamado uma vez, quando o título fica assistível
+            min_segments: Segmentos prontos necessários para publicar
+        """
+        self.work_playlist = work_playlist
+        self.public_playlist = public_playlist
+        self.metadata_path = metadata_path
+        self.provisional_metadata = provisional_metadata
+        self.on_published = on_published
+        self.min_segments = min_segments
+        self.poll_interval = poll_interval
+        # Segmentos iniciais gerados antes do ffmpeg principal (cabeça do copy)
+        self.prefix_segments = None
+
+        self.published_count = 0
+        self.published_at = None
+        self.started_at = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def published(self) -> bool:
+        return self.published_count > 0
+
+    def _ready_segments(self):
+        """Segmentos listados na playlist de trabalho cujo arquivo já existe."""
+        if not os.path.exists(self.work_playlist):
+            return []
+        try:
+            segments = parse_media_playlist(self.work_playlist)['segments']
+        except (OSError, ValueError):
+            # O ffmpeg reescreve a playlist no lugar; leitura pela metade
+            return []
+        hls_dir = os.path.dirname(self.work_playlist)
+        ready = []
+        for seg in segments:
+            if not os.path.exists(os.path.join(hls_dir, seg['uri'])):
+                break
+            ready.append(seg)
+        return ready
+
+    def poll(self):
+        """Uma iteração: publica ou acrescenta segmentos, se houver novos."""
+        with self._lock:
+            segments = self._ready_segments()
+            if len(segments) <= self.published_count:
+                return
+            if not self.published and len(segments) < self.min_segments:
+                return
+
+            # A cabeça entra desde a primeira publicação: numa EVENT só se acrescenta
+            # no fim, e o finalize() a mantém na frente
+            public = with_startup_head(self.prefix_segments, segments)
+            write_media_playlist(self.public_playlist, public, playlist_type='EVENT',
+                                 endlist=False, target_duration=self._target_duration(public),
+                                 start_time_offset=0)
+
+            if not self.published:
+                metadata = dict(self.provisional_metadata, status=STATUS_PROCESSING)
+                write_metadata_atomic(self.metadata_path, metadata)
+                self.published_at = time.monotonic()
+                elapsed = self.published_at - self.started_at if self.started_at else 0
+                print(f"Publicação progressiva: título assistível após {elapsed:.1f}s "
+                      f"({len(segments)} segmentos)")
+                self.published_count = len(segments)
+                if self.on_published:
+                    self.on_published()
+            else:
+                self.published_count = len(segments)
+
+    @staticmethod
+    def _target_duration(segments) -> int:
+        # Numa playlist EVENT o TARGETDURATION não pode mudar depois de publicado:
+        # usa folga para segmentos futuros mais longos que os primeiros
+        longest = max(seg['duration'] for seg in segments)
+        return max(int(longest + 0.999), 10)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"AVISO: Publicação progressiva: {e}")
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='progressive-publisher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        """
+        Despublica o título (uma estratégia falhou e a próxima vai reescrever
+        os segmentos). Ele volta a ser publicado pela próxima tentativa.
+        """
+        with self._lock:
+            for path in (self.public_playlist, self.metadata_path, self.work_playlist):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.published_count = 0
+            self.published_at = None
+
+    def finalize(self):
+        """
+        Para o acompanhamento e converte a playlist pública em VOD com
+        EXT-X-ENDLIST a partir da playlist final do ffmpeg. O metadata.json
+        final (status ready) é gravado pelo chamador.
+        """
+        self.stop()
+        with self._lock:
+            final = parse_media_playlist(self.work_playlist)
+            write_media_playlist(self.public_playlist, with_startup_head(self.prefix_segments, final['segments']),
+                                 playlist_type='VOD', endlist=True)
+            os.remove(self.work_playlist)
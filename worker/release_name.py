@@ -0,0 +1,210 @@
+"""
+Leitura estruturada de nomes de release ("Clown.In.A.Cornfield.2025.1080p.WEBRip.x265.10bit.AAC5.1-[YTS.MX]").
+
+O clean_filename_for_search antigo rodava uma dúzia de re.sub com
+IGNORECASE, mais um re.match por palavra, e devolvia só uma string; o main()
+extraía ano e variações de busca dela com mais expressões. Aqui uma única
+expressão pré-compilada percorre o nome uma vez e classifica cada token
+(ano, resolução, origem, codecs, áudio, grupo, palavra); o título é o que
+vem antes do ano ou do primeiro termo técnico.
+
+Os codecs usam os nomes do ffprobe (h264, hevc, av1, mpeg4, aac, ac3,
+eac3, dts...), para que as etapas seguintes comparem direto com a análise
+da fonte (ver packaging_hint).
+"""
+import re
+from typing import Dict, List, Optional
+
+from hls_strategy import COPY, TRANSCODE
+
+# Só extensões conhecidas saem do final: em "DD5.1" o ".1" não é extensão
+EXTENSION = re.compile(r'\.(?:mkv|mp4|m4v|avi|mov|wmv|ts|m2ts|webm|mpe?g|flv|srt|ass|ssa|sub|idx|nfo)$', re.IGNORECASE)
+
+# Cada grupo nomeado é um tipo de token. O grupo de release no fim ("-SPARKS",
+# "-[YTS.MX]") vem colado no token anterior, por isso fica fora das fronteiras.
+TOKEN = re.compile(r'''
+    (?P<group>-\s*\[?(?P<group_name>[^\W_][\w.]*?)\]?\s*$)
+  | (?<![^\W_])(?:
+        (?P<year>(?:19|20)\d\d)
+      | (?P<resolution>2160p|1440p|1080[pi]|720p|576[pi]|480p|360p|4k|uhd)
+      | (?P<source>web[-. ]?dl|web[-. ]?rip|web|blu[-. ]?ray|bd[-. ]?rip|br[-. ]?rip|bd[-. ]?remux|remux
+            |dvd[-. ]?rip|dvd[-. ]?scr|dvd[-. ]?r|dvd[59]?|hd[-. ]?rip|hdtv|pdtv|hd[-. ]?cam|cam[-. ]?rip|cam
+            |hd[-. ]?ts|telesync|ts|hd[-. ]?tc|telecine|tc|r5|scr|screener|vhs[-. ]?rip
+            |amzn|nf|hmax|dsnp|atvp)
+      | (?P<video_codec>[xh][-. ]?26[45]|hevc|avc|av1|xvid|divx|vp9|mpeg[-. ]?2)
+      | (?P<bit_depth>(?:8|10|12)[-. ]?bits?)
+      | (?P<hdr>hdr10(?:\+|plus)?|hdr|dolby[-. ]?vision|dovi|dv)
+      | (?P<audio>(?:ddp|dd\+|dd|e-?ac-?3|ac-?3|aac(?:[-. ]?lc)?|dts[-. ]?hd(?:[-. ]?ma)?|dts[-. ]?x|dts|truehd|atmos
+            |flac|mp3|opus|l?pcm)(?:[-. ]?[1-8][. ][01])?)
+      | (?P<channels>[1-8]\.[01])
+      | (?P<flag>extended(?:[-. ]cut)?|unrated|uncut|directors?[-. ]?cut|theatrical|remastered|restored|criterion
+            |imax|proper|repack|rerip|real|internal|limited|multi|dual[-. ]?audio|dubbed|subbed|hc|hardsub
+            |\d+(?:\.\d+)?[-. ]?(?:gb|mb)|\d+fps)
+      | (?P<site>yts(?:[-. ](?:mx|am|ag|lt))?|rarbg|1337x|eztv|ettv|tgx|torrentgalaxy|limetorrents
+            |www[-. ][\w-]+[-. ](?:com|org|net|to|me|lt))
+    )(?![^\W_])
+  | (?P<word>[^\W_]+(?:['’][^\W_]+)*|&)
+''', re.IGNORECASE | re.VERBOSE)
+
+# Termos técnicos que também são palavras de título ("The Cam", "Real Steel",
+# "Limited Partnership"): só contam como técnicos depois do ano ou colados ao
+# primeiro termo técnico forte
+WEAK = {'web', 'ts', 'tc', 'cam', 'scr', 'r5', 'dvd', 'dvd5', 'dvd9', 'dvdr', 'dv', 'hdr', 'uhd', '4k', 'nf', 'amzn',
+        'hmax', 'dsnp', 'atvp', 'avc', 'remux', 'screener', 'telecine', 'telesync', 'atmos', 'flac', 'opus', 'pcm',
+        'lpcm', 'mp3', 'dts', 'hc', 'real', 'proper', 'repack', 'limited', 'internal', 'multi', 'theatrical', 'restored',
+        'criterion', 'imax', 'remastered', 'extended', 'unrated', 'uncut', 'dubbed', 'subbed', 'hardsub'}
+WEAK_KINDS = {'channels'}
+
+RESOLUTIONS = {'4k': '2160p', 'uhd': '2160p'}
+SOURCES = {
+    'webdl': 'WEB-DL', 'webrip': 'WEBRip', 'web': 'WEB', 'bluray': 'BluRay', 'bdrip': 'BDRip', 'brrip': 'BRRip',
+    'bdremux': 'Remux', 'remux': 'Remux', 'dvdrip': 'DVDRip', 'dvdscr': 'DVDScr', 'dvdr': 'DVD', 'dvd': 'DVD',
+    'dvd5': 'DVD', 'dvd9': 'DVD', 'hdrip': 'HDRip', 'hdtv': 'HDTV', 'pdtv': 'HDTV', 'hdcam': 'CAM', 'camrip': 'CAM',
+    'cam': 'CAM', 'hdts': 'TS', 'telesync': 'TS', 'ts': 'TS', 'hdtc': 'TC', 'telecine': 'TC', 'tc': 'TC', 'r5': 'R5',
+    'scr': 'SCR', 'screener': 'SCR', 'vhsrip': 'VHSRip',
+    # Serviços de streaming: valem WEB quando o tipo (WEB-DL/WEBRip) não aparece
+    'amzn': 'WEB', 'nf': 'WEB', 'hmax': 'WEB', 'dsnp': 'WEB', 'atvp': 'WEB',
+}
+VIDEO_CODECS = {'x264': 'h264', 'h264': 'h264', 'avc': 'h264', 'x265': 'hevc', 'h265': 'hevc', 'hevc': 'hevc',
+                'av1': 'av1', 'xvid': 'mpeg4', 'divx': 'mpeg4', 'vp9': 'vp9', 'mpeg2': 'mpeg2video'}
+AUDIO_CODECS = {'dd': 'ac3', 'ac3': 'ac3', 'ddp': 'eac3', 'dd+': 'eac3', 'eac3': 'eac3', 'aac': 'aac', 'aaclc': 'aac',
+                'dts': 'dts', 'dtshd': 'dts', 'dtshdma': 'dts', 'dtsx': 'dts', 'truehd': 'truehd', 'atmos': 'truehd',
+                'flac': 'flac', 'mp3': 'mp3', 'opus': 'opus', 'pcm': 'pcm', 'lpcm': 'pcm'}
+AUDIO_LAYOUT = re.compile(r'([1-8])[. ]?([01])$')
+HDR_FORMATS = {'hdr': 'HDR', 'hdr10': 'HDR10', 'hdr10+': 'HDR10+', 'hdr10plus': 'HDR10+', 'dolbyvision': 'DV',
+               'dovi': 'DV', 'dv': 'DV'}
+
+# Vídeo que o HLS não leva por copy (mesma regra da detecção de codecs do main.py)
+TRANSCODE_CODECS = {'hevc', 'av1', 'mpeg4', 'vp9', 'mpeg2video'}
+
+NOT_TECHNICAL = {'word', 'year', 'group', 'site'}
+_SEPARATORS = str.maketrans('', '', '-. ')
+
+
+def _tokenize(name: str) -> List[tuple]:
+    """(tipo, texto, chave) de cada token; a chave é o texto minúsculo sem separadores."""
+    tokens = []
+    for match in TOKEN.finditer(name):
+        kind = match.lastgroup
+        text = match.group('group_name' if kind == 'group' else kind)
+        tokens.append((kind, text, text if kind == 'word' else text.lower().translate(_SEPARATORS)))
+    return tokens
+
+
+def _is_strong(kind: str, key: str) -> bool:
+    return kind not in NOT_TECHNICAL and kind not in WEAK_KINDS and key not in WEAK
+
+
+def empty_release() -> Dict:
+    return {'title': '', 'year': None, 'resolution': None, 'source': None, 'video_codec': None, 'bit_depth': None,
+            'audio': None, 'audio_channels': None, 'hdr': None, 'flags': [], 'release_group': None}
+
+
+def parse_release_name(filename: str) -> Dict:
+    """
+    Campos de um nome de release/arquivo, numa única passada do tokenizador.
+
+    Returns:
+        dict com title, year, resolution, source, video_codec, bit_depth,
+        audio, audio_channels, hdr, flags e release_group (None/[] quando
+        ausentes)
+    """
+    release = empty_release()
+    tokens = _tokenize(EXTENSION.sub('', filename.strip()))
+
+    first_strong = next((i for i, (kind, _, key) in enumerate(tokens) if _is_strong(kind, key)), len(tokens))
+    # Ano: o último antes do primeiro termo técnico que tenha algo antes
+    # ("2001 A Space Odyssey 1968", "Blade Runner 2049 2017", mas "1917 1080p")
+    year_index = next((i for i in range(first_strong - 1, 0, -1) if tokens[i][0] == 'year'), None)
+    if year_index is not None:
+        title_end, tech_start = year_index, year_index + 1
+        release['year'] = int(tokens[year_index][1])
+    else:
+        # Termos fracos colados no primeiro forte ("CAM x264") também são técnicos
+        title_end = first_strong
+        while title_end > 1 and tokens[title_end - 1][0] not in NOT_TECHNICAL:
+            title_end -= 1
+        tech_start = title_end
+
+    words = []
+    for kind, text, _ in tokens[:title_end]:
+        if kind == 'group':
+            # "-Man" de "Spider-Man" sem nada técnico antes: é título
+            words.extend(text.replace('.', ' ').split())
+        elif kind != 'site':
+            words.append(text)
+    release['title'] = ' '.join(words)
+
+    for kind, text, key in tokens[tech_start:]:
+        if kind == 'year':
+            release['year'] = release['year'] or int(text)
+        elif kind == 'group':
+            release['release_group'] = text
+        elif kind == 'site':
+            # "[YTS.MX]" sem hífen faz as vezes do grupo; sites "www.*" não
+            if not key.startswith('www'):
+                release['release_group'] = release['release_group'] or text.upper()
+        elif kind == 'resolution':
+            release['resolution'] = release['resolution'] or RESOLUTIONS.get(key, key)
+        elif kind == 'source':
+            # Tipo explícito (WEB-DL, WEBRip, Remux) vale mais que WEB/serviço/BluRay
+            if release['source'] in (None, 'WEB') or (release['source'] == 'BluRay' and key == 'remux'):
+                release['source'] = SOURCES[key]
+        elif kind == 'video_codec':
+            release['video_codec'] = release['video_codec'] or VIDEO_CODECS[key]
+        elif kind == 'bit_depth':
+            release['bit_depth'] = int(key.rstrip('bits'))
+        elif kind == 'hdr':
+            release['hdr'] = release['hdr'] or HDR_FORMATS[key]
+        elif kind == 'audio':
+            layout = AUDIO_LAYOUT.search(key)
+            codec = key[:layout.start()] if layout else key
+            release['audio'] = release['audio'] or AUDIO_CODECS[codec]
+            if layout:
+                release['audio_channels'] = release['audio_channels'] or f"{layout.group(1)}.{layout.group(2)}"
+        elif kind == 'channels':
+            release['audio_channels'] = release['audio_channels'] or text
+        elif kind == 'flag':
+            release['flags'].append(key)
+    return release
+
+
+def title_with_year(release: Dict) -> str:
+    """Título + ano, como o termo de busca (e título de fallback) usado pelo worker."""
+    if release['year']:
+        return f"{release['title']} {release['year']}".strip()
+    return release['title']
+
+
+def title_variations(release: Dict) -> List[str]:
+    """Variações de busca no TMDB, na ordem de tentativa, a partir dos campos já separados."""
+    full = title_with_year(release)
+    variations = [full]
+    words = full.split()
+    if len(words) > 3:
+        # Termo longo: primeiras palavras e, antes de tudo, o título sem o ano
+        variations.append(' '.join(words[:3]))
+        if release['year'] and len(release['title'].split()) >= 2:
+            variations.insert(0, release['title'])
+    without_numbers = ' '.join(word for word in words if not word.isdigit())
+    if without_numbers:
+        variations.append(without_numbers)
+    unique = []
+    for variation in variations:
+        if variation and variation not in unique:
+            unique.append(variation)
+    return unique
+
+
+def packaging_hint(release: Dict) -> Optional[str]:
+    """
+    Estratégia provável pelo nome: TRANSCODE para vídeo que o HLS não leva por
+    copy (HEVC, AV1, XviD, 10 bits, HDR), COPY para H.264 8 bits, None quando
+    o nome não diz. O ffprobe continua decidindo; a dica serve quando ele falha.
+    """
+    codec = release.get('video_codec')
+    if codec in TRANSCODE_CODECS or (release.get('bit_depth') or 8) > 8 or release.get('hdr'):
+        return TRANSCODE
+    if codec == 'h264':
+        return COPY
+    return None
@@ -0,0 +1,103 @@
+"""
+Layout HLS de arquivo único com EXT-X-BYTERANGE.
+
+Cada título era guardado como centenas ou milhares de segmentNNN.ts, o que
+pesa em inodes, listagens e backups do NAS. Aqui os segmentos de uma
+rendição são concatenados num único media.ts (MPEG-TS pode ser concatenado
+byte a byte, sem remux nem recodificação) e a playlist passa a apontar
+faixas de bytes dele.
+
+A troca é segura contra interrupções: media.ts e a playlist nova são
+escritos em arquivos temporários, renomeados nessa ordem e só então os
+segmentos antigos são apagados. Uma interrupção em qualquer ponto deixa a
+playlist antiga ou a nova, ambas válidas.
+"""
+import os
+import shutil
+from typing import Dict, List
+
+from hls_playlist import parse_media_playlist, write_media_playlist
+
+MEDIA_FILE = 'media.ts'
+LAYOUT_SEGMENTS = 'segments'
+LAYOUT_SINGLE_FILE = 'single_file'
+COPY_BUFFER = 4 * 1024 * 1024
+
+
+def is_single_file(segments: List[Dict]) -> bool:
+    """Todos os segmentos já são faixas de um mesmo arquivo."""
+    return bool(segments) and all(seg.get('byterange') for seg in segments) \
+        and len({seg['uri'] for seg in segments}) == 1
+
+
+def _copy_range(source, target, offset: int, length: int):
+    source.seek(offset)
+    remaining = length
+    while remaining > 0:
+        chunk = source.read(min(COPY_BUFFER, remaining))
+        if not chunk:
+            raise ValueError(f"Segmento menor que o esperado: {source.name}")
+        target.write(chunk)
+        remaining -= len(chunk)
+
+
+def consolidate_segments(hls_dir: str, playlist_name: str = 'playlist.m3u8',
+                         media_name: str = MEDIA_FILE) -> int:
+    """
+    Concatena os segmentos da playlist em `media_name` e reescreve a
+    playlist com EXT-X-BYTERANGE. Não faz nada se ela já é de arquivo único.
+
+    Returns:
+        Número de segmentos consolidados (0 se nada mudou)
+    """
+    playlist_path = os.path.join(hls_dir, playlist_name)
+    segments = parse_media_playlist(playlist_path)['segments']
+    if not segments or is_single_file(segments):
+        return 0
+
+    media_path = os.path.join(hls_dir, media_name)
+    temp_media = media_path + '.tmp'
+    consolidated = []
+    offset = 0
+    with open(temp_media, 'wb') as target:
+        for seg in segments:
+            source_path = os.path.join(hls_dir, seg['uri'])
+            with open(source_path, 'rb') as source:
+                if seg.get('byterange'):
+                    length, _, start = seg['byterange'].partition('@')
+                    length, start = int(length), int(start or 0)
+                else:
+                    length, start = os.path.getsize(source_path), 0
+                _copy_range(source, target, start, length)
+            consolidated.append({
+                'duration': seg['duration'],
+                'uri': media_name,
+                'discontinuity': seg.get('discontinuity', False),
+                'byterange': f'{length}@{offset}'
+            })
+            offset += length
+        target.flush()
+        os.fsync(target.fileno())
+
+    os.replace(temp_media, media_path)
+    write_media_playlist(playlist_path, consolidated, playlist_type='VOD', endlist=True)
+
+    for uri in {seg['uri'] for seg in segments}:
+        if uri != media_name and os.path.exists(os.path.join(hls_dir, uri)):
+            os.remove(os.path.join(hls_dir, uri))
+    print(f"Layout de arquivo único: {len(consolidated)} segmentos em {media_name} "
+          f"({offset / (1024 * 1024):.0f} MB)")
+    return len(consolidated)
+
+
+def remove_stale_files(hls_dir: str, keep: List[str]):
+    """Remove .ts que nenhuma playlist referencia (restos de uma conversão interrompida)."""
+    for name in os.listdir(hls_dir):
+        if name.endswith('.ts') and name not in keep:
+            os.remove(os.path.join(hls_dir, name))
+        elif name.endswith('.tmp'):
+            path = os.path.join(hls_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
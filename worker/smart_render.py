@@ -0,0 +1,257 @@
+"""
+Smart render: recodifica só os GOPs que impedem uma segmentação regular.
+
+Fontes com GOPs muito longos ou irregulares geram, no copy, segmentos
+enormes e desiguais (e a busca fica lenta); a alternativa era recodificar o
+filme inteiro. Aqui o índice de keyframes da fonte é lido com ffprobe (só
+demux, sem decodificar), os intervalos entre keyframes maiores que
+LONG_GOP_SECONDS viram trechos recodificados com keyframes a cada
+SEGMENT_DURATION segundos, e todo o resto é copiado. Cada trecho começa e
+termina em keyframes da fonte, é empacotado num ffmpeg próprio e as
+playlists são unidas com EXT-X-DISCONTINUITY nas emendas.
+"""
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from chunked_encoder import (SEGMENT_DURATION, STARTUP_SEGMENT_DURATIONS, build_encode_command,
+                             default_worker_count, merge_chunk_playlists, probe_duration)
+from hls_strategy import LONG_GOP_SECONDS
+from process_supervisor import PROBE_TIMEOUT, encode_timeout, run_captured, run_supervised
+
+COPY_REGION = 'copy'
+ENCODE_REGION = 'encode'
+# Trechos de copy mais curtos que isso entre dois trechos recodificados são
+# absorvidos por eles (cada emenda custa um ffmpeg e uma descontinuidade)
+MIN_COPY_REGION_SECONDS = 20
+# Acima dessa fração recodificada, a recodificação completa é mais simples
+MAX_ENCODE_FRACTION = 0.5
+# Keyframe "no início" do arquivo, apesar de pequenos atrasos de PTS
+START_TOLERANCE = 0.1
+
+
+def probe_keyframe_index(video_file: str) -> Tuple[float, List[float]]:
+    """
+    Índice de keyframes do primeiro fluxo de vídeo (só demux).
+
+    Returns:
+        (start_time do arquivo, keyframes em segundos relativos ao início)
+    """
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+           '-show_entries', 'packet=pts_time,flags:format=start_time',
+           '-of', 'compact=p=0:nk=0', video_file]
+    result = run_captured(cmd, 'ffprobe:keyframes', PROBE_TIMEOUT)
+    if result.returncode != 0:
+        return 0.0, []
+
+    start_time = 0.0
+    keyframes = []
+    for line in result.stdout.splitlines():
+        fields = dict(part.split('=', 1) for part in line.strip().split('|') if '=' in part)
+        if 'start_time' in fields:
+            try:
+                start_time = float(fields['start_time'])
+            except ValueError:
+                pass
+        elif 'K' in fields.get('flags', ''):
+            try:
+                keyframes.append(float(fields['pts_time']))
+            except (KeyError, ValueError):
+                continue
+    return start_time, sorted(k - start_time for k in keyframes)
+
+
+def _merge_runs(regions: List[Dict]) -> List[Dict]:
+    merged = []
+    for region in regions:
+        if merged and merged[-1]['mode'] == region['mode']:
+            merged[-1]['end'] = region['end']
+        else:
+            merged.append(dict(region))
+    return merged
+
+
+def plan_regions(keyframes: List[float], duration: float, startup: bool = False) -> List[Dict]:
+    """
+    Divide o filme em trechos de copy e de recodificação.
+
+    Args:
+        keyframes: Keyframes da fonte (segundos, relativos ao início)
+        duration: Duração do filme
+        startup: Recodifica também o início (até o primeiro keyframe após os
+            segmentos iniciais curtos), como no layout de início rápido
+
+    Returns:
+        Lista de {'start', 'end', 'mode'} contígua de 0 a duration
+    """
+    points = sorted(k for k in keyframes if 0 <= k < duration)
+    has_start_keyframe = bool(points) and points[0] <= START_TOLERANCE
+    if has_start_keyframe:
+        points[0] = 0.0
+    else:
+        # Sem keyframe no início o trecho até o primeiro não pode ser copiado
+        points = [0.0] + points
+    bounds = points + [duration]
+
+    head_end = sum(STARTUP_SEGMENT_DURATIONS) if startup else 0
+    regions = []
+    for start, end in zip(bounds, bounds[1:]):
+        needs_encode = (end - start > LONG_GOP_SECONDS or start < head_end
+                        or (start == 0.0 and not has_start_keyframe))
+        regions.append({'start': start, 'end': end, 'mode': ENCODE_REGION if needs_encode else COPY_REGION})
+    regions = _merge_runs(regions)
+
+    # Copy curto entre trechos recodificados (ou no fim) vira recodificação
+    for i, region in enumerate(regions):
+        if region['mode'] != COPY_REGION or region['end'] - region['start'] >= MIN_COPY_REGION_SECONDS:
+            continue
+        neighbours = [regions[j]['mode'] for j in (i - 1, i + 1) if 0 <= j < len(regions)]
+        if neighbours and all(mode == ENCODE_REGION for mode in neighbours):
+            region['mode'] = ENCODE_REGION
+    regions = _merge_runs(regions)
+
+    for region in regions:
+        region['startup'] = startup and region['mode'] == ENCODE_REGION and region['start'] == 0.0
+    return regions
+
+
+def encode_fraction(regions: List[Dict]) -> float:
+    total = sum(r['end'] - r['start'] for r in regions)
+    encoded = sum(r['end'] - r['start'] for r in regions if r['mode'] == ENCODE_REGION)
+    return encoded / total if total else 0.0
+
+
+def build_region_command(video_file: str, region: Dict, playlist_path: str, segment_pattern: str,
+                         bit_depth: int, audio_copy: bool, encoding: Optional[Dict] = None) -> List[str]:
+    """Comando ffmpeg de um trecho (copy ou recodificação), com timestamps originais."""
+    start = region['start']
+    length = region['end'] - region['start']
+    if region['mode'] == ENCODE_REGION:
+        return build_encode_command(video_file, playlist_path, segment_pattern, bit_depth,
+                                    start=start, duration=length, encoding=encoding,
+                                    startup=region.get('startup', False), audio_copy=audio_copy)
+
+    cmd = ['ffmpeg', '-hide_banner', '-y']
+    if start:
+        cmd += ['-ss', f'{start:.3f}']
+    cmd += ['-t', f'{length:.3f}', '-i', video_file, '-c:v', 'copy']
+    cmd += ['-c:a', 'copy'] if audio_copy else ['-c:a', 'aac', '-ar', '48000', '-b:a', '128k']
+    if start:
+        cmd += ['-output_ts_offset', f'{start:.3f}']
+    cmd += ['-f', 'hls',
+            '-hls_time', str(SEGMENT_DURATION), '-hls_playlist_type', 'vod',
+            '-hls_flags', 'independent_segments',
+            '-hls_segment_filename', segment_pattern, playlist_path]
+    return cmd
+
+
+def _run_region(task: Dict) -> Dict:
+    os.makedirs(task['region_dir'], exist_ok=True)
+    cmd = task['command']
+    cmd[1:1] = ['-v', 'error']
+    started = time.monotonic()
+    region = task['region']
+    result = run_supervised(cmd, f"ffmpeg:trecho {region['start']:.1f}s",
+                            total_timeout=encode_timeout(region['end'] - region['start']),
+                            should_stop=task['cancel'].is_set)
+    return {
+        'ok': result['ok'] and os.path.exists(task['playlist']),
+        'elapsed': time.monotonic() - started,
+        'error': '\n'.join(result['tail'])[-2000:] if not result['ok'] else None
+    }
+
+
+def smart_render_hls(video_file: str, hls_dir: str, bit_depth: int, playlist_path: str,
+                     audio_copy: bool = True, startup: bool = False,
+                     workers: Optional[int] = None, encoding: Optional[Dict] = None,
+                     progress_callback: Optional[Callable] = None) -> bool:
+    """
+    Empacota o vídeo em HLS recodificando só os trechos necessários.
+
+    Args:
+        video_file: Arquivo de origem (vídeo copiável)
+        hls_dir: Pasta final do HLS
+        bit_depth: Profundidade de cor da fonte
+        playlist_path: Playlist final (ou a de trabalho da publicação progressiva)
+        audio_copy: Copia o áudio; False recodifica para AAC em todos os trechos
+        startup: Segmentos iniciais curtos no primeiro trecho
+        workers: Trechos simultâneos
+        encoding: Parâmetros do otimizador por título
+        progress_callback: Função (message, progress 0-100)
+
+    Returns:
+        True se a playlist foi gerada; False indica que o chamador deve
+        seguir para a próxima estratégia.
+    """
+    def report(message, progress=None):
+        if progress_callback:
+            progress_callback(message, progress)
+        print(f"Smart render: {message}")
+
+    duration = probe_duration(video_file)
+    _, keyframes = probe_keyframe_index(video_file)
+    if not duration or not keyframes:
+        report("Índice de keyframes indisponível")
+        return False
+
+    regions = plan_regions(keyframes, duration, startup=startup)
+    fraction = encode_fraction(regions)
+    encode_count = sum(1 for r in regions if r['mode'] == ENCODE_REGION)
+    report(f"{len(keyframes)} keyframes, {len(regions)} trechos, "
+           f"{encode_count} recodificados ({fraction * 100:.1f}% do filme)", 0)
+    if fraction > MAX_ENCODE_FRACTION:
+        report("GOPs longos em boa parte do filme, a recodificação completa compensa mais")
+        return False
+
+    work_dir = os.path.join(hls_dir, '.smart')
+    shutil.rmtree(work_dir, ignore_errors=True)
+    cancel = threading.Event()
+    tasks = []
+    for i, region in enumerate(regions):
+        region_dir = os.path.join(work_dir, f'region{i:04d}')
+        playlist = os.path.join(region_dir, 'region.m3u8')
+        tasks.append({
+            'region': region,
+            'region_dir': region_dir,
+            'playlist': playlist,
+            'cancel': cancel,
+            'command': build_region_command(video_file, region, playlist,
+                                            os.path.join(region_dir, 'part%05d.ts'),
+                                            bit_depth, audio_copy, encoding)
+        })
+
+    started = time.monotonic()
+    done_seconds = 0.0
+    try:
+        # Os trechos rodam em subprocessos; threads bastam para coordená-los
+        with ThreadPoolExecutor(max_workers=workers or default_worker_count()) as pool:
+            futures = {pool.submit(_run_region, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                result = future.result()
+                region = task['region']
+                if not result['ok']:
+                    report(f"Trecho {region['mode']} {region['start']:.1f}-{region['end']:.1f}s falhou: {result['error']}")
+                    # Sair do with espera os trechos em andamento: o evento faz o
+                    # supervisor de cada um encerrar o ffmpeg
+                    cancel.set()
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                done_seconds += region['end'] - region['start']
+                report(f"Trecho {region['mode']} {region['start']:.1f}-{region['end']:.1f}s pronto",
+                       done_seconds / duration * 100)
+
+        if cancel.is_set():
+            return False
+        segment_count = merge_chunk_playlists([task['playlist'] for task in tasks], hls_dir, playlist_path)
+        report(f"{segment_count} segmentos em {time.monotonic() - started:.0f}s", 100)
+        return True
+    except Exception as e:
+        report(f"Erro no smart render: {e}")
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,72 @@
+"""
+Referência de fala de um filme para a sincronização de legendas.
+
+O ffsubsync decodificava o áudio do filme inteiro e rodava a detecção de voz
+(VAD) a cada legenda sincronizada: dois idiomas, duas decodificações
+completas, e uma nova busca depois da ingestão já não tinha mais o vídeo.
+Aqui a atividade de fala é extraída uma vez por vídeo (VAD webrtc do próprio
+ffsubsync, 100 amostras por segundo) e guardada na pasta do filme como
+speech_reference.npz — um vetor 0/1 em uint8 comprimido, dezenas de KB por
+hora. O ffsubsync aceita esse .npz como referência no lugar do vídeo.
+"""
+import os
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # instalação mínima, sem ffsubsync
+    np = None
+
+SPEECH_REFERENCE_FILE = 'speech_reference.npz'
+# Amostras por segundo (ffsubsync.constants.SAMPLE_RATE)
+SPEECH_SAMPLE_RATE = 100
+# Taxa em que o áudio é decodificado para o VAD (webrtc aceita 8/16/32/48 kHz)
+VAD_FRAME_RATE = 48000
+
+
+def reference_path(movie_folder: str) -> str:
+    return os.path.join(movie_folder, SPEECH_REFERENCE_FILE)
+
+
+def compute_speech_reference(video_file: str) -> "np.ndarray":
+    """Uma decodificação só do áudio (sem vídeo) + VAD, como o ffsubsync faria."""
+    from ffsubsync.speech_transformers import VideoSpeechTransformer
+
+    transformer = VideoSpeechTransformer(vad='webrtc', sample_rate=SPEECH_SAMPLE_RATE,
+                                         frame_rate=VAD_FRAME_RATE, non_speech_label=0.0)
+    return transformer.fit(video_file).transform(video_file)
+
+
+def save_speech_reference(path: str, speech: "np.ndarray"):
+    # np.savez acrescenta .npz a nomes sem a extensão
+    temp_path = path[:-len('.npz')] + '.tmp.npz'
+    np.savez_compressed(temp_path, speech=(np.asarray(speech) >= 1.0).astype(np.uint8),
+                        sample_rate=SPEECH_SAMPLE_RATE)
+    os.replace(temp_path, path)
+
+
+def load_speech_reference(path: str) -> Optional["np.ndarray"]:
+    try:
+        with np.load(path) as data:
+            return data['speech'].astype(float)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def ensure_speech_reference(movie_folder: str, video_file: Optional[str] = None) -> Optional[str]:
+    """
+    Caminho da referência do filme, extraindo-a de `video_file` se ainda não
+    existe. None se não há referência nem vídeo para extraí-la.
+    """
+    path = reference_path(movie_folder)
+    if os.path.exists(path):
+        return path
+    if np is None or not video_file or not os.path.exists(video_file):
+        return None
+    speech = compute_speech_reference(video_file)
+    if speech is None or not len(speech):
+        return None
+    save_speech_reference(path, speech)
+    print(f"Referência de fala salva: {len(speech) / SPEECH_SAMPLE_RATE / 60:.0f} min, "
+          f"{os.path.getsize(path) // 1024} KB")
+    return path
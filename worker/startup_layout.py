@@ -0,0 +1,232 @@
+"""
+Layout de segmentos otimizado para o início da reprodução.
+
+O player só mostra o primeiro quadro depois de baixar as playlists e o
+primeiro segmento inteiro. Com segmentos uniformes de 4s (ou, no copy,
+segmentos do tamanho do GOP da fonte, às vezes 10s ou mais) isso atrasa o
+play e cada CHANGE_MOVIE das salas. Aqui:
+
+- na recodificação, os primeiros segmentos têm 1s, 1s e 2s (keyframes
+  forçados, ver chunked_encoder.force_keyframes_expr);
+- no copy, só o trecho até o primeiro keyframe da fonte após 4s é
+  recodificado nesse layout ("cabeça"); o resto continua em copy a partir
+  desse keyframe;
+- ao final, a media playlist é reescrita com as tags corretas e uma master
+  playlist com CODECS/RESOLUTION é gerada, para o hls.js não precisar
+  sondar o primeiro segmento.
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+from chunked_encoder import STARTUP_SEGMENT_DURATIONS, build_encode_command
+from media_probe import probe_media
+from hls_playlist import (parse_media_playlist, write_media_playlist, write_master_playlist,
+                          video_codec_string, audio_codec_string)
+from iframe_playlist import write_iframes_for
+from process_supervisor import PROBE_TIMEOUT, encode_timeout, run_captured, run_supervised
+
+HEAD_PLAYLIST = '.startup.m3u8'
+HEAD_SEGMENT_PATTERN = 'startup%02d.ts'
+# Acima disso a cabeça recodificada custa mais do que economiza
+MAX_HEAD_SECONDS = 20
+MASTER_PLAYLIST = 'master.m3u8'
+
+
+def _probe_json(args: List[str]) -> Dict:
+    result = run_captured(['ffprobe', '-v', 'error'] + args + ['-of', 'json'], 'ffprobe', PROBE_TIMEOUT)
+    if result.returncode != 0:
+        return {}
+    try:
+        return json.loads(result.stdout)
+    except json.JSONDecodeError:
+        return {}
+
+
+def find_copy_head_end(video_file: str) -> Optional[float]:
+    """
+    Primeiro keyframe da fonte a partir do fim dos segmentos iniciais,
+    relativo ao início do arquivo (o -ss do ffmpeg desconta o start_time).
+    None se não houver keyframe até MAX_HEAD_SECONDS.
+    """
+    # Os keyframes da janela inicial já vêm da análise única da fonte
+    info = probe_media(video_file)
+    if not info:
+        return None
+    try:
+        start_time = float(info.format.get('start_time') or 0)
+    except ValueError:
+        start_time = 0.0
+
+    head_min = sum(STARTUP_SEGMENT_DURATIONS)
+    keyframes = [k - start_time for k in info.keyframes]
+
+    candidates = sorted(k for k in keyframes if head_min <= k <= MAX_HEAD_SECONDS)
+    return candidates[0] if candidates else None
+
+
+def encode_startup_head(video_file: str, hls_dir: str, bit_depth: int, head_end: float,
+                        encoding: Optional[Dict] = None) -> Optional[List[Dict]]:
+    """
+    Recodifica [0, head_end) em segmentos curtos (startupNN.ts).
+
+    Returns:
+        Segmentos da cabeça (formato de parse_media_playlist) ou None se a
+        recodificação falhou; nesse caso o copy segue sem cabeça.
+    """
+    playlist_path = os.path.join(hls_dir, HEAD_PLAYLIST)
+    cmd = build_encode_command(video_file, playlist_path, os.path.join(hls_dir, HEAD_SEGMENT_PATTERN),
+                               bit_depth, duration=head_end, encoding=encoding, startup=True)
+    result = run_supervised(cmd, 'ffmpeg:segmentos iniciais', total_timeout=encode_timeout(head_end))
+    if not result['ok'] or not os.path.exists(playlist_path):
+        # A saída do ffmpeg já foi impressa pelo supervisor
+        print("AVISO: Falha ao gerar os segmentos iniciais")
+        return None
+
+    segments = parse_media_playlist(playlist_path)['segments']
+    os.remove(playlist_path)
+    print(f"Segmentos iniciais: {[round(seg['duration'], 2) for seg in segments]} (copy a partir de {head_end:.3f}s)")
+    return segments
+
+
+def with_startup_head(head_segments: Optional[List[Dict]], segments: List[Dict]) -> List[Dict]:
+    """Cabeça + segmentos do copy, com descontinuidade na emenda."""
+    if not head_segments or not segments:
+        return segments
+    tail = [dict(segments[0], discontinuity=True)] + segments[1:]
+    return head_segments + tail
+
+
+def discard_startup_head(hls_dir: str, head_segments: Optional[List[Dict]]):
+    """Remove os arquivos da cabeça (a estratégia final não os usa)."""
+    for seg in head_segments or []:
+        path = os.path.join(hls_dir, seg['uri'])
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _segment_size(hls_dir: str, seg: Dict) -> int:
+    if seg.get('byterange'):
+        return int(seg['byterange'].split('@')[0])
+    return os.path.getsize(os.path.join(hls_dir, seg['uri']))
+
+
+def _frame_rate(stream: Dict) -> Optional[float]:
+    try:
+        num, den = (stream.get('avg_frame_rate') or '0/0').split('/')
+        return int(num) / int(den) if int(den) else None
+    except ValueError:
+        return None
+
+
+def describe_variant(hls_dir: str, media_playlist: str = 'playlist.m3u8') -> Optional[Dict]:
+    """
+    Atributos EXT-X-STREAM-INF da media playlist: banda de pico e média
+    (pelos tamanhos dos segmentos), CODECS, RESOLUTION e FRAME-RATE (pelo
+    ffprobe de um segmento do meio, representativo do corpo do filme).
+    """
+    segments = parse_media_playlist(os.path.join(hls_dir, media_playlist))['segments']
+    timed = [seg for seg in segments if seg['duration'] > 0]
+    if not timed:
+        return None
+
+    sizes = [_segment_size(hls_dir, seg) for seg in timed]
+    bandwidth = max(size * 8 / seg['duration'] for size, seg in zip(sizes, timed))
+    average = sum(sizes) * 8 / sum(seg['duration'] for seg in timed)
+
+    sample = timed[len(timed) // 2]
+    streams = _probe_json(['-show_entries',
+                           'stream=codec_type,codec_name,profile,level,width,height,avg_frame_rate',
+                           os.path.join(hls_dir, sample['uri'])]).get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), {})
+
+    variant = {'uri': media_playlist, 'bandwidth': bandwidth, 'average_bandwidth': average,
+               'video_codec': video_codec_string(video)}
+    codecs = [c for c in (variant['video_codec'], audio_codec_string(audio)) if c]
+    # CODECS incompleto é pior que ausente: o player descartaria o fluxo não listado
+    if len(codecs) == len([s for s in (video, audio) if s]):
+        variant['codecs'] = ','.join(codecs)
+    if video.get('width') and video.get('height'):
+        variant['resolution'] = f"{video['width']}x{video['height']}"
+    if _frame_rate(video):
+        variant['frame_rate'] = _frame_rate(video)
+    return variant
+
+
+def _describe_audio_renditions(hls_dir: str, renditions: List[Dict]) -> List[Dict]:
+    """Banda e CODECS de cada rendition de áudio, descritas como variantes da sua pasta."""
+    media = []
+    for rendition in renditions:
+        folder, playlist = os.path.split(rendition['uri'])
+        described = describe_variant(os.path.join(hls_dir, folder), playlist) or {}
+        media.append({
+            'group': rendition['group'],
+            'name': rendition['name'],
+            'language': rendition['language'],
+            'default': rendition['default'],
+            'uri': rendition['uri'],
+            'bandwidth': described.get('bandwidth', 0),
+            'average_bandwidth': described.get('average_bandwidth', 0),
+            'codecs': described.get('codecs'),
+        })
+    return media
+
+
+def finalize_playlists(hls_dir: str, media_playlist: str = 'playlist.m3u8', iframes: bool = True,
+                       audio_renditions: Optional[List[Dict]] = None) -> bool:
+    """
+    Reescreve a media playlist final com as tags corretas (TARGETDURATION
+    arredondado, VERSION, INDEPENDENT-SEGMENTS) e gera master.m3u8, com a
+    playlist de I-frames (iframes.m3u8) quando `iframes` e as renditions de
+    áudio por idioma (audio_renditions.package_audio_renditions) como
+    EXT-X-MEDIA.
+
+    Returns:
+        True se a master playlist foi escrita
+    """
+    playlist_path = os.path.join(hls_dir, media_playlist)
+    parsed = parse_media_playlist(playlist_path)
+    write_media_playlist(playlist_path, parsed['segments'], playlist_type='VOD', endlist=True)
+
+    try:
+        variant = describe_variant(hls_dir, media_playlist)
+    except OSError as e:
+        print(f"AVISO: Não foi possível descrever a variante HLS: {e}")
+        return False
+    if not variant:
+        return False
+
+    media = []
+    if audio_renditions:
+        try:
+            media = _describe_audio_renditions(hls_dir, audio_renditions)
+        except OSError as e:
+            print(f"AVISO: Não foi possível descrever as renditions de áudio: {e}")
+            return False
+        # A variante passa a ser vídeo + a rendition de áudio mais pesada
+        variant['bandwidth'] += max(r['bandwidth'] for r in media)
+        variant['average_bandwidth'] += max(r['average_bandwidth'] for r in media)
+        audio_codecs = {r['codecs'] for r in media}
+        if variant.get('codecs') and None not in audio_codecs:
+            variant['codecs'] = ','.join([variant['codecs']] + sorted(audio_codecs))
+        else:
+            variant.pop('codecs', None)
+        variant['audio'] = media[0]['group']
+
+    iframe_variants = []
+    if iframes:
+        try:
+            iframe_variant = write_iframes_for(hls_dir, media_playlist)
+        except (OSError, IndexError) as e:
+            print(f"AVISO: Não foi possível gerar a playlist de I-frames: {e}")
+            iframe_variant = None
+        if iframe_variant:
+            iframe_variant['codecs'] = variant['video_codec']
+            iframe_variant['resolution'] = variant.get('resolution')
+            iframe_variants.append(iframe_variant)
+
+    write_master_playlist(os.path.join(hls_dir, MASTER_PLAYLIST), [variant], iframe_variants, media)
+    print(f"Master playlist: CODECS={variant.get('codecs')} RESOLUTION={variant.get('resolution')} "
+          f"BANDWIDTH={int(variant['bandwidth'])}")
+    return True
@@ -0,0 +1,117 @@
+"""
+Alinhamento de legendas com a referência de fala do filme.
+
+O ffsubsync rodava dentro do processo do worker (troca de sys.argv +
+ffs.main()): pesado, não thread-safe e capaz de travar o pipeline. Aqui a
+legenda vira um vetor de intervalos com fala (100 amostras/s, a mesma taxa
+de speech_reference.npz) e a correlação cruzada com a referência, via FFT
+em NumPy, dá o deslocamento constante. O desvio linear (legenda feita para
+outra taxa de quadros, ex. 25 vs 23,976 fps) é coberto testando as razões
+usuais de framerate e ficando com a de maior correlação.
+
+A confiança é o quanto o pico se destaca das demais defasagens (z-score).
+Abaixo de MIN_CONFIDENCE, o SubtitleManager cai para o ffsubsync.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 100
+MAX_OFFSET_SECONDS = 60
+# Razões de taxa de quadros (as mesmas que o ffsubsync testa) e as inversas
+FRAMERATE_RATIOS = (1.0, 24.0 / 23.976, 25.0 / 23.976, 25.0 / 24.0,
+                    23.976 / 24.0, 23.976 / 25.0, 24.0 / 25.0)
+MIN_CONFIDENCE = 6.0
+# Busca grossa em 10 amostras por ponto (0,1s), refinada depois em 0,01s
+COARSE_FACTOR = 10
+
+
+def cue_vector(cues: Sequence[Tuple[float, float]], length: int, ratio: float = 1.0,
+               sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Vetor 0/1 com fala onde há legenda (tempos multiplicados por `ratio`)."""
+    vector = np.zeros(length)
+    if not len(cues):
+        return vector
+    times = np.asarray(cues, dtype=float) * ratio * sample_rate
+    starts = np.clip(times[:, 0].astype(int), 0, length)
+    ends = np.clip(np.ceil(times[:, 1]).astype(int), 0, length)
+    # Soma de prefixos: +1 no início e -1 no fim de cada legenda
+    edges = np.zeros(length + 1)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, ends, -1)
+    vector[np.cumsum(edges[:-1]) > 0] = 1.0
+    return vector
+
+
+def _downsample(vector: np.ndarray, factor: int) -> np.ndarray:
+    usable = len(vector) // factor * factor
+    return vector[:usable].reshape(-1, factor).mean(axis=1)
+
+
+def _correlate(reference_ft: np.ndarray, subtitle: np.ndarray, size: int, max_lag: int) -> np.ndarray:
+    """Correlação em ±1 para defasagens -max_lag..+max_lag (positiva: a legenda precisa ser atrasada)."""
+    circular = np.fft.irfft(reference_ft * np.conj(np.fft.rfft(2 * subtitle - 1, size)), size)
+    return np.concatenate([circular[size - max_lag:], circular[:max_lag + 1]])
+
+
+def _lag_score(reference: np.ndarray, subtitle: np.ndarray, lag: int) -> float:
+    if lag >= 0:
+        return float(np.dot(reference[lag:], subtitle[:len(subtitle) - lag]))
+    return float(np.dot(reference[:lag], subtitle[-lag:]))
+
+
+def align(reference: np.ndarray, cues: Sequence[Tuple[float, float]],
+          max_offset: float = MAX_OFFSET_SECONDS, ratios: Sequence[float] = FRAMERATE_RATIOS,
+          sample_rate: int = SAMPLE_RATE) -> Optional[Dict]:
+    """
+    Melhor deslocamento e razão de framerate da legenda.
+
+    A busca é feita primeiro em resolução reduzida (COARSE_FACTOR amostras
+    por ponto, uma FFT por razão) e refinada na resolução cheia perto do pico.
+
+    Returns:
+        Dict com 'offset' (segundos), 'ratio' (novo tempo = tempo * ratio +
+        offset), 'score' (correlação normalizada, -1..1) e 'confidence', ou
+        None se não há fala em um dos lados
+    """
+    reference = np.asarray(reference, dtype=float)
+    n = len(reference)
+    if n < 2 * COARSE_FACTOR or not len(cues) or not reference.any():
+        return None
+
+    coarse_reference = _downsample(reference, COARSE_FACTOR)
+    coarse_lag = min(int(max_offset * sample_rate) // COARSE_FACTOR, len(coarse_reference) - 1)
+    size = 1 << int(np.ceil(np.log2(2 * len(coarse_reference))))
+    reference_ft = np.fft.rfft(2 * coarse_reference - 1, size)
+
+    best = None
+    for ratio in ratios:
+        subtitle = cue_vector(cues, n, ratio, sample_rate)
+        correlation = _correlate(reference_ft, _downsample(subtitle, COARSE_FACTOR), size, coarse_lag)
+        peak = int(np.argmax(correlation))
+        if best is None or correlation[peak] > best[0]:
+            best = (correlation[peak], peak, ratio, correlation, subtitle)
+
+    _, peak, ratio, correlation, subtitle = best
+    spread = correlation.std()
+    confidence = float((correlation[peak] - correlation.mean()) / spread) if spread > 0 else 0.0
+    # Pico na borda da janela: o deslocamento real provavelmente está fora dela
+    if peak in (0, len(correlation) - 1):
+        confidence = 0.0
+
+    # Refinamento: defasagens da resolução cheia em torno do pico
+    signed_reference, signed_subtitle = 2 * reference - 1, 2 * subtitle - 1
+    center = (peak - coarse_lag) * COARSE_FACTOR
+    lag = max(range(center - COARSE_FACTOR, center + COARSE_FACTOR + 1),
+              key=lambda candidate: _lag_score(signed_reference, signed_subtitle, candidate))
+    return {
+        'offset': lag / sample_rate,
+        'ratio': ratio,
+        'score': _lag_score(signed_reference, signed_subtitle, lag) / n,
+        'confidence': confidence,
+    }
+
+
+def apply_alignment(cues: List[Tuple[float, float]], result: Dict) -> List[Tuple[float, float]]:
+    return [(max(0.0, start * result['ratio'] + result['offset']),
+             max(0.0, end * result['ratio'] + result['offset'])) for start, end in cues]
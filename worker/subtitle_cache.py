@@ -0,0 +1,196 @@
+"""
+Cache em disco das legendas baixadas (/app/cache/subtitles).
+
+Reprocessar um título, ou ingerir outra release do mesmo filme, consultava
+todos os provedores e baixava tudo de novo. Cada entrada guarda a legenda
+bruta (como veio do provedor) e o WebVTT final, e é encontrada por qualquer
+uma das identidades do filme, por idioma:
+
+- hash do arquivo de vídeo (OpenSubtitles): acerto exato, o WebVTT já está
+  sincronizado para aquele arquivo e é copiado direto;
+- id do TMDB ou do IMDb: mesmo filme, talvez outra release; a legenda bruta
+  é reaproveitada, mas passa de novo pela sincronização.
+
+O tamanho total é limitado (LRU pelo mtime, atualizado a cada acerto, como
+o cache de segmentos do jit_server.py) e os acertos/faltas ficam em stats().
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import config
+
+ENTRY_FILE = 'entry.json'
+VTT_FILE = 'subtitle.vtt'
+# Prefixo das identidades cujo acerto dispensa a sincronização
+EXACT_PREFIX = 'hash:'
+
+
+def identity_keys(video_hash: Optional[str] = None, tmdb_id=None, imdb_id: Optional[str] = None) -> List[str]:
+    """Identidades do filme, da mais específica (arquivo) para a mais geral."""
+    keys = []
+    if video_hash:
+        keys.append(f'{EXACT_PREFIX}{video_hash}')
+    if tmdb_id:
+        keys.append(f'tmdb:{tmdb_id}')
+    if imdb_id:
+        keys.append(f'imdb:{imdb_id}')
+    return keys
+
+
+class SubtitleCache:
+    """Cache LRU de legendas em disco, limitado a `max_bytes`."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # nome da entrada -> tamanho em bytes
+        self.index = {}  # (identidade, idioma) -> nome da entrada
+        self.keys = {}  # nome da entrada -> identidades
+        self.total_bytes = 0
+        self.stats_counters = {'hits_exact': 0, 'hits_title': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        # Reconstrói o índice e a ordem LRU pelo mtime das entradas
+        found = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path):
+                continue
+            if name.endswith('.tmp'):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            try:
+                with open(os.path.join(path, ENTRY_FILE), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                size = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+                found.append((os.stat(path).st_mtime, name, entry, size))
+            except (OSError, ValueError):
+                shutil.rmtree(path, ignore_errors=True)
+        with self.lock:
+            for _, name, entry, size in sorted(found, key=lambda item: item[0]):
+                self._register(name, entry['keys'], entry['language'], size)
+            self._evict()
+
+    def _register(self, name: str, keys: List[str], language: str, size: int):
+        self.total_bytes += size - self.entries.pop(name, 0)
+        self.entries[name] = size
+        self.keys[name] = [(key, language) for key in keys]
+        for key in self.keys[name]:
+            self.index[key] = name
+
+    def _entry_name(self, keys: List[str], language: str) -> str:
+        return f"{language}-{hashlib.sha1(keys[0].encode('utf-8')).hexdigest()[:16]}"
+
+    def lookup(self, keys: List[str], language: str) -> Optional[Dict]:
+        """
+        Entrada do idioma para a primeira identidade conhecida do cache.
+
+        Returns:
+            Dict com 'raw' e 'vtt' (caminhos), 'exact' (acerto pelo hash do
+            vídeo) e 'provider', ou None
+        """
+        for key in keys:
+            with self.lock:
+                name = self.index.get((key, language))
+                if name is None:
+                    continue
+                self.entries.move_to_end(name)
+            path = os.path.join(self.cache_dir, name)
+            try:
+                os.utime(path)
+                with open(os.path.join(path, ENTRY_FILE), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                with self.lock:
+                    self._forget(name)
+                continue
+            exact = key.startswith(EXACT_PREFIX)
+            with self.lock:
+                self.stats_counters['hits_exact' if exact else 'hits_title'] += 1
+            return {
+                'raw': os.path.join(path, entry['raw']),
+                'vtt': os.path.join(path, VTT_FILE),
+                'exact': exact,
+                'provider': entry.get('provider'),
+            }
+        with self.lock:
+            self.stats_counters['misses'] += 1
+        return None
+
+    def put(self, keys: List[str], language: str, raw_path: str, vtt_path: str,
+            provider: Optional[str] = None) -> Optional[str]:
+        """Guarda a legenda bruta e o WebVTT (escrita numa pasta .tmp e renomeada)."""
+        if not keys:
+            return None
+        name = self._entry_name(keys, language)
+        path = os.path.join(self.cache_dir, name)
+        temp_path = path + '.tmp'
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        raw_name = 'raw' + (os.path.splitext(raw_path)[1] or '.srt')
+        shutil.copyfile(raw_path, os.path.join(temp_path, raw_name))
+        shutil.copyfile(vtt_path, os.path.join(temp_path, VTT_FILE))
+        with open(os.path.join(temp_path, ENTRY_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'keys': keys, 'language': language, 'raw': raw_name, 'provider': provider}, f)
+        size = sum(os.path.getsize(os.path.join(temp_path, file)) for file in os.listdir(temp_path))
+
+        with self.lock:
+            if os.path.exists(path):
+                self._forget(name)
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(temp_path, path)
+            self._register(name, keys, language, size)
+            self.stats_counters['stores'] += 1
+            self._evict(keep=name)
+        return path
+
+    def _forget(self, name: str):
+        self.total_bytes -= self.entries.pop(name, 0)
+        for key in self.keys.pop(name, []):
+            if self.index.get(key) == name:
+                del self.index[key]
+
+    def _evict(self, keep: Optional[str] = None):
+        while self.total_bytes > self.max_bytes and self.entries:
+            name = next(iter(self.entries))
+            if name == keep:
+                break
+            self._forget(name)
+            self.stats_counters['evictions'] += 1
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats_counters)
+            stats['entries'] = len(self.entries)
+            stats['bytes'] = self.total_bytes
+        lookups = stats['hits_exact'] + stats['hits_title'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits_exact'] + stats['hits_title']) / lookups, 3) if lookups else None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_subtitle_cache() -> Optional[SubtitleCache]:
+    """Cache do processo (compartilhado entre jobs); None se desligado ou sem acesso à pasta."""
+    global _cache
+    if not config.SUBTITLE_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = SubtitleCache(config.SUBTITLE_CACHE_DIR, config.SUBTITLE_CACHE_MAX_MB * 1024 * 1024)
+            except OSError as e:
+                print(f"AVISO: Cache de legendas indisponível: {e}")
+                return None
+        return _cache
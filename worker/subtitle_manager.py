@@ -1,14 +1,19 @@
 import os
 import json
-import subprocess
-import requests
-import pysrt
 import chardet
-from subliminal import Video, download_best_subtitles, save_subtitles
+from subliminal import Video, save_subtitles
 from babelfish import Language
 import logging
 import tempfile
 import shutil
+import sys
+import time
+
+from process_supervisor import run_supervised
+from speech_reference import ensure_speech_reference
+from subtitle_search import find_best_subtitles, compute_video_hashes, is_hash_match, DEFAULT_PROVIDERS
+from subtitle_cache import get_subtitle_cache, identity_keys
+from webvtt_converter import convert_to_webvtt, cue_seconds, read_cues, vtt_time, write_srt
 
 # Verifica se ffsubsync está disponível
 try:
@@ -19,6 +24,29 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Tempo máximo do ffsubsync (só usado quando o alinhador interno não tem confiança)
+FFSUBSYNC_TIMEOUT = 300
+
+WANTED_LANGUAGES = {'pt-BR': Language('por'), 'en': Language('eng')}
+
+LANGUAGE_NAMES = {
+    'en': 'English',
+    'pt': 'Português',
+    'pt-BR': 'Português (Brasil)'
+}
+
+def language_name(lang_code):
+    """Retorna nome amigável do idioma"""
+    return LANGUAGE_NAMES.get(lang_code, lang_code)
+
+def sort_subtitles(subtitles):
+    """Ordena as legendas: pt-BR, en, outros"""
+    return sorted(subtitles, key=lambda x: (
+        x['language'] != 'pt-BR',
+        x['language'] != 'en',
+        x['language']
+    ))
+
 class SubtitleManager:
     def __init__(self, movie_folder, movie_info, progress_callback=None):
         self.movie_folder = movie_folder
@@ -27,6 +55,8 @@ class SubtitleManager:
         self.subtitles_folder = os.path.join(movie_folder, 'subtitles')
         os.makedirs(self.subtitles_folder, exist_ok=True)
         self.temp_folder = tempfile.mkdtemp(prefix='subtitles_')
+        self.cache = None
+        self.cache_keys = []
 
     def report_progress(self, message, progress=None):
         if self.progress_callback:
@@ -52,12 +82,9 @@ class SubtitleManager:
     def _force_pt_br_with_podnapisi(self, video) -> list:
         self.report_progress("🇧🇷 PT-BR fallback ativado...", 70)
         try:
-            from subliminal.providers.podnapisi import PodnapisiProvider
-            from subliminal.core import ProviderPool
-            
-            with ProviderPool(providers=[PodnapisiProvider]) as pool:
-                subtitles = pool.list_subtitles(video, {Language('por')})
-            
+            # Mesma sessão do Podnapisi usada na busca principal (sem novo pool)
+            subtitles = find_best_subtitles(video, {Language('por')}, providers=['podnapisi'])
+
             if subtitles:
                 self.report_progress(f"Encontrado {len(subtitles)} legendas PT-BR no Podnapisi.")
                 # Baixar a melhor legenda encontrada
@@ -65,18 +92,33 @@ class SubtitleManager:
                 save_subtitles(video, [best_pt_sub], directory=self.temp_folder)
                 temp_path = self._get_subtitle_temp_path(video, best_pt_sub)
                 if temp_path and os.path.exists(temp_path):
-                    return [self._process_subtitle_file(temp_path, 'pt-BR', video.name)]
+                    final_subtitle = self._process_subtitle_file(temp_path, 'pt-BR', video.name)
+                    self._store_in_cache('pt-BR', temp_path, final_subtitle, best_pt_sub.provider_name)
+                    return [final_subtitle]
             return []
         except Exception as e:
             self.report_progress(f"Erro no fallback PT-BR: {e}")
             return []
 
-    def download_subtitles(self):
-        video_file = self.movie_info.get('video_file')
-        if not video_file or not os.path.exists(video_file):
-            raise Exception("Arquivo de vídeo não encontrado")
+    def _video_hashes(self, video_file):
+        """Hashes do arquivo (OpenSubtitles, napiprojekt): os do movie_info ou calculados agora."""
+        hashes = self.movie_info.get('video_hashes')
+        if not hashes and video_file and os.path.exists(video_file):
+            hashes = compute_video_hashes(video_file)
+        return hashes or {}
+
+    def _cache_keys(self, video_hashes):
+        """Identidades do filme no cache de legendas (hash do arquivo, TMDB, IMDb)."""
+        return identity_keys(video_hashes.get('opensubtitles'), self.movie_info.get('tmdb_id'),
+                             self.movie_info.get('imdb_id'))
 
-        video = Video.fromname(video_file)
+    def _build_video(self, video_file, video_hashes):
+        """
+        Vídeo para os provedores: título/ano do TMDB, hashes do arquivo e id do
+        IMDb, para que OpenSubtitles e napiprojekt encontrem a legenda exata.
+        """
+        title = self.movie_info.get('original_title') or self.movie_info.get('title') or str(self.movie_info['id'])
+        video = Video.fromname(video_file or f"{title} {self.movie_info.get('year') or ''}".strip() + '.mkv')
         if self.movie_info.get('original_title'):
             video.title = self.movie_info['original_title']
             self.report_progress(f"Usando título original para busca: '{video.title}'", 25)
@@ -87,41 +129,112 @@ class SubtitleManager:
         if self.movie_info.get('year'):
             video.year = self.movie_info['year']
 
-        languages = {Language('eng'), Language('por')}
-        self.report_progress("Procurando legendas online...", 30)
+        video.hashes = dict(video_hashes)
+        video.size = self.movie_info.get('video_size') or (
+            os.path.getsize(video_file) if video_file and os.path.exists(video_file) else None)
+        if self.movie_info.get('imdb_id'):
+            video.external_ids['imdb_id'] = self.movie_info['imdb_id']
+        if self.movie_info.get('tmdb_id'):
+            video.external_ids['tmdb_id'] = self.movie_info['tmdb_id']
+        return video
+
+    def _from_cache(self, lang_code, video_file):
+        """Legenda do cache: WebVTT copiado direto (mesmo arquivo) ou a bruta, sincronizada de novo."""
+        try:
+            entry = self.cache.lookup(self.cache_keys, lang_code)
+            if not entry:
+                return None
+            if entry['exact']:
+                webvtt_path = os.path.join(self.subtitles_folder, f"subtitle_{lang_code}.vtt")
+                shutil.copyfile(entry['vtt'], webvtt_path)
+                self.report_progress(f"✓ {language_name(lang_code)} do cache (mesmo arquivo, sem sincronizar)", 45)
+                return self._subtitle_info(lang_code, webvtt_path)
+            temp_path = os.path.join(self.temp_folder, f"cache_{lang_code}{os.path.splitext(entry['raw'])[1]}")
+            shutil.copyfile(entry['raw'], temp_path)
+            self.report_progress(f"✓ {language_name(lang_code)} do cache (mesmo filme), sincronizando", 45)
+            return self._process_subtitle_file(temp_path, lang_code, video_file)
+        except Exception as e:
+            self.report_progress(f"⚠️ Cache de legendas ignorado ({lang_code}): {str(e)[:30]}")
+            return None
+
+    def _store_in_cache(self, lang_code, raw_path, subtitle_info, provider=None):
+        if not self.cache or not subtitle_info:
+            return
+        try:
+            self.cache.put(self.cache_keys, lang_code, raw_path,
+                           os.path.join(self.subtitles_folder, subtitle_info['file']), provider)
+        except Exception as e:
+            print(f"AVISO: Falha ao guardar legenda no cache: {e}")
 
-        # Excluir provedores problemáticos
-        providers = ['opensubtitles', 'podnapisi', 'addic7ed', 'gestdown', 'napiprojekt', 'subtitulamos', 'tvsubtitles']
+    def download_subtitles(self, skip_languages=()):
+        """
+        Busca online as legendas dos idiomas desejados, exceto `skip_languages`
+        (já cobertos, por exemplo, por faixas embutidas na fonte). O cache de
+        legendas é consultado antes de qualquer provedor.
+        """
+        wanted = {code: lang for code, lang in WANTED_LANGUAGES.items() if code not in skip_languages}
+        if not wanted:
+            self.report_progress("Todos os idiomas já disponíveis, busca online dispensada", 90)
+            return []
 
-        found_subtitles = download_best_subtitles([video], languages, providers=providers)
+        # Sem video_file (títulos já na biblioteca) a busca usa título/ano, hashes e
+        # ids do metadata.json, e a sincronização usa speech_reference.npz
+        video_file = self.movie_info.get('video_file')
+        if video_file and not os.path.exists(video_file):
+            raise Exception("Arquivo de vídeo não encontrado")
 
         processed_subs = {}
+        video_hashes = self._video_hashes(video_file)
+        self.cache = get_subtitle_cache()
+        self.cache_keys = self._cache_keys(video_hashes)
+        if self.cache and self.cache_keys:
+            for lang_code in list(wanted):
+                cached = self._from_cache(lang_code, video_file)
+                if cached:
+                    processed_subs[lang_code] = cached
+                    del wanted[lang_code]
+            stats = self.cache.stats()
+            print(f"Cache de legendas: {stats['hits_exact'] + stats['hits_title']} acertos "
+                  f"({stats['hits_exact']} exatos), {stats['misses']} faltas, {stats['bytes'] // 1024} KB")
+            if not wanted:
+                self.report_progress(f"Concluído: {len(processed_subs)} legendas do cache.", 90)
+                return sort_subtitles(processed_subs.values())
+
+        video = self._build_video(video_file, video_hashes)
+
+        languages = set(wanted.values())
+        self.report_progress("Procurando legendas online...", 30)
+
+        # Provedores em paralelo, com timeout por provedor e orçamento total
+        found_subtitles = find_best_subtitles(video, languages, providers=DEFAULT_PROVIDERS)
+
         if found_subtitles:
-            self.report_progress(f"Processando {len(found_subtitles.get(video, []))} legenda(s)...", 50)
-            for sub in found_subtitles.get(video, []):
+            self.report_progress(f"Processando {len(found_subtitles)} legenda(s)...", 50)
+            for sub in found_subtitles:
                 lang_code = self._normalize_language_code(sub.language)
                 save_subtitles(video, [sub], directory=self.temp_folder)
                 temp_path = self._get_subtitle_temp_path(video, sub)
                 if temp_path and os.path.exists(temp_path):
-                    final_subtitle = self._process_subtitle_file(temp_path, lang_code, video_file)
+                    # Legenda feita para este mesmo arquivo: já está sincronizada
+                    in_sync = is_hash_match(sub, video)
+                    if in_sync:
+                        self.report_progress(f"🎯 {language_name(lang_code)}: acerto exato pelo hash do arquivo "
+                                             f"({sub.provider_name}), sincronização dispensada", 55)
+                    final_subtitle = self._process_subtitle_file(temp_path, lang_code, video_file, in_sync)
                     if final_subtitle:
                         processed_subs[lang_code] = final_subtitle
+                        self._store_in_cache(lang_code, temp_path, final_subtitle, sub.provider_name)
                         if lang_code == 'pt-BR':
                             self.report_progress("✅ Legenda em português baixada com sucesso.", 60)
 
-        if 'pt-BR' not in processed_subs:
+        if 'pt-BR' in wanted and 'pt-BR' not in processed_subs:
             self.report_progress("Nenhuma legenda em português encontrada, tentando fallback...", 65)
             pt_br_fallback = self._force_pt_br_with_podnapisi(video)
             if pt_br_fallback:
                 processed_subs['pt-BR'] = pt_br_fallback[0]
                 self.report_progress("✅ Legenda em português baixada com sucesso via fallback.", 70)
 
-        # Ordenar: pt-BR, en, outros
-        final_list = sorted(processed_subs.values(), key=lambda x: (
-            x['language'] != 'pt-BR',
-            x['language'] != 'en',
-            x['language']
-        ))
+        final_list = sort_subtitles(processed_subs.values())
 
         self.report_progress(f"Concluído: {len(final_list)} legendas processadas.", 90)
         return final_list
@@ -142,13 +255,20 @@ class SubtitleManager:
             self.report_progress(f"Erro ao construir caminho temporário: {str(e)}")
             return None
 
-    def _process_subtitle_file(self, subtitle_path, lang_code, video_file):
-        """Processa uma legenda a partir de um arquivo no disco"""
+    def _subtitle_info(self, lang_code, webvtt_path):
+        """Informações da legenda (entrada de metadata['subtitles'])"""
+        return {
+            'language': lang_code,
+            'name': self._get_language_name(lang_code),
+            'file': os.path.basename(webvtt_path),
+            'url': f"/api/subtitles/{self.movie_info['id']}/{os.path.basename(webvtt_path)}"
+        }
+
+    def _process_subtitle_file(self, subtitle_path, lang_code, video_file, in_sync=False):
+        """Processa uma legenda a partir de um arquivo no disco (`in_sync`: já casada com o arquivo)"""
         try:
-            # Sincronizar se arquivo de vídeo fornecido
-            srt_to_convert = subtitle_path
-            if video_file and os.path.exists(video_file):
-                srt_to_convert = self._sync_subtitle_with_video(subtitle_path, video_file)
+            # Sincronizar com a referência de fala do filme
+            srt_to_convert = subtitle_path if in_sync else self._sync_subtitle_with_video(subtitle_path, video_file)
             
             # Converter para WebVTT
             webvtt_path = self._convert_to_webvtt(srt_to_convert, lang_code)
@@ -158,15 +278,7 @@ class SubtitleManager:
                 os.unlink(srt_to_convert)
             
             if webvtt_path:
-                # Informações da legenda
-                subtitle_info = {
-                    'language': lang_code,
-                    'name': self._get_language_name(lang_code),
-                    'file': os.path.basename(webvtt_path),
-                    'url': f"/api/subtitles/{self.movie_info['id']}/{os.path.basename(webvtt_path)}"
-                }
-                
-                return subtitle_info
+                return self._subtitle_info(lang_code, webvtt_path)
             else:
                 return None
             
@@ -210,10 +322,8 @@ class SubtitleManager:
                             video_file_path = os.path.join(self.movie_folder, file)
                             break
             
-            # Sincronizar se arquivo de vídeo encontrado
-            srt_to_convert = temp_srt.name
-            if video_file_path and os.path.exists(video_file_path):
-                srt_to_convert = self._sync_subtitle_with_video(temp_srt.name, video_file_path)
+            # Sincronizar (referência de fala do filme ou o vídeo encontrado)
+            srt_to_convert = self._sync_subtitle_with_video(temp_srt.name, video_file_path)
             
             # Converter para WebVTT
             webvtt_path = self._convert_to_webvtt(srt_to_convert, lang_code)
@@ -240,138 +350,115 @@ class SubtitleManager:
             self.report_progress(f"Erro ao processar legenda {lang_code}: {str(e)[:50]}")
             return None
     
+    def _sync_reference(self, video_path):
+        """
+        Referência da sincronização: a atividade de fala do filme (speech_reference.npz),
+        extraída na primeira sincronização e reutilizada por todas as outras,
+        inclusive depois que o vídeo já não existe. None se não há como sincronizar.
+        """
+        try:
+            return ensure_speech_reference(self.movie_folder, video_path)
+        except Exception as e:
+            self.report_progress(f"⚠️ Referência de fala indisponível: {str(e)[:30]}", 75)
+            return video_path if video_path and os.path.exists(video_path) else None
+
     def _sync_subtitle_with_video(self, subtitle_path, video_path):
-        """Sincroniza legenda com vídeo usando ffsubsync"""
+        """
+        Sincroniza a legenda com o áudio do filme: primeiro com o alinhador
+        interno (FFT sobre a referência de fala, menos de um segundo); o
+        ffsubsync, num processo separado, só roda quando a confiança é baixa.
+        """
+        reference = self._sync_reference(video_path)
+        if reference and reference.endswith('.npz'):
+            synced = self._align_with_reference(subtitle_path, reference)
+            if synced:
+                return synced
+
         if not FFSUBSYNC_AVAILABLE:
             self.report_progress("ffsubsync não disponível, pulando sincronização", 75)
             return subtitle_path
-        
-        try:
-            self.report_progress("🔄 Sincronizando legenda com áudio do vídeo...", 75)
-            
-            # Arquivo de saída sincronizado
-            sync_path = subtitle_path.replace('.srt', '_synced.srt')
-            
-            # Comando ffsubsync
-            import ffsubsync
-            from ffsubsync.sklearn_shim import Pipeline
-            
-            # Usar ffsubsync via API direta ao invés de subprocess
-            try:
-                # Tentar usar API direta do ffsubsync
-                import ffsubsync.ffsubsync as ffs
-                
-                # Simular argumentos de linha de comando
-                import argparse
-                import sys
-                
-                # Salvar argv original
-                original_argv = sys.argv
-                
-                # Configurar argumentos falsos para o parser
-                sys.argv = ['ffsubsync', video_path, '-i', subtitle_path, '-o', sync_path]
-                
-                try:
-                    # Executar sincronização
-                    ffs.main()
-                    
-                    if os.path.exists(sync_path):
-                        self.report_progress("✅ Legenda sincronizada com sucesso!", 78)
-                        return sync_path
-                    else:
-                        raise Exception("Arquivo sincronizado não foi criado")
-                        
-                finally:
-                    # Restaurar argv original
-                    sys.argv = original_argv
-                
-            except Exception as api_error:
-                self.report_progress(f"⚠️ API direta falhou: {str(api_error)[:30]}", 76)
-                
-                # Fallback: tentar encontrar executável
-                import shutil
-                ffsubsync_exe = shutil.which('ffsubsync')
-                
-                if ffsubsync_exe:
-                    self.report_progress("🔄 Tentando executável ffsubsync...", 76)
-                    cmd = [ffsubsync_exe, video_path, '-i', subtitle_path, '-o', sync_path]
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-                    
-                    if result.returncode == 0 and os.path.exists(sync_path):
-                        self.report_progress("✅ Legenda sincronizada com sucesso!", 78)
-                        return sync_path
-                    else:
-                        raise Exception(f"Executável falhou: {result.stderr}")
-                else:
-                    raise Exception("ffsubsync executável não encontrado")
-                
-        except subprocess.TimeoutExpired:
-            self.report_progress("⚠️ Sincronização excedeu tempo limite", 76)
+        if not reference:
             return subtitle_path
+        return self._sync_with_ffsubsync(subtitle_path, reference)
+
+    def _synced_path(self, subtitle_path):
+        return os.path.splitext(subtitle_path)[0] + '_synced.srt'
+
+    def _align_with_reference(self, subtitle_path, reference):
+        """Alinhador interno; None se não foi possível ou a confiança ficou baixa."""
+        try:
+            from speech_reference import load_speech_reference
+            from subtitle_aligner import align, apply_alignment, MIN_CONFIDENCE
+
+            speech = load_speech_reference(reference)
+            if speech is None:
+                return None
+            # Mesma leitura da conversão: UTF-8 estrito, chardet numa amostra, SRT ou ASS/SSA
+            subs, _ = read_cues(subtitle_path)
+            cues = [(cue_seconds(start), cue_seconds(end)) for start, end, _ in subs]
+
+            started = time.monotonic()
+            result = align(speech, cues)
+            elapsed_ms = (time.monotonic() - started) * 1000
+            if not result or result['confidence'] < MIN_CONFIDENCE:
+                confidence = result['confidence'] if result else 0
+                self.report_progress(f"Alinhamento interno com baixa confiança ({confidence:.1f}), usando ffsubsync", 76)
+                return None
+
+            aligned = [(vtt_time(int(round(start * 1000))), vtt_time(int(round(end * 1000))), text)
+                       for (start, end), (_, _, text) in zip(apply_alignment(cues, result), subs)]
+            sync_path = self._synced_path(subtitle_path)
+            write_srt(aligned, sync_path)
+            self.report_progress(f"✅ Legenda alinhada: deslocamento {result['offset']:+.2f}s, "
+                                 f"razão {result['ratio']:.4f} ({elapsed_ms:.0f} ms)", 78)
+            return sync_path
         except Exception as e:
-            self.report_progress(f"⚠️ Erro na sincronização: {str(e)[:30]}", 76)
-            logger.warning(f"Erro na sincronização: {e}")
-            return subtitle_path
-    
+            self.report_progress(f"⚠️ Alinhamento interno falhou: {str(e)[:30]}", 76)
+            return None
+
+    def _sync_with_ffsubsync(self, subtitle_path, reference):
+        """ffsubsync em processo separado e com tempo máximo (nunca dentro do worker)."""
+        self.report_progress("🔄 Sincronizando legenda com ffsubsync...", 76)
+        sync_path = self._synced_path(subtitle_path)
+        executable = shutil.which('ffsubsync')
+        cmd = ([executable] if executable else [sys.executable, '-m', 'ffsubsync.ffsubsync']) + \
+            [reference, '-i', subtitle_path, '-o', sync_path]
+        result = run_supervised(cmd, 'ffsubsync', total_timeout=FFSUBSYNC_TIMEOUT)
+        if result['ok'] and os.path.exists(sync_path):
+            self.report_progress("✅ Legenda sincronizada com sucesso!", 78)
+            return sync_path
+        reason = "tempo limite excedido" if result['timed_out'] else f"código {result['returncode']}"
+        self.report_progress(f"⚠️ Erro na sincronização: {reason}", 76)
+        return subtitle_path
+
     def _convert_to_webvtt(self, subtitle_path, lang_code):
-        """Converte legenda para formato WebVTT e salva na pasta final"""
+        """Converte legenda (SRT ou ASS/SSA) para formato WebVTT e salva na pasta final"""
         try:
             # Garantir que pasta de destino existe
             os.makedirs(self.subtitles_folder, exist_ok=True)
             
-            # Detecta encoding do arquivo
-            with open(subtitle_path, 'rb') as f:
-                raw_data = f.read()
-                encoding = chardet.detect(raw_data)['encoding'] or 'utf-8'
-            
-            self.report_progress(f"Lendo arquivo SRT ({encoding})", 82)
-            
-            # Lê o arquivo SRT
-            subs = pysrt.open(subtitle_path, encoding=encoding)
-            
-            # Cria arquivo WebVTT na pasta final
             webvtt_filename = f"subtitle_{lang_code}.vtt"
             webvtt_path = os.path.join(self.subtitles_folder, webvtt_filename)
             
             self.report_progress(f"Convertendo para WebVTT: {webvtt_filename}", 85)
             
-            with open(webvtt_path, 'w', encoding='utf-8') as f:
-                f.write("WEBVTT\n\n")
-                
-                for sub in subs:
-                    # Converte timing para formato WebVTT
-                    start_time = self._srt_time_to_webvtt(sub.start)
-                    end_time = self._srt_time_to_webvtt(sub.end)
-                    
-                    f.write(f"{start_time} --> {end_time}\n")
-                    f.write(f"{sub.text}\n\n")
+            # Leitura e escrita em streaming (UTF-8 estrito primeiro, chardet só numa amostra)
+            cues, encoding = convert_to_webvtt(subtitle_path, webvtt_path)
+            if not cues:
+                raise Exception("Nenhuma fala encontrada na legenda")
             
-            # Verificar se arquivo foi criado corretamente
-            if os.path.exists(webvtt_path):
-                file_size = os.path.getsize(webvtt_path)
-                self.report_progress(f"✓ WebVTT criado: {webvtt_filename} ({file_size} bytes)", 88)
-                return webvtt_path
-            else:
-                raise Exception(f"Arquivo WebVTT não foi criado: {webvtt_path}")
+            file_size = os.path.getsize(webvtt_path)
+            self.report_progress(f"✓ WebVTT criado: {webvtt_filename} ({cues} falas, {encoding}, {file_size} bytes)", 88)
+            return webvtt_path
             
         except Exception as e:
             self.report_progress(f"Erro na conversão para WebVTT: {str(e)[:50]}")
             logger.error(f"Erro na conversão WebVTT: {e}")
             return None
     
-    def _srt_time_to_webvtt(self, srt_time):
-        """Converte timestamp SRT para formato WebVTT"""
-        return str(srt_time).replace(',', '.')
-    
-    
     def _get_language_name(self, lang_code):
         """Retorna nome amigável do idioma"""
-        names = {
-            'en': 'English',
-            'pt': 'Português',
-            'pt-BR': 'Português (Brasil)'
-        }
-        return names.get(lang_code, lang_code)
+        return language_name(lang_code)
     
     def get_subtitle_info(self):
         """Retorna informações das legendas disponíveis na pasta final"""
@@ -406,7 +493,7 @@ class SubtitleManager:
         
         return subtitles
 
-def download_and_process_subtitles(movie_folder, movie_info, progress_callback=None):
+def download_and_process_subtitles(movie_folder, movie_info, progress_callback=None, skip_languages=()):
     """
     Função principal para download e processamento de legendas
     
@@ -414,6 +501,7 @@ def download_and_process_subtitles(movie_folder, movie_info, progress_callback=N
         movie_folder: Pasta do filme na biblioteca
         movie_info: Informações do filme (incluindo video_file)
         progress_callback: Callback para reportar progresso
+        skip_languages: Idiomas que não precisam de busca online
     
     Returns:
         Lista de informações das legendas processadas
@@ -422,7 +510,7 @@ def download_and_process_subtitles(movie_folder, movie_info, progress_callback=N
     
     try:
         # Baixar e processar legendas
-        subtitles = subtitle_manager.download_subtitles()
+        subtitles = subtitle_manager.download_subtitles(skip_languages)
         
         # Limpar arquivos temporários
         subtitle_manager.cleanup_temp()
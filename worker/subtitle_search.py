@@ -0,0 +1,274 @@
+"""
+Busca de legendas em vários provedores, em paralelo e com prazo.
+
+O download_best_subtitles do subliminal consulta os provedores um depois do
+outro e sem prazo: um provedor lento segura o job inteiro. E cada chamada
+abre um ProviderPool novo (login, sessão HTTP), inclusive o fallback PT-BR,
+que abria outro pool só para o Podnapisi.
+
+Aqui:
+
+- as sessões dos provedores (já inicializadas/logadas) ficam num cache do
+  processo e servem a todos os idiomas e jobs seguintes; cada uma tem um
+  lock, porque as sessões do subliminal não são thread-safe;
+- a listagem roda numa thread por provedor, com PROVIDER_TIMEOUT por
+  provedor e um orçamento total (SEARCH_BUDGET) para listagem + downloads;
+- quando o prazo estoura, fica valendo o que já chegou: os resultados
+  disponíveis são pontuados (compute_score, com os acertos pelo hash do
+  arquivo sempre na frente) e a melhor legenda de cada idioma é baixada,
+  caindo para a próxima em caso de erro.
+
+Threads não podem ser interrompidas: um provedor que estourou o prazo
+continua sua requisição em segundo plano e só libera a sessão ao terminar
+(as buscas seguintes não esperam por ele, pulam o provedor).
+"""
+import atexit
+import hashlib
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from subliminal.extensions import provider_manager
+from subliminal.exceptions import DiscardingError
+from subliminal.score import compute_score
+
+import config
+
+DEFAULT_PROVIDERS = ('opensubtitles', 'podnapisi', 'addic7ed', 'gestdown', 'napiprojekt', 'subtitulamos',
+                     'tvsubtitles')
+PROVIDER_TIMEOUT = config.SUBTITLE_PROVIDER_TIMEOUT
+SEARCH_BUDGET = config.SUBTITLE_SEARCH_BUDGET
+# Provedor fora do ar (DiscardingError) fica de fora das buscas por este tempo
+OUTAGE_COOLDOWN = 300
+MAX_WORKERS = 16
+# Blocos lidos pelos hashes de arquivo dos provedores
+OPENSUBTITLES_BLOCK = 64 * 1024
+NAPIPROJEKT_BLOCK = 10 * 1024 * 1024
+
+_sessions = {}
+_locks = {}
+_outages = {}
+# Intervalo mínimo entre chamadas a cada provedor (segundos), para buscas em lote
+_min_intervals = {}
+_next_call = {}
+_registry_lock = threading.Lock()
+# Executor do processo: um provedor atrasado não prende o fim da busca
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='subtitle-search')
+
+
+def opensubtitles_hash(video_file: str) -> Optional[str]:
+    """Hash do OpenSubtitles: tamanho + soma dos inteiros de 64 bits dos primeiros e últimos 64 KB."""
+    size = os.path.getsize(video_file)
+    if size < 2 * OPENSUBTITLES_BLOCK:
+        return None
+    words = OPENSUBTITLES_BLOCK // 8
+    with open(video_file, 'rb') as f:
+        head = f.read(OPENSUBTITLES_BLOCK)
+        f.seek(size - OPENSUBTITLES_BLOCK)
+        tail = f.read(OPENSUBTITLES_BLOCK)
+    total = size + sum(struct.unpack(f'<{words}Q', head)) + sum(struct.unpack(f'<{words}Q', tail))
+    return f'{total & 0xFFFFFFFFFFFFFFFF:016x}'
+
+
+def napiprojekt_hash(video_file: str) -> str:
+    """Hash do napiprojekt: MD5 dos primeiros 10 MB."""
+    with open(video_file, 'rb') as f:
+        return hashlib.md5(f.read(NAPIPROJEKT_BLOCK)).hexdigest()
+
+
+def compute_video_hashes(video_file: str) -> Dict[str, str]:
+    """Hashes do arquivo de vídeo por provedor (lê só blocos amostrados, nunca o arquivo inteiro)."""
+    hashes = {}
+    try:
+        opensubtitles = opensubtitles_hash(video_file)
+        if opensubtitles:
+            hashes['opensubtitles'] = opensubtitles
+        hashes['napiprojekt'] = napiprojekt_hash(video_file)
+    except OSError as e:
+        print(f"AVISO: Não foi possível calcular os hashes do vídeo: {e}")
+    return hashes
+
+
+def is_hash_match(subtitle, video) -> bool:
+    """A legenda foi feita para este mesmo arquivo (hash do provedor igual ao do vídeo)."""
+    try:
+        return 'hash' in subtitle.get_matches(video)
+    except Exception:
+        return False
+
+
+def exact_first_score(subtitle, video) -> Tuple[bool, int]:
+    """Pontuação do subliminal, com os acertos por hash sempre na frente."""
+    return is_hash_match(subtitle, video), compute_score(subtitle, video)
+
+
+def _provider_class(name: str):
+    return provider_manager[name].plugin
+
+
+def _lock_for(name: str) -> threading.Lock:
+    with _registry_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def _session(name: str):
+    """Sessão do provedor, inicializada (login) só na primeira vez. Chamar com o lock do provedor."""
+    provider = _sessions.get(name)
+    if provider is None:
+        provider = _provider_class(name)()
+        provider.initialize()
+        _sessions[name] = provider
+    return provider
+
+
+def _drop_session(name: str):
+    """Descarta a sessão (chamar com o lock do provedor); a próxima busca refaz o login."""
+    provider = _sessions.pop(name, None)
+    if provider is not None:
+        try:
+            provider.terminate()
+        except Exception:
+            pass
+
+
+def terminate_sessions():
+    for name in list(_sessions):
+        lock = _lock_for(name)
+        if lock.acquire(timeout=1):
+            try:
+                _drop_session(name)
+            finally:
+                lock.release()
+
+
+atexit.register(terminate_sessions)
+
+
+def set_rate_limit(name: str, min_interval: float):
+    """Limita as chamadas ao provedor a uma a cada `min_interval` segundos (0 desliga)."""
+    _min_intervals[name] = min_interval
+
+
+def _wait_rate_limit(name: str):
+    """Espera o intervalo mínimo do provedor. Chamar com o lock do provedor."""
+    interval = _min_intervals.get(name, 0)
+    if not interval:
+        return
+    delay = _next_call.get(name, 0) - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    _next_call[name] = time.monotonic() + interval
+
+
+def _with_session(name: str, action: Callable, wait: float):
+    """Executa `action(provider)` com a sessão do provedor; None se ela seguiu ocupada por `wait` segundos."""
+    lock = _lock_for(name)
+    if not lock.acquire(timeout=max(wait, 0)):
+        print(f"AVISO: Provedor de legendas {name} ocupado com outra busca, pulando")
+        return None
+    try:
+        _wait_rate_limit(name)
+        return action(_session(name))
+    except DiscardingError as e:
+        print(f"AVISO: Provedor de legendas {name} indisponível ({str(e)[:60]}), pausado por {OUTAGE_COOLDOWN}s")
+        _outages[name] = time.monotonic() + OUTAGE_COOLDOWN
+        _drop_session(name)
+        return None
+    except Exception as e:
+        print(f"AVISO: Erro no provedor de legendas {name}: {str(e)[:60]}")
+        _drop_session(name)
+        return None
+    finally:
+        lock.release()
+
+
+def _usable_providers(providers: Iterable[str], video, languages: Set) -> Dict[str, Set]:
+    """Provedores que aceitam o vídeo e algum dos idiomas (e não estão em pausa), com os idiomas de cada um."""
+    now = time.monotonic()
+    usable = {}
+    for name in providers:
+        if _outages.get(name, 0) > now:
+            continue
+        plugin = _provider_class(name)
+        if not plugin.check(video):
+            continue
+        provider_languages = plugin.check_languages(set(languages))
+        if provider_languages:
+            usable[name] = provider_languages
+    return usable
+
+
+def list_subtitles(video, languages: Set, providers: Sequence[str] = DEFAULT_PROVIDERS,
+                   provider_timeout: Optional[float] = None, deadline: Optional[float] = None) -> List:
+    """
+    Lista as legendas de todos os provedores em paralelo. Devolve o que chegou
+    até `provider_timeout` (ou até o `deadline`, em time.monotonic(), se antes).
+    """
+    started = time.monotonic()
+    limit = started + (PROVIDER_TIMEOUT if provider_timeout is None else provider_timeout)
+    if deadline is not None:
+        limit = min(limit, deadline)
+
+    futures = {}
+    for name, provider_languages in _usable_providers(providers, video, languages).items():
+        futures[name] = _executor.submit(
+            _with_session, name, lambda provider, langs=provider_languages: provider.list_subtitles(video, langs),
+            limit - time.monotonic())
+
+    subtitles = []
+    late = []
+    for name, future in futures.items():
+        try:
+            found = future.result(timeout=max(limit - time.monotonic(), 0))
+        except FutureTimeout:
+            late.append(name)
+            continue
+        subtitles.extend(found or [])
+    if late:
+        print(f"AVISO: Provedores sem resposta em {limit - started:.0f}s: {', '.join(late)}")
+    return subtitles
+
+
+def download_best(subtitles: Sequence, video, languages: Set, deadline: float,
+                  score: Callable = exact_first_score) -> List:
+    """
+    Baixa a legenda de maior pontuação de cada idioma até o `deadline`,
+    caindo para a próxima candidata do idioma quando o download falha.
+    Variantes regionais contam como o idioma pedido (por-BR atende por).
+    """
+    ranked = sorted(subtitles, key=lambda subtitle: score(subtitle, video), reverse=True)
+    downloaded = []
+    for language in languages:
+        for subtitle in (s for s in ranked if s.language.alpha3 == language.alpha3):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"AVISO: Prazo da busca de legendas esgotado antes do download ({language})")
+                return downloaded
+            future = _executor.submit(_with_session, subtitle.provider_name,
+                                      lambda provider, sub=subtitle: provider.download_subtitle(sub) or True,
+                                      remaining)
+            try:
+                ok = future.result(timeout=remaining)
+            except FutureTimeout:
+                ok = None
+            if ok and subtitle.is_valid():
+                downloaded.append(subtitle)
+                break
+    return downloaded
+
+
+def find_best_subtitles(video, languages: Set, providers: Sequence[str] = DEFAULT_PROVIDERS,
+                        provider_timeout: Optional[float] = None, budget: Optional[float] = None,
+                        score: Callable = exact_first_score) -> List:
+    """
+    Lista em paralelo e baixa a melhor legenda de cada idioma, tudo dentro de
+    `budget` segundos (padrões: PROVIDER_TIMEOUT e SEARCH_BUDGET do módulo).
+    """
+    deadline = time.monotonic() + (SEARCH_BUDGET if budget is None else budget)
+    subtitles = list_subtitles(video, languages, providers, provider_timeout, deadline)
+    if not subtitles:
+        return []
+    return download_best(subtitles, video, set(languages), deadline, score)
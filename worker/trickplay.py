@@ -0,0 +1,149 @@
+"""
+Miniaturas de pré-visualização da barra de busca (trickplay).
+
+Uma passada extra do ffmpeg sobre um filme 4K dobraria o custo de
+decodificação. Por isso as miniaturas saem:
+
+- na recodificação em processo único, como uma segunda saída do mesmo
+  ffmpeg (os quadros já decodificados para o HLS passam por fps+scale);
+- nos demais caminhos (copy, smart render, blocos paralelos), decodificando
+  só os keyframes da fonte (-skip_frame nokey), que é uma fração pequena
+  dos quadros.
+
+As miniaturas são agrupadas em sprites JPEG e descritas numa trilha WebVTT
+(#xywh=x,y,w,h), referenciada no metadata.json.
+"""
+import os
+import shutil
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from ffmpeg_progress import run_ffmpeg_with_progress
+from process_supervisor import PROGRESS_IDLE_TIMEOUT, encode_timeout
+
+THUMBNAIL_INTERVAL = 10
+THUMBNAIL_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+SPRITE_QUALITY = 80
+TRICKPLAY_FOLDER = 'trickplay'
+TRICKPLAY_VTT = 'thumbnails.vtt'
+
+
+def thumbnail_output_args(thumbs_dir: str, interval: int = THUMBNAIL_INTERVAL,
+                          width: int = THUMBNAIL_WIDTH) -> List[str]:
+    """Argumentos de uma saída extra do ffmpeg com uma miniatura a cada `interval` segundos."""
+    return ['-map', '0:v:0', '-an', '-sn',
+            '-vf', f'fps=1/{interval},scale={width}:-2',
+            '-q:v', '5', os.path.join(thumbs_dir, 'thumb%05d.jpg')]
+
+
+def extract_keyframe_thumbnails(video_file: str, thumbs_dir: str,
+                                interval: int = THUMBNAIL_INTERVAL, duration: Optional[float] = None) -> bool:
+    """
+    Gera as miniaturas decodificando apenas os keyframes da fonte. O
+    -progress mantém o supervisor informado (sem ele o ffmpeg com -v error
+    fica mudo até o fim); `duration` limita o tempo total.
+    """
+    os.makedirs(thumbs_dir, exist_ok=True)
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error', '-y',
+           '-skip_frame', 'nokey', '-i', video_file] + thumbnail_output_args(thumbs_dir, interval)
+    if not run_ffmpeg_with_progress(cmd, duration, stage='ffmpeg:miniaturas', idle_timeout=PROGRESS_IDLE_TIMEOUT,
+                                    total_timeout=encode_timeout(duration) if duration else None):
+        print("AVISO: Falha ao extrair miniaturas")
+        return False
+    return bool(list_thumbnails(thumbs_dir))
+
+
+def list_thumbnails(thumbs_dir: str) -> List[str]:
+    if not os.path.isdir(thumbs_dir):
+        return []
+    return sorted(os.path.join(thumbs_dir, name) for name in os.listdir(thumbs_dir)
+                  if name.startswith('thumb') and name.endswith('.jpg'))
+
+
+def _vtt_timestamp(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f'{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}'
+
+
+def build_sprites(thumbnails: List[str], output_dir: str, interval: int = THUMBNAIL_INTERVAL,
+                  duration: Optional[float] = None) -> Optional[Dict]:
+    """
+    Agrupa as miniaturas em sprites (SPRITE_COLUMNS x SPRITE_ROWS) e escreve
+    a trilha WebVTT.
+
+    Returns:
+        Dict para o metadata.json (vtt, interval, width, height, sprites) ou
+        None se não houver miniaturas
+    """
+    if not thumbnails:
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+
+    with Image.open(thumbnails[0]) as first:
+        width, height = first.size
+    per_sprite = SPRITE_COLUMNS * SPRITE_ROWS
+    cues = ['WEBVTT', '']
+    sprite_count = 0
+
+    for sprite_index in range(0, len(thumbnails), per_sprite):
+        batch = thumbnails[sprite_index:sprite_index + per_sprite]
+        rows = (len(batch) + SPRITE_COLUMNS - 1) // SPRITE_COLUMNS
+        columns = min(len(batch), SPRITE_COLUMNS)
+        sprite = Image.new('RGB', (columns * width, rows * height))
+        sprite_name = f'sprite_{sprite_count:03d}.jpg'
+
+        for position, path in enumerate(batch):
+            x = (position % SPRITE_COLUMNS) * width
+            y = (position // SPRITE_COLUMNS) * height
+            with Image.open(path) as thumb:
+                sprite.paste(thumb.convert('RGB').resize((width, height)), (x, y))
+
+            index = sprite_index + position
+            start = index * interval
+            end = start + interval
+            if duration:
+                end = min(end, duration)
+            if end <= start:
+                continue
+            cues.append(f'{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}')
+            cues.append(f'{sprite_name}#xywh={x},{y},{width},{height}')
+            cues.append('')
+
+        sprite.save(os.path.join(output_dir, sprite_name), 'JPEG', quality=SPRITE_QUALITY, optimize=True)
+        sprite_count += 1
+
+    temp_path = os.path.join(output_dir, TRICKPLAY_VTT + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(cues))
+    os.replace(temp_path, os.path.join(output_dir, TRICKPLAY_VTT))
+
+    return {
+        'vtt': f'/{TRICKPLAY_FOLDER}/{TRICKPLAY_VTT}',
+        'interval': interval,
+        'width': width,
+        'height': height,
+        'sprites': sprite_count
+    }
+
+
+def finalize_trickplay(movie_folder: str, thumbs_dir: str, video_file: str,
+                       duration: Optional[float] = None) -> Optional[Dict]:
+    """
+    Monta a trilha a partir das miniaturas da passada de recodificação ou,
+    se ela não as gerou, decodificando só os keyframes da fonte. A pasta
+    temporária de miniaturas é sempre removida.
+    """
+    try:
+        if not list_thumbnails(thumbs_dir):
+            extract_keyframe_thumbnails(video_file, thumbs_dir, duration=duration)
+        info = build_sprites(list_thumbnails(thumbs_dir), os.path.join(movie_folder, TRICKPLAY_FOLDER),
+                             duration=duration)
+        if info:
+            print(f"Trickplay: {info['sprites']} sprites ({info['width']}x{info['height']} a cada {info['interval']}s)")
+        return info
+    finally:
+        shutil.rmtree(thumbs_dir, ignore_errors=True)
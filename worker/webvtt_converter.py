@@ -0,0 +1,235 @@
+"""
+Conversão de legendas SRT e ASS/SSA para WebVTT, em streaming.
+
+O _convert_to_webvtt antigo lia o arquivo inteiro para o chardet.detect
+(lento em arquivos grandes: o chardet analisa byte a byte), relia tudo com
+o pysrt montando um objeto por fala e só aceitava SRT. Aqui:
+
+- a primeira tentativa é UTF-8 estrito (com ou sem BOM), que falha cedo e
+  barato se o arquivo não for UTF-8; só então o chardet roda, numa amostra
+  limitada (ENCODING_SAMPLE_BYTES) a partir do primeiro byte não ASCII (um
+  início só ASCII daria 'ascii' e cada acento viraria U+FFFD);
+- SRT e ASS/SSA são lidos linha a linha numa única passada (expressões
+  pré-compiladas) e cada fala é escrita no WebVTT assim que termina;
+- os tempos são normalizados para HH:MM:SS.mmm (vírgula ou ponto, horas ou
+  milissegundos com menos dígitos, centésimos do ASS);
+- a saída vai para um arquivo temporário renomeado no final (um WebVTT pela
+  metade nunca fica na pasta de legendas).
+
+read_cues/write_srt servem ao alinhador de legendas, que precisa de todas as
+falas em memória, com a mesma leitura (encoding e SRT/ASS) da conversão.
+"""
+import os
+import re
+from typing import Iterator, List, Optional, Tuple
+
+import chardet
+
+ENCODING_SAMPLE_BYTES = 64 * 1024
+FALLBACK_ENCODING = 'cp1252'
+# Abaixo disso de bytes não ASCII na amostra o chardet chuta (poucas letras
+# acentuadas viram cirílico): vale FALLBACK_ENCODING
+MIN_GUESS_EVIDENCE = 32
+ASS_EXTENSIONS = ('.ass', '.ssa')
+
+SRT_TIMING = re.compile(r'(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})')
+SRT_INDEX = re.compile(r'\d+$')
+ASS_TIME = re.compile(r'(\d+):(\d{1,2}):(\d{1,2})[.:](\d{1,3})$')
+ASS_OVERRIDE = re.compile(r'\{[^}]*\}')
+NON_ASCII = re.compile(rb'[\x80-\xff]')
+ASS_DEFAULT_FORMAT = ['layer', 'start', 'end', 'style', 'name', 'marginl', 'marginr', 'marginv', 'effect', 'text']
+
+# (início, fim, texto), com os tempos já no formato do WebVTT
+Cue = Tuple[str, str, str]
+
+
+def vtt_time(ms: int) -> str:
+    hours, ms = divmod(max(ms, 0), 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{ms:03d}"
+
+
+def _stamp(hours: str, minutes: str, seconds: str, millis: str) -> str:
+    # Caso comum (00:01:02,345) sem conversões; o resto é normalizado
+    if len(hours) == 2 and len(minutes) == 2 and len(seconds) == 2 and len(millis) == 3:
+        return f"{hours}:{minutes}:{seconds}.{millis}"
+    return vtt_time(((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis))
+
+
+def _cue_text(lines) -> str:
+    # "-->" encerraria a fala no WebVTT; linhas vazias também
+    return '\n'.join(line.replace('-->', '->') for line in lines if line.strip())
+
+
+def parse_srt(lines) -> Iterator[Cue]:
+    """Falas (início ms, fim ms, texto) de um SRT, tolerante a numeração faltando ou linhas sobrando."""
+    start = end = None
+    text = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        timing = SRT_TIMING.search(line) if '-->' in line else None
+        if timing:
+            # Número da próxima fala colado no texto da anterior (sem linha vazia)
+            if text and SRT_INDEX.match(text[-1].strip()):
+                text.pop()
+            if start is not None and text:
+                yield start, end, _cue_text(text)
+            groups = timing.groups()
+            start, end, text = _stamp(*groups[:4]), _stamp(*groups[4:]), []
+        elif start is not None:
+            if line.strip():
+                text.append(line)
+            elif text:
+                yield start, end, _cue_text(text)
+                start, text = None, []
+    if start is not None and text:
+        yield start, end, _cue_text(text)
+
+
+def _ass_time(value: str) -> Optional[str]:
+    match = ASS_TIME.match(value.strip())
+    if not match:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    # Centésimos no ASS ("0:00:01.50" = 1,5s)
+    return _stamp(hours.zfill(2), minutes.zfill(2), seconds.zfill(2), fraction.ljust(3, '0')[:3])
+
+
+def _ass_text(text: str) -> str:
+    text = ASS_OVERRIDE.sub('', text)
+    return text.replace('\\N', '\n').replace('\\n', '\n').replace('\\h', ' ')
+
+
+def parse_ass(lines) -> Iterator[Cue]:
+    """Falas das linhas Dialogue da seção [Events] de um ASS/SSA (tags de estilo removidas)."""
+    in_events = False
+    fields = ASS_DEFAULT_FORMAT
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            in_events = line.lower() == '[events]'
+            continue
+        if not in_events:
+            continue
+        key, _, value = line.partition(':')
+        key = key.strip().lower()
+        if key == 'format':
+            fields = [field.strip().lower() for field in value.split(',')]
+        elif key == 'dialogue':
+            values = value.split(',', len(fields) - 1)
+            if len(values) != len(fields):
+                continue
+            event = dict(zip(fields, values))
+            start, end = _ass_time(event.get('start', '')), _ass_time(event.get('end', ''))
+            text = _cue_text(_ass_text(event.get('text', '')).split('\n'))
+            if start is not None and end is not None and text:
+                yield start, end, text
+
+
+def _is_ass(path: str, first_line: str) -> bool:
+    return path.lower().endswith(ASS_EXTENSIONS) or first_line.lstrip('\ufeff').strip().lower() == '[script info]'
+
+
+def _first_non_ascii(f) -> int:
+    """Offset do primeiro byte não ASCII (0 se não houver), lido em blocos."""
+    offset = 0
+    while True:
+        chunk = f.read(ENCODING_SAMPLE_BYTES)
+        if not chunk:
+            return 0
+        match = NON_ASCII.search(chunk)
+        if match:
+            return offset + match.start()
+        offset += len(chunk)
+
+
+def guess_encoding(path: str, sample_bytes: int = ENCODING_SAMPLE_BYTES) -> str:
+    """
+    Encoding pelo chardet numa amostra que começa no primeiro byte não ASCII.
+    Com pouca evidência (MIN_GUESS_EVIDENCE), sem palpite ou com 'ascii' (o
+    UTF-8 estrito já falhou, então há bytes acima de 0x7F), vale
+    FALLBACK_ENCODING.
+    """
+    with open(path, 'rb') as f:
+        f.seek(_first_non_ascii(f))
+        sample = f.read(sample_bytes)
+    if len(NON_ASCII.findall(sample)) < MIN_GUESS_EVIDENCE:
+        return FALLBACK_ENCODING
+    encoding = chardet.detect(sample)['encoding']
+    return encoding if encoding and encoding.lower() != 'ascii' else FALLBACK_ENCODING
+
+
+def _parse(source: str, src) -> Iterator[Cue]:
+    parser = parse_ass if _is_ass(source, src.readline()) else parse_srt
+    src.seek(0)
+    return parser(src)
+
+
+def _write(source: str, target: str, encoding: str, errors: str) -> int:
+    temp_path = target + '.tmp'
+    cues = 0
+    try:
+        with open(source, 'r', encoding=encoding, errors=errors, newline='') as src, \
+                open(temp_path, 'w', encoding='utf-8') as out:
+            out.write("WEBVTT\n\n")
+            for start, end, text in _parse(source, src):
+                out.write(f"{start} --> {end}\n{text}\n\n")
+                cues += 1
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return cues
+
+
+def convert_to_webvtt(source: str, target: str) -> Tuple[int, str]:
+    """
+    Converte `source` (SRT ou ASS/SSA) em `target` (WebVTT, UTF-8).
+
+    Returns:
+        (número de falas escritas, encoding usado na leitura)
+    """
+    try:
+        return _write(source, target, 'utf-8-sig', 'strict'), 'utf-8'
+    except UnicodeDecodeError:
+        encoding = guess_encoding(source)
+        # Depois do palpite do chardet, bytes inválidos viram U+FFFD em vez de abortar
+        return _write(source, target, encoding, 'replace'), encoding
+
+
+def read_cues(source: str) -> Tuple[List[Cue], str]:
+    """
+    Todas as falas de `source` (SRT ou ASS/SSA), lidas como na conversão:
+    UTF-8 estrito primeiro, depois o palpite do chardet numa amostra.
+
+    Returns:
+        (falas, encoding usado na leitura)
+    """
+    try:
+        with open(source, 'r', encoding='utf-8-sig', newline='') as src:
+            return list(_parse(source, src)), 'utf-8'
+    except UnicodeDecodeError:
+        encoding = guess_encoding(source)
+        with open(source, 'r', encoding=encoding, errors='replace', newline='') as src:
+            return list(_parse(source, src)), encoding
+
+
+def cue_seconds(stamp: str) -> float:
+    """'HH:MM:SS.mmm' (formato das falas) em segundos."""
+    hours, minutes, seconds = stamp.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def write_srt(cues: List[Cue], target: str) -> int:
+    """Grava as falas como SRT (UTF-8), via arquivo temporário. Retorna o número de falas."""
+    temp_path = target + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as out:
+            for index, (start, end, text) in enumerate(cues, 1):
+                out.write(f"{index}\n{start.replace('.', ',')} --> {end.replace('.', ',')}\n{text}\n\n")
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return len(cues)